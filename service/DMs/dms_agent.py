@@ -9,10 +9,12 @@ import json
 import os
 import re
 import signal
+import socket
 import subprocess
 import threading
 import time
 import sys, traceback
+from collections import deque
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Dict, Optional, List
@@ -27,6 +29,27 @@ HERE = Path(__file__).resolve()
 ROOT = HERE.parents[2] if len(HERE.parts) >= 3 and HERE.parts[-3].lower() == "service" else HERE.parent
 DEFAULT_CONFIG = ROOT / "config" / "dms_config.json"
 
+# 공용 모듈 (src.fd_common.*) 사용을 위해 V5 ROOT 를 import 경로에 추가
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from src.fd_common.log_stream import fd_log_stream, fd_log_search
+from src.fd_common.log_ship import fd_logship_batch, fd_logship_encode, LOGSHIP_MAX_BYTES
+from service.DMs.dms_proctable import PROC_TABLE, kill_pid_tree
+from service.DMs.dms_telemetry import TelemetryCollector, FIELDS as TELEMETRY_FIELDS
+from service.DMs.dms_health import HealthMonitor, fd_health_parse
+from src.fd_common.config_store import CONFIG_STORE
+from src.fd_common.metrics import fd_metric_counter, fd_metric_gauge, fd_metrics_text, METRICS_CONTENT_TYPE
+
+import psutil
+
+# ── metrics (/metrics) ──────────────────────────────────────────────────────
+_M_EVENTS   = fd_metric_counter("dms_process_events", "supervision events (start/stop/exit/restart_scheduled/crash_loop/unhealthy)", ("proc", "kind"))
+_M_UP       = fd_metric_gauge("dms_process_up", "1 if the managed process is running", ("proc",))
+_M_CRASHES  = fd_metric_gauge("dms_process_crash_count", "consecutive crashes since the last stable run", ("proc",))
+_M_BREAKER  = fd_metric_gauge("dms_process_crash_loop", "1 while auto-restart is paused by the crash-loop breaker", ("proc",))
+_M_RES      = fd_metric_gauge("dms_process_resource", "latest telemetry sample (cpu %, rss bytes, threads, handles, io B/s)", ("proc", "field"))
+_M_LOGSHIP  = fd_metric_counter("dms_logship_bytes", "log shipping bytes served", ("kind",))
+
 # NEW: OMS style unified log folder
 LOG_DIR_DEFAULT = ROOT / "daemon" / "DMS" / "log"
 ensure_dir(LOG_DIR_DEFAULT)
@@ -53,7 +76,8 @@ def _strip_json5_comments(text: str) -> str:
         lines.append("".join(buf))
     return "\n".join(lines)
 def _json5_load(p: Path) -> dict:
-    text = p.read_text(encoding="utf-8")
+    return _json5_loads(p.read_text(encoding="utf-8"))
+def _json5_loads(text: str) -> dict:
     cleaned = _strip_json5_comments(text)
     cleaned = re.sub(r'(?m)(?<!["\w])([A-Za-z_][A-Za-z0-9_]*)\s*:(?!\s*")', r'"\1":', cleaned)  # unquoted key
     cleaned = re.sub(r",\s*([\]})])", r"\1", cleaned)  # trailing comma
@@ -65,8 +89,11 @@ def load_config(path: Path) -> dict:
 def now_ms() -> int:
     return int(time.time() * 1000)
 
-# ── Windows helpers (no psutil) ─────────────────────────────────────────────
+# ── process helpers (psutil process table) ──────────────────────────────────
 def _taskkill_pid(pid: int, force: bool = True) -> None:
+    if os.name != "nt":
+        kill_pid_tree(pid)
+        return
     flags = ["/T", "/F"] if force else ["/T"]
     try:
         subprocess.run(["taskkill", "/PID", str(pid), *flags],
@@ -74,33 +101,11 @@ def _taskkill_pid(pid: int, force: bool = True) -> None:
                        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
     except Exception:
         pass
+    PROC_TABLE.invalidate()
 def _pids_by_image_name(image: str) -> List[int]:
-    try:
-        out = subprocess.check_output(
-            ["tasklist", "/FI", f"IMAGENAME eq {image}"],
-            stderr=subprocess.STDOUT,
-            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
-        ).decode(errors="ignore")
-        rx = re.compile(rf"^{re.escape(image)}\s+(\d+)\s", re.M | re.I)
-        return [int(m.group(1)) for m in rx.finditer(out)]
-    except Exception:
-        return []
+    return PROC_TABLE.pids_by_name(image)
 def _pids_by_exact_path(path: Path) -> List[int]:
-    p = str(path.resolve())
-    try:
-        ps = [
-            "powershell", "-NoProfile", "-Command",
-            "$p=@'\n" + p + "\n'@;"
-            "Get-CimInstance Win32_Process | "
-            "Where-Object { $_.ExecutablePath -eq $p } | "
-            "Select-Object -ExpandProperty ProcessId"
-        ]
-        out = subprocess.check_output(ps, stderr=subprocess.STDOUT,
-                                      creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
-                                      ).decode(errors="ignore")
-        return [int(s) for s in re.findall(r"\d+", out)]
-    except Exception:
-        return []
+    return PROC_TABLE.pids_by_exe(path)
 def _kill_all_by_path(path: Path) -> int:
     pids = _pids_by_exact_path(path)
     for pid in pids:
@@ -108,22 +113,7 @@ def _kill_all_by_path(path: Path) -> int:
     return len(pids)
 def _pids_by_cmd_contains(substr: str) -> List[int]:
     """CommandLine에 substr(대소문자 무시)이 포함된 프로세스 PID 목록"""
-    if not substr:
-        return []
-    s = substr.lower()
-    try:
-        ps = [
-            "powershell","-NoProfile","-Command",
-            ("Get-CimInstance Win32_Process | "
-             "Where-Object { $_.CommandLine -and $_.CommandLine.ToLower().Contains(@'\n" + s + "\n'@) } | "
-             "Select-Object -ExpandProperty ProcessId")
-        ]
-        out = subprocess.check_output(ps, stderr=subprocess.STDOUT,
-                                      creationflags=getattr(subprocess,"CREATE_NO_WINDOW",0)
-                                     ).decode(errors="ignore")
-        return [int(x) for x in re.findall(r"\d+", out)]
-    except Exception:
-        return []
+    return PROC_TABLE.pids_by_cmd_contains(substr)
 def _kill_by_cmd_contains(substr: str) -> int:
     cnt = 0
     for pid in _pids_by_cmd_contains(substr):
@@ -179,7 +169,8 @@ class ProcSpec:
     def __init__(self, name: str, path: Path, args: list,
                  auto_restart: bool, start_on_boot: bool, select: bool,
                  alias: str = "", cwd: Optional[Path] = None, workdir: Optional[Path] = None,
-                 env: Optional[Dict[str, str]] = None, shell: bool = False):
+                 env: Optional[Dict[str, str]] = None, shell: bool = False,
+                 ready: Optional[dict] = None, health: Optional[dict] = None):
         self.name = name
         self.path = path
         self.alias = alias or ""
@@ -191,6 +182,10 @@ class ProcSpec:
         self.cwd = cwd
         self.env = env or {}
         self.shell = shell
+        # readiness: {"tcp": <port>, "delay_sec": <sec>} - 없으면 running 이면 ready
+        self.ready = dict(ready or {})
+        # health check: tcp / mtd_ping / log_fresh (dms_health.py) - 없으면 프로세스 존재만 본다
+        self.health = fd_health_parse(health)
 
 class ProcState:
     def __init__(self, spec: ProcSpec):
@@ -199,6 +194,15 @@ class ProcState:
         self.pid: Optional[int] = None
         self.last_start_ms: Optional[int] = None
         self.last_exit_code: Optional[int] = None
+        self.last_exit_ms: Optional[int] = None
+        # ── supervision (watcher thread / backoff / crash-loop breaker)
+        self.gen = 0                               # start/stop 마다 증가 → 이전 watcher 의 exit 는 무시
+        self.watch_pid: Optional[int] = None       # watcher 가 기다리고 있는 pid
+        self.crash_count = 0                       # 연속 crash (stable_sec 이상 돌면 0 으로)
+        self.exit_times: deque = deque(maxlen=32)  # crash-loop 판정용 exit 시각
+        self.restart_at: Optional[float] = None    # backoff 후 restart 예정 시각
+        self.breaker_until = 0.0                   # crash-loop → 이 시각까지 auto-restart 중지
+        self.kill_reason: Optional[str] = None     # DMS 가 죽인 경우 (health) exit event 에 남긴다
 
     def is_running(self) -> bool:
         return bool(self.proc is not None and (self.proc.poll() is None))
@@ -228,7 +232,11 @@ class ProcState:
             "running": bool(self.proc is not None and (self.proc.poll() is None)),
             "pid": self.pid,
             "last_rc": self.last_exit_code,
-            "last_exit_code": self.last_exit_code
+            "last_exit_code": self.last_exit_code,
+            "last_exit_ms": self.last_exit_ms,
+            "crash_count": self.crash_count,
+            "restart_in_sec": round(max(0.0, self.restart_at - time.time()), 2) if self.restart_at else None,
+            "crash_loop": self.breaker_until > time.time(),
         }
 
 class DmsSupervisor:
@@ -261,16 +269,18 @@ class DmsSupervisor:
             cwd = (ROOT / cwd_val).resolve() if cwd_val and not os.path.isabs(cwd_val) else Path(cwd_val) if cwd_val else None
             env = dict(item.get("env", {}))
             shell = bool(item.get("shell", False))
+            ready = item.get("ready") if isinstance(item.get("ready"), dict) else None
 
             spec = ProcSpec(name, path, args, auto_restart, start_on_boot, select,
-                            alias=alias, cwd=cwd, env=env, shell=shell, workdir=workdir)
+                            alias=alias, cwd=cwd, env=env, shell=shell, workdir=workdir, ready=ready,
+                            health=item.get("health"))
             self.specs[name] = spec
             self.states[name] = ProcState(spec)
 
         self._stop_evt = threading.Event()
         self._http_thread: Optional[threading.Thread] = None
         self._tick_thread: Optional[threading.Thread] = None
-        self._cfg_mtime = DEFAULT_CONFIG.stat().st_mtime if DEFAULT_CONFIG.exists() else 0
+        self._cfg_version = CONFIG_STORE.get(DEFAULT_CONFIG, _json5_loads).version
 
         # caches
         self._psnap_ts = 0.0
@@ -280,19 +290,244 @@ class DmsSupervisor:
 
         # ── maintenance lock: restart-all 등에서 auto_restart 일시 정지
         self._maint_lock = False
+
+        # ── readiness: start/stop/exit 때 notify → /ready, /events long-poll 이 바로 깨어난다
+        self._ready_cv = threading.Condition()
+
+        # ── restart policy (exponential backoff + crash-loop breaker)
+        rp = config.get("restart_policy") if isinstance(config.get("restart_policy"), dict) else {}
+        self.backoff_base = float(rp.get("backoff_base_sec", 1.0))      # 두 번째 crash 부터 1, 2, 4 ... 초
+        self.backoff_max = float(rp.get("backoff_max_sec", 60.0))
+        self.stable_sec = float(rp.get("stable_sec", 30.0))             # 이만큼 돌았으면 crash_count reset
+        self.crash_loop_max = int(rp.get("crash_loop_max", 5))          # window 안에 이만큼 죽으면 breaker open
+        self.crash_loop_window = float(rp.get("crash_loop_window_sec", 60.0))
+        self.crash_loop_cooldown = float(rp.get("crash_loop_cooldown_sec", 300.0))
+
+        # ── supervision events (OMS 가 /events long-poll 로 바로 받아간다)
+        self.boot_ms = now_ms()
+        self._events: deque = deque(maxlen=500)
+        self._event_seq = 0
+
+        # ── resource telemetry (process 별 ring buffer)
+        tm = config.get("telemetry") if isinstance(config.get("telemetry"), dict) else {}
+        self.telemetry = TelemetryCollector(
+            lambda: {nm: st.pid for nm, st in list(self.states.items())},
+            interval=float(tm.get("interval_sec", 2.0)),
+            capacity=int(tm.get("capacity", 1800)),
+            log=self._log,
+        )
+
+        # ── health check (hang 감지 → 연속 N 회 실패면 kill, 재시작은 exit watcher 의 backoff 를 탄다)
+        self.health = HealthMonitor(
+            lambda: {nm: {"health": st.spec.health, "running": st.pid is not None, "started_ms": st.last_start_ms}
+                     for nm, st in list(self.states.items())},
+            self._on_unhealthy,
+            ROOT,
+            log=self._log,
+        )
     
     # ── small wait helper (class method) ────────────────────────────────────
     def _wait_until(self, predicate, *, timeout=20.0, interval=0.4, hint=""):
-        t0 = time.time()
+        """predicate 가 True 가 될 때까지 - start/stop/exit notify 로 깨어나고, interval 은 재확인 상한"""
+        deadline = time.time() + timeout
         while True:
             try:
                 if predicate():
                     return True
             except Exception:
                 pass
-            if (time.time() - t0) > timeout:
+            remaining = deadline - time.time()
+            if remaining <= 0:
                 raise TimeoutError(f"timeout while waiting {hint}".strip())
-            time.sleep(interval)
+            with self._ready_cv:
+                self._ready_cv.wait(min(remaining, interval))
+
+    # ── supervision events ──────────────────────────────────────────────────
+    def _publish_event(self, kind: str, name: str, **fields):
+        with self._ready_cv:
+            self._event_seq += 1
+            ev = {"seq": self._event_seq, "ts": now_ms(), "kind": kind, "name": name, **fields}
+            self._events.append(ev)
+            self._status_cache = None  # 다음 /status 는 바뀐 상태로
+            _M_EVENTS.labels(name, kind).inc()
+            self._ready_cv.notify_all()
+        return ev
+
+    def events_since(self, since: int = 0, timeout: float = 0.0, boot: int = 0) -> dict:
+        """
+        since 이후 event. 없으면 최대 timeout 초 long-poll.
+        boot 가 다르면 (DMS 재시작) since 를 무시하고 남아있는 것 전부 (reset=True)
+        """
+        reset = bool(boot) and int(boot) != self.boot_ms
+        since = 0 if reset else int(since)
+        deadline = time.time() + max(0.0, min(float(timeout), 30.0))
+        with self._ready_cv:
+            if since > self._event_seq:
+                since, reset = 0, True
+            while self._event_seq <= since:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._ready_cv.wait(remaining)
+            evs = [e for e in self._events if e["seq"] > since]
+            seq = self._event_seq
+        return {"ok": True, "boot": self.boot_ms, "seq": seq, "reset": reset, "events": evs}
+
+    # ── child supervision (watcher thread per instance) ─────────────────────
+    def _watch(self, st: ProcState):
+        """
+        Popen 자식은 proc.wait(), 이미 떠 있던(adopt) 프로세스는 psutil wait 로 exit 를 바로 잡는다.
+        (pid 재사용은 psutil.Process 가 create_time 으로 걸러준다)
+        """
+        gen, proc, pid = st.gen, st.proc, st.pid
+        if pid is None or st.watch_pid == pid:
+            return
+        try:
+            handle = proc if proc is not None else psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            handle = None
+        st.watch_pid = pid
+
+        def run():
+            rc = None
+            try:
+                if handle is not None:
+                    rc = handle.wait()
+            except psutil.NoSuchProcess:
+                pass
+            except Exception as e:
+                self._log(f"[WATCH] {st.spec.name} pid={pid} wait failed: {e!r}")
+                st.watch_pid = None
+                return
+            self._on_exit(st, gen, rc, source="watch")
+
+        threading.Thread(target=run, daemon=True, name=f"dms-watch-{st.spec.name}-{pid}").start()
+
+    def _on_exit(self, st: ProcState, gen: int, rc: Optional[int], source: str = "watch"):
+        with self._lock:
+            if st.gen != gen:  # stop() / 새 start() 이후의 exit → 이미 처리됨
+                return
+            name = st.spec.name
+            now = time.time()
+            uptime = (now_ms() - st.last_start_ms) / 1000.0 if st.last_start_ms else 0.0
+            st.gen += 1
+            st.proc = None
+            st.pid = None
+            st.watch_pid = None
+            st.last_exit_code = rc
+            st.last_exit_ms = now_ms()
+            reason, st.kill_reason = st.kill_reason, None
+            PROC_TABLE.invalidate()
+
+            if uptime >= self.stable_sec:
+                st.crash_count = 0
+                st.exit_times.clear()
+            st.crash_count += 1
+            st.exit_times.append(now)
+            self._log(f"[EXIT] {name} rc={rc} uptime={uptime:.1f}s (by {source})" + (f" - {reason}" if reason else ""))
+            self._publish_event("exit", name, rc=rc, uptime_sec=round(uptime, 3), source=source, reason=reason)
+
+            if self._stop_evt.is_set() or self._maint_lock or not st.spec.auto_restart or not st.spec.select:
+                return
+            recent = [t for t in st.exit_times if now - t <= self.crash_loop_window]
+            if len(recent) >= self.crash_loop_max:
+                st.breaker_until = now + self.crash_loop_cooldown
+                st.restart_at = None
+                self._log(f"[CRASH-LOOP] {name} exited {len(recent)} times in {self.crash_loop_window:.0f}s "
+                          f"-> auto-restart paused for {self.crash_loop_cooldown:.0f}s")
+                self._publish_event("crash_loop", name, exits=len(recent), cooldown_sec=self.crash_loop_cooldown)
+                return
+            # 첫 crash 는 바로, 이후 base * 2^(n-2) (max 까지)
+            delay = 0.0 if st.crash_count <= 1 else min(self.backoff_max, self.backoff_base * (2 ** (st.crash_count - 2)))
+            self._schedule_restart(st, delay)
+
+    def _on_unhealthy(self, name: str, detail: str) -> bool:
+        """health check 연속 실패 → 프로세스를 죽이고 crash 로 처리 (backoff / crash-loop 그대로 적용)"""
+        with self._lock:
+            st = self.states.get(name)
+            if not st or st.pid is None:
+                return False
+            self._publish_event("unhealthy", name, detail=detail, pid=st.pid)
+            if self._maint_lock or not st.spec.auto_restart or not st.spec.select:
+                return False
+            self._log(f"[HEALTH] {name} pid={st.pid} killing hung process -> auto-restart")
+            st.kill_reason = f"unhealthy: {detail}"
+            pid, gen = st.pid, st.gen
+            _taskkill_pid(pid, True)
+            if st.watch_pid != pid:  # watcher 가 없으면 (wrapper 등) 바로 exit 처리
+                self._on_exit(st, gen, None, source="health")
+            return True
+
+    def _schedule_restart(self, st: ProcState, delay: float):
+        st.restart_at = time.time() + delay
+        gen = st.gen
+        if delay > 0:
+            self._log(f"[RESTART] {st.spec.name} in {delay:.1f}s (crash #{st.crash_count})")
+            self._publish_event("restart_scheduled", st.spec.name, delay_sec=delay, crash_count=st.crash_count)
+        t = threading.Timer(delay, self._restart_due, args=(st, gen))
+        t.daemon = True
+        t.start()
+
+    def _restart_due(self, st: ProcState, gen: int):
+        with self._lock:
+            if st.gen != gen or st.restart_at is None or self._stop_evt.is_set():
+                return  # 그 사이 수동 start/stop
+            st.restart_at = None
+            if self._maint_lock or not st.spec.auto_restart or not st.spec.select:
+                return
+            self._log(f"[RESTART] {st.spec.name} restarting...")
+            try:
+                self.start(st.spec.name, auto=True)
+            except Exception as e:
+                self._log(f"[RESTART-ERR] {st.spec.name}: {e!r}")
+
+    # ── readiness (long-poll) ───────────────────────────────────────────────
+    def _notify_ready(self):
+        with self._ready_cv:
+            self._ready_cv.notify_all()
+
+    def _is_ready(self, st: ProcState, since_ms: int) -> tuple:
+        if st.last_start_ms is None or st.last_start_ms < since_ms:
+            return False, "not started"
+        if not st.is_running() and not st.is_running_fast(self._proc_snapshot()):
+            return False, "not running"
+        rd = st.spec.ready
+        delay = float(rd.get("delay_sec", 0) or 0)
+        if delay and (now_ms() - st.last_start_ms) < delay * 1000:
+            return False, "warming up"
+        port = rd.get("tcp")
+        if port:
+            try:
+                with socket.create_connection((rd.get("host", "127.0.0.1"), int(port)), timeout=0.5):
+                    pass
+            except OSError:
+                return False, f"tcp {port} not listening"
+        return True, "ready"
+
+    def wait_ready(self, name: str, since_ms: int = 0, timeout: float = 10.0) -> dict:
+        """
+        since_ms 이후에 시작된 인스턴스가 ready 가 될 때까지 최대 timeout 초 대기.
+        ready 가 아니어도 timeout 이면 ready=False 로 응답 (caller 가 다시 부른다)
+        """
+        st = self._get_state(name)
+        if not st:
+            return {"ok": False, "error": f"unknown process: {name}"}
+        deadline = time.time() + max(0.0, min(float(timeout), 30.0))
+        while True:
+            ready, reason = self._is_ready(st, int(since_ms))
+            remaining = deadline - time.time()
+            if ready or remaining <= 0:
+                break
+            with self._ready_cv:
+                self._ready_cv.wait(min(remaining, 0.25))
+        return {
+            "ok": True,
+            "name": st.spec.name,
+            "ready": ready,
+            "reason": reason,
+            "pid": st.pid,
+            "started_ms": st.last_start_ms,
+        }
 
     # ── atomic restart-all (class method) ───────────────────────────────────
     def restart_all(self) -> dict:
@@ -339,32 +574,12 @@ class DmsSupervisor:
     
     # ── proc snapshot ────────────────────────────────────────────────────────
     def _proc_snapshot(self) -> dict:
-        now = time.time()
-        if (now - self._psnap_ts) < 2.0 and self._psnap:
-            return self._psnap
+        """{lowercased exe path: pid} - psutil process table (메모리, 1초 이내면 재조회 없음)"""
         try:
-            ps = [
-                "powershell", "-NoProfile", "-Command",
-                ("Get-CimInstance Win32_Process | "
-                 "Where-Object {$_.ExecutablePath} | "
-                 "ForEach-Object { [Console]::Out.WriteLine(\"{0}|{1}\" -f $_.ProcessId, $_.ExecutablePath) }")
-            ]
-            out = subprocess.check_output(ps, stderr=subprocess.STDOUT,
-                                          creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
-                                          ).decode(errors="ignore")
-            snap = {}
-            for line in out.splitlines():
-                if "|" not in line: continue
-                pid_str, path = line.split("|", 1)
-                path = path.strip().lower()
-                if not path: continue
-                m = re.search(r"\d+", pid_str)
-                if m:
-                    snap[path] = int(m.group(0))
-            self._psnap = snap
-        except Exception:
-            self._psnap = {}
-        self._psnap_ts = now
+            self._psnap = PROC_TABLE.exe_map()
+        except Exception as e:
+            self._log(f"[PROC] process table refresh failed: {e!r}")
+        self._psnap_ts = time.time()
         return self._psnap
 
     # ── helpers ──────────────────────────────────────────────────────────────
@@ -462,6 +677,29 @@ class DmsSupervisor:
         self._log(f"[LOG-SCAN]  pick(latest) -> {pick}")
         return pick
 
+    def logship_sources(self) -> dict:
+        """log shipping 대상 {proc: [log dir, ...]} - daemon/<proc>/log 우선, 그 다음 exe 주변 후보"""
+        src = {"DMS": [Path(self.log_dir)]}
+        for nm, st in list(self.states.items()):
+            src[nm] = [ROOT / "daemon" / nm / "log", *self._collect_log_dirs(st.spec.path)]
+        return src
+
+    def metrics_text(self) -> str:
+        """/metrics - process gauge 는 scrape 시점 상태로 채운다"""
+        now = time.time()
+        latest = self.telemetry.latest()
+        for nm, st in list(self.states.items()):
+            _M_UP.labels(nm).set(1 if st.pid is not None else 0)
+            _M_CRASHES.labels(nm).set(st.crash_count)
+            _M_BREAKER.labels(nm).set(1 if st.breaker_until > now else 0)
+            smp = latest.get(nm) if st.pid is not None else None
+            for f in TELEMETRY_FIELDS:
+                if smp and smp.get(f) is not None:
+                    _M_RES.labels(nm, f).set(smp[f])
+                else:
+                    _M_RES.remove(nm, f)
+        return fd_metrics_text()
+
     def _log_dates_for(self, name: str) -> list[str]:
         st = self._get_state(name)
         if not st:
@@ -510,6 +748,9 @@ class DmsSupervisor:
             d = st.to_dict()
             d["running"] = running
             d["pid"] = st.pid
+            res = self.telemetry.peek(name) if running else None
+            d["res"] = {k: (round(v, 1) if k == "cpu" else int(v)) for k, v in res.items() if k != "ts"} if res else None
+            d["health"] = self.health.summary(name) if st.spec.health else None
             data[name] = d
             # 배열 항목(프론트 호환용)
             executables.append({
@@ -556,6 +797,7 @@ class DmsSupervisor:
         if _is_wrapper_exe(st.spec.path):
             return
         time.sleep(0.3)
+        PROC_TABLE.invalidate()
         pids = _pids_by_exact_path(st.spec.path)
         if not pids:
             return
@@ -579,11 +821,17 @@ class DmsSupervisor:
             return spec.alias.lower()
         return spec.name.lower()
 
-    def start(self, name: str) -> dict:
+    def start(self, name: str, auto: bool = False) -> dict:
+        """auto=False (사용자/OMS 요청) 이면 backoff / crash-loop 상태를 초기화한다"""
         with self._lock:
             st = self.states.get(name)
             if not st:
                 return {"ok": False, "error": f"unknown process: {name}"}
+            if not auto:
+                st.crash_count = 0
+                st.exit_times.clear()
+                st.restart_at = None
+                st.breaker_until = 0.0
 
             if not st.spec.select:
                 self._log(f"[START-SKIP] {name} select=false")
@@ -594,7 +842,7 @@ class DmsSupervisor:
                 return {"ok": False, "error": f"executable not found: {spec.path}"}
 
             if st.is_running():
-                return {"ok": True, "msg": f"{name} already running", "pid": st.pid}
+                return {"ok": True, "msg": f"{name} already running", "pid": st.pid, "started_ms": st.last_start_ms}
 
             # 스냅샷 기반 중복 실행 체크 (wrapper는 제외)
             if not _is_wrapper_exe(spec.path):
@@ -603,7 +851,10 @@ class DmsSupervisor:
                 pid = snap.get(p)
                 if pid:
                     st.pid = pid
-                    return {"ok": True, "msg": f"{name} already running", "pid": st.pid}
+                    if st.last_start_ms is None:
+                        st.last_start_ms = now_ms()
+                    self._watch(st)  # 이미 떠 있던 인스턴스도 exit 를 바로 잡는다
+                    return {"ok": True, "msg": f"{name} already running", "pid": st.pid, "started_ms": st.last_start_ms}
 
             # 이중 Popen 제거: 한 번만 실행
             creationflags = 0
@@ -642,12 +893,18 @@ class DmsSupervisor:
             st.proc = proc
             st.pid = proc.pid
             st.last_start_ms = now_ms()
+            st.gen += 1
+            st.restart_at = None
+            PROC_TABLE.invalidate()
             self._log(f"[START] {name} pid={st.pid}")
 
             # wrapper는 스킵, 일반 exe만 singleton enforcement
             self._enforce_singleton_after_start(st)
+            self._watch(st)
+            self._publish_event("start", name, pid=st.pid, auto=auto, crash_count=st.crash_count)
+            self._notify_ready()
 
-            return {"ok": True, "msg": "started", "pid": st.pid}
+            return {"ok": True, "msg": "started", "pid": st.pid, "started_ms": st.last_start_ms}
 
     def stop(self, name: str, force: bool = True) -> dict:
         with self._lock:
@@ -655,6 +912,12 @@ class DmsSupervisor:
             if not st:
                 return {"ok": False, "error": f"unknown process: {name}"}
 
+            # 의도된 종료 → watcher 의 exit 는 crash 로 보지 않는다
+            st.gen += 1
+            st.restart_at = None
+            was_running = st.watch_pid is not None or st.is_running()
+            st.watch_pid = None
+
             # 1) 자식 핸들 종료 시도
             if st.proc and (st.proc.poll() is None):
                 try:
@@ -687,6 +950,9 @@ class DmsSupervisor:
             st.proc = None
             st.pid = None
             self._log(f"[STOP] {name} done (killed={killed})")
+            if was_running or killed:
+                self._publish_event("stop", name, killed=killed)
+            self._notify_ready()
             return {"ok": True, "msg": "stopped", "killed": killed}
 
     def restart(self, name: str) -> dict:
@@ -725,6 +991,7 @@ class DmsSupervisor:
                 d = st.to_dict()
                 d["running"] = running
                 d["pid"] = st.pid
+                d["health"] = self.health.summary(st.spec.name) if st.spec.health else None
                 return d
 
             if name:
@@ -756,15 +1023,23 @@ class DmsSupervisor:
                                 if pid != keep: _taskkill_pid(pid, True)
                             st.pid = keep
 
-                    # auto-restart
-                    if (not self._maint_lock) and st.spec.auto_restart and st.last_start_ms is not None:
-                        # wrapper라도 여기선 다시 시작 가능
-                        snap = self._proc_snapshot()
-                        alive = st.is_running_fast(snap)
-                        if not alive:
-                            self._log(f"[RESTART] {nm} restarting...")
-                            try: self.start(nm)
+                    # auto-restart : exit 는 watcher 가 바로 처리, tick 은 watcher 가 없는 경우의 보정 + breaker 해제
+                    if (not self._maint_lock) and st.spec.auto_restart and st.spec.select and st.last_start_ms is not None:
+                        now = time.time()
+                        if st.restart_at is not None or st.breaker_until > now:
+                            pass  # backoff / crash-loop cooldown 중
+                        elif st.breaker_until:
+                            st.breaker_until = 0.0
+                            st.crash_count = 0
+                            st.exit_times.clear()
+                            self._log(f"[CRASH-LOOP] {nm} cooldown over -> retry")
+                            self._publish_event("crash_loop_reset", nm)
+                            try: self.start(nm, auto=True)
                             except Exception: pass
+                        elif not st.is_running_fast(self._proc_snapshot()):
+                            self._on_exit(st, st.gen, None, source="tick")
+                        elif st.watch_pid != st.pid:
+                            self._watch(st)
 
                     # select=false → 강제 정지
                     if not st.spec.select and st.is_running():
@@ -775,17 +1050,12 @@ class DmsSupervisor:
         self._log("[DMs] tick loop ended")
 
     def _reload_config_if_needed(self):
-        try:
-            mt = DEFAULT_CONFIG.stat().st_mtime
-        except Exception:
-            return
-        if mt == self._cfg_mtime:
-            return
-        self._cfg_mtime = mt
-        try:
-            cfg = load_config(DEFAULT_CONFIG)
-        except Exception:
+        # CONFIG_STORE: 바뀌었을 때만 parse, 깨진/쓰는 중인 file 은 이전 snapshot 유지
+        snap = CONFIG_STORE.get(DEFAULT_CONFIG, _json5_loads)
+        if not snap.exists or snap.version == self._cfg_version:
             return
+        self._cfg_version = snap.version
+        cfg = snap.data
 
         items = {str(it["name"]): it for it in cfg.get("executables", [])}
         # 업데이트/삭제
@@ -801,6 +1071,8 @@ class DmsSupervisor:
             st.spec.auto_restart = bool(it.get("auto_restart", True))
             st.spec.start_on_boot = bool(it.get("start_on_boot", False))
             st.spec.args = list(it.get("args", []))
+            st.spec.ready = dict(it.get("ready") or {}) if isinstance(it.get("ready"), dict) else {}
+            st.spec.health = fd_health_parse(it.get("health"))
             st.spec.path = (ROOT / it["path"]).resolve() if not os.path.isabs(it["path"]) else Path(it["path"]).resolve()
 
         # 신규 추가
@@ -814,6 +1086,8 @@ class DmsSupervisor:
                 bool(it.get("auto_restart", True)),
                 bool(it.get("start_on_boot", False)),
                 bool(it.get("select", True)),
+                ready=it.get("ready") if isinstance(it.get("ready"), dict) else None,
+                health=it.get("health"),
             )
             self.specs[nm] = spec
             self.states[nm] = ProcState(spec)
@@ -822,6 +1096,11 @@ class DmsSupervisor:
         sup = self
 
         class H(BaseHTTPRequestHandler):
+            # OMS 가 connection 을 재사용(keep-alive)할 수 있도록 HTTP/1.1 로 응답
+            # (모든 응답에 Content-Length 가 들어간다). idle connection 은 timeout 후 닫는다
+            protocol_version = "HTTP/1.1"
+            timeout = 30
+
             def _ok(self, code=200, payload=None):
                 try:
                     self.send_response(code)
@@ -894,6 +1173,29 @@ class DmsSupervisor:
                                 dates.append(p.stem)
                             return self._ok(200, {"ok": True, "dates": dates})
 
+                        # /daemon/<PROC>/log/stream?date=YYYY-MM-DD&offset=N&fid=...&tail=50000
+                        # /daemon/<PROC>/log/search?date=YYYY-MM-DD&level=WARNING&q=regex&from=HH:MM:SS&to=HH:MM:SS&limit=2000
+                        if len(parts) >= 4 and parts[3] in ("stream", "search"):
+                            qs = _uparse.parse_qs(_uparse.urlsplit(self.path).query or "")
+                            q1 = lambda k, d="": ((qs.get(k) or [d])[0] or d).strip()
+                            date = q1("date") or time.strftime("%Y-%m-%d")
+                            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+                                return self._ok(400, {"ok": False, "error": "bad date"})
+                            fp = log_dir / f"{date}.log"
+                            try:
+                                if parts[3] == "stream":
+                                    res = fd_log_stream(fp, q1("offset"), q1("fid"), tail=int(q1("tail", "50000")))
+                                else:
+                                    res = fd_log_search(fp, level=q1("level"), pattern=q1("q"),
+                                                        t_from=q1("from"), t_to=q1("to"),
+                                                        limit=int(q1("limit", "2000")), date=date)
+                                res["date"] = date
+                                return self._ok(200, res)
+                            except ValueError as e:
+                                return self._ok(400, {"ok": False, "error": str(e)})
+                            except Exception as e:
+                                return self._ok(500, {"ok": False, "error": repr(e)})
+
                         # /daemon/<PROC>/log?date=YYYY-MM-DD&tail=50000
                         qs = _uparse.parse_qs(_uparse.urlsplit(self.path).query or "")
                         date = (qs.get("date") or [""])[0]
@@ -927,6 +1229,59 @@ class DmsSupervisor:
                             "text": text
                         })
 
+                    # readiness long-poll: /ready/<PROC>?since=<started_ms>&timeout=<sec>
+                    if len(parts) == 2 and parts[0] == "ready":
+                        q = _uparse.parse_qs(_uparse.urlsplit(self.path).query or "")
+                        try:
+                            since = int(float((q.get("since") or ["0"])[0]))
+                            wait = float((q.get("timeout") or ["10"])[0])
+                        except ValueError:
+                            return self._ok(400, {"ok": False, "error": "bad since/timeout"})
+                        res = sup.wait_ready(parts[1], since, wait)
+                        return self._ok(200 if res.get("ok") else 404, res)
+
+                    if parts == ["metrics"]:
+                        data = sup.metrics_text().encode("utf-8")
+                        self.send_response(200)
+                        self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+                        self.send_header("Cache-Control", "no-store")
+                        self.send_header("Content-Length", str(len(data)))
+                        self.end_headers()
+                        try: self.wfile.write(data)
+                        except (ConnectionAbortedError, BrokenPipeError): pass
+                        return
+
+                    # resource telemetry
+                    #   /telemetry                 : process 별 최신 sample
+                    #   /telemetry/<proc>?since=&until=&points=&fields=cpu,rss
+                    if parts and parts[0] == "telemetry" and len(parts) <= 2:
+                        if len(parts) == 1:
+                            return self._ok(200, {"ok": True, "interval_sec": sup.telemetry.interval,
+                                                  "fields": list(TELEMETRY_FIELDS), "data": sup.telemetry.latest()})
+                        q = _uparse.parse_qs(_uparse.urlsplit(self.path).query or "")
+                        try:
+                            since = float((q.get("since") or ["0"])[0])
+                            until = float((q.get("until") or ["0"])[0])
+                            points = max(1, min(int((q.get("points") or ["300"])[0]), 5000))
+                        except ValueError:
+                            return self._ok(400, {"ok": False, "error": "bad since/until/points"})
+                        fields = [f for f in ",".join(q.get("fields") or []).split(",") if f] or None
+                        ser = sup.telemetry.series(parts[1], since, until, points, fields)
+                        if ser is None:
+                            return self._ok(404, {"ok": False, "error": f"no telemetry for {parts[1]}"})
+                        return self._ok(200, {"ok": True, **ser})
+
+                    # supervision event (start / stop / exit / restart_scheduled / crash_loop) long-poll
+                    if parts == ["events"]:
+                        q = _uparse.parse_qs(_uparse.urlsplit(self.path).query or "")
+                        try:
+                            since = int((q.get("since") or ["0"])[0])
+                            boot = int((q.get("boot") or ["0"])[0])
+                            wait = float((q.get("timeout") or ["0"])[0])
+                        except ValueError:
+                            return self._ok(400, {"ok": False, "error": "bad since/boot/timeout"})
+                        return self._ok(200, sup.events_since(since, wait, boot))
+
                     # 로그 API
                     if parts and parts[0] == "logs":
                         if len(parts) == 3 and parts[1] == "list":
@@ -1100,15 +1455,36 @@ class DmsSupervisor:
                     if parts and parts[0] == "logs":
                         return self.do_GET()
 
+                    # log shipping: OMS collector 가 cursor 를 보내면 그 이후 라인을 압축 batch 로
+                    if parts == ["logship", "batch"]:
+                        try:
+                            req = json.loads(body or "{}")
+                        except ValueError as e:
+                            return self._ok(400, {"ok": False, "error": f"bad json: {e}"})
+                        try:
+                            max_bytes = max(1, min(int(req.get("max_bytes") or LOGSHIP_MAX_BYTES), 16_000_000))
+                        except (TypeError, ValueError):
+                            return self._ok(400, {"ok": False, "error": "bad max_bytes"})
+                        batch = fd_logship_batch(sup.logship_sources(), req.get("cursors") or {}, max_bytes)
+                        data, enc = fd_logship_encode(batch, self.headers.get("Accept-Encoding", ""))
+                        _M_LOGSHIP.labels("raw").inc(sum(len(f["text"]) for f in batch["files"]))
+                        _M_LOGSHIP.labels("wire").inc(len(data))
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/json; charset=utf-8")
+                        self.send_header("Content-Encoding", enc)
+                        self.send_header("Cache-Control", "no-store")
+                        self.send_header("Content-Length", str(len(data)))
+                        self.end_headers()
+                        try: self.wfile.write(data)
+                        except (ConnectionAbortedError, BrokenPipeError): pass
+                        return
+
                     # 설정 저장/포맷
                     if parts == ["config"]:
-                        DEFAULT_CONFIG.parent.mkdir(parents=True, exist_ok=True)
-                        DEFAULT_CONFIG.write_text(body, encoding="utf-8")
-                        s = DEFAULT_CONFIG.stat()
-                        sup._cfg_mtime = 0
+                        snap = CONFIG_STORE.write(DEFAULT_CONFIG, body, _json5_loads)
                         sup._reload_config_if_needed()
-                        sup._log(f"[CONFIG SAVED] {DEFAULT_CONFIG} ({s.st_size} bytes)")
-                        return self._ok(200, {"ok": True})
+                        sup._log(f"[CONFIG SAVED] {DEFAULT_CONFIG} ({snap.size} bytes, v{snap.version})")
+                        return self._ok(200, {"ok": True, "version": snap.version})
 
                     if parts == ["config-format"] or parts == ["config","format"]:
                         try:
@@ -1140,6 +1516,8 @@ class DmsSupervisor:
     def run(self):
         self._tick_thread = threading.Thread(target=self._tick_loop, daemon=True); self._tick_thread.start()
         self._http_thread = threading.Thread(target=self._http_loop, daemon=True); self._http_thread.start()
+        self.telemetry.start()
+        self.health.start()
         try:
             while not self._stop_evt.is_set():
                 time.sleep(0.5)
@@ -1147,6 +1525,8 @@ class DmsSupervisor:
             pass
         finally:
             self._stop_evt.set()
+            self.telemetry.stop()
+            self.health.stop()
             with self._lock:
                 for nm in list(self.states.keys()):
                     try: self.stop(nm, force=True)
@@ -0,0 +1,260 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# dms_health.py
+# - managed daemon health check (DMS config "health")
+#   . tcp       : daemon port connect
+#   . mtd_ping  : MTd 규격 frame (4byte len LE + 1byte type + JSON) 을 보내고 응답 frame 수신
+#   . log_fresh : 최신 log 파일의 mtime 이 max_age_sec 이내
+#   . process 별 interval / timeout, 연속 N 회 실패 → on_unhealthy (auto-restart 로 연결)
+#   . 기동 직후 grace_sec 동안은 검사하지 않는다
+#
+# config 예)
+#   "health": {
+#     "interval_sec": 5, "timeout_sec": 2, "failures": 3, "grace_sec": 20,
+#     "checks": [
+#       { "type": "tcp", "port": 19765 },
+#       { "type": "mtd_ping", "port": 19765 },          # "from" 생략 시 "4DOMS"
+#       { "type": "log_fresh", "max_age_sec": 120 }
+#     ]
+#   }
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import socket
+import struct
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.fd_common.metrics import fd_metric_histogram
+
+HEALTH_TYPES = ("tcp", "mtd_ping", "log_fresh")
+
+_M_CHECK_SEC = fd_metric_histogram("dms_health_check_seconds", "health check latency", ("proc", "type", "result"))
+
+def fd_health_parse(cfg) -> Optional[dict]:
+    """config 의 "health" → 정규화된 dict (없거나 잘못되면 None)"""
+    if not isinstance(cfg, dict):
+        return None
+    checks = cfg.get("checks")
+    if checks is None and cfg.get("type"):
+        checks = [cfg]   # 단일 check 축약형
+    checks = [dict(c) for c in (checks or []) if isinstance(c, dict) and c.get("type") in HEALTH_TYPES]
+    if not checks:
+        return None
+    return {
+        "interval_sec": max(0.5, float(cfg.get("interval_sec", 5.0))),
+        "timeout_sec": max(0.1, float(cfg.get("timeout_sec", 2.0))),
+        "failures": max(1, int(cfg.get("failures", 3))),
+        "grace_sec": max(0.0, float(cfg.get("grace_sec", 20.0))),
+        "checks": checks,
+    }
+
+# ─────────────────────────────────────────────────────────────
+# checks : (ok, detail)
+# ─────────────────────────────────────────────────────────────
+def _check_tcp(c: dict, name: str, timeout: float, ctx: dict):
+    host, port = c.get("host", "127.0.0.1"), int(c["port"])
+    with socket.create_connection((host, port), timeout=timeout):
+        pass
+    return True, f"tcp {port} open"
+
+def _recv_exact(s: socket.socket, n: int, deadline: float) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        left = deadline - time.time()
+        if left <= 0:
+            raise TimeoutError("timeout while reading frame")
+        s.settimeout(left)
+        chunk = s.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return buf
+
+def _check_mtd_ping(c: dict, name: str, timeout: float, ctx: dict):
+    """accept 만 하고 멈춘 daemon 은 tcp 로는 안 잡힌다 → 실제 request/response 한 번"""
+    host, port = c.get("host", "127.0.0.1"), int(c.get("port", 19765))
+    ts = int(time.time() * 1000)
+    msg = dict(c.get("message") or {
+        "Section1": "Daemon",
+        "Section2": "Information",
+        "Section3": "Version",
+        "SendState": "request",
+        "From": c.get("from") or "4DOMS",   # MTd 는 알려진 sender(4DOMS) 만 routing - OMS 와 같은 값
+        "To": c.get("to") or name,
+        "Action": "set",
+    })
+    msg.setdefault("Token", f"health_{ts}_{hex(ts)[-3:]}")
+    js = json.dumps(msg, ensure_ascii=False).encode("utf-8")
+    deadline = time.time() + timeout
+    with socket.create_connection((host, port), timeout=timeout) as s:
+        s.sendall(struct.pack("<IB", len(js), 0) + js)
+        size, typ = struct.unpack("<IB", _recv_exact(s, 5, deadline))
+        body = _recv_exact(s, size, deadline)
+    if typ == 0:
+        json.loads(body.decode("utf-8", "replace"))
+    elif typ != 1:
+        return False, f"unexpected frame type={typ}"
+    return True, f"mtd frame {size}B"
+
+def _check_log_fresh(c: dict, name: str, timeout: float, ctx: dict):
+    max_age = float(c.get("max_age_sec", 120.0))
+    p = Path(c["path"]) if c.get("path") else ctx["log_dir"]
+    if not p.is_absolute():
+        p = ctx["root"] / p
+    if p.is_dir():
+        files = [f for f in p.glob("*.log") if f.is_file()]
+        if not files:
+            return False, f"no log in {p}"
+        p = max(files, key=lambda f: f.stat().st_mtime)
+    age = time.time() - p.stat().st_mtime
+    if age > max_age:
+        return False, f"log stale {age:.0f}s > {max_age:.0f}s ({p.name})"
+    return True, f"log {age:.0f}s old"
+
+_CHECKS = {"tcp": _check_tcp, "mtd_ping": _check_mtd_ping, "log_fresh": _check_log_fresh}
+
+# ─────────────────────────────────────────────────────────────
+# monitor
+# ─────────────────────────────────────────────────────────────
+class HealthState:
+    __slots__ = ("status", "fails", "total_fails", "restarts", "last_check", "last_ok", "results", "next_due", "inflight")
+
+    def __init__(self):
+        self.status = "unknown"     # unknown | down | grace | ok | failing | unhealthy
+        self.fails = 0
+        self.total_fails = 0
+        self.restarts = 0
+        self.last_check = 0.0
+        self.last_ok = 0.0
+        self.results = []
+        self.next_due = 0.0
+        self.inflight = False
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status, "fails": self.fails, "total_fails": self.total_fails,
+            "restarts": self.restarts, "last_check": round(self.last_check, 3),
+            "last_ok": round(self.last_ok, 3), "results": self.results,
+        }
+
+class HealthMonitor:
+    def __init__(self, targets: Callable[[], Dict[str, dict]], on_unhealthy: Callable[[str, str], bool],
+                 root: Path, log: Callable[[str], None] = None, max_workers: int = 4):
+        """
+        targets      : () -> {name: {"health": dict|None, "running": bool, "started_ms": int|None, "log_dir": Path}}
+        on_unhealthy : (name, detail) -> 재시작을 걸었으면 True
+        """
+        self._targets = targets
+        self._on_unhealthy = on_unhealthy
+        self._root = Path(root)
+        self._log = log or (lambda m: None)
+        self._states: Dict[str, HealthState] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="dms-health")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _state(self, name: str) -> HealthState:
+        with self._lock:
+            return self._states.setdefault(name, HealthState())
+
+    def summary(self, name: str) -> Optional[dict]:
+        hs = self._states.get(name)
+        return hs.to_dict() if hs else None
+
+    def _tick(self):
+        now = time.time()
+        targets = self._targets() or {}
+        with self._lock:
+            for nm in list(self._states):
+                if nm not in targets:
+                    self._states.pop(nm, None)
+        for name, t in targets.items():
+            hc = t.get("health")
+            if not hc:
+                continue
+            hs = self._state(name)
+            if not t.get("running"):
+                hs.status, hs.fails = "down", 0
+                continue
+            started = (t.get("started_ms") or 0) / 1000.0
+            if now - started < hc["grace_sec"]:
+                hs.status, hs.fails = "grace", 0
+                continue
+            if hs.inflight or now < hs.next_due:
+                continue
+            hs.inflight = True
+            hs.next_due = now + hc["interval_sec"]
+            self._pool.submit(self._run, name, hc, t)
+
+    def _run(self, name: str, hc: dict, t: dict):
+        hs = self._state(name)
+        try:
+            results, ok_all = [], True
+            ctx = {"root": self._root, "log_dir": t.get("log_dir") or (self._root / "daemon" / name / "log")}
+            for c in hc["checks"]:
+                t0 = time.perf_counter()
+                try:
+                    ok, detail = _CHECKS[c["type"]](c, name, hc["timeout_sec"], ctx)
+                except Exception as e:
+                    ok, detail = False, f"{type(e).__name__}: {e}"
+                _M_CHECK_SEC.labels(name, c["type"], "ok" if ok else "fail").observe(time.perf_counter() - t0)
+                results.append({"type": c["type"], "ok": ok, "ms": round((time.perf_counter() - t0) * 1000, 1), "detail": detail})
+                if not ok:
+                    ok_all = False
+                    break   # 앞 check 가 실패하면 뒤는 의미 없다 (tcp → ping → log)
+            hs.results = results
+            hs.last_check = time.time()
+            if ok_all:
+                hs.status, hs.fails, hs.last_ok = "ok", 0, hs.last_check
+                return
+            hs.fails += 1
+            hs.total_fails += 1
+            detail = results[-1]["detail"]
+            if hs.fails < hc["failures"]:
+                hs.status = "failing"
+                self._log(f"[HEALTH] {name} check failed {hs.fails}/{hc['failures']}: {detail}")
+                return
+            hs.status = "unhealthy"
+            self._log(f"[HEALTH] {name} unhealthy after {hs.fails} consecutive failures: {detail}")
+            try:
+                if self._on_unhealthy(name, detail):
+                    hs.restarts += 1
+                    hs.fails = 0
+            except Exception as e:
+                self._log(f"[HEALTH] {name} recovery failed: {e!r}")
+        finally:
+            hs.inflight = False
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                self._log(f"[HEALTH] loop error: {e!r}")
+            self._stop.wait(0.25)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="dms-health")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "HEALTH_TYPES",
+    "fd_health_parse",
+    "HealthState",
+    "HealthMonitor",
+]
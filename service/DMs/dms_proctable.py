@@ -0,0 +1,182 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# dms_proctable.py
+# - in-memory process table (psutil) — PowerShell Get-CimInstance 대체
+#   . pid → exe / name / cmdline / create_time
+#   . refresh 는 증분: 새 pid 만 exe/cmdline 조회, 사라진 pid 는 제거
+#   . pid 재사용은 create_time 비교로 판정 (psutil.Process.is_running)
+#   . 모든 lookup 은 메모리에서 (max_age 보다 오래됐으면 먼저 refresh)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import threading
+import time
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psutil
+
+def _norm_path(p) -> str:
+    """비교용 경로 (기존 snapshot 과 같은 규칙: 절대경로 + 소문자)"""
+    if not p:
+        return ""
+    try:
+        return str(Path(p).resolve()).lower()
+    except Exception:
+        return str(p).lower()
+
+class ProcRow:
+    __slots__ = ("pid", "create_time", "exe", "name", "cmdline", "proc")
+
+    def __init__(self, proc: psutil.Process):
+        self.proc = proc
+        self.pid = proc.pid
+        with proc.oneshot():
+            self.create_time = proc.create_time()
+            self.name = self._safe(proc.name, "").lower()
+            exe = self._safe(proc.exe, "")
+            self.exe = exe.lower() if exe else ""
+            cmd = self._safe(proc.cmdline, []) or []
+            self.cmdline = " ".join(map(str, cmd)).lower()
+
+    @staticmethod
+    def _safe(fn, default):
+        try:
+            return fn()
+        except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+            return default
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": self.pid, "create_time": self.create_time,
+            "exe": self.exe, "name": self.name, "cmdline": self.cmdline,
+        }
+
+class ProcTable:
+    def __init__(self, max_age: float = 1.0):
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._rows: Dict[int, ProcRow] = {}
+        self._by_exe: Dict[str, List[int]] = {}
+        self._ts = 0.0
+        self.stats = {"refresh": 0, "added": 0, "removed": 0, "reused": 0, "last_ms": 0.0}
+
+    # ────────────────────────────────────────────
+    # refresh
+    # ────────────────────────────────────────────
+    def refresh(self, max_age: Optional[float] = None) -> None:
+        age = self.max_age if max_age is None else float(max_age)
+        if time.time() - self._ts < age:
+            return
+        with self._lock:
+            if time.time() - self._ts < age:  # 다른 thread 가 방금 갱신
+                return
+            t0 = time.perf_counter()
+            rows = self._rows
+            live = set(psutil.pids())
+            added = removed = reused = 0
+
+            for pid in list(rows):
+                if pid not in live:
+                    rows.pop(pid); removed += 1
+                elif not rows[pid].proc.is_running():  # 같은 pid, 다른 create_time → 재사용
+                    rows.pop(pid); reused += 1
+            for pid in live:
+                if pid in rows:
+                    continue
+                try:
+                    rows[pid] = ProcRow(psutil.Process(pid))
+                    added += 1
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                    continue
+
+            if added or removed or reused or not self._by_exe:
+                by_exe: Dict[str, List[int]] = {}
+                for pid, r in rows.items():
+                    if r.exe:
+                        by_exe.setdefault(r.exe, []).append(pid)
+                self._by_exe = by_exe
+
+            self._ts = time.time()
+            st = self.stats
+            st["refresh"] += 1
+            st["added"] += added
+            st["removed"] += removed
+            st["reused"] += reused
+            st["last_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+
+    def invalidate(self) -> None:
+        """kill / spawn 직후 - 다음 lookup 에서 바로 refresh"""
+        self._ts = 0.0
+
+    # ────────────────────────────────────────────
+    # lookups (memory)
+    # ────────────────────────────────────────────
+    def pids_by_exe(self, path, max_age: Optional[float] = None) -> List[int]:
+        self.refresh(max_age)
+        return sorted(self._by_exe.get(_norm_path(path), []))
+
+    def pids_by_name(self, image: str, max_age: Optional[float] = None) -> List[int]:
+        self.refresh(max_age)
+        img = (image or "").lower()
+        return sorted(pid for pid, r in list(self._rows.items()) if r.name == img)
+
+    def pids_by_cmd_contains(self, substr: str, max_age: Optional[float] = None) -> List[int]:
+        if not substr:
+            return []
+        self.refresh(max_age)
+        s = substr.lower()
+        me = os.getpid()
+        return sorted(pid for pid, r in list(self._rows.items()) if pid != me and s in r.cmdline)
+
+    def exe_map(self, max_age: Optional[float] = None) -> Dict[str, int]:
+        """{lowercased exe path: pid} - 기존 _proc_snapshot 과 같은 모양"""
+        self.refresh(max_age)
+        return {exe: pids[-1] for exe, pids in self._by_exe.items()}
+
+    def get(self, pid: int) -> Optional[dict]:
+        r = self._rows.get(pid)
+        return r.to_dict() if r else None
+
+    def alive(self, pid: Optional[int], create_time: Optional[float] = None) -> bool:
+        """pid 가 살아있고 (create_time 을 주면) 같은 인스턴스인지"""
+        if not pid:
+            return False
+        r = self._rows.get(pid)
+        if r is None:
+            return False
+        return create_time is None or abs(r.create_time - create_time) < 0.01
+
+    def info(self) -> dict:
+        return {**self.stats, "count": len(self._rows), "age_sec": round(time.time() - self._ts, 3)}
+
+PROC_TABLE = ProcTable()
+
+def kill_pid_tree(pid: int) -> bool:
+    """psutil 로 자식까지 종료 (taskkill /T /F 와 같은 동작)"""
+    try:
+        p = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return False
+    procs = []
+    try:
+        procs = p.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        pass
+    procs.append(p)
+    for c in procs:
+        try: c.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied): pass
+    psutil.wait_procs(procs, timeout=3)
+    PROC_TABLE.invalidate()
+    return True
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "ProcRow",
+    "ProcTable",
+    "PROC_TABLE",
+    "kill_pid_tree",
+]
@@ -0,0 +1,211 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# dms_telemetry.py
+# - managed process 별 resource telemetry (psutil)
+#   . cpu % / rss / threads / handles(fd) / io read·write bytes/s
+#   . process 별 고정 크기 ring buffer (array 컬럼, 메모리 고정)
+#   . wrapper (cmd.exe → 실제 exe) 를 위해 자식 프로세스까지 합산
+#   . series() : 구간 조회 + bucket downsampling (cpu/io 는 평균, rss/threads/handles 는 최대)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import threading
+import time
+
+from array import array
+from typing import Callable, Dict, Optional
+
+import psutil
+
+FIELDS     = ("cpu", "rss", "threads", "handles", "rd_bps", "wr_bps")
+FIELDS_MAX = ("rss", "threads", "handles")   # downsampling 때 peak 를 남길 field
+
+class TelemetryRing:
+    """고정 크기 ring - ts + FIELDS 컬럼"""
+    def __init__(self, capacity: int):
+        self.capacity = max(2, int(capacity))
+        self._lock = threading.Lock()
+        self._ts = array("d", [0.0] * self.capacity)
+        self._col = {f: array("d", [0.0] * self.capacity) for f in FIELDS}
+        self._head = 0      # 다음에 쓸 위치
+        self._count = 0
+
+    def append(self, ts: float, sample: dict):
+        with self._lock:
+            i = self._head
+            self._ts[i] = ts
+            for f in FIELDS:
+                self._col[f][i] = float(sample.get(f) or 0.0)
+            self._head = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _order(self):
+        start = (self._head - self._count) % self.capacity
+        return [(start + k) % self.capacity for k in range(self._count)]
+
+    def latest(self) -> Optional[dict]:
+        with self._lock:
+            if not self._count:
+                return None
+            i = (self._head - 1) % self.capacity
+            return {"ts": self._ts[i], **{f: self._col[f][i] for f in FIELDS}}
+
+    def series(self, since: float = 0.0, until: float = 0.0, max_points: int = 300, fields=None) -> dict:
+        fields = [f for f in (fields or FIELDS) if f in FIELDS]
+        with self._lock:
+            idx = [i for i in self._order() if self._ts[i] > since and (not until or self._ts[i] <= until)]
+            ts = [self._ts[i] for i in idx]
+            cols = {f: [self._col[f][i] for i in idx] for f in fields}
+        n = len(ts)
+        max_points = max(1, int(max_points))
+        step = 1 if n <= max_points else -(-n // max_points)   # ceil
+        out = {"t": [], **{f: [] for f in fields}}
+        for a in range(0, n, step):
+            b = min(n, a + step)
+            out["t"].append(round(ts[b - 1], 3))
+            for f in fields:
+                chunk = cols[f][a:b]
+                v = max(chunk) if f in FIELDS_MAX else sum(chunk) / len(chunk)
+                out[f].append(int(v) if f in FIELDS_MAX else round(v, 2))
+        return {"fields": fields, "points": len(out["t"]), "raw": n, "step": step, **out}
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"capacity": self.capacity, "count": self._count}
+
+class _ProcSampler:
+    """
+    한 인스턴스(pid + create_time) 의 psutil.Process 와 이전 io 값을 유지
+    (cpu_percent 는 이전 호출과의 차이로 계산되므로 객체를 재사용해야 한다)
+    """
+    def __init__(self, pid: int):
+        self.root = psutil.Process(pid)
+        self.procs: Dict[int, psutil.Process] = {}
+        self.prev_io = None   # (ts, read_bytes, write_bytes)
+
+    def sample(self, now: float) -> dict:
+        if not self.root.is_running():
+            raise psutil.NoSuchProcess(self.root.pid)
+        try:
+            tree = [self.root] + self.root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            tree = [self.root]
+        live = {}
+        for p in tree:
+            live[p.pid] = self.procs.get(p.pid, p)   # 기존 객체 재사용 (cpu 기준점)
+        self.procs = live
+
+        cpu = rss = threads = handles = rd = wr = 0
+        for p in live.values():
+            try:
+                with p.oneshot():
+                    cpu += p.cpu_percent(None)
+                    rss += p.memory_info().rss
+                    threads += p.num_threads()
+                    handles += p.num_handles() if os.name == "nt" else p.num_fds()
+                    try:
+                        io = p.io_counters()
+                        rd += io.read_bytes
+                        wr += io.write_bytes
+                    except (AttributeError, psutil.AccessDenied, NotImplementedError):
+                        pass
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+                continue
+
+        rd_bps = wr_bps = 0.0
+        if self.prev_io:
+            dt = now - self.prev_io[0]
+            if dt > 0:
+                # 자식이 빠지면 합이 줄 수 있다 → 음수는 0
+                rd_bps = max(0.0, (rd - self.prev_io[1]) / dt)
+                wr_bps = max(0.0, (wr - self.prev_io[2]) / dt)
+        self.prev_io = (now, rd, wr)
+        return {"cpu": cpu, "rss": rss, "threads": threads, "handles": handles,
+                "rd_bps": rd_bps, "wr_bps": wr_bps}
+
+class TelemetryCollector:
+    def __init__(self, targets: Callable[[], Dict[str, Optional[int]]],
+                 interval: float = 2.0, capacity: int = 1800, log: Callable[[str], None] = None):
+        """
+        targets  : () -> {name: pid|None}  (supervisor 의 현재 pid)
+        capacity : process 별 sample 수 (기본 2s x 1800 = 1시간)
+        """
+        self._targets = targets
+        self.interval = max(0.2, float(interval))
+        self.capacity = int(capacity)
+        self._log = log or (lambda m: None)
+        self._rings: Dict[str, TelemetryRing] = {}
+        self._samplers: Dict[str, _ProcSampler] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ring(self, name: str) -> TelemetryRing:
+        r = self._rings.get(name)
+        if r is None:
+            r = self._rings.setdefault(name, TelemetryRing(self.capacity))
+        return r
+
+    def peek(self, name: str) -> Optional[dict]:
+        """최근 sample (읽기 전용 - sample 된 적 없는 process 는 ring 을 만들지 않고 None)"""
+        r = self._rings.get(name)
+        return r.latest() if r is not None else None
+
+    def sample_once(self):
+        now = time.time()
+        targets = self._targets() or {}
+        for name in list(self._samplers):
+            if name not in targets:
+                self._samplers.pop(name, None)
+        for name, pid in targets.items():
+            if not pid:
+                self._samplers.pop(name, None)
+                continue
+            sp = self._samplers.get(name)
+            if sp is None or sp.root.pid != pid:
+                try:
+                    sp = self._samplers[name] = _ProcSampler(pid)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    self._samplers.pop(name, None)
+                    continue
+            try:
+                self.ring(name).append(now, sp.sample(now))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                self._samplers.pop(name, None)   # 재시작 → 다음 tick 에 새 pid 로
+            except Exception as e:
+                self._log(f"[TELEMETRY] {name} pid={pid} sample failed: {e!r}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            t0 = time.time()
+            try:
+                self.sample_once()
+            except Exception as e:
+                self._log(f"[TELEMETRY] loop error: {e!r}")
+            self._stop.wait(max(0.0, self.interval - (time.time() - t0)))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="dms-telemetry")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self) -> Dict[str, Optional[dict]]:
+        return {nm: r.latest() for nm, r in list(self._rings.items())}
+
+    def series(self, name: str, since: float = 0.0, until: float = 0.0, max_points: int = 300, fields=None) -> Optional[dict]:
+        r = self._rings.get(name)
+        if r is None:
+            return None
+        return {"name": name, "interval_sec": self.interval, **r.series(since, until, max_points, fields)}
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "FIELDS",
+    "TelemetryRing",
+    "TelemetryCollector",
+]
@@ -18,16 +18,51 @@ import re, copy
 import json, time, threading
 
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait as futures_wait, FIRST_COMPLETED
 from pathlib import Path
 from urllib.parse import urlsplit, parse_qs, unquote
 from copy import deepcopy
 from src.fd_communication.server_mtd_connect import tcp_json_roundtrip, MtdTraceError
+from src.fd_common.log_stream import fd_log_stream, fd_log_search
 from live_mtx_manager import MTX
-from collections import OrderedDict
+from oms_cam_monitor import CameraStateMonitor, CameraHealthProber
+from oms_restart_plan import RestartPlan
+from oms_step_graph import StepGraph, fd_step_chain, fd_step_bind, fd_step_abandoned
+from contextlib import contextmanager
+from oms_log_collector import LogSegmentStore, LogCollector, fd_log_collect_search
+from src.fd_common.metrics import fd_metrics_text, METRICS_CONTENT_TYPE
+from src.fd_common.tracing import fd_trace_setup, fd_trace_span, fd_trace_inject, fd_trace_spans, fd_trace_tokens, fd_trace_timeline
+from src.fd_common.config_store import CONFIG_STORE
+from collections import OrderedDict, deque
 
 # MTD 통신 충돌 방지용 전역 Lock
 _mtd_lock = threading.Lock()
+# connect step graph 의 fan-out : sequence 가 _mtd_lock 을 잡고 lease 를 건다
+# - 그 lease 를 물려받은 worker 끼리만 lock 없이 동시 전송
+# - sequence 가 끝나거나 (lease 해제) step 이 deadline 을 넘겨 버려지면 다시 lock 경로
+_mtd_owner = None
+_mtd_tls = threading.local()
+# trace : TraceParent 를 넣어도 되는 MTd 요청 대상 / /oms/trace limit 상한
+TRACE_INJECT_TO = {"AId", "AIc"}
+TRACE_LIMIT_MAX = 1000
+@contextmanager
+def _mtd_fanout_lease():
+    global _mtd_owner
+    with _mtd_lock:
+        lease = object()
+        _mtd_owner = lease
+        try:
+            yield lease
+        finally:
+            _mtd_owner = None
+def _mtd_fanout_init(lease=None):
+    # ThreadPoolExecutor initializer - 부르는 thread 의 lease / step 사슬을 worker 에 물려준다
+    lease = lease if lease is not None else getattr(_mtd_tls, "lease", None)
+    chain = fd_step_chain()
+    def _init():
+        _mtd_tls.lease = lease
+        fd_step_bind(chain)
+    return _init
 
 # ─────────────────────────────────────────────────────────────
 # shared codes/functions
@@ -80,6 +115,24 @@ class Orchestrator:
         self._cache = {}
         self._cache_ts = {}
         self._cache_alias = {} # { node_name: { "PreSd": "Pre Storage [#1]", ... } }
+        # DMS supervision event (exit / start / crash_loop ...) - node 별 /events long-poll
+        self._dms_events = deque(maxlen=500)
+        # 전 node daemon log 수집 (DMS /logship/batch → segment store)
+        lc = cfg.get("log_collect") if isinstance(cfg.get("log_collect"), dict) else {}
+        self._log_collect_enabled = bool(lc.get("enabled", True))
+        self._log_store = LogSegmentStore(
+            flush_sec=float(lc.get("flush_sec", 10.0)),
+            segment_bytes=int(lc.get("segment_bytes", 1_000_000)),
+            keep_days=int(lc.get("keep_days", 7)),
+        )
+        self._log_collector = LogCollector(lambda: self.nodes, self._log_store,
+                                           interval=float(lc.get("interval_sec", 2.0)))
+        # Token 별 span (OMS → MTd → AId → AIc) - /oms/trace 에서 daemon 것과 합쳐 timeline
+        tc = cfg.get("trace") if isinstance(cfg.get("trace"), dict) else {}
+        fd_trace_setup("OMS", int(tc.get("ring", 4096)),
+                       sink_dir=PATH_TRACE if tc.get("jsonl", True) else None,
+                       enabled=bool(tc.get("enabled", True)))
+        self._trace_inject = bool(tc.get("inject", True))
         
         # ────────────────────────────────────────
         # system restart
@@ -103,10 +156,14 @@ class Orchestrator:
         self._restart_poll_interval = 0.25
         self._restart_max_workers = 8
         self._restart_min_prepare_ms = 300        
+        user_depends = cfg.get("restart_depends") or {}
+        self._restart_depends = {**PROCESS_DEPENDS_DEFAULT, **(user_depends if isinstance(user_depends, dict) else {})}
         # ────────────────────────────────────────
         # system connect
         # ────────────────────────────────────────
         self._sys_connect_lock = threading.RLock() 
+        self._connect_step_deadline = float(cfg.get("connect_step_deadline_sec", 60.0))       # connect step 별
+        self._connect_version_deadline = float(cfg.get("connect_version_deadline_sec", 20.0)) # daemon version 질의 별
         self._sys_connect = {
             "state": "idle", # idle | running | done | error
             "message": "",
@@ -153,7 +210,16 @@ class Orchestrator:
         self._cam_connect_lock = threading.RLock() 
         fd_cam_state_load()
 
-        self.cam_state_lock  = threading.RLock() # for state change
+        self.cam_state_lock  = CAM_STATE_LOCK    # for state change (CAM_STATE 기록 store 와 같은 lock)
+        self._cam_wake = threading.Event() # prober 전이 감지 → 즉시 sweep
+        self._cam_prober = CameraHealthProber(
+            self._on_camera_transition,
+            timeout_sec=float(cfg.get("camera_probe_timeout_sec", 1.0)),
+            concurrency=int(cfg.get("camera_probe_concurrency", 64)),
+            min_interval=float(cfg.get("camera_probe_min_interval_sec", 0.5)),
+            max_interval=float(cfg.get("camera_probe_max_interval_sec", 5.0)),
+        )
+        self._cam_monitor = CameraStateMonitor(self.cam_state_lock, self._camera_ccd_status, max_workers=8, prober=self._cam_prober)
         self.erase_connect_state = False
         self.camera_poll_locked_until = 0        
         # ────────────────────────────────────────
@@ -181,6 +247,12 @@ class Orchestrator:
         self.product_date = 0
         self.product_time = 0
         self.producing_start_time = 0
+        # ────────────────────────────────────────
+        # system state snapshot (/oms/system/state)
+        # ────────────────────────────────────────
+        self._sys_snapshot = FdSnapshotPublisher(self._sys_status_build, name="SYS")
+        fd_sys_state_listen(self._sys_state_publish)
+        self._sys_state_publish()
 
 
 
@@ -188,9 +260,23 @@ class Orchestrator:
     # ⚙️ C/O/M/M/O/N
     # ────────────────────────────────────────────      
     def _mtd_command(self, tag, msg, wait=7.0):
+        lease = getattr(_mtd_tls, "lease", None)
+        if lease is not None and lease is _mtd_owner and not fd_step_abandoned():
+            return self._mtd_command_nolock(tag, msg, wait)
         with _mtd_lock:
             return self._mtd_command_nolock(tag, msg, wait)
     def _mtd_command_nolock(self, tag, msg, wait=7.0):
+        # 요청 하나 = span 하나 (MTd 가 TraceParent 를 넘겨주면 AId span 이 이 아래로 붙는다)
+        name = f"mtd:{msg.get('Section1', '')}/{msg.get('Section2', '')}/{msg.get('Section3', '')}"
+        with fd_trace_span(name, pkt=msg, to=msg.get("To", ""), tag=tag if isinstance(tag, str) else "") as span:
+            # TraceParent 는 우리가 schema 를 가진 AId / AIc 요청에만 (CCd / camera 등 외부 daemon 은 그대로)
+            if self._trace_inject and msg.get("To") in TRACE_INJECT_TO:
+                fd_trace_inject(msg)
+            r = self._mtd_roundtrip(tag, msg, wait)
+            if isinstance(r, dict) and r.get("ResultCode") not in (None, 1000):
+                span.fail(f"ResultCode {r.get('ResultCode')}")
+            return r
+    def _mtd_roundtrip(self, tag, msg, wait=7.0):
         token = msg.get("Token")
         conn = None
 
@@ -265,6 +351,40 @@ class Orchestrator:
                 except:
                     pass
 
+    def _trace_query(self, token: str, limit: int = 50, wait: float = 2.0) -> dict:
+        """
+        Token 하나의 timeline (OMS 자신의 span + MTd 를 거쳐 AId / AIc 의 span)
+        - token 이 비어 있으면 daemon 별 최근 token 목록
+        - 진단용이라 operator 명령을 기다리게 하지 않는다 : _mtd_lock 이 잡혀 있으면 OMS span 만
+        """
+        msg = {
+            "Section1": "Daemon",
+            "Section2": "Information",
+            "Section3": "Trace",
+            "SendState": "request",
+            "From": "4DOMS",
+            "To": "AId",
+            "Token": fd_make_token(),
+            "Action": "get",
+            "DMPDIP": self.mtd_ip,
+            "TraceToken": token,
+            "Limit": limit,
+        }
+        r, error = {}, ""
+        if not _mtd_lock.acquire(blocking=False):
+            error = "MTd busy - OMS spans only (retry)"
+        else:
+            try:
+                # span 을 남기지 않는 roundtrip (조회 자체가 token 목록에 끼지 않게)
+                r = self._mtd_roundtrip("Trace", msg, wait=wait) or {}
+            except Exception as e:
+                error = f"AId trace query failed: {e}"
+            finally:
+                _mtd_lock.release()
+        if not token:
+            return {"ok": True, "error": error, "tokens": {"OMS": fd_trace_tokens(limit), **(r.get("Tokens") or {})}}
+        timeline = fd_trace_timeline(fd_trace_spans(token) + list(r.get("Spans") or []), token)
+        return {"ok": True, "error": error, "missing": r.get("Missing", []), **timeline}
     def _get_process_list(self):
         try:
             status = self._sys_status_core()            
@@ -363,36 +483,80 @@ class Orchestrator:
     # ────────────────────────────────────────────      
     def _get_node_info(self):
         for n in self.nodes:
-            name=n.get("name") or n.get("host")
+            self._get_node_info_one(n)
+    def _get_node_info_one(self, n):
+        name=n.get("name") or n.get("host")
+        try:
+            st,_,data = fd_http_fetch(n["host"], int(n.get("port",19776)), "GET", "/status", None, None, timeout=2.5)
+            payload = json.loads(data.decode("utf-8","ignore")) if st==200 else {"ok":False,"error":f"http {st}"}
+        except Exception as e:
+            payload = {"ok":False,"error":repr(e)}
+        # ▼ DMS /config에서 실행 항목(alias)도 끌어옴
+        alias_map = None
+        try:
+            st2, hdr2, dat2 = fd_http_fetch(n["host"], int(n.get("port",19776)), "GET", "/config", None, None, timeout=self._status_fetch_timeout)
+            if st2 == 200:
+                txt = dat2.decode("utf-8","ignore")
+                cfg = json.loads(fd_strip_json5(txt))
+                tmp = {}
+                for ex in (cfg.get("executables") or []):
+                    nm = (ex or {}).get("name"); al = (ex or {}).get("alias")
+                    if nm and al is not None:
+                        if al:
+                            tmp[nm] = al
+                alias_map = tmp
+            else:
+                alias_map = None
+        except Exception:
+            alias_map = None
+        with self._lock:
+            self._cache[name] = payload
+            self._cache_ts[name] = time.time()
+            # ⬇️ 핵심: 200 OK였다면 빈 dict라도 캐시 반영(= 제거 반영)
+            if alias_map is not None:
+                self._cache_alias[name] = alias_map
+        self._sys_state_publish()
+
+    # ────────────────────────────────────────────
+    # 📡 DMS SUPERVISION EVENTS (long-poll)
+    # ────────────────────────────────────────────
+    def _watch_node_events(self, n):
+        """
+        DMS /events 를 long-poll → exit / start 가 오면 그 node 의 status 를 바로 갱신한다.
+        (heartbeat 주기 polling 은 그대로 두고, 변화만 앞당긴다)
+        """
+        name = n.get("name") or n.get("host")
+        host, port = n["host"], int(n.get("port", 19776))
+        boot, seq = 0, 0
+        while not self._stop.is_set():
             try:
-                st,_,data = fd_http_fetch(n["host"], int(n.get("port",19776)), "GET", "/status", None, None, timeout=2.5)
-                payload = json.loads(data.decode("utf-8","ignore")) if st==200 else {"ok":False,"error":f"http {st}"}
+                st, _, data = fd_http_fetch(host, port, "GET", f"/events?since={seq}&boot={boot}&timeout={DMS_EVENT_POLL_SEC:g}",
+                                            None, None, timeout=DMS_EVENT_POLL_SEC + 5.0)
+                if st == 404:  # 예전 DMS (event API 없음) → heartbeat polling 만
+                    fd_log.info(f"[OMS] {name}: DMS has no /events, heartbeat polling only")
+                    return
+                if st != 200:
+                    raise RuntimeError(f"http {st}")
+                res = json.loads(data.decode("utf-8", "ignore"))
             except Exception as e:
-                payload = {"ok":False,"error":repr(e)}
-            # ▼ DMS /config에서 실행 항목(alias)도 끌어옴
-            alias_map = None
+                fd_log.debug(f"[OMS] {name} event poll failed: {e}")
+                self._stop.wait(3.0)
+                continue
+            first = (boot == 0)
+            boot, seq = int(res.get("boot") or 0), int(res.get("seq") or 0)
+            evs = res.get("events") or []
+            if first or not evs:
+                continue  # 처음 붙을 때는 cursor 만 맞춘다 (지난 event 는 status 에 이미 반영)
+            for ev in evs:
+                ev = {**ev, "node": name, "host": host}
+                self._dms_events.append(ev)
+                lv = fd_log.warning if ev.get("kind") in ("exit", "crash_loop") else fd_log.info
+                lv(f"[DMS][{name}] {ev.get('kind')} {ev.get('name')} "
+                   + " ".join(f"{k}={v}" for k, v in ev.items() if k not in ("seq", "ts", "kind", "name", "node", "host")))
             try:
-                st2, hdr2, dat2 = fd_http_fetch(n["host"], int(n.get("port",19776)), "GET", "/config", None, None, timeout=self._status_fetch_timeout)
-                if st2 == 200:
-                    txt = dat2.decode("utf-8","ignore")
-                    cfg = json.loads(fd_strip_json5(txt))
-                    tmp = {}
-                    for ex in (cfg.get("executables") or []):
-                        nm = (ex or {}).get("name"); al = (ex or {}).get("alias")
-                        if nm and al is not None:
-                            if al:
-                                tmp[nm] = al
-                    alias_map = tmp
-                else:
-                    alias_map = None
+                self._get_node_info_one(n)
             except Exception:
-                alias_map = None
-            with self._lock:
-                self._cache[name] = payload
-                self._cache_ts[name] = time.time()
-                # ⬇️ 핵심: 200 OK였다면 빈 dict라도 캐시 반영(= 제거 반영)
-                if alias_map is not None:
-                    self._cache_alias[name] = alias_map
+                fd_log.exception(f"[OMS] {name} status refresh after event failed")
         
     # ────────────────────────────────────────────
     # 🛠️ /S/Y/S/T/E/M/
@@ -498,14 +662,20 @@ class Orchestrator:
         if "Version" in r and isinstance(r["Version"], dict):
             return r["Version"]            
         return r
-    def _request_version(self, daemon, ip, extra_fields=None, wait=8.0):
+    def _request_version(self, daemon, ip, extra_fields=None, wait=8.0, deadline=None):
         """
         daemon에 Version 요청을 보내고,
         정상 응답이 올 때까지 전체 응답(response) dict 그대로 반환한다.
+        deadline(epoch) 이 있으면 그 시각까지만 재시도한다.
         """
         max_retry = 100
 
         for attempt in range(1, max_retry + 1):
+            if deadline is not None:
+                left = deadline - time.time()
+                if left <= 0:
+                    break
+                wait = min(wait, max(0.5, left))
             msg = {
                 "Section1": "Daemon",
                 "Section2": "Information",
@@ -570,9 +740,15 @@ class Orchestrator:
                 fd_log.warning(f"[Version] {daemon} failed {attempt}/{max_retry}: {e}")
                 time.sleep(0.3)
 
-        raise Exception(f"[Version] {daemon} failed after {max_retry} attempts")
+        raise Exception(f"[Version] {daemon} failed after {attempt} attempts")
     # 🎯 oms/system/state
+    def _sys_state_publish(self):
+        # writer 쪽: 상태가 바뀐 직후 호출 → snapshot 교체
+        return self._sys_snapshot.publish()
     def _sys_status_core(self):
+        # reader 쪽: lock 없이 최신 snapshot → 복사본 (호출자가 고쳐도 publish 된 snapshot 은 그대로)
+        return deepcopy(self._sys_snapshot.latest().payload)
+    def _sys_status_build(self):
         with self._lock:
             # ---------------------------------------------------------
             # 1) 기본 nodes 리스트 구성
@@ -585,7 +761,7 @@ class Orchestrator:
                     "alias": n.get("alias", ""),
                     "host": n["host"],
                     "port": int(n.get("port", 19776)),
-                    "status": self._cache.get(nm),
+                    "status": deepcopy(self._cache.get(nm)),    # snapshot 은 live cache 와 분리
                     "ts": self._cache_ts.get(nm, 0),
                 })
             payload = {
@@ -598,7 +774,7 @@ class Orchestrator:
             # 2) extra (SYS_STATE 최신 스냅샷)
             # ---------------------------------------------------------
             _, latest = fd_sys_latest_state()
-            extra = latest or {}
+            extra = deepcopy(latest or {})                      # SYS_STATE 참조를 넘기지 않는다
             payload["extra"] = extra
             # 반드시 추가! summary 계산에 필요
             sys_st = extra
@@ -765,6 +941,7 @@ class Orchestrator:
             self._sys_restart.update(kw)
             self._sys_restart["updated_at"] = time.time()            
             self._sys_restart["started_at"] = start_time
+        self._sys_state_publish()
     def _sys_restart_process(self, orch):
         try:
             time.sleep(max(0, orch._restart_min_prepare_ms / 1000.0))
@@ -787,6 +964,7 @@ class Orchestrator:
                 # CAM_STATE 초기화
                 with self.cam_state_lock:
                     fd_cam_clear_connect_state()
+                    self._cam_monitor.invalidate()
                     self.erase_connect_state = True
                 fd_log.info("[CAM] reset connection info")
 
@@ -822,21 +1000,33 @@ class Orchestrator:
                 if not d:
                     return 0
                 return int(round(100.0 * n / d))
-            # ---------- pre-snapshots ----------
-            base_map = {}
             for (host, port, node_name, proc) in jobs:
-                base_map[(node_name, proc)] = fd_read_proc_snapshot(host, port, proc)
                 # check daemon host 
                 if proc == "MTd":
                     self.mtd_ip = host
 
+            # ---------- restart plan (dependency graph) ----------
+            plan = RestartPlan(jobs, self._restart_depends)
+            fd_log.info(f"[SYS][RESTART] plan: {plan.describe()}")
+
+            # ---------- pre-snapshots (ready-hook 이 없는 DMS 용 fallback 판정 기준) ----------
+            base_map = {}
+            with ThreadPoolExecutor(max_workers=min(len(jobs), 32)) as ex:
+                futs = {ex.submit(fd_read_proc_snapshot, j[0], j[1], j[3]): j for j in jobs}
+                for fut in as_completed(futs):
+                    j = futs[fut]
+                    try:
+                        base_map[(j[2], j[3])] = fut.result()
+                    except Exception:
+                        base_map[(j[2], j[3])] = {}
+
             # ======================================================
-            # 1) POST /restart/<proc>  --- 병렬 전송
+            # 1) POST /restart/<proc>
+            #    - 의존하는 proc 이 모두 ready 가 된 job 부터 바로 보낸다
             # ======================================================
-
             def send_restart(job):
                 host, port, node_name, proc = job
-                st, _, _ = fd_http_fetch(
+                st, _, data = fd_http_fetch(
                     host, port, "POST",
                     f"/restart/{proc}",
                     b"{}",
@@ -845,44 +1035,43 @@ class Orchestrator:
                 )
                 if st >= 400:
                     raise RuntimeError(f"http {st}")
-                return job
-
-            sent = 0
-            fails = []
-            sent_at_map = {}
-            orch._sys_restart_set(state=1,message=f"Sending restarts… 0/{total} (0%)")
-
-            # --- 병렬 max_workers = job 수
-            with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
-                futs = {ex.submit(send_restart, j): j for j in jobs}
-                for fut in as_completed(futs):
-                    job = futs[fut]
-                    host, port, node_name, proc = job
-                    try:
-                        fut.result()
-                        sent += 1
-                        sent_at_map[(node_name, proc)] = time.time()
-                    except Exception as e:
-                        msg = f"{node_name}/{proc}: {e}"
-                        fails.append(msg)
-                        fd_log.exception(f"[send] {msg}")
-                    finally:
-                        pct = _fmt_percent(sent, total)
-                        orch._sys_restart_set(state=1,sent=sent,fails=fails,message=f"Restart Process [{proc}] {sent}:/{total} ({pct}%) (fail {len(fails)})… waiting")
+                try:
+                    js = json.loads(data.decode("utf-8", "ignore") or "{}")
+                except Exception:
+                    js = {}
+                # DMS 시계 기준 시작 시각 (ready-hook 의 since 로 그대로 넘긴다)
+                return (js.get("start") or {}).get("started_ms")
 
             # ======================================================
-            # 2) wait_ready --- 병렬 polling (완전 병렬화)
+            # 2) wait_ready
+            #    - DMS ready-hook (GET /ready/<proc>, long-poll)
+            #    - hook 이 없는 DMS 는 /status polling 으로 판정
             # ======================================================
-            pending = [
-                j for j in jobs
-                if not any(f"{j[3]}" in f for f in fails)
-            ]
-
-            def wait_ready(job):
+            def wait_ready_hook(job, started_ms, deadline):
+                """True/False, hook 미지원이면 None"""
+                host, port, node_name, proc = job
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    wait = min(remaining, 10.0)
+                    st, _, data = fd_http_fetch(
+                        host, port, "GET",
+                        f"/ready/{proc}?since={int(started_ms)}&timeout={wait:.1f}",
+                        None, None,
+                        timeout=wait + self._status_fetch_timeout
+                    )
+                    if st == 404:
+                        return None
+                    js = json.loads(data.decode("utf-8", "ignore") or "{}")
+                    if js.get("ok") is False and "error" in js and "ready" not in js:
+                        return None
+                    if js.get("ready"):
+                        return True
+
+            def wait_ready_poll(job, sent_at, deadline):
                 host, port, node_name, proc = job
                 base = base_map.get((node_name, proc), {})
-                sent_at = sent_at_map.get((node_name, proc)) or time.time()
-                t0 = time.time()
                 saw_down = False
                 seen_running = 0
 
@@ -901,36 +1090,77 @@ class Orchestrator:
 
                     # 방식1: meta 기반 restart 판단
                     if fd_is_restarted(base, cur, sent_at, saw_down):
-                        return (job, True)
+                        return True
 
                     # 방식3: meta 없고 빠른 재기동 → running 2회 관측
                     meta_present = any(base.get(k) is not None for k in ("pid","start_ts","uptime")) \
                         or any(cur.get(k) is not None for k in ("pid","start_ts","uptime"))
                     if (not meta_present and cur.get("running") and seen_running >= 2 and (time.time() - sent_at) > 1.0):
-                        return (job, True)
+                        return True
 
                     # timeout
-                    if time.time() - t0 > orch._restart_ready_timeout:
-                        return (job, False)
+                    if time.time() > deadline:
+                        return False
 
                     time.sleep(orch._restart_poll_interval)
 
+            progress_lock = threading.Lock()
+            sent = 0
             done = 0
+            fails = []
 
-            # --- 강제 병렬: max_workers = pending 수
-            with ThreadPoolExecutor(max_workers=len(pending)) as ex:
-                futs = [ex.submit(wait_ready, j) for j in pending]
-                for fut in as_completed(futs):
-                    job, ok = fut.result()
-                    host, port, node_name, proc = job
-                    if ok:
-                        done += 1
-                    else:
-                        msg = f"{node_name}/{proc}: timeout"
-                        fails.append(msg)
-                        fd_log.error(f"[wait] {msg}")
+            def run_job(job):
+                """send → ready. (job, ok, error)"""
+                nonlocal sent
+                host, port, node_name, proc = job
+                try:
+                    started_ms = send_restart(job)
+                except Exception as e:
+                    fd_log.exception(f"[send] {node_name}/{proc}: {e}")
+                    return job, False, str(e)
+                sent_at = time.time()
+                with progress_lock:
+                    sent += 1
+                    n_sent = sent
+                wave = plan.wave_of.get(job, 0) + 1
+                orch._sys_restart_set(state=1,sent=n_sent,
+                    message=f"Restart Process [{proc}] wave {wave}/{len(plan.waves)} {n_sent}:/{total} ({_fmt_percent(n_sent, total)}%)… waiting")
+
+                deadline = sent_at + orch._restart_ready_timeout
+                ok = None
+                if started_ms is not None:
+                    try:
+                        ok = wait_ready_hook(job, started_ms, deadline)
+                    except Exception as e:
+                        fd_log.warning(f"[wait] {node_name}/{proc}: ready-hook failed ({e}), fallback to polling")
+                        ok = None
+                if ok is None:
+                    ok = wait_ready_poll(job, sent_at, deadline)
+                return job, ok, (None if ok else "timeout")
 
-                    orch._sys_restart_set(state=1,done=done,fails=fails,message=f"Restart Process {sent}/{total} (fail {len(fails)})… waiting")
+            orch._sys_restart_set(state=1,message=f"Sending restarts… 0/{total} (0%) · waves {len(plan.waves)}")
+
+            # --- 의존성이 풀린 job 만 실행 (critical path 만큼만 걸린다)
+            with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
+                futs = {ex.submit(run_job, j) for j in plan.roots()}
+                while futs:
+                    finished, futs = futures_wait(futs, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        job, ok, err = fut.result()
+                        host, port, node_name, proc = job
+                        if ok:
+                            done += 1
+                        else:
+                            msg = f"{node_name}/{proc}: {err}"
+                            fails.append(msg)
+                            fd_log.error(f"[wait] {msg}")
+                        released = plan.complete(job)
+                        if released and not ok:
+                            fd_log.warning(f"[SYS][RESTART] {node_name}/{proc} not ready, releasing dependents anyway: "
+                                           f"{sorted({j[3] for j in released})}")
+                        for nxt in released:
+                            futs.add(ex.submit(run_job, nxt))
+                        orch._sys_restart_set(state=1,done=done,fails=fails,message=f"Restart Process {sent}/{total} (fail {len(fails)})… waiting")
 
             # ======================================================
             # 3) settle 단계 (병렬 검사 버전)
@@ -1094,6 +1324,7 @@ class Orchestrator:
             self._sys_connect.update(kw)
             self._sys_connect["updated_at"] = time.time()  
             self._sys_connect["started_at"] = start_time    
+        self._sys_state_publish()
     # ================================================================
     # FULL REFACTORED VERSION OF _sys_connect_sequence + sub functions
     # ================================================================
@@ -1106,54 +1337,57 @@ class Orchestrator:
         fd_sys_clear_connect_state()
         fd_log.info("[SYS] reset connection info")
         #reset camera state
-        fd_cam_clear_connect_state()
+        with self.cam_state_lock:
+            fd_cam_clear_connect_state()
+            self._cam_monitor.invalidate()
         self.erase_connect_state = True
         fd_log.info("[CAM] reset connection info")
 
         self._prepare_daemon_ips()
         self._sys_connect_set(state=1, message="Connect start", started_at=time.time())
 
-        # STEP 1: Daemon Connect
-        self._sys_connect_set(state=1, message="Daemon Connect")
-        r1 = fd_retry(self._seq_step_1_daemon_connect, daemon_map, retry=3)
-
-        # STEP 2: CCd.Select
-        self._sys_connect_set(state=1, message="CCd.Select")
-        r2 = fd_retry(self._seq_step_2_ccd_select, retry=3)
-
-        # STEP 3: Build PreSd map
-        self._sys_connect_set(state=1, message="Build PreSd map")
-        self._seq_step_3_build_presd_map(r2)
-
-        # STEP 4: PCd Connect
-        self._sys_connect_set(state=1, message="PCd connect")
-        fd_retry(self._seq_step_4_pcd_connect, retry=3)
-
-        # STEP 5: AIc Connect
-        self._sys_connect_set(state=1, message="AIc connect")
-        fd_retry(self._seq_step_5_aic_connect, retry=3)
-
-        # STEP 6: Update daemon status
-        self._sys_connect_set(state=1, message="Update daemon dtatus")
-        final_connected = self._seq_step_6_update_daemon_status(r1)
-
-        fd_log.info("---------------------------------------------------------------------")
-        fd_log.info(f"[SYS][CONNECT] Get Version")
-        fd_log.info("---------------------------------------------------------------------")
-        # STEP 7: Get Versions
-        self._sys_connect_set(state=1, message="Get Version")
-        temp = self._seq_step_7_get_version(dmpdip, final_connected)
-
-        # STEP 8: Switch Information
-        self._sys_connect_set(state=1, message="Switch Information")
-        fd_retry(self._seq_step_8_switch_info, temp, retry=3)
-
-        # STEP 9: Save States
-        self._sys_connect_set(state=1, message="Save States")
-        self._seq_step_9_save_states(temp)
+        # ─────────────────────────────────────────────
+        # step graph
+        #   daemon ─┬─ ccd_select ─ presd_map ─┬─ pcd ────┐
+        #           │                          └─ switch ─┼─ save
+        #           ├─ aic ───────────────────────────────┤
+        #           └─ daemon_status ─────── version ─────┘
+        #   (version 은 pcd / aic / daemon_status 이후)
+        # ─────────────────────────────────────────────
+        dl = self._connect_step_deadline
+        g = StepGraph("SYS.CONNECT", on_event=self._sys_connect_step_event)
+        g.add("daemon", lambda r: fd_retry(self._seq_step_1_daemon_connect, daemon_map, retry=3),
+              deadline=dl, label="Daemon Connect")
+        g.add("ccd_select", lambda r: self._seq_step_2_ccd_select_ready(time.time() + dl),
+              deps=("daemon",), deadline=dl, label="CCd.Select")
+        g.add("presd_map", lambda r: self._seq_step_3_build_presd_map(r["ccd_select"]),
+              deps=("ccd_select",), label="Build PreSd map")
+        g.add("pcd", lambda r: fd_retry(self._seq_step_4_pcd_connect, retry=3),
+              deps=("presd_map",), deadline=dl, label="PCd connect")
+        g.add("aic", lambda r: fd_retry(self._seq_step_5_aic_connect, retry=3),
+              deps=("daemon",), deadline=dl, label="AIc connect")
+        g.add("daemon_status", lambda r: self._seq_step_6_update_daemon_status(r["daemon"]),
+              deps=("daemon",), label="Update daemon status")
+        g.add("version", lambda r: self._seq_step_7_get_version(dmpdip, r["daemon_status"]),
+              deps=("pcd", "aic", "daemon_status"), deadline=dl, label="Get Version")
+        g.add("switch", lambda r: fd_retry(self._seq_step_8_switch_info, {}, retry=3),
+              deps=("presd_map",), deadline=dl, label="Switch Information")
+        g.add("save", lambda r: self._seq_step_9_save_states({**r["version"], "switches": r["switch"].get("switches", [])}),
+              deps=("version", "switch"), label="Save States")
+
+        # sequence 동안 MTd 는 이 graph 가 점유 (worker 끼리는 동시 전송)
+        with _mtd_fanout_lease() as lease:
+            g.run(max_workers=4, initializer=_mtd_fanout_init(lease))
 
         self._sys_connect_set(state=2, message="Finish Connection")
-        return {"ok": True}
+        return {"ok": True, "steps": g.events}
+    def _sys_connect_step_event(self, ev):
+        if ev.get("state") == "start":
+            self._sys_connect_set(state=1, message=ev.get("label") or ev.get("step"))
+        elif ev.get("state") in ("failed", "skipped"):
+            fd_log.error(f"[SYS][CONNECT] step {ev.get('step')} {ev.get('state')}: {ev.get('error')}")
+        else:
+            fd_log.info(f"[SYS][CONNECT] step {ev.get('step')} done in {ev.get('sec')}s")
     def _prepare_daemon_ips(self):
     # STEP 0: preparing daemon IPs
         self.daemon_ips = self._get_daemon_ip()
@@ -1172,8 +1406,6 @@ class Orchestrator:
             self._connected_daemonlist = (r1.get("DaemonList") or {})
         except:
             self._connected_daemonlist = {}
-
-        time.sleep(0.8)
         return r1
     def _seq_step_2_ccd_select(self):
     # STEP 2: CCd.Select
@@ -1198,6 +1430,15 @@ class Orchestrator:
         })
 
         return resp
+    def _seq_step_2_ccd_select_ready(self, deadline, empty_grace=2.0):
+    # STEP 2: CCd.Select - daemon connect 직후 고정 sleep 대신, CCd 가 카메라 목록을 줄 때까지 재시도
+        t0 = time.time()
+        def _select():
+            resp = self._seq_step_2_ccd_select()
+            if not (resp or {}).get("ResultArray") and time.time() - t0 < empty_grace:
+                raise Exception("CCd.Select returned empty camera list (not ready yet?)")
+            return resp
+        return fd_retry_until(_select, deadline=deadline, retry_delay=0.2)
     def _seq_step_3_build_presd_map(self, r2):
     # STEP 3: Build PreSd Map
         self.presd_map = {}
@@ -1327,28 +1568,33 @@ class Orchestrator:
         if not connected_map:
             connected_map = final_connected        
 
-        self._sys_connect_set(state=1, message="Essential Daemon Versions ...")        
-        fd_retry(
-            self._ver_load_essential,
-            dmpdip, connected_map, versions,
-            retry=3
-        )
-        # STEP 7-2: PreSd Version
-        self._sys_connect_set(state=1, message="PreSd Version ...")        
-        fd_retry(
-            self._ver_get_PreSd,
-            dmpdip, presd_ips, versions, presd_versions,
-            retry=3
-        )
-        # STEP 7-3: AId + AIc Version
-        self._sys_connect_set(state=1, message="AId + AIc Version ...")        
-        fd_retry(
-            self._ver_get_AIc,
-            dmpdip, aic_map, connected_map, versions, aic_versions,
-            retry=3
-        )
+        # STEP 7-2: daemon 별 version 질의를 동시에 (각자 deadline)
+        dl = self._connect_version_deadline
+        until = lambda: time.time() + dl
+        def _aic(r):
+            d = until()
+            return fd_retry_until(self._ver_get_AIc, dmpdip, aic_map, connected_map, versions, aic_versions, d,
+                                  deadline=d, retry_delay=0.5)
+        g = StepGraph("SYS.VERSION", on_event=self._sys_connect_step_event)
+        for name, op, need in (
+            ("MTd", lambda r: self._ver_get_MTd(versions, deadline=until()), True),
+            ("EMd", lambda r: self._ver_get_EMd(dmpdip, versions, deadline=until()), connected_map.get("EMd")),
+            ("CCd", lambda r: self._ver_get_CCd(dmpdip, versions, deadline=until()), connected_map.get("CCd")),
+            ("SCd", lambda r: self._ver_get_SCd(dmpdip, versions, deadline=until()), connected_map.get("SCd")),
+            ("PCd", lambda r: self._ver_get_PCd(dmpdip, versions, deadline=until()), connected_map.get("PCd")),
+            ("MMd", lambda r: self._ver_get_SPd_as_MMd(dmpdip, versions, deadline=until()),
+                    connected_map.get("SPd") or connected_map.get("MMd")),
+            ("PreSd", lambda r: self._ver_get_PreSd(dmpdip, presd_ips, versions, presd_versions), True),
+            ("AIc", _aic, "AId" in connected_map),
+        ):
+            if need:
+                g.add(name, op, deadline=dl + 2.0, label=f"{name} Versions ...")
+        if "AId" not in connected_map:
+            fd_log.warning("[SYS][CONNECT] AId not connected → skip AId/AIc version")
+        g.run(max_workers=8, initializer=_mtd_fanout_init())
+
         self._sys_connect_set(state=1, message="Final Connected Map ...")        
-        # STEP 7-4: Final Connected Map
+        # STEP 7-3: Final Connected Map
         return self._ver_finalize(
             dmpdip,
             versions,
@@ -1357,11 +1603,10 @@ class Orchestrator:
             connected_map
         )
     def _seq_step_8_switch_info(self, temp):
-    # STEP 8: Switch Info
+    # STEP 8: Switch Info (switch 별 질의를 동시에)
         fd_log.info(">>> Switch Information")
 
-        switches_info = []
-        for ip in self.switch_ips:
+        def _query(ip):
             pkt = {
                 "Section1": "Switch",
                 "Section2": "Information",
@@ -1380,11 +1625,18 @@ class Orchestrator:
 
             if sw_list:
                 info = sw_list[0]
-                switches_info.append({
+                return {
                     "IP": ip,
                     "Brand": info.get("Brand", ""),
                     "Model": info.get("Model", ""),
-                })
+                }
+            return None
+
+        ips = sorted(self.switch_ips)
+        switches_info = []
+        if ips:
+            with ThreadPoolExecutor(max_workers=min(len(ips), 8), initializer=_mtd_fanout_init()) as ex:
+                switches_info = [x for x in ex.map(_query, ips) if x]
 
         temp["switches"] = switches_info
         return temp
@@ -1412,77 +1664,34 @@ class Orchestrator:
             "switches": temp.get("switches", []),
             "updated_at": time.time(),
         })
+        self._cam_monitor.invalidate()
     def _ver_load_connected_map(self):
         connected_map = self._get_connected_map_from_status()
         if not connected_map:
             connected_map = self.state.get("connected_daemons", {})
         return connected_map
-    def _ver_load_essential(self, dmpdip, connected_map, versions):
-        # MTd - must
-        self._sys_connect_set(state=1, message="MTd Versions ...")
-        self._ver_get_MTd(versions)        
-        # EMd
-        if connected_map.get("EMd"):
-            self._sys_connect_set(state=1, message="EMd Versions ...")
-            self._ver_get_EMd(dmpdip, versions)
-        # CCd
-        if connected_map.get("CCd"):
-            self._sys_connect_set(state=1, message="CCd Versions ...")
-            self._ver_get_CCd(dmpdip, versions)
-        # SCd
-        if connected_map.get("SCd"):
-            self._sys_connect_set(state=1, message="SCd Versions ...")
-            self._ver_get_SCd(dmpdip, versions)
-        # PCd
-        if connected_map.get("PCd"):
-            self._sys_connect_set(state=1, message="PCd Versions ...")
-            self._ver_get_PCd(dmpdip, versions)
-        # SPd → MMd
-        if connected_map.get("SPd") or connected_map.get("MMd"):
-            self._sys_connect_set(state=1, message="MMd Versions ...")
-            self._ver_get_SPd_as_MMd(dmpdip, versions)
-    def _ver_get_EMd(self, dmpdip, versions):
-        def _op():
-            r = self._request_version("EMd", dmpdip)
-            v = (r.get("Version") or {}).get("EMd")
-            if v:
-                versions["EMd"] = v
-        fd_retry(_op, retry=3)
-    def _ver_get_CCd(self, dmpdip, versions):
+    def _ver_get_one(self, daemon, ip, versions, key=None, deadline=None):
         def _op():
-            r = self._request_version("CCd", dmpdip)
-            v = (r.get("Version") or {}).get("CCd")
+            r = self._request_version(daemon, ip, deadline=deadline)
+            v = (r.get("Version") or {}).get(daemon)
             if v:
-                versions["CCd"] = v
-        fd_retry(_op, retry=3)
-    def _ver_get_SCd(self, dmpdip, versions):
-        def _op():
-            r = self._request_version("SCd", dmpdip)
-            v = (r.get("Version") or {}).get("SCd")
-            if v:
-                versions["SCd"] = v
-        fd_retry(_op, retry=3)
-    def _ver_get_PCd(self, dmpdip, versions):
-        def _op():
-            r = self._request_version("PCd", dmpdip)
-            v = (r.get("Version") or {}).get("PCd")
-            if v:
-                versions["PCd"] = v
-        fd_retry(_op, retry=3)
-    def _ver_get_SPd_as_MMd(self, dmpdip, versions):
-        def _op():
-            r = self._request_version("SPd", dmpdip)
-            v = (r.get("Version") or {}).get("SPd")
-            if v:
-                versions["MMd"] = v
-        fd_retry(_op, retry=3)
-    def _ver_get_MTd(self, versions):
-        def _op():
-            r = self._request_version("MTd", self.mtd_ip)
-            v = (r.get("Version") or {}).get("MTd")
-            if v:
-                versions["MTd"] = v
-        fd_retry(_op, retry=3)
+                versions[key or daemon] = v
+        if deadline is None:
+            fd_retry(_op, retry=3)
+        else:
+            fd_retry_until(_op, deadline=deadline)
+    def _ver_get_EMd(self, dmpdip, versions, deadline=None):
+        self._ver_get_one("EMd", dmpdip, versions, deadline=deadline)
+    def _ver_get_CCd(self, dmpdip, versions, deadline=None):
+        self._ver_get_one("CCd", dmpdip, versions, deadline=deadline)
+    def _ver_get_SCd(self, dmpdip, versions, deadline=None):
+        self._ver_get_one("SCd", dmpdip, versions, deadline=deadline)
+    def _ver_get_PCd(self, dmpdip, versions, deadline=None):
+        self._ver_get_one("PCd", dmpdip, versions, deadline=deadline)
+    def _ver_get_SPd_as_MMd(self, dmpdip, versions, deadline=None):
+        self._ver_get_one("SPd", dmpdip, versions, key="MMd", deadline=deadline)
+    def _ver_get_MTd(self, versions, deadline=None):
+        self._ver_get_one("MTd", self.mtd_ip, versions, deadline=deadline)
     def _ver_get_PreSd(self, dmpdip, presd_ips, versions, presd_versions):        
         self._sys_connect_set(state=1, message="Get PreSd Version ...")        
         snapshot_key = None
@@ -1564,7 +1773,7 @@ class Orchestrator:
                 fd_log.exception(f"PreSd version fetch failed: {e}")
         else:
             fd_log.debug(f"non presd_ips")
-    def _ver_get_AIc(self, dmpdip, aic_map, connected_map, versions, aic_versions):
+    def _ver_get_AIc(self, dmpdip, aic_map, connected_map, versions, aic_versions, deadline=None):
         self._sys_connect_set(state=1, message="Get AId Version ...")
 
         if "AId" not in connected_map:
@@ -1592,13 +1801,19 @@ class Orchestrator:
 
         # 🔥 🔥 🔥 _mtd_command 자체를 10번 재시도 🔥 🔥 🔥
         for attempt in range(1, 5):
+            wait = 7.0
+            if deadline is not None:
+                left = deadline - time.time()
+                if left <= 0:
+                    break
+                wait = min(wait, max(0.5, left))
             try:
                 msg = dict(msg_base)
                 msg["Token"] = fd_make_token()
 
                 fd_log.debug(f"[AId Version] Try {attempt}/10 → {msg}")
 
-                r = self._mtd_command("Version(AId)", msg, wait=7.0)
+                r = self._mtd_command("Version(AId)", msg, wait=wait)
 
                 vmap = self._unwrap_version_map(r)
                 if not isinstance(vmap, dict):
@@ -1915,6 +2130,7 @@ class Orchestrator:
             st["updated_at"] = time.time()
 
             fd_cam_state_save()
+            self._cam_monitor.invalidate()
 
             fd_log.info("[CAM] FORCE OFF: all cameras set offline")
     def _camera_action_switch(self, type: int = 1):
@@ -1926,6 +2142,7 @@ class Orchestrator:
             # 초기화
             with self.cam_state_lock:
                 fd_cam_clear_connect_state(alive_reset=True)
+                self._cam_monitor.invalidate()
                 self.erase_connect_state = True
             # command opt
             if type == 1:
@@ -1980,6 +2197,7 @@ class Orchestrator:
 
         with self.cam_state_lock:
             fd_cam_clear_connect_state(alive_reset=True)
+            self._cam_monitor.invalidate()
             self.erase_connect_state = True
 
         # Unlocked        
@@ -2322,6 +2540,7 @@ class Orchestrator:
                 "summary": summary,
             }
             fd_cam_state_upsert(cam_payload)
+            self._cam_monitor.invalidate()
             self._cam_connect_set(state=2,#done
                                   message="success camera connection and get information")
             # update screen
@@ -2334,126 +2553,53 @@ class Orchestrator:
                 error=str(e),
             )
             return {"ok": False, "error": str(e)}
-    def _camera_state_update(self, timeout_sec: float = 1.0) -> None:
-        with COMMAND_LOCK:
-            global CAM_STATE        
-            cs = fd_cam_latest_state()            
-            cams = cs.get("cameras") or []
-            
-            # if recording... update recording time
-            cam_record = self._rec_state_get()
-            cam_record_state   = cam_record.get("state")            
-            if(cam_record_state == 1):
-                msg_rec = f"Recording..."
-                self._rec_state_set(state=1,message=msg_rec)
-
-            ip_map = {str(c.get("IP")).strip(): c for c in cams if isinstance(c, dict)}
-            ips = list(ip_map.keys())
-            if not ips:
-                return
-
-            # ---------------------------------------------------------
-            # 1) ping
-            # "cameras": [{[{"Index": 1, "alive": true}, ....]
-            # ---------------------------------------------------------
-            with ThreadPoolExecutor(max_workers=min(8, len(ips))) as ex:
-                ping_results = {
-                    ip: ex.submit(fd_ping_check, ip, method="auto", port=554, timeout_sec=timeout_sec)
-                    for ip in ips
-                }
-
-            for ip, fut in ping_results.items():
-                try:
-                    alive, _ = fut.result()
-                except Exception:
-                    alive = None
-                cam = ip_map[ip]
-                cam["alive"] = bool(alive)
-
-            # ---------------------------------------------------------
-            # 2) CCD Status Query
-            # "cameras": [{[{"Index": 1, "raw_status": true}, ....]
-            # ---------------------------------------------------------
-            ccd_map = {}
-            if True:
-                req = {
-                    "Section1": "Camera",
-                    "Section2": "Information",
-                    "Section3": "Status",
-                    "SendState": "request",
-                    "From": "4DOMS",
-                    "To": "CCd",
-                    "Action": "get",
-                    "Token": fd_make_token(),
-                }
-
-                try:
-                    ccd_resp = tcp_json_roundtrip(
-                        self.mtd_ip, self.mtd_port, req, timeout=3.0
-                    )[0]
-                except Exception as e:
-                    fd_log.warning(f"CCd Status query fail: {e}")
-                    ccd_resp = None
-
-                if isinstance(ccd_resp, dict):
-                    for item in (ccd_resp.get("Cameras") or []):
-                        ip = str(item.get("IPAddress") or item.get("IP") or "").strip()
-                        if not ip:
-                            continue
-
-                        status = (item.get("Status") or "").upper()
-                        record = (item.get("Record") or "").upper()
-
-                        ccd_map[ip] = {
-                            "raw_status": status,
-                            "connected": (status == "OK"),
-                            "record": (record == "RUN"),
-                            "temperature": item.get("Temperature"),
-                        }
-
-            # ---------------------------------------------------------
-            # 3) CCD result 
-            # "cameras": [{[{"Index": 1, "connected": true, "record": false,}]
-            # ---------------------------------------------------------
-            for ip, info in ccd_map.items():
-                cam = ip_map.get(ip)
-                if not cam:
+    def _camera_ccd_status(self) -> dict:
+        # CCD Status Query → {ip: {"raw_status", "connected", "record", "temperature"}}
+        req = {
+            "Section1": "Camera",
+            "Section2": "Information",
+            "Section3": "Status",
+            "SendState": "request",
+            "From": "4DOMS",
+            "To": "CCd",
+            "Action": "get",
+            "Token": fd_make_token(),
+        }
+        ccd_resp = tcp_json_roundtrip(
+            self.mtd_ip, self.mtd_port, req, timeout=3.0
+        )[0]
+
+        ccd_map = {}
+        if isinstance(ccd_resp, dict):
+            for item in (ccd_resp.get("Cameras") or []):
+                ip = str(item.get("IPAddress") or item.get("IP") or "").strip()
+                if not ip:
                     continue
-                raw_status = info["raw_status"]
-                # CCD -> connected
-                cam["connected"] = (raw_status == "OK")
-                # CCD -> record
-                cam["record"] = info["record"]
-                # NG는 record/connected 강제로 끔
-                if raw_status == "NG":
-                    cam["connected"] = False
-                    cam["record"] = False
-                if info["temperature"] is not None:
-                    cam["temperature"] = info["temperature"]
 
-            # ---------------------------------------------------------
-            # 4) alive=False 이면 connected=False 강제
-            # "cameras": [{[{"Index": 1, "connected": true, "record": false,}]
-            # ---------------------------------------------------------
-            for ip, cam in ip_map.items():
-                if not cam.get("alive"):
-                    cam["connected"] = False
-                    cam["record"] = False
+                status = (item.get("Status") or "").upper()
+                record = (item.get("Record") or "").upper()
 
-            # ---------------------------------------------------------
-            # 5) CAM_STATE save
-            # ---------------------------------------------------------
-            # set| "camera_alive": {"10.82.104.11": true, 
-            CAM_STATE["camera_alive"]       = {ip: ip_map[ip].get("alive", False)       for ip in ip_map }
-            # set| "camera_connected": {"10.82.104.11": true, 
-            CAM_STATE["camera_connected"]   = {ip: ip_map[ip].get("connected", False)   for ip in ip_map }
-            # set| "camera_record": {"10.82.104.11": true, 
-            CAM_STATE["camera_record"]      = {ip: ip_map[ip].get("record", False)      for ip in ip_map }
-            # set| "connected_ips": ["10.82.104.11",
-            CAM_STATE["connected_ips"]      = [ip for ip, cam in ip_map.items() if cam.get("connected")]
-            # set| "updated_at" : xxxx
-            CAM_STATE["updated_at"] = time.time()
-            fd_cam_state_save()
+                ccd_map[ip] = {
+                    "raw_status": status,
+                    "connected": (status == "OK"),
+                    "record": (record == "RUN"),
+                    "temperature": item.get("Temperature"),
+                }
+        return ccd_map
+    def _on_camera_transition(self, ip, alive, prev, stat):
+        # prober thread 에서 호출 - 무거운 작업 금지
+        fd_log.info(f"[CAM][PROBE] {ip} alive {prev} -> {alive} (rtt={stat.get('rtt_ms')}ms, flapping={stat.get('flapping')})")
+        self._cam_wake.set()
+    def _camera_state_update(self, timeout_sec: float = 1.0) -> None:
+        # if recording... update recording time
+        cam_record = self._rec_state_get()
+        cam_record_state   = cam_record.get("state")            
+        if(cam_record_state == 1):
+            msg_rec = f"Recording..."
+            self._rec_state_set(state=1,message=msg_rec)
+
+        # ping + CCd 는 lock 없이 수행, 결과만 짧게 publish (변경 시에만 저장)
+        self._cam_monitor.sweep(timeout_sec=timeout_sec)
         
     # ────────────────────────────────────────────
     # 🔴 CAMERA RECORD
@@ -2525,7 +2671,7 @@ class Orchestrator:
         # ────────────────────────────────────────────
         # 2) Load user-config.json (Record Setting)
         # ────────────────────────────────────────────
-        config = fd_load_json_file("/config/user-config.json")
+        config = fd_user_config_snapshot().data
         RS = config.get("RecordSetting", {})
 
         cam_time      = RS.get("CameraRecordWaitTime", 1500)
@@ -3036,7 +3182,7 @@ class Orchestrator:
             # ────────────────────────────────────────────
             # 1) Load user-config.json (Record Setting)
             # ────────────────────────────────────────────
-            config = fd_load_json_file("/config/user-config.json")
+            config = fd_user_config_snapshot().data   # 한 request 안에서는 같은 snapshot
             RS = config.get("RecordSetting", {})
             # use audio
             use_audio       = RS.get("UseAudio", False)
@@ -3048,7 +3194,6 @@ class Orchestrator:
             # ────────────────────────────────────────────
             # 2) Load production target info
             # ────────────────────────────────────────────            
-            config = fd_load_json_file("/config/user-config.json")
             pt = config.get("production-target", {})
             groups = pt.get("groups", [])
             g = pt.get("select-group", 0)
@@ -3405,21 +3550,16 @@ class Orchestrator:
                 self._stop.wait(0.2)
                 continue
             
-            # (3) 정상 polling
-            with self.cam_state_lock:
-                st = fd_cam_latest_state() or {}
-                cameras = st.get("cameras", [])
-                if not cameras:
-                    # 카메라 없으면 바로 빠져나와서 쉬기
-                    pass
-                else:
-                    try:
-                        self._camera_state_update(timeout_sec=1)
-                    except Exception:
-                        fd_log.exception("[OMS] camera ping loop error")
-                        continue
+            # (3) 정상 polling (cam_state_lock 은 publish 순간에만 잡힌다)
+            try:
+                self._camera_state_update(timeout_sec=1)
+            except Exception:
+                fd_log.exception("[OMS] camera ping loop error")
+                continue
                     
-            self._stop.wait(1.0)
+            # 1초 주기, prober 가 전이를 감지하면 즉시 다음 sweep
+            self._cam_wake.wait(1.0)
+            self._cam_wake.clear()
     
     # ────────────────────────────────────────────
     # ⭐ MAIN FUNTIONS
@@ -3427,7 +3567,14 @@ class Orchestrator:
     def run(self):
         # looping command
         threading.Thread(target=self._polling_node_info, daemon=True).start()
+        for n in self.nodes:
+            threading.Thread(target=self._watch_node_events, args=(n,), daemon=True).start()
+        if self._log_collect_enabled:
+            self._log_collector.start()
+        self._cam_prober.start()
         threading.Thread(target=self._polling_camera_info, daemon=True).start()        
+        CONFIG_STORE.set_log(fd_log.warning)
+        CONFIG_STORE.subscribe(FILE_USER_CFG, lambda snap: fd_log.info(f"[config] user-config.json changed -> v{snap.version}"))
 
         self._http_srv = ThreadingHTTPServer(
             (self.http_host, self.http_port), 
@@ -3445,6 +3592,20 @@ class Orchestrator:
     def stop(self):
         try: self._stop.set()
         except: pass
+        try: self._cam_wake.set()
+        except: pass
+        try: self._cam_prober.stop()
+        except: pass
+        try: self._cam_monitor.close()
+        except: pass
+        try: fd_state_flush_all()
+        except: pass
+        try:
+            self._log_collector.stop()
+            self._log_store.flush(force=True)
+        except: pass
+        try: FD_HTTP_POOL.close_all()
+        except: pass
         try: self._http_srv.shutdown()
         except: pass
     # http handler factory
@@ -3474,6 +3635,24 @@ class Orchestrator:
                     if clean in {"/liveview"}: return fd_serve_static(self, "oms-liveview.html")
                     if clean in {"/user"}: return fd_serve_static(self, "user-config.html")
 
+                    # ──────────────────────────────────────────────────────
+                    # 📈 GET /metrics  (Prometheus text format)
+                    # ──────────────────────────────────────────────────────
+                    if clean == "/metrics":
+                        return self._write(200, fd_metrics_text().encode("utf-8"), METRICS_CONTENT_TYPE)
+
+                    # ──────────────────────────────────────────────────────
+                    # 🧵 GET /oms/trace?token=...&limit=50  (token 없으면 최근 token 목록)
+                    # ──────────────────────────────────────────────────────
+                    if parts[:2] == ["oms", "trace"]:
+                        qs = parse_qs(urlsplit(self.path).query)
+                        token = ((qs.get("token") or [""])[0] or (parts[2] if len(parts) > 2 else "")).strip()
+                        try:
+                            limit = min(TRACE_LIMIT_MAX, max(1, int((qs.get("limit") or ["50"])[0] or 50)))
+                        except ValueError:
+                            return self._write(400, b'{"ok":false,"error":"bad limit"}')
+                        return self._send_json(orch._trace_query(unquote(token), limit=limit))
+
                     # ──────────────────────────────────────────────────────
                     # 📦 GET : proxy
                     # ──────────────────────────────────────────────────────
@@ -3514,6 +3693,29 @@ class Orchestrator:
                             except Exception as e:
                                 err = json.dumps({"ok": False, "error": f"list failed: {e}"}, ensure_ascii=False).encode("utf-8")
                                 return self._write(500, err)
+                        # /daemon/<PROC>/log/stream?date=YYYY-MM-DD&offset=N&fid=...&tail=50000
+                        # /daemon/<PROC>/log/search?date=YYYY-MM-DD&level=WARNING&q=regex&from=HH:MM:SS&to=HH:MM:SS&limit=2000
+                        if len(parts) >= 4 and parts[3] in ("stream", "search"):
+                            qs = parse_qs(urlsplit(self.path).query)
+                            q1 = lambda k, d="": ((qs.get(k) or [d])[0] or d).strip()
+                            date = q1("date") or time.strftime("%Y-%m-%d", time.localtime())
+                            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+                                return self._write(400, b'{"ok":false,"error":"bad date"}')
+                            log_file = log_dir / f"{date}.log"
+                            try:
+                                if parts[3] == "stream":
+                                    res = fd_log_stream(log_file, q1("offset"), q1("fid"), tail=int(q1("tail", "50000")))
+                                else:
+                                    res = fd_log_search(log_file, level=q1("level"), pattern=q1("q"),
+                                                        t_from=q1("from"), t_to=q1("to"),
+                                                        limit=int(q1("limit", "2000")), date=date)
+                                res["date"] = date
+                                return self._write(200, json.dumps(res, ensure_ascii=False).encode("utf-8"))
+                            except ValueError as e:
+                                return self._write(400, json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False).encode("utf-8"))
+                            except Exception as e:
+                                err = json.dumps({"ok": False, "error": f"read failed: {e}"}, ensure_ascii=False).encode("utf-8")
+                                return self._write(500, err)
                         # /daemon/<PROC>/log?date=YYYY-MM-DD&tail=50000                        
                         qs = parse_qs(urlsplit(self.path).query)
                         date = (qs.get("date") or [""])[0].strip()
@@ -3594,8 +3796,7 @@ class Orchestrator:
                     # 1️⃣ GET : /oms/system/state
                     # ──────────────────────────────────────────────────────                                        
                     if parts == ["oms", "system", "state"]:
-                        status = orch._sys_status_core()
-                        return self._write(200, json.dumps(status, ensure_ascii=False).encode("utf-8"))
+                        return self._write(200, orch._sys_snapshot.latest().body)
                     # ──────────────────────────────────────────────────────
                     # 1️⃣ GET /oms/system/process-list
                     # ──────────────────────────────────────────────────────
@@ -3604,6 +3805,24 @@ class Orchestrator:
                         body = json.dumps({"processes": plist}, ensure_ascii=False).encode("utf-8")
                         return self._write(200, body)
                     # ──────────────────────────────────────────────────────
+                    # 📜 GET /oms/logs/search , /oms/logs/collector  (전 node 수집 로그)
+                    # ──────────────────────────────────────────────────────
+                    if parts == ["oms", "logs", "search"]:
+                        # 전 node 통합 검색 : ?from=&to=&date=&node=a,b&proc=MTd&level=ERROR&pattern=&limit=
+                        res = fd_log_collect_search(orch._log_store, parse_qs(urlsplit(self.path).query))
+                        return self._write(200 if res.get("ok") else 400, json.dumps(res, ensure_ascii=False).encode("utf-8"))
+                    if parts == ["oms", "logs", "collector"]:
+                        return self._write(200, json.dumps(orch._log_collector.status(), ensure_ascii=False).encode("utf-8"))
+                    # ──────────────────────────────────────────────────────
+                    # 1️⃣ GET /oms/system/process-events  (DMS exit/start/crash_loop, 최근 것부터)
+                    # ──────────────────────────────────────────────────────
+                    if parts == ["oms", "system", "process-events"]:
+                        q = parse_qs(urlsplit(self.path).query)
+                        try: limit = max(1, min(int((q.get("limit") or ["100"])[0]), 500))
+                        except ValueError: limit = 100
+                        evs = list(orch._dms_events)[-limit:][::-1]
+                        return self._write(200, json.dumps({"ok": True, "events": evs}, ensure_ascii=False).encode("utf-8"))
+                    # ──────────────────────────────────────────────────────
                     # 1️⃣-1️⃣ GET /oms/system/restart/state
                     # ──────────────────────────────────────────────────────                    
                     if parts == ["oms", "system", "restart", "state"]:
@@ -3634,6 +3853,12 @@ class Orchestrator:
                         s = orch._cam_connect_get()
                         return self._write(200, json.dumps(s, ensure_ascii=False).encode("utf-8","ignore"))
                     # ──────────────────────────────────────────────────────
+                    # 2️⃣-3️⃣ GET /oms/camera/health  (prober RTT/interval 통계)
+                    # ──────────────────────────────────────────────────────                    
+                    if parts == ["oms", "camera", "health"]:
+                        s = {"ok": True, "cameras": orch._cam_prober.stats()}
+                        return self._write(200, json.dumps(s, ensure_ascii=False).encode("utf-8","ignore"))
+                    # ──────────────────────────────────────────────────────
                     # 3️⃣-1️⃣ GET /oms/record/state
                     # ──────────────────────────────────────────────────────                    
                     if parts == ["oms", "record", "state"]:
@@ -3742,7 +3967,9 @@ class Orchestrator:
                     # 🧩 POST : /oms/config/apply
                     # ──────────────────────────────────────────────────────                      
                     if parts==["oms", "config", "apply"]:
-                        return fd_oms_config_apply(self, orch)
+                        res = fd_oms_config_apply(self, orch)
+                        orch._sys_state_publish()
+                        return res
                     # ──────────────────────────────────────────────────────
                     # 🧩 POST : /oms/alias/clear
                     # ──────────────────────────────────────────────────────                      
@@ -3827,6 +4054,7 @@ class Orchestrator:
                             return self._write(400, b'{"ok":false,"error":"invalid json"}')
                         # 핵심: 여기서 바로 기존 함수 호출
                         fd_cam_state_upsert(req)
+                        orch._cam_monitor.invalidate()
                         return self._write(200, b'{"ok":true}')
                     # ──────────────────────────────────────────────────────
                     # 2️⃣-1️⃣ POST : /oms/camera/action/reboot
@@ -3969,10 +4197,9 @@ class Orchestrator:
                         raw_body = body
                         try:
                             data = raw_body.decode("utf-8")
-                            file_path = os.path.join(PATH_WEB, "config", "user-config.json")
-                            with open(file_path, "w", encoding="utf-8") as f:
-                                f.write(data)
-                            self._send_json({"status": "ok"})
+                            if not fd_save_user_config(data):
+                                raise IOError("save failed")
+                            self._send_json({"status": "ok", "version": fd_user_config_snapshot().version})
                         except Exception as e:
                             self._send_json({"status": "error", "msg": str(e)}, status=500)
                         return
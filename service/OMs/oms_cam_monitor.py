@@ -0,0 +1,356 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# oms_cam_monitor.py
+# - Camera state monitor (ping + CCd status)
+#   . persistent worker pool (no executor per sweep)
+#   . next state is built off-lock, published by reference swap
+#   . CAM_STATE is written / persisted only when something changed
+# - Camera health prober (asyncio)
+#   . one coroutine per camera, bounded by a semaphore (no thread per camera)
+#   . adaptive interval: stable → slower, changed/flapping → faster
+#   . emits only alive transitions, keeps RTT statistics per camera
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import time
+import asyncio
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from oms_env import *
+from oms_common import fd_ping_check, fd_ping_check_async
+import oms_state
+from src.fd_common.metrics import fd_metric_histogram, fd_metric_gauge
+
+_M_PROBE_SEC = fd_metric_histogram("oms_camera_probe_seconds", "camera health probe round trip", ("result",),
+                                   buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+_M_SWEEP_SEC = fd_metric_histogram("oms_camera_sweep_seconds", "camera state sweep (ping + CCd status)")
+_M_CAM_COUNT = fd_metric_gauge("oms_cameras", "cameras by state", ("state",))
+
+# ─────────────────────────────────────────────────────────────
+# 📡 CAMERA HEALTH PROBER
+# ─────────────────────────────────────────────────────────────
+class CameraHealthProber:
+    def __init__(self, on_transition=None, *, port: int = 554, timeout_sec: float = 1.0,
+                 concurrency: int = 64, min_interval: float = 0.5, max_interval: float = 5.0,
+                 backoff: float = 1.5, flap_window: float = 30.0, flap_count: int = 3):
+        """
+        on_transition : callable(ip, alive, prev_alive, stat) - alive 값이 바뀔 때만 호출 (prober thread)
+        """
+        self._on_transition = on_transition
+        self._port = int(port)
+        self._timeout = float(timeout_sec)
+        self._concurrency = max(1, int(concurrency))
+        self._min_iv = float(min_interval)
+        self._max_iv = max(float(max_interval), self._min_iv)
+        self._backoff = max(1.0, float(backoff))
+        self._flap_window = float(flap_window)
+        self._flap_count = int(flap_count)
+
+        self._lock = threading.Lock()
+        self._stats = {} # ip -> dict (probe thread 에서만 교체, reader 는 copy)
+        self._tasks = {} # ip -> asyncio.Task (loop thread 전용)
+        self._loop = None
+        self._sem = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # ────────────────────────────────────────────
+    # lifecycle
+    # ────────────────────────────────────────────
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="cam-prober", daemon=True)
+        self._thread.start()
+        self._ready.wait(5.0)
+    def stop(self):
+        loop = self._loop
+        if not loop:
+            return
+        def _shutdown():
+            for t in list(self._tasks.values()):
+                t.cancel()
+            self._tasks.clear()
+            loop.stop()
+        try:
+            loop.call_soon_threadsafe(_shutdown)
+        except RuntimeError:
+            pass
+        if self._thread:
+            self._thread.join(timeout=3.0)
+        self._loop = None
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._sem = asyncio.Semaphore(self._concurrency)
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            except Exception:
+                pass
+            loop.close()
+
+    # ────────────────────────────────────────────
+    # targets / readers (any thread)
+    # ────────────────────────────────────────────
+    def set_targets(self, ips):
+        loop = self._loop
+        if not loop:
+            return
+        wanted = {str(ip).strip() for ip in ips if ip}
+        try:
+            loop.call_soon_threadsafe(self._apply_targets, wanted)
+        except RuntimeError:
+            pass
+    def alive(self, ip):
+        """True/False, 아직 한 번도 판정 못했으면 None"""
+        st = self._stats.get(ip)
+        return None if not st else st.get("alive")
+    def alive_map(self) -> dict:
+        with self._lock:
+            return {ip: st.get("alive") for ip, st in self._stats.items()}
+    def stats(self) -> dict:
+        with self._lock:
+            return {ip: dict(st) for ip, st in self._stats.items()}
+
+    # ────────────────────────────────────────────
+    # loop thread
+    # ────────────────────────────────────────────
+    def _apply_targets(self, wanted: set):
+        for ip in list(self._tasks):
+            if ip not in wanted:
+                self._tasks.pop(ip).cancel()
+                with self._lock:
+                    self._stats.pop(ip, None)
+        for ip in wanted:
+            if ip not in self._tasks:
+                self._tasks[ip] = self._loop.create_task(self._probe_forever(ip))
+    async def _probe_forever(self, ip: str):
+        interval = self._min_iv
+        flips = deque()
+        st = {
+            "alive": None, "method": "", "probes": 0, "fails": 0,
+            "rtt_ms": None, "rtt_avg_ms": None, "rtt_min_ms": None, "rtt_max_ms": None,
+            "interval": interval, "changed_at": 0.0, "updated_at": 0.0, "flapping": False,
+        }
+        while True:
+            async with self._sem:
+                t0 = time.perf_counter()
+                try:
+                    alive, method = await fd_ping_check_async(ip, method="auto", port=self._port, timeout_sec=self._timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    alive, method = None, ""
+                rtt_ms = (time.perf_counter() - t0) * 1000.0
+            _M_PROBE_SEC.labels("alive" if alive else ("dead" if alive is False else "error")).observe(rtt_ms / 1000.0)
+
+            now = time.time()
+            st = dict(st)
+            st["probes"] += 1
+            st["method"] = method
+            st["updated_at"] = now
+            prev = st["alive"]
+            if alive:
+                st["rtt_ms"] = round(rtt_ms, 2)
+                st["rtt_min_ms"] = st["rtt_ms"] if st["rtt_min_ms"] is None else min(st["rtt_min_ms"], st["rtt_ms"])
+                st["rtt_max_ms"] = st["rtt_ms"] if st["rtt_max_ms"] is None else max(st["rtt_max_ms"], st["rtt_ms"])
+                avg = st["rtt_avg_ms"]
+                st["rtt_avg_ms"] = st["rtt_ms"] if avg is None else round(avg * 0.8 + st["rtt_ms"] * 0.2, 2)
+            elif alive is False:
+                st["fails"] += 1
+
+            # None(판단불가) 은 상태를 바꾸지 않는다
+            changed = alive is not None and alive != prev
+            if changed:
+                st["alive"] = alive
+                st["changed_at"] = now
+                if prev is not None:
+                    flips.append(now)
+            while flips and now - flips[0] > self._flap_window:
+                flips.popleft()
+            st["flapping"] = len(flips) >= self._flap_count
+
+            # adaptive interval
+            if changed or st["flapping"] or alive is None:
+                interval = self._min_iv
+            else:
+                interval = min(self._max_iv, interval * self._backoff)
+            st["interval"] = round(interval, 3)
+
+            with self._lock:
+                self._stats[ip] = st
+            if changed and self._on_transition:
+                try:
+                    self._on_transition(ip, alive, prev, dict(st))
+                except Exception as e:
+                    fd_log.warning(f"[CAM][PROBE] transition callback failed: {e}")
+
+            await asyncio.sleep(interval)
+
+# ─────────────────────────────────────────────────────────────
+# 📷 CAMERA STATE MONITOR
+# ─────────────────────────────────────────────────────────────
+
+class CameraStateMonitor:
+    def __init__(self, state_lock, fetch_ccd, max_workers: int = 8, ping_port: int = 554, prober=None):
+        """
+        state_lock : lock guarding CAM_STATE mutation (held only while publishing)
+        fetch_ccd  : callable() -> {ip: {"raw_status","connected","record","temperature"}}
+        prober     : CameraHealthProber (optional) - 판정된 IP 는 prober 결과를 사용
+        """
+        self._state_lock = state_lock
+        self._fetch_ccd = fetch_ccd
+        self._prober = prober
+        self._ping_port = int(ping_port)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="cam-ping")
+        self._generation = 0
+        self._version = 0
+        self._snap = oms_state.FdStateSnapshot(0, {}, b"{}", 0.0)
+
+    # ────────────────────────────────────────────
+    # reader
+    # ────────────────────────────────────────────
+    def latest(self):
+        return self._snap
+
+    def invalidate(self):
+        """
+        CAM_STATE 가 외부에서 바뀜 (clear / force-off / upsert)
+        - 진행 중인 sweep 결과는 버리고
+        - 다음 sweep 은 내용이 같아도 다시 반영/저장한다
+        """
+        self._generation += 1
+        self._snap = oms_state.FdStateSnapshot(self._snap.version, {}, b"{}", time.time())
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    # ────────────────────────────────────────────
+    # sweep
+    # ────────────────────────────────────────────
+    def sweep(self, timeout_sec: float = 1.0):
+        with _M_SWEEP_SEC.time():
+            return self._sweep(timeout_sec)
+
+    def _sweep(self, timeout_sec: float):
+        gen = self._generation
+        # 1) 대상 IP 목록만 짧게 복사
+        with self._state_lock:
+            cams = oms_state.CAM_STATE.get("cameras") or []
+            ips = [str(c.get("IP")).strip() for c in cams if isinstance(c, dict) and c.get("IP")]
+            # CCd 조회가 실패하면 이 값을 그대로 쓴다 (한 번의 실패로 전체가 disconnected 가 되지 않게)
+            prev_connected = dict(oms_state.CAM_STATE.get("camera_connected") or {})
+            prev_record = dict(oms_state.CAM_STATE.get("camera_record") or {})
+            prev_temperature = {str(c.get("IP")).strip(): c.get("temperature") for c in cams
+                                if isinstance(c, dict) and c.get("IP") and c.get("temperature") is not None}
+        if not ips:
+            return None
+
+        # 2) ping (lock 없이) - prober 결과 우선, 아직 판정 전인 IP 만 상주 pool 로 직접 ping
+        alive = {}
+        if self._prober:
+            self._prober.set_targets(ips)
+            probed = self._prober.alive_map()
+            for ip in ips:
+                if probed.get(ip) is not None:
+                    alive[ip] = bool(probed[ip])
+        futs = {
+            ip: self._pool.submit(fd_ping_check, ip, method="auto", port=self._ping_port, timeout_sec=timeout_sec)
+            for ip in ips if ip not in alive
+        }
+        for ip, fut in futs.items():
+            try:
+                ok, _ = fut.result()
+            except Exception:
+                ok = None
+            alive[ip] = bool(ok)
+
+        # 3) CCd status (lock 없이)
+        ccd_ok = True
+        try:
+            ccd_map = self._fetch_ccd() or {}
+        except Exception as e:
+            fd_log.warning(f"CCd Status query fail (keep last camera state): {e}")
+            ccd_map, ccd_ok = {}, False
+
+        # 4) 다음 상태 계산
+        connected, record, temperature = {}, {}, {}
+        for ip in ips:
+            info = ccd_map.get(ip)
+            con = rec = False
+            if not ccd_ok:
+                con = bool(prev_connected.get(ip, False))
+                rec = bool(prev_record.get(ip, False))
+                if prev_temperature.get(ip) is not None:
+                    temperature[ip] = prev_temperature[ip]
+            elif info:
+                raw_status = info.get("raw_status")
+                con = (raw_status == "OK")
+                rec = bool(info.get("record")) and raw_status != "NG"
+                if info.get("temperature") is not None:
+                    temperature[ip] = info.get("temperature")
+            # alive=False 이면 connected/record 강제 False
+            if not alive[ip]:
+                con = rec = False
+            connected[ip] = con
+            record[ip] = rec
+
+        payload = {
+            "camera_alive": alive,
+            "camera_connected": connected,
+            "camera_record": record,
+            "connected_ips": [ip for ip in ips if connected[ip]],
+            "temperature": temperature,
+        }
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        _M_CAM_COUNT.labels("total").set(len(ips))
+        _M_CAM_COUNT.labels("alive").set(sum(1 for ip in ips if alive[ip]))
+        _M_CAM_COUNT.labels("connected").set(len(payload["connected_ips"]))
+        _M_CAM_COUNT.labels("record").set(sum(1 for ip in ips if record[ip]))
+
+        # 5) publish (짧은 lock) - sweep 도중 clear 가 있었으면 버린다
+        with self._state_lock:
+            if gen != self._generation:
+                return None
+            changed = (body != self._snap.body)
+            self._version += 1
+            self._snap = oms_state.FdStateSnapshot(self._version, payload, body, time.time())
+            if changed:
+                self._apply(payload)
+                oms_state.fd_cam_state_save()
+        return self._snap
+
+    def _apply(self, payload: dict):
+        st = oms_state.CAM_STATE
+        for cam in (st.get("cameras") or []):
+            if not isinstance(cam, dict):
+                continue
+            ip = str(cam.get("IP") or "").strip()
+            if ip not in payload["camera_alive"]:
+                continue
+            cam["alive"] = payload["camera_alive"][ip]
+            cam["connected"] = payload["camera_connected"][ip]
+            cam["record"] = payload["camera_record"][ip]
+            if ip in payload["temperature"]:
+                cam["temperature"] = payload["temperature"][ip]
+        st["camera_alive"]     = dict(payload["camera_alive"])
+        st["camera_connected"] = dict(payload["camera_connected"])
+        st["camera_record"]    = dict(payload["camera_record"])
+        st["connected_ips"]    = list(payload["connected_ips"])
+        st["updated_at"] = time.time()
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "CameraHealthProber",
+    "CameraStateMonitor",
+]
@@ -6,6 +6,7 @@
 # ─────────────────────────────────────────────────────────────────────────────
 
 import os, time
+import asyncio
 import json
 import re
 import base64
@@ -13,9 +14,12 @@ import socket
 import errno
 import http.client
 import subprocess
+import threading
 
 from pathlib import Path
 from oms_env import *
+from src.fd_common.metrics import fd_metric_histogram, fd_metric_counter
+from src.fd_common.config_store import CONFIG_STORE, ConfigSnapshot
 
 # ─────────────────────────────────────────────────────────────────────────────
 # json file save/load
@@ -337,20 +341,20 @@ def fd_serve_static(handler, rel):
 # ─────────────────────────────────────────────────────────────────────────────
 # USER Config
 # ─────────────────────────────────────────────────────────────────────────────
+# - CONFIG_STORE 가 한 번만 parse 해서 불변 snapshot 으로 나눠준다 (file 이 바뀌면 다시)
+# - 읽기만 할 때는 fd_user_config_snapshot().data, 고쳐서 저장할 때는 fd_load_user_config()
+def fd_user_config_snapshot() -> ConfigSnapshot:
+    return CONFIG_STORE.get(FILE_USER_CFG)
 def fd_load_user_config():
     try:
-        if FILE_USER_CFG.exists():
-            return json.loads(FILE_USER_CFG.read_text(encoding="utf-8"))
-        return {}
+        return fd_user_config_snapshot().mutable()
     except Exception as e:
         fd_log.error(f"[config] load_user_config fail: {e}")
         return {}
-def fd_save_user_config(cfg: dict):
+def fd_save_user_config(cfg):
+    """cfg: dict 또는 raw JSON text - temp file + replace (reader 는 반쯤 쓴 file 을 못 본다)"""
     try:
-        FILE_USER_CFG.write_text(
-            json.dumps(cfg, indent=2, ensure_ascii=False),
-            encoding="utf-8"
-        )
+        CONFIG_STORE.write(FILE_USER_CFG, cfg)
         return True
     except Exception as e:
         fd_log.error(f"[config] save_user_config fail: {e}")
@@ -556,6 +560,26 @@ def fd_retry(func, *args, retry=3, retry_delay=0.5, **kwargs):
                 )
                 raise last_err
 
+def fd_retry_until(func, *args, deadline: float, retry_delay=0.1, max_delay=1.0, **kwargs):
+    """
+    deadline(epoch) 까지 재시도. 대기는 retry_delay 부터 두 배씩 (max_delay 까지).
+    고정 sleep 대신 "조건이 만족될 때까지" 기다릴 때 사용 (func 가 raise 하면 미충족)
+    """
+    delay = retry_delay
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            left = deadline - time.time()
+            if left <= 0:
+                fd_log.error(f"[retry] {func.__name__} deadline reached ({attempt} tries): {e}")
+                raise
+            fd_log.warning(f"[retry] {func.__name__} failed ({attempt}), {left:.1f}s left: {e}")
+            time.sleep(min(delay, left))
+            delay = min(delay * 2, max_delay)
+
 # ─────────────────────────────────────────────────────────────
 # PING
 # ─────────────────────────────────────────────────────────────
@@ -618,6 +642,56 @@ def fd_ping_check(ip: str, method: str = "auto", port: int = 554, timeout_sec: f
     if a is not None:
         return a, "tcp"
     return _icmp_ping(ip, timeout_sec), "icmp"
+async def _tcp_probe_async(ip: str, port: int = 554, timeout_sec: float = 1.0) -> bool | None:
+    """_tcp_probe 의 asyncio 버전 (판정 규칙 동일)"""
+    try:
+        _, w = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout=timeout_sec)
+        w.close()
+        try:
+            await w.wait_closed()
+        except Exception:
+            pass
+        return True
+    except asyncio.TimeoutError:
+        return False
+    except OSError as e:
+        if isinstance(e, ConnectionRefusedError) or getattr(e, "errno", None) == errno.ECONNREFUSED:
+            return True
+        if getattr(e, "errno", None) in (errno.ENETUNREACH, errno.EHOSTUNREACH, errno.EHOSTDOWN):
+            return False
+        return None
+    except Exception:
+        return None
+async def _icmp_ping_async(ip: str, timeout_sec: float = 1.0) -> bool | None:
+    """_icmp_ping 의 asyncio 버전 (thread 를 점유하지 않는다)"""
+    try:
+        if os.name == "nt":
+            cmd = ["ping", "-n", "1", "-w", str(int(timeout_sec * 1000)), ip]
+        else:
+            cmd = ["ping", "-c", "1", "-W", str(max(1, int(timeout_sec))), ip]
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            ret = await asyncio.wait_for(proc.wait(), timeout=timeout_sec + 0.5)
+        except asyncio.TimeoutError:
+            try: proc.kill()
+            except Exception: pass
+            return False
+        return ret == 0
+    except Exception:
+        return None
+async def fd_ping_check_async(ip: str, method: str = "auto", port: int = 554, timeout_sec: float = 1.0) -> tuple[bool | None, str]:
+    """fd_ping_check 의 asyncio 버전. 반환 형식 동일: (alive, used_method)"""
+    m = (method or "auto").lower()
+    if m == "tcp":
+        return await _tcp_probe_async(ip, port, timeout_sec), "tcp"
+    if m == "icmp":
+        return await _icmp_ping_async(ip, timeout_sec), "icmp"
+    a = await _tcp_probe_async(ip, port, timeout_sec)
+    if a is not None:
+        return a, "tcp"
+    return await _icmp_ping_async(ip, timeout_sec), "icmp"
     
 # ─────────────────────────────────────────────────────────────
 # BACKEND HELPER
@@ -648,23 +722,140 @@ def fd_mime(p:Path)->str:
     if s==".json": return "application/json; charset=utf-8"
     if s in (".png",".jpg",".jpeg",".gif",".svg"): return f"image/{s.lstrip('.')}"
     return "application/octet-stream"
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP keep-alive connection pool
+# - host:port 별 idle connection 을 보관했다가 재사용 (HTTP/1.1 keep-alive)
+# - idle 은 host 당 HTTP_POOL_MAX_PER_HOST 개까지, HTTP_POOL_IDLE_SEC 지나면 폐기
+# - timeout 은 요청 전체 deadline (재시도 포함)
+# - 재사용한 socket 이 이미 끊겨 있으면(stale) 새 connection 으로 한 번 더 보낸다
+#   . 보내는 중에 끊김 → method 상관없이 재시도 (peer 는 요청을 받지 못했다)
+#   . 응답을 기다리다 끊김 → GET / HEAD 만 재시도 (POST 는 peer 에서 이미 실행됐을 수 있다)
+# ─────────────────────────────────────────────────────────────────────────────
+_HTTP_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+_HTTP_IDEMPOTENT = {"GET", "HEAD", "OPTIONS"}
+class FdHttpPool:
+    def __init__(self, max_per_host: int = HTTP_POOL_MAX_PER_HOST, idle_sec: float = HTTP_POOL_IDLE_SEC):
+        self._max_per_host = max(0, int(max_per_host))
+        self._idle_sec = float(idle_sec)
+        self._lock = threading.Lock()
+        self._idle = {}   # (host, port) -> [(conn, last_used_monotonic), ...]
+        self._stats = {"created": 0, "reused": 0, "stale": 0, "evicted": 0}
+
+    def _checkout(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._idle.get(key) or []
+            while bucket:
+                conn, used = bucket.pop()     # 최근에 쓴 것부터 (LIFO)
+                if now - used <= self._idle_sec:
+                    self._stats["reused"] += 1
+                    return conn, True
+                self._stats["evicted"] += 1
+                self._close(conn)
+            self._stats["created"] += 1
+        return http.client.HTTPConnection(key[0], key[1], timeout=timeout), False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            bucket = self._idle.setdefault(key, [])
+            if len(bucket) < self._max_per_host:
+                bucket.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try: conn.close()
+        except Exception: pass
+
+    def request(self, host: str, port: int, method: str, path: str, body=None, headers=None, timeout: float = 4.0):
+        key = (host, int(port))
+        deadline = time.monotonic() + float(timeout)
+        hdrs = dict(headers or {})
+        for attempt in (0, 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout(f"http deadline exceeded: {method} {host}:{port}{path}")
+            conn, reused = self._checkout(key, remaining)
+            conn.timeout = remaining
+            if conn.sock is not None:
+                conn.sock.settimeout(remaining)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=hdrs)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except _HTTP_STALE_ERRORS:
+                self._close(conn)
+                if reused and attempt == 0 and (not sent or method.upper() in _HTTP_IDEMPOTENT):
+                    with self._lock:
+                        self._stats["stale"] += 1
+                    continue
+                raise
+            except Exception:
+                self._close(conn)
+                raise
+            if resp.will_close:
+                self._close(conn)
+            else:
+                self._checkin(key, conn)
+            return resp.status, dict(resp.getheaders()), data
+
+    def evict_idle(self):
+        """idle_sec 지난 connection 정리 (주기적으로 불러도 되고, checkout 때도 정리된다)"""
+        now = time.monotonic()
+        dead = []
+        with self._lock:
+            for key, bucket in self._idle.items():
+                keep = [(c, t) for c, t in bucket if now - t <= self._idle_sec]
+                dead += [c for c, t in bucket if now - t > self._idle_sec]
+                bucket[:] = keep
+            self._stats["evicted"] += len(dead)
+        for c in dead:
+            self._close(c)
+        return len(dead)
+
+    def close_all(self):
+        with self._lock:
+            buckets, self._idle = self._idle, {}
+        for bucket in buckets.values():
+            for c, _ in bucket:
+                self._close(c)
+
+    def stats(self) -> dict:
+        with self._lock:
+            st = dict(self._stats)
+            st["idle"] = {f"{h}:{p}": len(b) for (h, p), b in self._idle.items() if b}
+        return st
+
+FD_HTTP_POOL = FdHttpPool()
+
+_M_HTTP_SEC = fd_metric_histogram("oms_http_client_seconds", "OMS outbound HTTP request latency", ("host", "method"))
+_M_HTTP_ERR = fd_metric_counter("oms_http_client_errors", "OMS outbound HTTP request failures", ("host", "method"))
+
 def fd_http_fetch(host:str, port:int, method:str, path:str, body:bytes|None, headers:dict|None, timeout=4.0):
-    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    t0 = time.perf_counter()
     try:
-        conn.request(method, path, body=body, headers=headers or {})
-        resp = conn.getresponse()
-        data = resp.read()
-        return resp.status, dict(resp.getheaders()), data
+        return FD_HTTP_POOL.request(host, port, method, path, body, headers, timeout)
+    except Exception:
+        _M_HTTP_ERR.labels(f"{host}:{port}", method).inc()
+        raise
     finally:
-        try: conn.close()
-        except: pass
+        _M_HTTP_SEC.labels(f"{host}:{port}", method).observe(time.perf_counter() - t0)
 
 
 # ────────────────────────────────────────────────────────────
 # EXPORTS
 # ────────────────────────────────────────────────────────────
 __all__ = [
-    "fd_load_config","fd_load_json_file","fd_save_json_file","fd_update_prefix_item","fd_handle_config_update","fd_update_production_target",    # config
+    "fd_load_config","fd_load_json_file","fd_user_config_snapshot","fd_load_user_config","fd_save_user_config","fd_save_json_file","fd_update_prefix_item","fd_handle_config_update","fd_update_production_target",    # config
     "fd_oms_config","fd_oms_config_update","fd_oms_config_apply",
     "fd_serve_static","fd_http_write","fd_http_send_json",
     "fd_format_hms_verbose","fd_format_datetime", "fd_format_hms_ms",
@@ -673,8 +864,8 @@ __all__ = [
     "fd_make_token",
     "fd_pluck_procs","fd_read_proc_snapshot",
     "fd_is_restarted",
-    "fd_retry",
-    "fd_ping_check",
+    "fd_retry","fd_retry_until",
+    "fd_ping_check","fd_ping_check_async",
     "fd_strip_json5","fd_mime",
-    "fd_http_fetch"
+    "FdHttpPool","FD_HTTP_POOL","fd_http_fetch"
 ]
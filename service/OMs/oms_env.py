@@ -112,11 +112,51 @@ PROCESS_ALIAS_DEFAULT = {
     "CMd": "Compute Multimedia",
 }
 
+# ─────────────────────────────────────────────────────────────
+# --- restart dependency (proc → 먼저 ready 가 되어야 하는 proc 목록) ---
+# - 모든 daemon 은 MTd(broker) 에 붙는다
+# - oms_config.json 의 "restart_depends" 로 덮어쓸 수 있다
+# ─────────────────────────────────────────────────────────────
+PROCESS_DEPENDS_DEFAULT = {
+    "MTd": [],
+    "EMd": ["MTd"],
+    "CCd": ["MTd"],
+    "SCd": ["MTd"],
+    "PCd": ["MTd"],
+    "GCd": ["MTd"],
+    "MMd": ["MTd"],
+    "MMc": ["MMd"],
+    "AId": ["MTd"],
+    "AIc": ["AId"],
+    "PreSd": ["MTd"],
+    "PostSd": ["MTd"],
+    "VPd": ["MTd"],
+    "AMd": ["MTd"],
+    "CMd": ["MTd"],
+}
+
 # ─────────────────────────────────────────────────────────────
 # --- hard-coded timeouts ---
 # ─────────────────────────────────────────────────────────────
 RESTART_POST_TIMEOUT = 30.0
 STATUS_FETCH_TIMEOUT = 10.0
+DMS_EVENT_POLL_SEC   = 25.0     # DMS /events long-poll (exit/start 를 heartbeat 기다리지 않고 받는다)
+
+# ─────────────────────────────────────────────────────────────
+# --- state file persistence (write-behind) ---
+# STATE_FLUSH_WINDOW_SEC : 이 시간 안의 변경은 한 번의 write 로 합친다
+# STATE_FSYNC            : "always" | "never"
+# ─────────────────────────────────────────────────────────────
+STATE_FLUSH_WINDOW_SEC = float(os.environ.get("OMS_STATE_FLUSH_WINDOW_SEC", 0.5))
+STATE_FSYNC = os.environ.get("OMS_STATE_FSYNC", "always").lower()
+
+# ─────────────────────────────────────────────────────────────
+# --- http keep-alive pool (fd_http_fetch) ---
+# HTTP_POOL_MAX_PER_HOST : host 당 보관할 idle connection 수
+# HTTP_POOL_IDLE_SEC     : 이 시간 이상 안 쓴 connection 은 버린다 (DMS 쪽 keep-alive timeout 보다 짧게)
+# ─────────────────────────────────────────────────────────────
+HTTP_POOL_MAX_PER_HOST = int(os.environ.get("OMS_HTTP_POOL_MAX_PER_HOST", 16))
+HTTP_POOL_IDLE_SEC = float(os.environ.get("OMS_HTTP_POOL_IDLE_SEC", 20.0))
 
 
 # ─────────────────────────────────────────────────────────────
@@ -161,12 +201,16 @@ COMMAND_LOCK = threading.Lock()
 # ────────────────────────────────────────────────────────────
 __all__ = [
     "fd_log",                                               # log
-    "ROOT", "PATH_WEB","PATH_CFG","PATH_LOG", "PATH_TRACE", # path
+    "ROOT", "PATH_WEB","PATH_CFG","PATH_OMS","PATH_LOG", "PATH_TRACE", # path
     "FILE_USER_CFG","FILE_CAM_ENV",                         # file
     "FILE_CAM_STATE", "FILE_SYS_STATE", "FILE_REC_STATE",   # state file
     "FILE_RECORD_HISTORY","FILE_PRODUCT_HISTORY",           # history file
     "PROCESS_ALIAS_DEFAULT",                                # alias
+    "PROCESS_DEPENDS_DEFAULT",                              # restart dependency
     "RESTART_POST_TIMEOUT", "STATUS_FETCH_TIMEOUT",         # timeout 
+    "DMS_EVENT_POLL_SEC",                                   # dms event long-poll
+    "STATE_FLUSH_WINDOW_SEC", "STATE_FSYNC",                # state persistence
+    "HTTP_POOL_MAX_PER_HOST", "HTTP_POOL_IDLE_SEC",         # http keep-alive pool
     "COMMAND_LOCK",                                         # lock    
     "UI_STATE_TITLE",                                       # state definition
 ]
@@ -0,0 +1,393 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# oms_log_collector.py
+# - 전 node daemon log 를 OMS 한 곳으로 (DMS POST /logship/batch 를 주기적으로 당겨온다)
+#   . cursor (fid + byte offset) 는 segment 가 disk 에 쓰인 뒤에만 commit → OMS 재시작시 그 지점부터 재개
+#   . segment store : logstore/<date>/<node>/<proc>/<seq>.log.gz  (gzip, flush_sec / segment_bytes 단위)
+#   . time index    : logstore/index.jsonl (segment 별 t0/t1) → bisect 로 시간 구간 segment 만 연다
+#   . search        : node / proc / level / regex / 시간 구간, 아직 flush 안 된 buffer 까지 포함
+# ─────────────────────────────────────────────────────────────────────────────
+
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from oms_env import *
+from oms_common import fd_http_fetch
+from src.fd_common.log_stream import LogTimeParser, fd_log_line_level, fd_log_level_no, fd_log_parse_time
+from src.fd_common.log_ship import fd_logship_accept, fd_logship_decode, LOGSHIP_MAX_BYTES
+from src.fd_common.metrics import fd_metric_counter
+
+_M_LOG_BYTES = fd_metric_counter("oms_logship_bytes", "log shipping bytes received", ("node", "kind"))
+
+LOGSTORE_DIR = PATH_OMS / "logstore"
+
+class _Buffer:
+    __slots__ = ("lines", "bytes", "t0", "t1", "since", "last_ts")
+    def __init__(self, last_ts=None):
+        self.lines, self.bytes = [], 0
+        self.t0 = self.t1 = None
+        self.since = time.time()
+        self.last_ts = last_ts
+
+class LogSegmentStore:
+    def __init__(self, root: Path = LOGSTORE_DIR, flush_sec: float = 10.0,
+                 segment_bytes: int = 1_000_000, keep_days: int = 7):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.flush_sec = float(flush_sec)
+        self.segment_bytes = int(segment_bytes)
+        self.keep_days = int(keep_days)
+        self._lock = threading.RLock()
+        self._index, self._t0s = [], []     # t0 순 정렬 (bisect)
+        self._seq = 0
+        self._buf = {}                      # (node, proc, date) -> _Buffer
+        self._last_ts = {}                  # (node, proc, date) -> 마지막 라인 ts (ts 없는 라인용)
+        self._cursors = {}                  # node -> {key: {fid, offset}}  (disk 에 반영된 것)
+        self._pending = {}                  # node -> {key: {fid, offset}}  (buffer 에만 있는 것)
+        self._load()
+
+    # ────────────────────────────────────────────
+    # persistence
+    # ────────────────────────────────────────────
+    def _load(self):
+        idx = self.root / "index.jsonl"
+        if idx.exists():
+            for line in idx.read_text(encoding="utf-8", errors="ignore").splitlines():
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue   # 쓰다 끊긴 마지막 줄
+                if (self.root / e["file"]).exists():
+                    self._insert(e)
+                    self._seq = max(self._seq, int(e.get("seq", 0)))
+        cur = self.root / "cursors.json"
+        if cur.exists():
+            try:
+                self._cursors = json.loads(cur.read_text(encoding="utf-8"))
+            except ValueError:
+                fd_log.warning("[LOGSTORE] cursors.json broken - collecting from backfill")
+        self.prune()
+
+    def _insert(self, e: dict):
+        i = bisect_right(self._t0s, e["t0"])
+        self._t0s.insert(i, e["t0"])
+        self._index.insert(i, e)
+
+    def _save_cursors(self):
+        tmp = self.root / "cursors.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._cursors, ensure_ascii=False))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.root / "cursors.json")
+
+    # ────────────────────────────────────────────
+    # write
+    # ────────────────────────────────────────────
+    def cursors(self, node: str) -> dict:
+        with self._lock:
+            return {**self._cursors.get(node, {}), **self._pending.get(node, {})}
+
+    def append(self, node: str, proc: str, date: str, text: str, cursor: dict):
+        parse = LogTimeParser()
+        key = (node, proc, date)
+        with self._lock:
+            b = self._buf.get(key)
+            if b is None:
+                b = self._buf[key] = _Buffer(self._last_ts.get(key))
+            for line in text.splitlines():
+                if not line:
+                    continue
+                ts = parse(line.encode("utf-8", "ignore"))
+                if ts is None:
+                    ts = b.last_ts       # traceback 등은 앞 라인 시각
+                else:
+                    b.last_ts = ts
+                if ts is not None:
+                    b.t0 = ts if b.t0 is None else min(b.t0, ts)
+                    b.t1 = ts if b.t1 is None else max(b.t1, ts)
+                b.lines.append(line)
+                b.bytes += len(line) + 1
+            self._last_ts[key] = b.last_ts
+            self._pending.setdefault(node, {})[f"{proc}/{date}"] = cursor
+
+    def flush(self, node: str = None, force: bool = False) -> int:
+        """node 단위로 통째로 flush (그래야 그 node 의 cursor 를 commit 할 수 있다)"""
+        written = 0
+        with self._lock:
+            nodes = {k[0] for k in self._buf} | set(self._pending)
+            for nd in nodes:
+                if node is not None and nd != node:
+                    continue
+                keys = [k for k in self._buf if k[0] == nd]
+                due = force or any(
+                    self._buf[k].bytes >= self.segment_bytes or time.time() - self._buf[k].since >= self.flush_sec
+                    for k in keys)
+                if not due and keys:
+                    continue
+                try:
+                    for k in keys:
+                        b = self._buf[k]
+                        if b.lines:
+                            self._write_segment(k, b)
+                            written += 1
+                        self._buf.pop(k)     # disk 에 쓴 뒤에만 buffer 를 버린다
+                except OSError as e:
+                    # 남은 buffer / pending cursor 는 그대로 → 다음 flush 에서 재시도
+                    fd_log.warning(f"[LOGSTORE] segment write failed ({nd}): {e}")
+                    continue
+                if self._pending.get(nd):
+                    self._cursors.setdefault(nd, {}).update(self._pending.pop(nd))
+                    self._save_cursors()
+        return written
+
+    def _write_segment(self, key, b: _Buffer):
+        node, proc, date = key
+        self._seq += 1
+        rel = Path(date) / node / proc / f"{self._seq:08d}.log.gz"
+        fp = self.root / rel
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        with open(fp, "wb") as raw:
+            with gzip.open(raw, "wt", encoding="utf-8", compresslevel=5) as f:
+                f.write("\n".join(b.lines) + "\n")
+            raw.flush()
+            os.fsync(raw.fileno())   # cursor 가 이 segment 보다 먼저 disk 에 닿으면 안 된다
+        now = time.time()
+        e = {
+            "seq": self._seq, "node": node, "proc": proc, "date": date, "file": rel.as_posix(),
+            "t0": b.t0 if b.t0 is not None else now, "t1": b.t1 if b.t1 is not None else now,
+            "lines": len(b.lines), "bytes": b.bytes,
+        }
+        with open(self.root / "index.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._insert(e)
+
+    def prune(self):
+        """keep_days 이전 date 디렉터리 / index / cursor 정리"""
+        cutoff = time.strftime("%Y-%m-%d", time.localtime(time.time() - self.keep_days * 86400))
+        with self._lock:
+            old = [e for e in self._index if e["date"] < cutoff]
+            if old:
+                keep = [e for e in self._index if e["date"] >= cutoff]
+                self._index = sorted(keep, key=lambda e: e["t0"])
+                self._t0s = [e["t0"] for e in self._index]
+                tmp = self.root / "index.jsonl.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for e in sorted(keep, key=lambda e: e["seq"]):
+                        f.write(json.dumps(e, ensure_ascii=False) + "\n")
+                os.replace(tmp, self.root / "index.jsonl")
+            for d in self.root.iterdir():
+                if d.is_dir() and re.fullmatch(r"\d{4}-\d{2}-\d{2}", d.name) and d.name < cutoff:
+                    shutil.rmtree(d, ignore_errors=True)
+            # 이틀 지난 cursor 는 더 이상 받을 일이 없다
+            c2 = time.strftime("%Y-%m-%d", time.localtime(time.time() - 2 * 86400))
+            changed = False
+            for nd, cur in self._cursors.items():
+                for k in [k for k in cur if k.rsplit("/", 1)[-1] < c2]:
+                    cur.pop(k); changed = True
+            if changed:
+                self._save_cursors()
+            for k in [k for k in self._last_ts if k[2] < c2]:
+                self._last_ts.pop(k, None)
+
+    # ────────────────────────────────────────────
+    # query
+    # ────────────────────────────────────────────
+    def search(self, t_from=None, t_to=None, nodes=None, procs=None, level=None,
+               pattern: str = "", limit: int = 2000, ignore_case: bool = True) -> dict:
+        rx = re.compile(pattern, re.I if ignore_case else 0) if pattern else None
+        min_lv = fd_log_level_no(level)
+        t0 = float(t_from) if t_from is not None else None
+        t1 = float(t_to) if t_to is not None else None
+        nodes = set(nodes or []) or None
+        procs = set(procs or []) or None
+        limit = max(1, min(int(limit), 20000))
+
+        with self._lock:
+            hi = len(self._index) if t1 is None else bisect_right(self._t0s, t1)
+            segs = [e for e in self._index[:hi]
+                    if (t0 is None or e["t1"] >= t0)
+                    and (nodes is None or e["node"] in nodes)
+                    and (procs is None or e["proc"] in procs)]
+            live = [(k, list(b.lines), b.t0 if b.t0 is not None else b.last_ts)
+                    for k, b in self._buf.items()
+                    if (nodes is None or k[0] in nodes) and (procs is None or k[1] in procs)
+                    and (t0 is None or b.t1 is None or b.t1 >= t0)]
+
+        hits, scanned = [], 0
+
+        def scan(node, proc, lines, ts_start):
+            nonlocal scanned
+            parse = LogTimeParser()
+            cur_ts, cur_lv = ts_start, 20
+            for line in lines:
+                scanned += 1
+                ts = parse(line.encode("utf-8", "ignore"))
+                if ts is not None:
+                    cur_ts, cur_lv = ts, fd_log_line_level(line)
+                if cur_ts is not None:
+                    if t0 is not None and cur_ts < t0:
+                        continue
+                    if t1 is not None and cur_ts > t1:
+                        continue
+                if min_lv and cur_lv < min_lv:
+                    continue
+                if rx and not rx.search(line):
+                    continue
+                hits.append((cur_ts or 0.0, node, proc, line))
+
+        for e in segs:
+            try:
+                with gzip.open(self.root / e["file"], "rt", encoding="utf-8", errors="ignore") as f:
+                    scan(e["node"], e["proc"], f.read().splitlines(), e["t0"])
+            except (OSError, EOFError) as ex:
+                fd_log.warning(f"[LOGSTORE] segment read failed {e['file']}: {ex}")
+        for (node, proc, _), lines, ts_start in live:
+            scan(node, proc, lines, ts_start)
+
+        hits.sort(key=lambda h: h[0])   # stable → 같은 시각은 segment 순서 유지
+        truncated = len(hits) > limit
+        hits = hits[-limit:]
+        return {
+            "ok": True, "segments": len(segs), "live": len(live), "scanned": scanned,
+            "count": len(hits), "truncated": truncated,
+            "lines": [{"ts": round(ts, 3), "node": n, "proc": p, "line": ln} for ts, n, p, ln in hits],
+        }
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "root": str(self.root), "segments": len(self._index),
+                "buffered_lines": sum(len(b.lines) for b in self._buf.values()),
+                "keep_days": self.keep_days,
+            }
+
+class LogCollector:
+    def __init__(self, nodes_fn, store: LogSegmentStore, interval: float = 2.0, max_workers: int = 8):
+        """nodes_fn : () -> [{"name", "host", "port"}, ...]"""
+        self._nodes_fn = nodes_fn
+        self.store = store
+        self.interval = max(0.5, float(interval))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="log-collect")
+        self._stop = threading.Event()
+        self._stats = {}        # node -> dict
+        self._skip_until = {}   # node -> epoch (/logship 없는 예전 DMS 는 잠시 건너뛴다)
+
+    def _stat(self, node: str) -> dict:
+        return self._stats.setdefault(node, {
+            "polls": 0, "errors": 0, "last_ok": 0.0, "last_error": "",
+            "bytes_wire": 0, "bytes_raw": 0, "files": 0,
+        })
+
+    def poll_node(self, n: dict, rounds: int = 5):
+        name = n.get("name") or n.get("host")
+        host, port = n["host"], int(n.get("port", 19776))
+        st = self._stat(name)
+        if time.time() < self._skip_until.get(name, 0):
+            return
+        failed = False
+        try:
+            for _ in range(max(1, rounds)):
+                req = json.dumps({"cursors": self.store.cursors(name), "max_bytes": LOGSHIP_MAX_BYTES}).encode("utf-8")
+                st["polls"] += 1
+                try:
+                    code, hdr, data = fd_http_fetch(host, port, "POST", "/logship/batch", req,
+                                                    {"Content-Type": "application/json", "Accept-Encoding": fd_logship_accept()},
+                                                    timeout=15.0)
+                    if code == 404:
+                        self._skip_until[name] = time.time() + 60.0
+                        st["last_error"] = "DMS has no /logship (old version)"
+                        return
+                    if code != 200:
+                        raise RuntimeError(f"http {code}")
+                    enc = next((v for k, v in hdr.items() if k.lower() == "content-encoding"), "identity")
+                    batch = fd_logship_decode(data, enc)
+                except Exception as e:
+                    st["errors"] += 1
+                    st["last_error"] = repr(e)
+                    failed = True
+                    return
+                st["bytes_wire"] += len(data)
+                _M_LOG_BYTES.labels(name, "wire").inc(len(data))
+                for f in batch.get("files") or []:
+                    st["bytes_raw"] += len(f.get("text", ""))
+                    _M_LOG_BYTES.labels(name, "raw").inc(len(f.get("text", "")))
+                    st["files"] += 1
+                    self.store.append(name, f["proc"], f["date"], f.get("text", ""),
+                                      {"fid": f["fid"], "offset": f["offset"]})
+                st["last_ok"] = time.time()
+                st["last_error"] = ""
+                self.store.flush(name)
+                if not batch.get("more"):
+                    return
+        finally:
+            # 실패 (node offline 등) 에도 이미 받아 둔 line 은 바로 기록 - 죽은 node 의 로그가 가장 필요하다
+            self.store.flush(name, force=failed)
+
+    def _loop(self):
+        last_prune = time.time()
+        while not self._stop.is_set():
+            t0 = time.time()
+            nodes = list(self._nodes_fn() or [])
+            futs = [self._pool.submit(self.poll_node, n) for n in nodes]
+            for f in futs:
+                try:
+                    f.result()
+                except Exception:
+                    fd_log.exception("[LOGSTORE] collect failed")
+            if time.time() - last_prune > 3600:
+                last_prune = time.time()
+                self.store.prune()
+            self._stop.wait(max(0.0, self.interval - (time.time() - t0)))
+        self.store.flush(force=True)
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True, name="log-collector").start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        return {"ok": True, "interval_sec": self.interval, "store": self.store.info(),
+                "nodes": {k: dict(v) for k, v in self._stats.items()}}
+
+def fd_log_collect_search(store: LogSegmentStore, q: dict) -> dict:
+    """query string (parse_qs) → store.search - node/proc 는 ',' 로 여러 개"""
+    def one(k, default=""):
+        return (q.get(k) or [default])[0]
+    def many(k):
+        return [x for v in (q.get(k) or []) for x in v.split(",") if x]
+    date = one("date")
+    t_from = fd_log_parse_time(one("from"), date)
+    t_to = fd_log_parse_time(one("to"), date)
+    if one("from") and t_from is None or one("to") and t_to is None:
+        return {"ok": False, "error": "bad from/to (epoch, 'YYYY-mm-dd HH:MM:SS' or 'HH:MM:SS' with date)"}
+    try:
+        limit = int(one("limit", "2000"))
+    except ValueError:
+        return {"ok": False, "error": "bad limit"}
+    try:
+        return store.search(t_from, t_to, many("node"), many("proc"), one("level") or None,
+                            one("pattern"), limit, one("case", "0") != "1")
+    except re.error as e:
+        return {"ok": False, "error": f"bad regex: {e}"}
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "LOGSTORE_DIR",
+    "LogSegmentStore",
+    "LogCollector",
+    "fd_log_collect_search",
+]
@@ -0,0 +1,98 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# oms_restart_plan.py
+# - system restart planner
+#   . restart job (host, port, node, proc) 사이의 의존성을 proc 의존성 표로 만든다
+#     (dependency proc 의 모든 인스턴스가 ready 가 되어야 release)
+#   . wave = 의존성 깊이 (표시/로그용), 실제 release 는 job 단위로 바로 한다
+#   . 순환 의존은 끊고 경고 로그만 남긴다
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+
+from oms_env import *
+
+class RestartPlan:
+    def __init__(self, jobs, depends: dict):
+        """
+        jobs    : [(host, port, node_name, proc), ...]
+        depends : {proc: [proc, ...]} - 이 restart 에 없는 proc 은 이미 만족된 것으로 본다
+        """
+        self.jobs = list(dict.fromkeys(jobs))
+        self._lock = threading.Lock()
+
+        by_proc = {}
+        for j in self.jobs:
+            by_proc.setdefault(j[3], []).append(j)
+
+        self.deps = {}   # job -> set(job)
+        self.users = {}  # job -> [job] (나를 기다리는 job)
+        for j in self.jobs:
+            need = set()
+            for dp in (depends.get(j[3]) or []):
+                if dp != j[3]:
+                    need.update(by_proc.get(dp, []))
+            self.deps[j] = need
+            for d in need:
+                self.users.setdefault(d, []).append(j)
+
+        self.waves = self._build_waves()
+        self.wave_of = {j: i for i, w in enumerate(self.waves) for j in w}
+        self._left = {j: len(self.deps[j]) for j in self.jobs}
+        self._done = set()
+
+    def _build_waves(self):
+        indeg = {j: len(self.deps[j]) for j in self.jobs}
+        wave = [j for j in self.jobs if indeg[j] == 0]
+        waves, seen = [], set()
+        while wave:
+            waves.append(wave)
+            seen.update(wave)
+            nxt = []
+            for j in wave:
+                for u in self.users.get(j, []):
+                    indeg[u] -= 1
+                    if indeg[u] == 0:
+                        nxt.append(u)
+            wave = nxt
+        cyclic = [j for j in self.jobs if j not in seen]
+        if cyclic:
+            # 순환 의존 → 순환에 걸린 job 끼리의 의존은 끊고 마지막 wave 로
+            fd_log.warning(f"[SYS][RESTART] dependency cycle: {sorted({j[3] for j in cyclic})}")
+            cyc = set(cyclic)
+            for j in cyclic:
+                for d in self.deps[j] & cyc:
+                    self.users[d].remove(j)
+                self.deps[j] -= cyc
+            waves.append(cyclic)
+        return waves
+
+    # ────────────────────────────────────────────
+    # scheduling
+    # ────────────────────────────────────────────
+    def roots(self):
+        return [j for j in self.jobs if not self.deps[j]]
+
+    def complete(self, job):
+        """job 이 끝났다 (ready 든 실패든) → 이번에 release 되는 job 목록"""
+        released = []
+        with self._lock:
+            if job in self._done:
+                return released
+            self._done.add(job)
+            for u in self.users.get(job, []):
+                self._left[u] -= 1
+                if self._left[u] == 0:
+                    released.append(u)
+        return released
+
+    def describe(self) -> str:
+        return " → ".join(
+            "[" + ",".join(sorted({j[3] for j in w})) + "]" for w in self.waves
+        )
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "RestartPlan",
+]
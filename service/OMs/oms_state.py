@@ -9,6 +9,9 @@ import os, time
 import copy
 import json
 import base64
+import atexit
+import hashlib
+import threading
 
 from pathlib import Path
 
@@ -18,10 +21,120 @@ from pathlib import Path
 # ─────────────────────────────────────────────────────────────
 from oms_env import *
 
+# ─────────────────────────────────────────────────────────────
+# 💾 STATE / PERSISTENCE (write-behind)
+# - 메모리 상태가 원본, 파일은 STATE_FLUSH_WINDOW_SEC 단위로 합쳐서 기록
+# - tmp 파일에 쓰고 fsync 후 rename → 읽는 쪽이 반쯤 쓰인 파일을 보지 않음
+# - 직전 기록과 내용(hash)이 같으면 기록 생략
+# ─────────────────────────────────────────────────────────────
+class FdStateStore:
+    def __init__(self, name: str, path: Path, source, window: float = STATE_FLUSH_WINDOW_SEC, fsync: str = STATE_FSYNC,
+                 lock=None):
+        """
+        source: callable() -> dict (기록 시점의 최신 메모리 상태)
+        lock  : 상태를 바꾸는 쪽이 잡는 lock 과 같은 것 (기록은 이 lock 안에서 직렬화 → key 사이가 찢어지지 않는다)
+        """
+        self.name = name
+        self.path = Path(path)
+        self._source = source
+        self._window = max(0.0, float(window))
+        self._fsync = (fsync or "always") != "never"
+        self._io_lock = threading.Lock()
+        self.lock = lock if lock is not None else threading.RLock()
+        self._due = 0.0 # 0 이면 pending 없음
+        self._last_hash = None
+        self.writes = 0
+        self.skipped = 0
+    def mark_dirty(self):
+        with _STORE_COND:
+            if not self._due:
+                self._due = time.monotonic() + self._window
+                _STORE_COND.notify()
+    def discard(self):
+        """pending 취소 + hash 초기화 (파일을 지운 뒤 호출)"""
+        with _STORE_COND:
+            self._due = 0.0
+        with self._io_lock:
+            self._last_hash = None
+    def _serialize(self) -> bytes:
+        # writer 와 같은 lock 안에서 직렬화 (파일 쓰기는 lock 밖)
+        with self.lock:
+            return json.dumps(self._source(), indent=2, ensure_ascii=False).encode("utf-8")
+    def flush(self) -> bool:
+        # _due 는 먼저 내린다 (기록 중에 바뀐 것은 다시 dirty → 다음 tick)
+        with _STORE_COND:
+            self._due = 0.0
+        with self._io_lock:
+            try:
+                data = self._serialize()
+                h = hashlib.blake2b(data, digest_size=16).digest()
+                if h == self._last_hash:
+                    self.skipped += 1
+                    return False
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    if self._fsync:
+                        os.fsync(f.fileno())
+                for attempt in range(5):
+                    try:
+                        os.replace(tmp, self.path)
+                        break
+                    except PermissionError:
+                        # Windows: reader 가 열고 있으면 잠깐 대기
+                        if attempt == 4:
+                            raise
+                        time.sleep(0.02)
+                self._last_hash = h
+                self.writes += 1
+                return True
+            except Exception as e:
+                fd_log.exception(f"[save][{self.name}][state] failed: {e}")
+                # 실패한 변경을 잃지 않도록 다시 dirty → 다음 tick 에 재시도
+                self.mark_dirty()
+                return False
+
+_STORES = []
+_STORE_COND = threading.Condition()
+_STORE_THREAD = None
+def _fd_state_flusher():
+    while True:
+        with _STORE_COND:
+            while True:
+                pending = [st._due for st in _STORES if st._due]
+                now = time.monotonic()
+                if pending and min(pending) <= now:
+                    break
+                _STORE_COND.wait(None if not pending else min(pending) - now)
+            due = [st for st in _STORES if st._due and st._due <= time.monotonic()]
+        for st in due:
+            st.flush()
+def fd_state_store(name: str, path: Path, source, lock=None) -> FdStateStore:
+    global _STORE_THREAD
+    st = FdStateStore(name, path, source, lock=lock)
+    with _STORE_COND:
+        _STORES.append(st)
+        if _STORE_THREAD is None:
+            _STORE_THREAD = threading.Thread(target=_fd_state_flusher, name="oms-state-flush", daemon=True)
+            _STORE_THREAD.start()
+    return st
+def fd_state_flush_all():
+    """shutdown hook: pending 상태를 즉시 기록"""
+    for st in list(_STORES):
+        with _STORE_COND:
+            pending = bool(st._due)
+        if pending:
+            st.flush()
+atexit.register(fd_state_flush_all)
+
 # ─────────────────────────────────────────────────────────────
 # 🗂️ STATE / SYSTEM
 # ─────────────────────────────────────────────────────────────
 SYS_STATE = {} # 새로운 프로세스 상태 저장소
+# 상태 dict 별 lock 하나 - 바꾸는 쪽 (여기 helper / oms_agent / cam monitor) 과 store 기록이 같이 쓴다
+SYS_STATE_LOCK = threading.RLock()
+_SYS_STORE = fd_state_store("system", FILE_SYS_STATE, lambda: SYS_STATE, lock=SYS_STATE_LOCK)
 ALLOWED_SYS_KEYS = {
     "connected_daemons",
     "cameras",
@@ -32,6 +145,17 @@ ALLOWED_SYS_KEYS = {
     "aic_versions",
     "updated_at",
 }
+_SYS_STATE_LISTENERS = [] # SYS_STATE 변경 시 호출 (snapshot 재생성 등)
+def fd_sys_state_listen(callback):
+    """Register a no-arg callback invoked after every SYS_STATE change."""
+    if callback not in _SYS_STATE_LISTENERS:
+        _SYS_STATE_LISTENERS.append(callback)
+def _fd_sys_state_changed():
+    for cb in list(_SYS_STATE_LISTENERS):
+        try:
+            cb()
+        except Exception as e:
+            fd_log.exception(f"[SYS] state listener failed: {e}")
 def fd_sys_state_load():
     global SYS_STATE
     try:
@@ -66,13 +190,11 @@ def fd_sys_state_load():
             SYS_STATE = {}        
     except Exception as e:
         fd_log.exception(f"fd_sys_state_load failed: {e}")
+    finally:
+        _fd_sys_state_changed()
 def fd_sys_state_save():
-    global SYS_STATE
-    try:
-        with open(FILE_SYS_STATE, "w", encoding="utf-8") as f:
-            json.dump(SYS_STATE, f, indent=2, ensure_ascii=False)        
-    except Exception as e:
-        fd_log.exception(f"[save][system][state] failed: {e}")
+    _SYS_STORE.mark_dirty()
+    _fd_sys_state_changed()
 def fd_sys_state_upsert(payload: dict):
     global SYS_STATE
     clean = {}
@@ -81,9 +203,8 @@ def fd_sys_state_upsert(payload: dict):
             clean[k] = v
     clean["updated_at"] = time.time()
     # SYS_STATE 전체를 clean 으로 교체
-    SYS_STATE = clean
-    with open(FILE_SYS_STATE, "w", encoding="utf-8") as f:
-        json.dump(SYS_STATE, f, indent=2, ensure_ascii=False) 
+    with SYS_STATE_LOCK:
+        SYS_STATE = clean
     fd_sys_state_save()
 def fd_sys_latest_state():
     global SYS_STATE
@@ -93,19 +214,23 @@ def fd_sys_latest_state():
 def fd_sys_clear_state() -> bool:
     global SYS_STATE
     try:
-        SYS_STATE.clear()
+        with SYS_STATE_LOCK:
+            SYS_STATE.clear()
+        _SYS_STORE.discard()
         try:
             FILE_SYS_STATE.unlink(missing_ok=True)
         except Exception:
             pass
+        _fd_sys_state_changed()
         return True
     except Exception:
         return False
 def fd_sys_clear_connect_state() -> bool:
     global SYS_STATE
     try:
-        SYS_STATE["connected_daemons"] = {}
-        SYS_STATE["updated_at"] = time.time()
+        with SYS_STATE_LOCK:
+            SYS_STATE["connected_daemons"] = {}
+            SYS_STATE["updated_at"] = time.time()
         fd_sys_state_save()
         fd_log.info("[SYS] Clear connect_state OK")
         return True
@@ -113,9 +238,54 @@ def fd_sys_clear_connect_state() -> bool:
         fd_log.error(f"[SYS] Clear connect_state FAIL: {e}")
         return False
 # ─────────────────────────────────────────────────────────────
+# 🗂️ STATE / SNAPSHOT
+# - writer 가 변경 시점에 payload 를 다시 만들어 교체(publish)
+# - reader 는 lock 없이 최신 snapshot 참조만 읽는다
+# ─────────────────────────────────────────────────────────────
+class FdStateSnapshot:
+    """Immutable view of a state payload with its pre-serialized JSON body."""
+    __slots__ = ("version", "payload", "body", "built_at")
+    def __init__(self, version: int, payload: dict, body: bytes, built_at: float):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "payload", payload)
+        object.__setattr__(self, "body", body)
+        object.__setattr__(self, "built_at", built_at)
+    def __setattr__(self, key, value):
+        raise AttributeError("FdStateSnapshot is immutable")
+class FdSnapshotPublisher:
+    """
+    builder() 로 payload 를 만들어 version 을 올리고 통째로 교체한다.
+    - publish(): writer 쪽에서 호출 (writer 끼리만 직렬화)
+    - latest() : reader 쪽, lock 없이 참조 1회 읽기 (O(1))
+    - builder 는 live state 를 복사해서 넣어야 한다 (payload 가 live dict 를 가리키면 immutable 이 아니다)
+    """
+    def __init__(self, builder, name: str = "state"):
+        self._builder = builder
+        self._name = name
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snap = FdStateSnapshot(0, {}, b"{}", 0.0)
+    def publish(self) -> FdStateSnapshot:
+        with self._lock:
+            try:
+                payload = self._builder() or {}
+            except Exception as e:
+                fd_log.exception(f"[{self._name}] snapshot build failed: {e}")
+                return self._snap
+            self._version += 1
+            payload["snapshot_version"] = self._version
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self._snap = FdStateSnapshot(self._version, payload, body, time.time())
+            return self._snap
+    def latest(self) -> FdStateSnapshot:
+        return self._snap
+
+# ─────────────────────────────────────────────────────────────
 # 🗂️ STATE / CAMERA
 # ─────────────────────────────────────────────────────────────
 CAM_STATE = {} 
+CAM_STATE_LOCK = threading.RLock()     # = Orchestrator.cam_state_lock
+_CAM_STORE = fd_state_store("camera", FILE_CAM_STATE, lambda: CAM_STATE, lock=CAM_STATE_LOCK)
 def fd_cam_state_load():
     global CAM_STATE
     try:
@@ -126,22 +296,17 @@ def fd_cam_state_load():
     except:
         CAM_STATE = {}
 def fd_cam_state_save():
-    global CAM_STATE
-    try:
-        with open(FILE_CAM_STATE, "w", encoding="utf-8") as f:
-            json.dump(CAM_STATE, f, indent=2, ensure_ascii=False)                
-    except Exception as e:
-        fd_log.exception(f"[save][camera][state] failed: {e}")
+    _CAM_STORE.mark_dirty()
 def fd_cam_state_upsert(payload: dict):
     global CAM_STATE    
     # 기존 CAM_STATE 유지 + payload 반영 (merge 방식)
-    for k, v in payload.items():
-        CAM_STATE[k] = v
-    # updated_at 항상 새로 기록
-    CAM_STATE["updated_at"] = time.time()
-    # 파일 저장
-    with open(FILE_CAM_STATE, "w", encoding="utf-8") as f:
-        json.dump(CAM_STATE, f, indent=2, ensure_ascii=False)
+    with CAM_STATE_LOCK:
+        for k, v in payload.items():
+            CAM_STATE[k] = v
+        # updated_at 항상 새로 기록
+        CAM_STATE["updated_at"] = time.time()
+    # 파일 저장 (write-behind)
+    fd_cam_state_save()
 def fd_cam_latest_state():
     global CAM_STATE
     return CAM_STATE
@@ -149,28 +314,30 @@ def fd_cam_clear_connect_state(alive_reset = False) -> bool:
     global CAM_STATE
     try:
         # NOTE: Lock 은 바깥에서 잡아줘야 한다 (self 없음)
-        cameras = CAM_STATE.get("cameras")
-        if isinstance(cameras, list):
-            for cam in cameras:
-                if not isinstance(cam, dict):
-                    continue
-                # unified clear of "connected" flags
-                cam["alive"] = False
-                cam["connected"] = False
-                if isinstance(cam.get("state"), dict):
-                    cam["state"].pop("connected", None)
-                cam.pop("connected_state", None)
+        # (CAM_STATE_LOCK = cam_state_lock - RLock 이라 바깥에서 잡고 있어도 된다)
+        with CAM_STATE_LOCK:
+            cameras = CAM_STATE.get("cameras")
+            if isinstance(cameras, list):
+                for cam in cameras:
+                    if not isinstance(cam, dict):
+                        continue
+                    # unified clear of "connected" flags
+                    cam["alive"] = False
+                    cam["connected"] = False
+                    if isinstance(cam.get("state"), dict):
+                        cam["state"].pop("connected", None)
+                    cam.pop("connected_state", None)
 
             
-        # clear summary / aggregation fields
-        CAM_STATE["camera_connected"] = {}
-        CAM_STATE["camera_record"] = []
-        if alive_reset == True:
-            CAM_STATE["camera_alive"] = []        
-        CAM_STATE.pop("connected_summary", None)
-        CAM_STATE.pop("connected_map", None)
+            # clear summary / aggregation fields
+            CAM_STATE["camera_connected"] = {}
+            CAM_STATE["camera_record"] = []
+            if alive_reset == True:
+                CAM_STATE["camera_alive"] = []        
+            CAM_STATE.pop("connected_summary", None)
+            CAM_STATE.pop("connected_map", None)
 
-        CAM_STATE["updated_at"] = time.time()
+            CAM_STATE["updated_at"] = time.time()
 
         fd_cam_state_save()
 
@@ -184,6 +351,8 @@ def fd_cam_clear_connect_state(alive_reset = False) -> bool:
 # 🗂️ STATE / RECORD
 # ─────────────────────────────────────────────────────────────
 REC_STATE = {} 
+REC_STATE_LOCK = threading.RLock()
+_REC_STORE = fd_state_store("record", FILE_REC_STATE, lambda: REC_STATE, lock=REC_STATE_LOCK)
 def fd_rec_state_load():
     global REC_STATE
     try:
@@ -194,22 +363,17 @@ def fd_rec_state_load():
     except:
         REC_STATE = {}
 def fd_rec_state_save():
-    global REC_STATE
-    try:
-        with open(FILE_REC_STATE, "w", encoding="utf-8") as f:
-            json.dump(REC_STATE, f, indent=2, ensure_ascii=False)                
-    except Exception as e:
-        fd_log.exception(f"[save][record][state] failed: {e}")
+    _REC_STORE.mark_dirty()
 def fd_rec_state_upsert(payload: dict):
     global REC_STATE    
     # 기존 CAM_STATE 유지 + payload 반영 (merge 방식)
-    for k, v in payload.items():
-        REC_STATE[k] = v
-    # updated_at 항상 새로 기록
-    REC_STATE["updated_at"] = time.time()
-    # 파일 저장
-    with open(FILE_REC_STATE, "w", encoding="utf-8") as f:
-        json.dump(REC_STATE, f, indent=2, ensure_ascii=False)
+    with REC_STATE_LOCK:
+        for k, v in payload.items():
+            REC_STATE[k] = v
+        # updated_at 항상 새로 기록
+        REC_STATE["updated_at"] = time.time()
+    # 파일 저장 (write-behind)
+    fd_rec_state_save()
 def fd_rec_latest_state():
     global REC_STATE
     return REC_STATE
@@ -244,7 +408,10 @@ def get_camera_format():
 # EXPORTS
 # ────────────────────────────────────────────────────────────
 __all__ = [
+    "SYS_STATE_LOCK","CAM_STATE_LOCK","REC_STATE_LOCK",
     "SYS_STATE","fd_sys_state_load", "fd_sys_state_save","fd_sys_state_upsert", "fd_sys_latest_state","fd_sys_clear_state","fd_sys_clear_connect_state",
+    "fd_sys_state_listen","FdStateSnapshot","FdSnapshotPublisher",
+    "FdStateStore","fd_state_store","fd_state_flush_all",
     "CAM_STATE","fd_cam_state_load", "fd_cam_state_save", "fd_cam_state_upsert", "fd_cam_latest_state", "fd_cam_clear_connect_state",
     "REC_STATE","fd_rec_state_load", "fd_rec_state_save", "fd_rec_state_upsert", "fd_rec_latest_state",
     "get_camera_format",
@@ -0,0 +1,170 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# oms_step_graph.py
+# - step graph runner (system connect / version fan-out)
+#   . step = fn(results) , deps 가 모두 끝나면 바로 실행 (독립 step 은 동시에)
+#   . step 별 deadline : 넘기면 실패 처리 후 다음으로 진행 (thread 는 끝까지 돈다)
+#   . required step 실패 → 그 step 에 의존하는 step 은 skip, run() 은 첫 에러를 raise
+#   . optional step 실패 → 결과 None 으로 dependent 진행
+#   . deadline 을 넘겨 버려진 step 은 fd_step_abandoned() 가 True (안쪽 graph / helper pool 까지)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import time
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait, FIRST_COMPLETED
+
+from oms_env import *
+from src.fd_common.metrics import fd_metric_histogram
+
+_M_STEP_SEC = fd_metric_histogram("oms_step_seconds", "StepGraph step duration", ("graph", "step", "state"))
+
+# 지금 thread 가 돌고 있는 step 의 abandon event 사슬 (바깥 graph step → 안쪽 step)
+_step_tls = threading.local()
+
+def fd_step_chain() -> tuple:
+    return getattr(_step_tls, "chain", ())
+
+def fd_step_bind(chain):
+    """step 안에서 만든 helper pool 의 initializer 에서 - 그 step 의 abandon 을 물려받는다"""
+    _step_tls.chain = tuple(chain or ())
+
+def fd_step_abandoned() -> bool:
+    """현재 step (또는 그것을 부른 바깥 step) 이 deadline 을 넘겨 버려졌으면 True"""
+    return any(ev.is_set() for ev in fd_step_chain())
+
+class StepGraph:
+    def __init__(self, name: str, on_event=None):
+        """
+        on_event : callable(event: dict) - step start/finish 때 호출 (coordinator thread)
+        """
+        self.name = name
+        self._steps = OrderedDict()
+        self._on_event = on_event
+        self.events = []
+
+    def add(self, name: str, fn, deps=(), deadline: float | None = None, required: bool = True, label: str = ""):
+        for d in deps:
+            if d not in self._steps:
+                raise ValueError(f"[{self.name}] unknown dependency '{d}' for step '{name}'")
+        self._steps[name] = {
+            "fn": fn, "deps": tuple(deps), "deadline": deadline,
+            "required": bool(required), "label": label or name,
+        }
+        return self
+
+    def _emit(self, ev: dict):
+        self.events.append(ev)
+        if "sec" in ev:
+            _M_STEP_SEC.labels(self.name, ev["step"], ev["state"]).observe(ev["sec"])
+        if self._on_event:
+            try:
+                self._on_event(ev)
+            except Exception as e:
+                fd_log.warning(f"[{self.name}] step event callback failed: {e}")
+
+    @staticmethod
+    def _call(chain, fn, results):
+        prev = fd_step_chain()
+        fd_step_bind(chain)
+        try:
+            return fn(results)
+        finally:
+            fd_step_bind(prev)
+
+    def run(self, max_workers: int = 8, initializer=None) -> dict:
+        results, errors = {}, {}
+        pending = list(self._steps)
+        running = {}        # future -> name
+        started = {}        # name -> t0
+        abandon = {}        # name -> Event (deadline 초과시 set)
+        parent = fd_step_chain()
+        t_begin = time.time()
+
+        ex = ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                thread_name_prefix=f"step-{self.name}", initializer=initializer)
+        try:
+            while pending or running:
+                # 1) 실행 가능한 step 제출
+                for name in list(pending):
+                    st = self._steps[name]
+                    blocked = [d for d in st["deps"] if d in errors and self._steps[d]["required"]]
+                    if blocked:
+                        pending.remove(name)
+                        errors[name] = RuntimeError(f"skipped: dependency failed ({', '.join(blocked)})")
+                        self._emit({"step": name, "state": "skipped", "error": str(errors[name])})
+                        continue
+                    if all(d in results or d in errors for d in st["deps"]):
+                        pending.remove(name)
+                        started[name] = time.time()
+                        self._emit({"step": name, "state": "start", "label": st["label"]})
+                        abandon[name] = threading.Event()
+                        running[ex.submit(self._call, parent + (abandon[name],), st["fn"], results)] = name
+                if not running:
+                    if pending:  # 도달 불가 (순환) - add() 가 순서를 강제하므로 오지 않는다
+                        raise RuntimeError(f"[{self.name}] unreachable steps: {pending}")
+                    break
+
+                # 2) 가장 가까운 deadline 까지 대기
+                now = time.time()
+                timeout = None
+                for name in running.values():
+                    dl = self._steps[name]["deadline"]
+                    if dl is not None:
+                        left = started[name] + dl - now
+                        timeout = left if timeout is None else min(timeout, left)
+                finished, _ = futures_wait(list(running), timeout=max(0.0, timeout) if timeout is not None else None,
+                                           return_when=FIRST_COMPLETED)
+
+                # 3) 결과 수집
+                for fut in finished:
+                    name = running.pop(fut)
+                    sec = round(time.time() - started[name], 3)
+                    try:
+                        results[name] = fut.result()
+                        self._emit({"step": name, "state": "done", "sec": sec})
+                    except Exception as e:
+                        errors[name] = e
+                        self._fail(name, e, sec, results)
+
+                # 4) deadline 초과
+                now = time.time()
+                for fut, name in list(running.items()):
+                    dl = self._steps[name]["deadline"]
+                    if dl is not None and now - started[name] >= dl:
+                        running.pop(fut)
+                        abandon[name].set()
+                        e = TimeoutError(f"step '{name}' exceeded deadline {dl}s")
+                        errors[name] = e
+                        self._fail(name, e, round(now - started[name], 3), results)
+        finally:
+            # 아직 도는 thread 는 끝까지 돌지만 더 이상 이 run 의 일부가 아니다
+            for name in running.values():
+                abandon[name].set()
+            ex.shutdown(wait=False)
+
+        fd_log.info(f"[{self.name}] step graph finished in {time.time() - t_begin:.2f}s "
+                    f"(ok {len(set(results) - set(errors))}, fail {len(errors)})")
+        for name in self._steps:
+            if name in errors and self._steps[name]["required"]:
+                raise errors[name]
+        return results
+
+    def _fail(self, name, e, sec, results):
+        st = self._steps[name]
+        self._emit({"step": name, "state": "failed", "sec": sec, "error": str(e)})
+        if st["required"]:
+            fd_log.error(f"[{self.name}] step '{name}' failed: {e}")
+        else:
+            fd_log.warning(f"[{self.name}] optional step '{name}' failed: {e}")
+            results[name] = None
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "StepGraph",
+    "fd_step_chain",
+    "fd_step_bind",
+    "fd_step_abandoned",
+]
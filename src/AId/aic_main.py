@@ -15,6 +15,7 @@ import threading
 import signal
 import atexit
 import socket
+import psutil
 from threading import Semaphore
 from datetime import datetime
 
@@ -34,12 +35,45 @@ sys.path.insert(0, common_path)
 
 # ── project imports ──────────────────────────────────────────────────────────
 from fd_common.tcp_server        import TCPServer
+from fd_common.attach            import fd_attach_jpeg
+from fd_common.scatter_gather    import ScatterGather
+from fd_common.work_queue        import WorkWorker
 from fd_utils.fd_config_manager  import setup, conf, get
-from fd_utils.fd_logging         import fd_log
+from fd_utils.fd_logging         import fd_log, PATH_LOG
+from fd_common.metrics          import fd_metric_histogram, fd_metrics_snapshot
+from fd_common.tracing          import fd_trace_setup, fd_trace_span, fd_trace_spans, fd_trace_tokens
 
-from fd_product.fd_product_clip  import fd_calibrate_files
+from fd_product.fd_product_clip  import fd_calibrate_files, fd_calibrate_stop, fd_calibrate_stats
 
 conf._product = "AIc"
+
+_M_CMD_SEC = fd_metric_histogram("aic_command_seconds", "AId command handling time", ("section",))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# preview (AId → AIc : [AIc], [Information], [Preview])
+# - 영상 file 의 한 frame 을 JPEG 로 → flag 1 첨부로 응답 (base64 / 공유 폴더 없이)
+# ─────────────────────────────────────────────────────────────────────────────
+PREVIEW_WIDTH   = 640
+PREVIEW_QUALITY = 80
+
+def aic_grab_preview(path: str, frame: int = 0, width: int = PREVIEW_WIDTH):
+    """영상(또는 image) file 에서 frame 하나 → BGR ndarray (width 로 축소)"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise FileNotFoundError(f"cannot open {path}")
+        if frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame))
+        ok, img = cap.read()
+        if not ok or img is None:
+            raise ValueError(f"cannot read frame {frame} from {path}")
+    finally:
+        cap.release()
+    h, w = img.shape[:2]
+    if width and w > width:
+        img = cv2.resize(img, (int(width), int(h * width / w)), interpolation=cv2.INTER_AREA)
+    return img
 # ─────────────────────────────────────────────────────────────────────────
 # 🎯AIc Class (Artificial Intelligence Client)
 # ─────────────────────────────────────────────────────────────────────────
@@ -67,8 +101,18 @@ class AIc:
 
         # product info
         self.prod_video_source  = None
+        self.prod_video_sources = []     # scheduler 배정 - camera 가 여러 PreSd 에 걸칠 수 있다
         self.prod_adjust_info   = None
         self.prod_info = None
+        self.prod_generations   = {}     # cam ip → generation (AId scheduler, ch 폴더 handoff)
+
+        # calibration worker (AId WorkQueue 에서 camera × marker unit 을 가져와 처리)
+        self.aid_rpc = ScatterGather(self._send_to_aid, name="AIc-AId", max_workers=2, log=fd_log.warning)
+        self.work = None
+        self._work_job = None
+        self._work_lock = threading.Lock()
+        self._work_idle = threading.Condition(self._work_lock)
+        self._work_inflight = {}         # job → 처리 중인 unit 수 (job setup 은 다른 job unit 이 없을 때만)
     def init_sys(self) -> bool:
         current_path = os.path.dirname(os.path.abspath(__file__))
         log_path = os.path.join(current_path, "log")
@@ -102,6 +146,7 @@ class AIc:
         try:
             aid_port = conf._aic_daemon_port
             self.aid_server = TCPServer("", aid_port, self.on_aid_msg)
+            self.aid_server.set_attach_callback(self.on_aid_attach)
             self.aid_server.open()
             fd_log.info(f"[{self.name}] listening for AId on 0.0.0.0:{aid_port}")
             return True
@@ -110,6 +155,17 @@ class AIc:
             return False
     def run(self):
         fd_log.info("🟢 [AIc] run() begin..")
+        fd_trace_setup("AIc", getattr(conf, "_trace_ring", 4096),
+                       sink_dir=os.path.join(PATH_LOG, "trace") if getattr(conf, "_trace_jsonl", True) else None,
+                       enabled=getattr(conf, "_trace_enabled", True))
+        slots = int(getattr(conf, "_work_worker_slots", 2) or 0)
+        if slots > 0:
+            self.work = WorkWorker(f"{socket.gethostname()}:{os.getpid()}", self._work_rpc,
+                                   {"calibration": self._work_calibration}, slots=slots,
+                                   heartbeat_sec=float(getattr(conf, "_work_heartbeat_sec", 5.0) or 5.0),
+                                   log=fd_log.info)
+            self.work.start()
+            fd_log.info(f"[AIc] calibration worker {self.work.name} ({slots} slot)")
     def stop(self):
         fd_log.info("[AIc] stop() begin..")
         if self._stopped:
@@ -118,6 +174,8 @@ class AIc:
         self._stopped = True
 
         self.end = True
+        if self.work:
+            self.work.stop()
 
         # AId <-> AIc 전용 서버 종료
         try:
@@ -183,8 +241,19 @@ class AIc:
             fd_log.warning(f"[AIc] on_aid_msg: invalid data type after parse: {type(data)}")
             return
 
-        # 4) dispatch
-        self._dispatch_aid_command(data) 
+        # 4) AIc → AId 요청 (Work) 에 대한 응답 → 기다리는 gather 로
+        if str(data.get("SendState", "")).lower() == "response" and self.aid_rpc.resolve("AId", data):
+            return
+
+        # 5) dispatch
+        t0 = time.perf_counter()
+        with fd_trace_span(f"{data.get('Section1')}/{data.get('Section2')}/{data.get('Section3')}", pkt=data):
+            self._dispatch_aid_command(data)
+        _M_CMD_SEC.labels(f"{data.get('Section1')}/{data.get('Section2')}/{data.get('Section3')}").observe(time.perf_counter() - t0)
+    def on_aid_attach(self, pkt: dict, attachments: list):
+        """flag 1 (JSON + 첨부) - 'Attachments' 를 Attachment 객체 list 로 바꿔서 같은 dispatch 로"""
+        pkt["Attachments"] = attachments
+        self.on_aid_msg(pkt)
     # 🎯 command processing
     def _dispatch_aid_command(self, pkt: dict):
         sec1 = pkt.get("Section1")
@@ -201,6 +270,31 @@ class AIc:
             case ("AIc", "Information", "Version"):
                 return self.get_version_request(pkt)
             # ──────────────────────────────────────────────────────
+            # 📦 V5 : [AIc], [Information], [Metrics]
+            # ──────────────────────────────────────────────────────
+            case ("AIc", "Information", "Metrics"):
+                return self.get_metrics_request(pkt)
+            # ──────────────────────────────────────────────────────
+            # 📦 V5 : [AIc], [Information], [Trace]
+            # ──────────────────────────────────────────────────────
+            case ("AIc", "Information", "Trace"):
+                return self.get_trace_request(pkt)
+            # ──────────────────────────────────────────────────────
+            # 📦 V5 : [AIc], [Information], [Preview]
+            # ──────────────────────────────────────────────────────
+            case ("AIc", "Information", "Preview"):
+                return self.get_preview_request(pkt)
+            # ──────────────────────────────────────────────────────
+            # 📦 V5 : [AIc], [Information], [Load]
+            # ──────────────────────────────────────────────────────
+            case ("AIc", "Information", "Load"):
+                return self.get_load_request(pkt)
+            # ──────────────────────────────────────────────────────
+            # 📦 V5 : [AIc], [Operation], [Assign]
+            # ──────────────────────────────────────────────────────
+            case ("AIc", "Operation", "Assign"):
+                return self.production_assign(pkt)
+            # ──────────────────────────────────────────────────────
             # 📦 V5 : [AIc], [Operation], [Prepare]
             # ──────────────────────────────────────────────────────
             case ("AIc", "Operation", "Prepare"):
@@ -214,6 +308,13 @@ class AIc:
                 elif action == "stop":
                     return self.production_stop(pkt)
             # ──────────────────────────────────────────────────────
+            # 📦 V5 : [AIc], [Work], [Notify] - 새 calibration job
+            # ──────────────────────────────────────────────────────
+            case ("AIc", "Work", "Notify"):
+                if self.work:
+                    self.work.wake()
+                return
+            # ──────────────────────────────────────────────────────
             # 📦 V5 : not matching packet
             # ──────────────────────────────────────────────────────
             case _:
@@ -261,6 +362,129 @@ class AIc:
                 fd_log.error(f"send_msg failed: {e}")
         else:
             fd_log.error("aid_server is None, cannot send Version response to AId")
+    # get metrics request
+    def get_metrics_request(self, pkt: dict) -> None:
+        """AId → AIc : metrics snapshot (fd_common.metrics)"""
+        resp = {
+            "Section1": "Daemon",
+            "Section2": "Information",
+            "Section3": "Metrics",
+            "SendState": "response",
+            "From": "AIc",
+            "To": "AId",
+            "Token": pkt.get("Token"),
+            "Action": "set",
+            "Metrics": fd_metrics_snapshot(),
+            "Work": self.work.status() if self.work else {},
+            "ResultCode": 1000,
+            "ErrorMsg": ""
+        }
+        if self.aid_server:
+            try:
+                self.aid_server.send_msg(json.dumps(resp))
+            except Exception as e:
+                fd_log.error(f"send_msg failed: {e}")
+        else:
+            fd_log.error("aid_server is None, cannot send Metrics response to AId")
+    # get trace request
+    def get_trace_request(self, pkt: dict) -> None:
+        """AId → AIc : TraceToken 의 span (없으면 최근 token 목록)"""
+        trace_token = str(pkt.get("TraceToken", "") or "")
+        resp = {
+            "Section1": "Daemon",
+            "Section2": "Information",
+            "Section3": "Trace",
+            "SendState": "response",
+            "From": "AIc",
+            "To": "AId",
+            "Token": pkt.get("Token"),
+            "Action": "set",
+            "TraceToken": trace_token,
+            "ResultCode": 1000,
+            "ErrorMsg": ""
+        }
+        if trace_token:
+            resp["Spans"] = fd_trace_spans(trace_token)
+        else:
+            resp["Tokens"] = fd_trace_tokens(int(pkt.get("Limit", 50) or 50))
+        if self.aid_server:
+            try:
+                self.aid_server.send_msg(json.dumps(resp, default=str))
+            except Exception as e:
+                fd_log.error(f"send_msg failed: {e}")
+        else:
+            fd_log.error("aid_server is None, cannot send Trace response to AId")
+    # get load request
+    def get_load_request(self, pkt: dict) -> None:
+        """AId → AIc : scheduler 용 부하 보고 (encoder slot / CPU / camera 별 속도·밀린 초)"""
+        cams = fd_calibrate_stats()
+        try:
+            cpu = psutil.cpu_percent(interval=None)
+        except Exception:
+            cpu = 0.0
+        resp = {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Load",
+            "SendState": "response",
+            "From": "AIc",
+            "To": "AId",
+            "Token": pkt.get("Token"),
+            "Action": "set",
+            "Load": {
+                "slots_total": int(os.getenv("FD_NVENC_MAX_SLOTS", getattr(conf, "_gpu_session_max_cnt", 12))),
+                "slots_used": len(cams),
+                "cpu": cpu,
+                "backlog_sec": sum(c["lag"] for c in cams.values()),
+                "cameras": cams,
+            },
+            "ResultCode": 1000,
+            "ErrorMsg": ""
+        }
+        if self.aid_server:
+            try:
+                self.aid_server.send_msg(json.dumps(resp))
+            except Exception as e:
+                fd_log.error(f"send_msg failed: {e}")
+    # get preview request
+    def get_preview_request(self, pkt: dict) -> None:
+        """
+        AId → AIc : camera 별 preview (JPEG 첨부)
+        "Cameras": [{"ip": "10.82.104.11", "path": "D:\\...\\11.mp4"}, ...], "Frame": 0, "Width": 640
+        """
+        frame = int(pkt.get("Frame", 0) or 0)
+        width = int(pkt.get("Width", PREVIEW_WIDTH) or PREVIEW_WIDTH)
+        quality = int(pkt.get("Quality", PREVIEW_QUALITY) or PREVIEW_QUALITY)
+        attachments, errors = [], {}
+        for cam in pkt.get("Cameras") or []:
+            ip, path = str(cam.get("ip", "")), cam.get("path", "")
+            try:
+                img = aic_grab_preview(path, int(cam.get("frame", frame)), width)
+                attachments.append(fd_attach_jpeg(img, name=ip, quality=quality, frame=frame))
+            except Exception as e:
+                errors[ip] = f"{type(e).__name__}: {e}"
+                fd_log.warning(f"[AIc] preview {ip} failed: {errors[ip]}")
+        resp = {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Preview",
+            "SendState": "response",
+            "From": "AIc",
+            "To": "AId",
+            "Token": pkt.get("Token"),
+            "Action": "set",
+            "PreviewErrors": errors,
+            "ResultCode": 1000 if attachments or not errors else 1100,
+            "ErrorMsg": "" if not errors else f"{len(errors)} camera(s) failed"
+        }
+        if self.aid_server:
+            try:
+                fd_log.info(f"[AIc] >> AId Preview Response: {len(attachments)} jpeg, {sum(a.size for a in attachments)} bytes")
+                self.aid_server.send_msg(resp, attachments=attachments)
+            except Exception as e:
+                fd_log.error(f"send_msg failed: {e}")
+        else:
+            fd_log.error("aid_server is None, cannot send Preview response to AId")
     # get prepare request
     def production_prepare(self, pkt: dict) -> None:
         fd_log.info("🚀 [AIc] Handle Prepare from AId")
@@ -283,7 +507,9 @@ class AIc:
         }
         '''
         self.prod_video_source  = camera_info["video-info"]
+        self.prod_video_sources = camera_info.get("video-sources") or [self.prod_video_source]
         self.prod_adjust_info   = camera_info["adjust"]
+        self.prod_generations   = dict(pkt.get("Generations") or {})
 
         fd_log.info(f"[AIc] ⏯️ video_source:  {self.prod_video_source}")
         fd_log.info(f"[AIc] ⏯️ adjust_info: {self.prod_adjust_info}")
@@ -321,11 +547,13 @@ class AIc:
         # ───────────────────────────────────
         # 📌 create / calibration files to output folder
         # ───────────────────────────────────
-        fd_calibrate_files(
-            self.prod_video_source,
-            self.prod_info,
-            self.prod_adjust_info,            
-        )
+        for source in self.prod_video_sources:
+            fd_calibrate_files(
+                source,
+                self.prod_info,
+                self.prod_adjust_info,
+                generations=self.prod_generations,
+            )
 
         # ───────────────────────────────────
         # 📩 send response to AId
@@ -349,9 +577,107 @@ class AIc:
             self.aid_server.send_msg(json.dumps(resp))
         except Exception as e:
             fd_log.error(f"[AIc] Prepare response send failed: {e}")
+    # production assign (scheduler 재배정)
+    def production_assign(self, pkt: dict) -> None:
+        """
+        AId → AIc : 이 AIc 가 맡을 camera 전체 (원하는 상태)
+        - 목록에서 빠진 camera 는 stop, 새로 들어온 camera 는 (production 중이면) 이어서 시작
+        """
+        camera_info = pkt.get("CamInfo") or {}
+        sources = camera_info.get("video-sources") or []
+        wanted = {str(c["ip"]) for src in sources for c in src.get("cam_ips", [])}
+        removed = fd_calibrate_stop([ip for ip in fd_calibrate_stats() if ip not in wanted])
+
+        self.prod_video_sources = sources
+        self.prod_video_source  = camera_info.get("video-info") or (sources[0] if sources else None)
+        self.prod_adjust_info   = camera_info.get("adjust", self.prod_adjust_info)
+        self.prod_generations.update(pkt.get("Generations") or {})
+        if pkt.get("product_info"):
+            self.prod_info = pkt["product_info"]
+
+        if self.prod_info:
+            for source in sources:
+                fd_calibrate_files(source, self.prod_info, self.prod_adjust_info, resume=True,
+                                   generations=self.prod_generations)
+        fd_log.info(f"[AIc] 🔀 assign: cameras={sorted(wanted)} removed={removed}")
+
+        resp = {
+            "Section1": "AIc",
+            "Section2": "Operation",
+            "Section3": "Assign",
+            "SendState": "response",
+            "From": "AIc",
+            "To": "AId",
+            "Action": "set",
+            "Token": pkt.get("Token", ""),
+            "ResultCode": 1000,
+            "ErrorMsg": ""
+        }
+        try:
+            self.aid_server.send_msg(json.dumps(resp))
+        except Exception as e:
+            fd_log.error(f"[AIc] Assign response send failed: {e}")
+    # ─────────────────────────────────────────────────────────────────────────
+    # 🧩 Calibration worker (AIc → AId : [AIc], [Work], [...])
+    # ─────────────────────────────────────────────────────────────────────────
+    def _send_to_aid(self, node: str, packet: dict) -> bool:
+        if not self.aid_server or not self.aid_server.is_connected():
+            return False
+        self.aid_server.send_msg(json.dumps(packet))
+        return True
+    def _work_rpc(self, section3: str, payload: dict):
+        pkt = {
+            "Section1": "AIc",
+            "Section2": "Work",
+            "Section3": section3,
+            "SendState": "request",
+            "From": "AIc",
+            "To": "AId",
+            "Action": "set",
+            **payload,
+        }
+        res = self.aid_rpc.gather(["AId"], pkt, timeout=10.0)
+        return res.replies.get("AId")
+    def _work_calibration(self, unit: dict, job: dict, cancel) -> dict:
+        """
+        camera × marker unit 하나 - job 공통 설정은 job 이 바뀔 때 한 번
+        (fd_calibration_job_setup 은 RAM disk 를 비우고 job 공유 파일을 새로 잡는다
+         → 다른 slot 이 이전 job unit 을 처리하는 동안에는 기다린다)
+        """
+        from fd_aid import fd_calibration_job_setup
+        from fd_calibration.fd_file_calibration import run_calibration_unit
+        job_id = unit.get("Job")
+        with self._work_idle:
+            if self._work_job != job_id:
+                while any(n for j, n in self._work_inflight.items() if j != job_id):
+                    if cancel.is_set():
+                        return {}
+                    self._work_idle.wait(0.5)
+            if self._work_job != job_id:
+                if not fd_calibration_job_setup(job):
+                    raise ValueError(f"invalid calibration job {job_id}")
+                self._work_job = job_id
+            self._work_inflight[job_id] = self._work_inflight.get(job_id, 0) + 1
+        try:
+            if cancel.is_set():
+                return {}
+            # AId 의 calibration 요청 (job["Trace"] : Token / TraceParent) 아래 span
+            with fd_trace_span("calibration:unit", pkt=(job or {}).get("Trace") or {}, unit=unit.get("Unit")):
+                return run_calibration_unit(unit.get("Params") or {})
+        finally:
+            with self._work_idle:
+                n = self._work_inflight.get(job_id, 0) - 1
+                if n > 0:
+                    self._work_inflight[job_id] = n
+                else:
+                    self._work_inflight.pop(job_id, None)
+                self._work_idle.notify_all()
     # production stop
     def production_stop(self, pkt: dict) -> None:
         fd_log.info("⏹️ [AIc] Handle Production Stop from AId")
+        stopped = fd_calibrate_stop()
+        self.prod_info = None
+        fd_log.info(f"[AIc] ⏹️ stopped cameras: {stopped}")
         
         # ───────────────────────────────────
         # 📩 send response to AId
@@ -419,6 +745,11 @@ if __name__ == '__main__':
             aic.stop()
         except Exception:
             pass
+        # os._exit 는 atexit 을 건너뛴다 - log queue 를 먼저 비운다
+        try:
+            fd_log.close()
+        except Exception:
+            pass
         os._exit(0)
 
     try:
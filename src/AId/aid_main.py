@@ -10,7 +10,6 @@ import os
 import sys
 import json
 import struct
-import queue
 import time
 import threading
 import shutil
@@ -38,25 +37,67 @@ from fd_common.msg                  import FDMsg
 from fd_common.tcp_server           import TCPServer   # communication with MTd
 from fd_common.tcp_client           import TCPClient   # communication with AIc
 from fd_common.utils                import get_duration
+from fd_common.metrics              import fd_metric_gauge, fd_metrics_snapshot
+from fd_common.dispatcher           import MsgDispatcher
+from fd_common.scatter_gather       import ScatterGather
+from fd_common.attach               import Attachment
+from fd_common.work_queue           import WorkQueue
+from fd_common.tracing              import fd_trace_setup, fd_trace_context, fd_trace_spans, fd_trace_tokens
 
 from fd_utils.fd_config_manager     import setup, conf, get
-from fd_utils.fd_logging            import fd_log
+from fd_utils.fd_logging            import fd_log, PATH_LOG
 from fd_utils.fd_file_edit          import fd_clean_up
+from fd_utils.fd_file_edit          import fd_combine_calibrated_output
 
 from fd_aid                         import fd_create_analysis_file
 from fd_aid                         import fd_multi_channel_video
 from fd_aid                         import fd_multi_calibration_video
 
 from fd_utils.fd_calibration        import Calibration
+from fd_calibration.fd_file_calibration import create_video_each_camera
+from fd_calibration.fd_file_calibration import build_calibration_units
+from fd_calibration.fd_file_calibration import build_marker_camera_sets_by_camera
 from fd_manager.fd_create_clip      import play_and_create_multi_clips
 
 # ── imports (projectproduct) ────────────────────────────────────────────────────────
 from fd_product.fd_product_clip     import fd_convert_AIc_info, fd_create_payload_for_preparing_to_AIc
 from fd_product.fd_product_clip     import fd_create_payload_for_product_to_AIc
+from fd_product.fd_product_clip     import fd_create_payload_for_assigned_to_AIc
+
+from aid_scheduler                  import AIcScheduler
 
 # ─────────────────────────────────────────────────────────────────────────
 # 🎯AId Class (Artificial Intelligence Daemon)
 # ─────────────────────────────────────────────────────────────────────────
+_M_AIC_UP    = fd_metric_gauge("aid_aic_sessions", "connected AIc sessions")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# message lanes : {lane: (workers, queue max)}
+#  - control    : Version / Metrics / response - 항상 바로 처리 (self._lock 을 잡지 않는다)
+#  - production : AIc connect / Prepare / Production start·stop - 순서가 중요 → worker 1
+#  - job        : calibration / clip 생성 등 오래 걸리는 작업
+#  - transfer   : Preview 등 첨부(binary) 를 모아서 보내는 요청 - control 을 막지 않게
+#  production / job handler 는 지금처럼 self._lock 으로 서로 직렬
+# ─────────────────────────────────────────────────────────────────────────────
+AID_LANES = {"control": (2, 256), "production": (1, 64), "job": (1, 16), "transfer": (1, 16)}
+
+def aid_msg_lane(msg) -> str:
+    if not isinstance(msg, dict) or str(msg.get("SendState", "")).lower() != "request":
+        return "control"
+    match msg.get("Section1"), msg.get("Section2"), msg.get("Section3"):
+        case 'Daemon', 'Information', 'Preview':
+            return "transfer"
+        case 'Daemon', 'Information', _:
+            return "control"
+        case ('AIc', 'connect', _) | ('Daemon', 'Operation', _):
+            return "production"
+        case 'AI', 'Process', 'UserStart' | 'UserEnd':
+            # start / end 는 같은 lane (worker 1) 에서 받은 순서대로 - end 가 start 의 시각을 쓴다
+            return "production"
+        case 'AI', _, _:
+            return "job"
+    return "control"
+
 class AId:
     name = 'AId'
 
@@ -67,12 +108,13 @@ class AId:
     def __init__(self):
         self.name = "AId"
         self.property_data = None
-        self.th = None
         self.app_server = None     # 외부로 응답 송신시 사용(없을 수 있음)
         self.end = False
         self.host = None        
-        self.msg_queue = queue.Queue()
+        self.dispatcher = MsgDispatcher("AId", self.classify_msg, aid_msg_lane, AID_LANES,
+                                        log=fd_log.warning)
         self._lock = threading.Lock()
+        self._result_lock = threading.Lock()    # conf._result_code (lane 여러 개가 같이 쓴다)
         self._stopped = False
 
         self.conf = conf  # conf 객체를 직접 할당
@@ -83,16 +125,28 @@ class AId:
         #  - aic_name_ip_map : MTd에서 받은 이름 → IP 매핑
         #  - aic_ip_name_map : IP → 이름 매핑
         #  - aic_sessions    : IP 별 TCPClient 세션
-        #  - aic_version_cache: IP 별 버전 응답 캐시
+        #  - aic_gather     : AIc fan-out (동시 전송 + Token 별 응답 대기)
         self.aic_name_ip_map: dict[str, str] = {}
         self.aic_ip_name_map: dict[str, str] = {}
         self.aic_sessions = {}        # { ip: TCPClient }
-        self.aic_version_cache = {}   # { ip: {"name":..,"ip":..,"version":..,"date":..} }
+        self.aic_gather = ScatterGather(self._send_to_aic, name="AId-AIc", log=fd_log.warning)
+        self.aic_last_ack = {}        # { "Operation/Prepare": GatherResult.to_dict() }
+        _M_AIC_UP.set_function(lambda: len(self.aic_sessions))
+
+        # camera → AIc 배정 (Load 보고 기반, 끊기거나 밀리면 재배정)
+        self.scheduler = AIcScheduler(log=fd_log.info)
+        self.load_th = None
+
+        # calibration 작업 queue (AIc 가 남는 만큼 가져간다 - lease / heartbeat)
+        self.work_queue = WorkQueue(log=fd_log.info)
+        self.aic_workers = {}         # { worker name: AIc ip } - 끊기면 lease 를 바로 풀어준다
 
         # production variables
         self.camera_fps = 0
         self.prod_camera_env = {}
         self.prod_adjust_info = {}
+        self.prod_camera_info = None    # fd_convert_AIc_info() - Prepare 이후
+        self.prod_product_info = None   # AIc 로 보낸 product_info - Production start ~ stop
     # System initialization (e.g., log folder). Returns False on failure.    
     def init_sys(self) -> bool:
         current_path = os.path.dirname(os.path.abspath(__file__))
@@ -144,8 +198,15 @@ class AId:
     # AId Service Start
     def run(self):
         fd_log.info("🟢 [AId] run() begin..")
-        self.th = threading.Thread(target=self.status_task, daemon=True)
-        self.th.start()
+        fd_trace_setup("AId", getattr(conf, "_trace_ring", 4096),
+                       sink_dir=os.path.join(PATH_LOG, "trace") if getattr(conf, "_trace_jsonl", True) else None,
+                       enabled=getattr(conf, "_trace_enabled", True))
+        self.dispatcher.start()
+        self.work_queue.lease_sec = float(getattr(conf, "_work_lease_sec", 30.0) or 30.0)
+        self.work_queue.max_attempts = max(1, int(getattr(conf, "_work_max_attempts", 3) or 3))
+        self.work_queue.start()
+        self.load_th = threading.Thread(target=self._aic_load_loop, daemon=True, name="AId-load")
+        self.load_th.start()
     # stop the AId service
     def stop(self):
         fd_log.info("[AId] stop() begin..")
@@ -184,17 +245,11 @@ class AId:
             fd_log.info("[AId] app_server is None; nothing to close.")
 
         # 워커 합류
-        th = getattr(self, "th", None)
-        if th is not None:
-            try:
-                if th.is_alive():
-                    th.join(timeout=3.0)
-            except Exception as e:
-                fd_log.warning(f"[AId] thread join failed: {e}")
-            finally:
-                self.th = None
-        else:
-            fd_log.info("[AId] worker thread is None; nothing to join.")
+        self.work_queue.stop()
+        try:
+            self.dispatcher.stop(timeout=3.0)
+        except Exception as e:
+            fd_log.warning(f"[AId] dispatcher stop failed: {e}")
 
         fd_log.info("[AId] stop() end..")
 
@@ -242,21 +297,9 @@ class AId:
             fd_log.info(f"[AId] << Incoming request (from MTd/4DOMS): {data}")
         except:
             pass
-        with self._lock:
-            self.msg_queue.put(data)
-    # Message processing worker
-    def status_task(self):
-        fd_log.info("🟢 [AId] Message Receive Start")
-        while not self.end:
-            msg = None
-            with self._lock:
-                if not self.msg_queue.empty():
-                    msg = self.msg_queue.get(block=False)
-            if msg is not None:
-                self.classify_msg(msg)
-            time.sleep(0.01)
-        fd_log.info("🔴 [AId] Message Receive End")
-        # 정확히 size 만큼 수신하는 함수
+        if not self.dispatcher.submit(data):
+            fd_log.error("[AId] message lane is full - request dropped")
+
     # read exact size from socket
     def _recv_exact(self, sock, size):
         buf = b''
@@ -322,29 +365,31 @@ class AId:
             )
             return
         
-        fd_log.info(f"[AId] << From AIc({src_ip}) request: {text}")
-
-        sec1 = data.get("Section1")
-        sec2 = data.get("Section2")
-        sec3 = data.get("Section3")
+        # Work (lease / heartbeat) 는 주기적이라 debug 로
+        log = fd_log.debug if isinstance(data, dict) and data.get("Section2") == "Work" else fd_log.info
+        log(f"[AId] << From AIc({src_ip}) request: {text}")
+        self._on_aic_data(data, src_ip)
+    # AIc message callback (flag 1 : JSON + 첨부)
+    def on_aic_attach(self, data: dict, attachments: list, src_ip: str) -> None:
+        """'Attachments' descriptor 를 Attachment 객체 list 로 바꿔서 같은 경로로"""
+        fd_log.info(f"[AId] << From AIc({src_ip}) {data.get('Section2')}/{data.get('Section3')}: "
+                    f"{len(attachments)} attachment(s), {sum(a.size for a in attachments)} bytes")
+        data["Attachments"] = attachments
+        self._on_aic_data(data, src_ip)
+    def _on_aic_data(self, data: dict, src_ip: str) -> None:
         state = str(data.get("SendState", "")).lower()
 
-        if (sec1, sec2, sec3) == ("Daemon", "Information", "Version") and state == "response":
-            ver_map = data.get("Version", {})
-            aic_info = ver_map.get("AIc", {})
-
-            name = self.aic_ip_name_map.get(src_ip, src_ip)
-            key_ip = src_ip
-            self.aic_version_cache[key_ip] = {
-                "name": name,
-                "ip": src_ip,
-                "version": aic_info.get("version", ""),
-                "date": aic_info.get("date", ""),
-            }
-            fd_log.info(f"[AId] <- AIc Version from {src_ip}: {self.aic_version_cache[src_ip]}")
-        else:
-            # 현재는 Version 응답만 수집. 필요하면 여기서 추가 분기 가능.
-            fd_log.debug(f"[AId] on_aic_msg: ignore msg from {src_ip} : {data}")
+        # Version / Metrics / Prepare / Production 응답 → 기다리는 gather 로
+        if state == "response" and self.aic_gather.resolve(src_ip, data):
+            return
+        # AIc worker → [AIc], [Work], [Lease / Heartbeat / Complete / Fail]
+        if state == "request" and data.get("Section2") == "Work":
+            self.aic_workers[str(data.get("Worker", ""))] = src_ip
+            resp = self.work_queue.handle(data)
+            if resp is not None:
+                self._send_to_aic(src_ip, resp)
+            return
+        fd_log.debug(f"[AId] on_aic_msg: ignore msg from {src_ip} : {data}")
     # Get list of currently connected AIc IPs
     def _get_target_aic_list(self):
         """현재 연결된 AIc IP 목록 반환"""
@@ -356,8 +401,8 @@ class AId:
             fd_log.error(f"[AId] _get_target_aic_list failed: {e}")
             return []
     # Send message to a specific AIc
-    def _send_to_aic(self, ip: str, packet: dict) -> bool:
-        """AIc 하나에게 안전하게 메시지 전송"""
+    def _send_to_aic(self, ip: str, packet: dict, attachments=None) -> bool:
+        """AIc 하나에게 안전하게 메시지 전송 (attachments : [Attachment] → flag 1)"""
         try:
             sess = self.aic_sessions.get(ip)
             if not sess:
@@ -365,9 +410,9 @@ class AId:
                 return False
 
             text = json.dumps(packet)
-            fd_log.info(f"[AId] >> To AIc({ip}) {text}")
-            sess.send_msg(text)
-            return True
+            log = fd_log.debug if packet.get("Section2") == "Work" else fd_log.info
+            log(f"[AId] >> To AIc({ip}) {text}")
+            return sess.send_msg(text, attachments=attachments)
 
         except Exception as e:
             fd_log.error(f"[AId] send_to_aic({ip}) failed: {e}")
@@ -381,6 +426,7 @@ class AId:
 
         try:
             sess = TCPClient(name=f"AId→AIc:{ip}")
+            sess.set_attach_callback(lambda data, atts, _ip=ip: self.on_aic_attach(data, atts, _ip))
             ok = sess.connect(
                 ip,
                 conf._aic_daemon_port,
@@ -394,20 +440,102 @@ class AId:
         except Exception as e:
             fd_log.error(f"[AId] failed to connect {ip}: {e}")
             return None
+    # AIc weights (config "_aic_weights" : "이름 또는 IP=weight, ...")
+    def _aic_weights(self) -> dict:
+        weights = {}
+        for item in str(getattr(conf, "_aic_weights", "") or "").split(","):
+            if "=" not in item:
+                continue
+            key, val = item.rsplit("=", 1)
+            try:
+                weights[str(self.aic_name_ip_map.get(key.strip(), key.strip()))] = float(val)
+            except ValueError:
+                fd_log.warning(f"[AId] invalid _aic_weights entry: {item!r}")
+        return weights
+    # Collect AIc Load reports → scheduler
+    def _poll_aic_load(self, timeout: float) -> None:
+        ips = list(self.aic_sessions.keys())
+        self.scheduler.set_weights(self._aic_weights())
+        self.scheduler.set_nodes(ips)
+        if not ips:
+            return
+        res = self.aic_gather.gather(ips, {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Load",
+            "SendState": "request",
+            "From": "AId",
+            "To": "AIc",
+            "Action": "get",
+        }, timeout=timeout)
+        for ip in ips:
+            if ip in res.replies:
+                self.scheduler.report(ip, res.replies[ip].get("Load") or {})
+            else:
+                self.scheduler.miss(ip)
+    # Load loop : 주기적으로 보고를 받고, production 중이면 재배정
+    def _aic_load_loop(self):
+        while not self.end:
+            poll = max(0.5, float(getattr(conf, "_aic_load_poll_sec", 2.0) or 2.0))
+            time.sleep(poll)
+            # 끊어진 AIc 의 calibration unit 은 lease 를 기다리지 않고 다시 queue 로
+            for worker, ip in list(self.aic_workers.items()):
+                if ip not in self.aic_sessions:
+                    self.aic_workers.pop(worker, None)
+                    self.work_queue.release_worker(worker)
+            try:
+                self._poll_aic_load(timeout=poll)
+                if self.prod_camera_info is None or self.prod_product_info is None:
+                    continue   # production 중일 때만 재배정
+                changes = self.scheduler.rebalance()
+                if changes:
+                    self._send_aic_assign(changes)
+            except Exception as e:
+                fd_log.error(f"[AId] AIc load loop error: {e!r}")
+    # Send new camera assignment to AIc nodes (원하는 상태 전체)
+    def _send_aic_assign(self, changes: dict) -> None:
+        fd_log.info(f"[AId] AIc reassignment: {changes}")
+
+        def build(ip):
+            pkt = {
+                "Section1": "AIc",
+                "Section2": "Operation",
+                "Section3": "Assign",
+                "SendState": "request",
+                "From": "AId",
+                "To": "AIc",
+                "Action": "set",
+                "CamInfo": fd_create_payload_for_assigned_to_AIc(ip, self.prod_camera_info,
+                                                                  self.prod_adjust_info, changes[ip]),
+                "Generations": self.scheduler.generations(changes[ip]),   # ch 폴더 handoff fence
+            }
+            if self.prod_product_info:
+                pkt["product_info"] = self.prod_product_info
+            return pkt
+        self._broadcast_with_ack(build, list(changes))
     # Broadcast message to multiple AIcs
     def _broadcast_to_aic(self, packet: dict, only_ips=None):
         if only_ips is None:
             only_ips = list(self.aic_sessions.keys())
+        return self.aic_gather.scatter([ip for ip in only_ips if ip in self.aic_sessions], packet)
+    # Broadcast and collect AIc acks in background (OMS 응답은 이미 보냈다)
+    def _broadcast_with_ack(self, build, only_ips=None, timeout: float = 10.0):
+        ips = list(self.aic_sessions.keys()) if only_ips is None else [str(ip) for ip in only_ips]
+        fut = self.aic_gather.gather_async(ips, build, timeout=timeout)
 
-        for ip in only_ips:
+        def _done(f):
             try:
-                text = json.dumps(packet)
-                sess = self.aic_sessions.get(ip)
-                if not sess:
-                    continue
-                sess.send_msg(text)
+                res = f.result()
             except Exception as e:
-                fd_log.error(f"[AId] send to {ip} failed: {e}")
+                fd_log.error(f"[AId] AIc ack gather failed: {e!r}")
+                return
+            self.aic_last_ack[res.kind] = res.to_dict()
+            if res.ok:
+                fd_log.info(f"[AId] AIc {res.kind} acked by {len(res.replies)} in {res.elapsed * 1000:.0f}ms")
+            else:
+                fd_log.warning(f"[AId] AIc {res.kind} missing={res.missing} errors={res.errors}")
+        fut.add_done_callback(_done)
+        return fut
     
     # ─────────────────────────────────────────────────────────────────────────
     # 📦 Message Routing
@@ -435,7 +563,8 @@ class AId:
         
         if _4dmsg.is_valid():
             result_code, err_msg = 1000, ''
-            conf._result_code = 0
+            with self._result_lock:
+                conf._result_code = 0
             if (state := _4dmsg.get('SendState').lower()) == FDMsg.REQUEST:
                 sec1, sec2, sec3 = _4dmsg.get('Section1'), _4dmsg.get('Section2'), _4dmsg.get('Section3')
                 action = _4dmsg.get('Action', '').lower()            
@@ -474,6 +603,7 @@ class AId:
                                 sess = TCPClient()
                                 sess.connect(ip, conf._aic_daemon_port)
                                 sess.set_callback(lambda text, _ip=ip: self.on_aic_msg(text, _ip))
+                                sess.set_attach_callback(lambda data, atts, _ip=ip: self.on_aic_attach(data, atts, _ip))
                                 sess.start_recv()   # ★★★ 반드시 필요 ★★★
                                 self.aic_sessions[ip] = sess
                                 fd_log.info(f"[AId] Connected persistent session → AIc {name} ({ip})")
@@ -494,9 +624,29 @@ class AId:
                     # 📦 V5 : [Daemon], [Information], [Version]
                     # ──────────────────────────────────────────────────────                    
                     case 'Daemon', 'Information', 'Version':
-                    # Version Request
-                        with self._lock:
-                            self.mtd_version_request(_4dmsg.data)
+                    # Version Request (control lane - self._lock 없이)
+                        self.mtd_version_request(_4dmsg.data)
+                        return
+                    # ──────────────────────────────────────────────────────
+                    # 📦 V5 : [Daemon], [Information], [Metrics]
+                    # ──────────────────────────────────────────────────────
+                    case 'Daemon', 'Information', 'Metrics':
+                    # Metrics snapshot (AId + AIc)
+                        self.mtd_metrics_request(_4dmsg.data)
+                        return
+                    # ──────────────────────────────────────────────────────
+                    # 📦 V5 : [Daemon], [Information], [Trace]
+                    # ──────────────────────────────────────────────────────
+                    case 'Daemon', 'Information', 'Trace':
+                    # TraceToken 의 span (AId + AIc)
+                        self.mtd_trace_request(_4dmsg.data)
+                        return
+                    # ──────────────────────────────────────────────────────
+                    # 📦 V5 : [Daemon], [Information], [Preview]
+                    # ──────────────────────────────────────────────────────
+                    case 'Daemon', 'Information', 'Preview':
+                    # camera preview (AIc JPEG 첨부 → MTd 에 flag 1 로)
+                        self.mtd_preview_request(_4dmsg.data)
                         return
                     # ──────────────────────────────────────────────────────
                     # 📦 V5 : [Daemon], [Operation], [Prepare]
@@ -569,22 +719,25 @@ class AId:
                     self.app_server.send_msg(_4dmsg.get_json()[1])
 
             elif state == FDMsg.RESPONSE:
-                # AIc → AId : Version 응답 수신 처리
-                sender_ip = msg.get("SenderIP")
+                # AIc → AId : 응답이 MTd 경로로 들어온 경우도 기다리는 gather 로
+                sender_ip = msg.get("SenderIP") if isinstance(msg, dict) else None
                 if sender_ip:
-                    self._aic_version_cache[sender_ip] = msg
+                    self.aic_gather.resolve(sender_ip, msg)
                 pass  # PD 응답 수신 시 기본 처리 없음
 
         else:
             # 유효하지 않은 메시지 → 에러 응답 시도
             fd_log.error(f'[AId] message parsing error..\nMessage:\n{msg}')
-            conf._result_code += 100
+            with self._result_lock:
+                conf._result_code += 100
+                code = conf._result_code
+                if code > 100:
+                    conf._result_code = 0
             _4dmsg.update(Section1="AI", Section2="Process", Section3="Multi",
-                          From="4DPD", To="AId", ResultCode=conf._result_code,
-                          ErrorMsg=err_msg)
+                          From="4DPD", To="AId", ResultCode=code,
+                          ErrorMsg='')
             _4dmsg.toggle_status()
-            if conf._result_code > 100:
-                conf._result_code = 0
+            if code > 100:
                 if not self.app_server:
                     fd_log.warning("[AId] classify_msg(error path): app_server is None; skipping send.")
                 else:
@@ -643,63 +796,211 @@ class AId:
     # Request AIc versions
     def request_aic_versions(self, expect_ips, dmpdip, token, wait_sec=5):
         expect_ips = [str(ip) for ip in expect_ips]
-
-        # 초기화
-        for ip in expect_ips:
-            self.aic_version_cache.pop(ip, None)
-
         # 세션 확보
         for ip in expect_ips:
             self._ensure_aic_session(ip)
 
-        # 요청 패킷
-        def build_packet():
-            return {
-                "Section1": "AIc",
-                "Section2": "Information",
-                "Section3": "Version",
-                "SendState": "request",
-                "From": "AId",
-                "To": "AIc",
-                "Token": token,
-                "Action": "get",
-                "DMPDIP": dmpdip,
-            }
-
-        # 요청 전송
-        for ip in expect_ips:
-            sess = self.aic_sessions.get(ip)
-            if not sess:
-                continue
-            sess.send_msg(json.dumps(build_packet()))
-
-        # 응답 수집
-        pending = {ip: None for ip in expect_ips}
-        deadline = time.time() + wait_sec
-
-        while time.time() < deadline:
-            for ip in expect_ips:
-                if ip in self.aic_version_cache and pending[ip] is None:
-                    pending[ip] = self.aic_version_cache[ip]
-            if all(pending[ip] is not None for ip in expect_ips):
-                break
-            time.sleep(0.05)
+        res = self.aic_gather.gather(expect_ips, {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Version",
+            "SendState": "request",
+            "From": "AId",
+            "To": "AIc",
+            "Token": token,
+            "Action": "get",
+            "DMPDIP": dmpdip,
+        }, timeout=wait_sec)
 
         # 결과 구성
         results = []
         for ip in expect_ips:
-            info = pending[ip]
-            if not info:
-                fd_log.warning(f"[AId] No Version response from AIc({ip})")
+            data = res.replies.get(ip)
+            if not data:
+                fd_log.warning(f"[AId] No Version response from AIc({ip}) {res.errors.get(ip, 'timeout')}")
                 continue
+            aic_info = (data.get("Version") or {}).get("AIc", {})
             results.append({
                 "name": self.aic_ip_name_map.get(ip, ip),
                 "ip": ip,
-                "version": info.get("version"),
-                "date": info.get("date"),
+                "version": aic_info.get("version", ""),
+                "date": aic_info.get("date", ""),
             })
-
         return results
+    # Get Metrics Request
+    def mtd_metrics_request(self, pkt: dict) -> None:
+        """
+        4DOMS(MTd) → AId : metrics snapshot (fd_common.metrics)
+        - AId 자신의 snapshot + 연결된 AIc 들의 snapshot (Version 과 같은 방식으로 수집)
+        """
+        token = pkt.get("Token")
+        expect = pkt.get("Expect", {}) or {}
+        expect_ips = [str(ip) for ip in (expect.get("AIc", []) or list(self.aic_sessions.keys()))]
+        wait_sec = float(expect.get("wait_sec", 3) or 3)
+
+        res = self.aic_gather.gather(expect_ips, {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Metrics",
+            "SendState": "request",
+            "From": "AId",
+            "To": "AIc",
+            "Token": token,
+            "Action": "get",
+        }, timeout=wait_sec)
+
+        aic = {}
+        for ip in expect_ips:
+            if ip in res.replies:
+                aic[self.aic_ip_name_map.get(ip, ip)] = {"ip": ip, "rtt_ms": res.rtt_ms.get(ip),
+                                                         **(res.replies[ip].get("Metrics") or {})}
+            else:
+                fd_log.warning(f"[AId] No Metrics response from AIc({ip}) {res.errors.get(ip, 'timeout')}")
+        resp = {
+            "Section1": "Daemon",
+            "Section2": "Information",
+            "Section3": "Metrics",
+            "SendState": "response",
+            "From": "AId",
+            "To": pkt.get("From", "4DOMS"),
+            "Token": token,
+            "Action": "set",
+            "ResultCode": 1000,
+            "ErrorMsg": "",
+            "Metrics": {
+                "AId": fd_metrics_snapshot(),
+                "AIdLanes": self.dispatcher.status(),
+                "AIcAcks": self.aic_last_ack,
+                "AIcSchedule": self.scheduler.status(),
+                "Work": self.work_queue.status(),
+                "AIc": aic,
+            },
+        }
+        if self.app_server:
+            self.app_server.send_msg(json.dumps(resp))
+        else:
+            fd_log.error("[AId] app_server is None, cannot send Metrics response")
+    # Get Trace Request
+    def mtd_trace_request(self, pkt: dict) -> None:
+        """
+        4DOMS(MTd) → AId : "TraceToken" 으로 기록된 span (fd_common.tracing)
+        - AId 자신의 ring + 연결된 AIc 들의 ring (Metrics 와 같은 방식으로 수집)
+        - TraceToken 이 비어 있으면 최근 token 목록만
+        """
+        token = pkt.get("Token")
+        trace_token = str(pkt.get("TraceToken", "") or "")
+        limit = int(pkt.get("Limit", 50) or 50)
+        expect = pkt.get("Expect", {}) or {}
+        expect_ips = [str(ip) for ip in (expect.get("AIc", []) or list(self.aic_sessions.keys()))]
+        wait_sec = float(expect.get("wait_sec", 3) or 3)
+
+        res = self.aic_gather.gather(expect_ips, {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Trace",
+            "SendState": "request",
+            "From": "AId",
+            "To": "AIc",
+            "Token": token,
+            "Action": "get",
+            "TraceToken": trace_token,
+            "Limit": limit,
+        }, timeout=wait_sec)
+
+        spans = fd_trace_spans(trace_token) if trace_token else []
+        tokens = {"AId": fd_trace_tokens(limit)} if not trace_token else {}
+        for ip in expect_ips:
+            reply = res.replies.get(ip)
+            if reply is None:
+                fd_log.warning(f"[AId] No Trace response from AIc({ip}) {res.errors.get(ip, 'timeout')}")
+                continue
+            if trace_token:
+                spans.extend(reply.get("Spans") or [])
+            else:
+                tokens[self.aic_ip_name_map.get(ip, ip)] = reply.get("Tokens") or []
+        resp = {
+            "Section1": "Daemon",
+            "Section2": "Information",
+            "Section3": "Trace",
+            "SendState": "response",
+            "From": "AId",
+            "To": pkt.get("From", "4DOMS"),
+            "Token": token,
+            "Action": "set",
+            "ResultCode": 1000,
+            "ErrorMsg": "",
+            "TraceToken": trace_token,
+            "Missing": [self.aic_ip_name_map.get(ip, ip) for ip in expect_ips if ip not in res.replies],
+        }
+        if trace_token:
+            resp["Spans"] = spans
+        else:
+            resp["Tokens"] = tokens
+        if self.app_server:
+            self.app_server.send_msg(json.dumps(resp, default=str))
+        else:
+            fd_log.error("[AId] app_server is None, cannot send Trace response")
+    # Get Preview Request
+    def mtd_preview_request(self, pkt: dict) -> None:
+        """
+        4DOMS(MTd) → AId : camera preview
+        - "Cameras": [{"ip": cam ip, "path": 영상 file, "AIc": AIc ip 또는 이름(없으면 연결된 AIc 전부)}]
+        - AIc 별로 나눠서 요청 → JPEG 첨부로 응답 → 모아서 MTd 에 flag 1 frame 하나로
+          (JSON 의 Attachments[i] = {"name": cam ip, "AIc": ..., "offset", "size"} - base64 없음)
+        """
+        token = pkt.get("Token")
+        wait_sec = float((pkt.get("Expect", {}) or {}).get("wait_sec", 5) or 5)
+        by_aic = {}
+        for cam in pkt.get("Cameras") or []:
+            aic = cam.get("AIc")
+            ips = [str(self.aic_name_ip_map.get(aic, aic))] if aic else list(self.aic_sessions.keys())
+            for ip in ips:
+                by_aic.setdefault(ip, []).append({k: v for k, v in cam.items() if k != "AIc"})
+
+        res = self.aic_gather.gather(list(by_aic), lambda ip: {
+            "Section1": "AIc",
+            "Section2": "Information",
+            "Section3": "Preview",
+            "SendState": "request",
+            "From": "AId",
+            "To": "AIc",
+            "Token": token,
+            "Action": "get",
+            "Cameras": by_aic[ip],
+            "Frame": pkt.get("Frame", 0),
+            "Width": pkt.get("Width", 640),
+        }, timeout=wait_sec)
+
+        attachments, errors = [], {}
+        for ip in by_aic:
+            reply = res.replies.get(ip)
+            if reply is None:
+                errors[ip] = res.errors.get(ip, "timeout")
+                continue
+            for a in reply.get("Attachments") or []:
+                if isinstance(a, Attachment):
+                    a.meta["AIc"] = self.aic_ip_name_map.get(ip, ip)
+                    attachments.append(a)
+            for cam, err in (reply.get("PreviewErrors") or {}).items():
+                errors[f"{ip}/{cam}"] = err
+        resp = {
+            "Section1": "Daemon",
+            "Section2": "Information",
+            "Section3": "Preview",
+            "SendState": "response",
+            "From": "AId",
+            "To": pkt.get("From", "4DOMS"),
+            "Token": token,
+            "Action": "set",
+            "PreviewErrors": errors,
+            "ResultCode": 1000 if attachments or not errors else 1100,
+            "ErrorMsg": "" if not errors else f"{len(errors)} preview(s) failed",
+        }
+        if self.app_server:
+            # MTd 는 chunk ack 를 보내지 않는다 → frame 하나 (legacy type-1 규격)
+            self.app_server.send_msg(resp, attachments=attachments, chunked=False)
+        else:
+            fd_log.error("[AId] app_server is None, cannot send Preview response")
     # Production Prepare
     def production_preparing(self, pkt: dict) -> None:
         fd_log.info("🚀 AI:Daemon:Operation:Prepare")        
@@ -752,39 +1053,28 @@ class AId:
                 "camera-resolution": camera_resolution,
                 "record-folder": folder
             })
-            for ip in target_ips:
-                try:                    
-                    # 🔥 IP별 payload 생성
-                    per_ip_payload = fd_create_payload_for_preparing_to_AIc(
-                        ip, camera_info, adjust_info
-                    )
-                    # 기본 공통 헤더 추가
-                    pkt_to_aic = {
-                        "Section1": "AIc",
-                        "Section2": "Operation",
-                        "Section3": "Prepare",
-                        "SendState": "request",
-                        "From": "AId",
-                        "To": "AIc",
-                        "Action": "set",
-                        "Token": pkt.get("Token", ""),
-                        "DMPDIP": pkt.get("DMPDIP"),
-                        # IP별로 변경된 payload 삽입
-                        "CamInfo": per_ip_payload
-                    }
-
-                    # 🔥 IP별 세션 가져오기
-                    sess = self.aic_sessions.get(ip)
-                    if not sess:
-                        fd_log.warning(f"[AId] No active session for AIC {ip}")
-                        continue
-                    # 전송
-                    text = json.dumps(pkt_to_aic)
-                    sess.send_msg(text)
-                    fd_log.info(f"[AId] Sent Prepare to AIC {ip}")
-                except Exception as e:
-                    fd_log.error(f"[AId] Send Prepare to {ip} failed: {e}")
-
+            # 🔀 camera → AIc 배정 (최신 Load 기준 - weight × 측정 속도, encoder slot)
+            self._poll_aic_load(timeout=1.0)
+            plan = self.scheduler.assign(camera_list)
+            self.prod_camera_info = camera_info
+            fd_log.info(f"[AId] camera assignment: {plan}")
+            # 🔥 IP별 payload 생성 → 동시 전송, ack 는 background 로 집계
+            def build(ip):
+                return {
+                    "Section1": "AIc",
+                    "Section2": "Operation",
+                    "Section3": "Prepare",
+                    "SendState": "request",
+                    "From": "AId",
+                    "To": "AIc",
+                    "Action": "set",
+                    "Token": pkt.get("Token", ""),
+                    "DMPDIP": pkt.get("DMPDIP"),
+                    # IP별로 변경된 payload 삽입
+                    "CamInfo": fd_create_payload_for_assigned_to_AIc(ip, camera_info, adjust_info, plan.get(ip, [])),
+                    "Generations": self.scheduler.generations(plan.get(ip, [])),
+                }
+            self._broadcast_with_ack(build, target_ips)
         except Exception as e:
             fd_log.error(f"[AId] Prepare broadcast error: {e}")
     # Production Start
@@ -822,6 +1112,7 @@ class AId:
         try:
             # get payload for AIc
             aic_payload = fd_create_payload_for_product_to_AIc(product_info, self.camera_fps)
+            self.prod_product_info = aic_payload
 
             # create output folder
             output_folder = product_info["product-save-path"]
@@ -844,8 +1135,7 @@ class AId:
                 # Prepare Data (MTd → AId 그대로)
                 "product_info": aic_payload
             }
-            # Version broadcast 방식과 동일
-            self._broadcast_to_aic(pkt_to_aic, target_ips)
+            self._broadcast_with_ack(pkt_to_aic, target_ips)
         except Exception as e:
             fd_log.error(f"[AId] AIc Prepare broadcast failed: {e}")
     # Production Stop
@@ -877,6 +1167,7 @@ class AId:
         # --------------------------------------------------------------
         #  🔥 Production Stop Broadcast
         # --------------------------------------------------------------
+        self.prod_product_info = None
         try:
             target_ips = self._get_target_aic_list()
             fd_log.info(f"[AId] Product Stop to AIc: {target_ips}")
@@ -892,8 +1183,7 @@ class AId:
                 "Token": pkt.get("Token", ""),
                 "DMPDIP": pkt.get("DMPDIP"),        
             }
-            # Version broadcast 방식과 동일
-            self._broadcast_to_aic(pkt_to_aic, target_ips)
+            self._broadcast_with_ack(pkt_to_aic, target_ips)
         except Exception as e:
             fd_log.error(f"[AId] AIc Product Stop failed: {e}")
 
@@ -907,9 +1197,17 @@ class AId:
         result = False
         try:
             fd_log.info("⏸️ [AId] Calibration Multi channel clips begin..")
+            runner = None
+            if getattr(conf, "_calib_distributed", False) and self.aic_sessions:
+                job = {"Cameras": Cameras, "Markers": Markers, "AdjustData": AdjustData,
+                       "prefix": prefix, "output_path": output_path, "logo_path": logo_path,
+                       "resolution": resolution, "codec": codec, "fps": fps, "bitrate": bitrate,
+                       "gop": gop, "output_mode": output_mode,
+                       "Trace": fd_trace_context()}     # AIc unit span 의 Token / parent
+                runner = lambda cams, adjust, markers: self._calibrate_on_aic(job, cams, adjust, markers)
             result = fd_multi_calibration_video(
                 Cameras, Markers, AdjustData, prefix, output_path, logo_path,
-                resolution, codec, fps, bitrate, gop, output_mode
+                resolution, codec, fps, bitrate, gop, output_mode, runner=runner
             )
             if result is True:
                 fd_log.info("✅ [AId] create_ai_calibration_multi End..")
@@ -918,6 +1216,52 @@ class AId:
             return result
         finally:
             fd_log.info("⏯️ [AId] Finish Calibration Multi channel clips")
+    # Calibration on AIc nodes (WorkQueue) - create_video_each_camera() 대신
+    def _calibrate_on_aic(self, job: dict, Cameras, AdjustData, Markers) -> bool:
+        """
+        camera × marker unit 을 queue 에 올리고 AIc worker 가 가져가게 한다.
+        - 아무 AIc 도 lease 를 안 가져가면 (worker 꺼짐) 이 PC 에서 처리
+        - combine (output_mode) 은 전부 끝난 뒤 AId 에서
+        """
+        units = build_calibration_units(Cameras, AdjustData, Markers)
+        job_id = self.work_queue.submit(units, spec=job, kind="calibration")
+        self.aic_gather.scatter(list(self.aic_sessions), {
+            "Section1": "AIc",
+            "Section2": "Work",
+            "Section3": "Notify",
+            "SendState": "request",
+            "From": "AId",
+            "To": "AIc",
+            "Action": "set",
+            "Job": job_id,
+        })
+        try:
+            grace = self.work_queue.lease_sec
+            if not self.work_queue.wait(job_id, grace) and self.work_queue.job_status(job_id)["leased_ever"] == 0:
+                fd_log.warning(f"[AId] no AIc worker took {job_id} in {grace:.0f}s - calibrate locally")
+                self.work_queue.cancel(job_id)
+                return create_video_each_camera(Cameras, AdjustData, Markers)
+
+            timeout = float(getattr(conf, "_work_job_timeout_sec", 3600) or 3600)
+            if not self.work_queue.wait(job_id, timeout):
+                fd_log.error(f"[AId] calibration job {job_id} timeout ({timeout:.0f}s)")
+                self.work_queue.cancel(job_id)
+                return False
+            st = self.work_queue.job_status(job_id)
+            fd_log.info(f"[AId] calibration job {job_id}: done={st['done']}/{st['units']}, "
+                        f"elapsed={st['elapsed']}s, workers={st['workers']}")
+            if st["failed"]:
+                fd_log.error(f"[AId] calibration units failed: {st['errors']}")
+                return False
+        finally:
+            self.work_queue.forget(job_id)
+
+        # combine (AIc 에서 만든 file 은 공유 output folder 에 있다)
+        if conf._output_individual == False:
+            video_cams = [c for c in Cameras if c.get("video", True)]
+            conf._folder_input = (video_cams or Cameras)[-1].get("input_path")
+            fd_combine_calibrated_output(build_marker_camera_sets_by_camera(Cameras, Markers))
+        return True
     
     
 if __name__ == '__main__':
@@ -965,6 +1309,11 @@ if __name__ == '__main__':
             aid.stop()
         except Exception:
             pass
+        # os._exit 는 atexit 을 건너뛴다 - log queue 를 먼저 비운다
+        try:
+            fd_log.close()
+        except Exception:
+            pass
         os._exit(0)
 
     try:
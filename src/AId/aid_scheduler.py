@@ -0,0 +1,307 @@
+# ─────────────────────────────────────────────────────────────────────────────#
+# aid_scheduler.py
+# - camera channel → AIc 배정 (load aware)
+#   . AIc 가 보내는 Load 보고 : encoder slot (total / used), CPU, backlog, camera 별 처리 속도
+#   . node capacity = weight (config) × 측정 속도 (camera 가 1초 영상을 몇 배속으로 처리하는지)
+#   . 배정 : camera 하나씩 (배정 수 + 1) / capacity 가 가장 작은 node 로
+#            encoder slot 을 넘지 않고, 같은 값이면 이전 node → PreSd 와 같은 node 순
+#   . PreSd locality : 녹화가 PreSd node 의 local drive 에만 있으면 ("C_Movie|C:\\") 그 node 만 후보
+#                      (다른 AIc 는 파일을 못 읽고 lag 0 으로 기다리기만 한다)
+#                      공유 경로 ("UNC|\\\\host\\share") 이면 어느 node 든
+#   . rebalance : 끊긴 node 의 camera 는 전부, 밀리는 node 는 camera 하나씩 옮긴다
+#                 (옮긴 camera 는 CAM_COOLDOWN_SEC 동안 다시 옮기지 않는다 - 왔다갔다 방지)
+#   . generation : camera 의 주인이 바뀔 때마다 올린다 (AIc 는 ch 폴더 lease 로 이전 주인을 막는다)
+#                  시작값은 epoch-ms → AId 가 다시 떠도 이전 production 보다 크다
+# - AId 전용 (aid_main 에서 사용), I/O 없음 → 보고를 넣고 결과(node 별 camera 목록)만 받는다
+# ─────────────────────────────────────────────────────────────────────────────#
+
+import threading
+import time
+
+from typing import Dict, List, Optional
+
+from fd_common.metrics import fd_metric_gauge, fd_metric_counter
+
+_M_ASSIGNED = fd_metric_gauge("aid_sched_cameras", "cameras assigned per AIc", ("aic",))
+_M_CAPACITY = fd_metric_gauge("aid_sched_capacity", "effective AIc capacity (weight x measured speed)", ("aic",))
+_M_MOVES    = fd_metric_counter("aid_sched_moves", "camera reassignments", ("reason",))
+
+LOAD_STALE_SEC   = 10.0    # 이만큼 보고가 없으면 끊긴 것으로
+LOAD_MAX_MISSES  = 3       # Load 요청에 연속으로 응답이 없으면 끊긴 것으로
+LAG_LIMIT_SEC    = 5.0     # camera 가 이만큼(초) 밀리면 그 node 는 뒤처진 것
+CPU_LIMIT        = 95.0    # 이 이상인 node 에는 camera 를 더 주지 않는다
+CAM_COOLDOWN_SEC = 30.0
+SPEED_MIN, SPEED_MAX = 0.25, 4.0
+
+class AIcNode:
+    __slots__ = ("ip", "weight", "slots_total", "slots_used", "cpu", "backlog_sec",
+                 "cams", "t_report", "misses", "connected")
+
+    def __init__(self, ip: str, weight: float = 1.0):
+        self.ip = ip
+        self.weight = max(0.0, float(weight))
+        self.slots_total = 0          # 0 → 보고 전 (제한 없음)
+        self.slots_used = 0
+        self.cpu = 0.0
+        self.backlog_sec = 0.0
+        self.cams: Dict[str, dict] = {}   # cam ip → {"speed": x, "lag": sec}
+        self.t_report = 0.0
+        self.misses = 0
+        self.connected = True
+
+    @property
+    def speed(self) -> float:
+        """camera 평균 처리 속도 (1.0 = 실시간). 측정 전이면 1.0"""
+        sp = [float(c.get("speed", 0)) for c in self.cams.values() if c.get("speed")]
+        if not sp:
+            return 1.0
+        return min(SPEED_MAX, max(SPEED_MIN, sum(sp) / len(sp)))
+
+    @property
+    def capacity(self) -> float:
+        return self.weight * self.speed
+
+    def alive(self, now: float) -> bool:
+        if not self.connected or self.misses >= LOAD_MAX_MISSES:
+            return False
+        return self.t_report == 0.0 or now - self.t_report < LOAD_STALE_SEC
+
+    def lagging(self) -> bool:
+        return any(float(c.get("lag", 0)) > LAG_LIMIT_SEC for c in self.cams.values())
+
+    def to_dict(self, assigned: int) -> dict:
+        return {"weight": self.weight, "capacity": round(self.capacity, 3), "speed": round(self.speed, 3),
+                "slots": [self.slots_used, self.slots_total], "cpu": self.cpu,
+                "backlog_sec": self.backlog_sec, "assigned": assigned, "connected": self.connected,
+                "misses": self.misses, "lagging": self.lagging()}
+
+def fd_presd_local_node(cam: dict) -> str:
+    """camera 녹화를 읽을 수 있는 node 가 PreSd 하나뿐이면 그 ip, 공유 경로(UNC)이거나 PreSd 가 없으면 "" """
+    pre_ip = str(cam.get("PreSd_id", "") or "")
+    root = str(cam.get("PreSd_path", "") or "").split("|")[-1]
+    if not pre_ip or root.startswith(("\\\\", "//")):
+        return ""
+    return pre_ip
+
+class AIcScheduler:
+    def __init__(self, weights: Optional[Dict[str, float]] = None, log=None):
+        """weights : {AIc ip: weight} (없으면 1.0)"""
+        self._lock = threading.Lock()
+        self._log = log or (lambda m: None)
+        self.weights = {str(k): float(v) for k, v in (weights or {}).items()}
+        self.nodes: Dict[str, AIcNode] = {}
+        self.assignment: Dict[str, str] = {}     # cam ip → AIc ip
+        self.cameras: Dict[str, dict] = {}       # cam ip → camera (PreSd_id ...)
+        self._moved_at: Dict[str, float] = {}
+        self.generation: Dict[str, int] = {}     # cam ip → 지금 주인의 generation
+        self._gen = int(time.time() * 1000)
+
+    # ── node / load ───────────────────────────────────────────
+    def set_weights(self, weights: Dict[str, float]):
+        with self._lock:
+            self.weights = {str(k): float(v) for k, v in (weights or {}).items()}
+            for ip, n in self.nodes.items():
+                n.weight = self.weights.get(ip, 1.0)
+
+    def set_nodes(self, ips):
+        """현재 연결된 AIc 목록 (없어진 node 는 connected=False)"""
+        ips = {str(ip) for ip in ips}
+        with self._lock:
+            for ip in ips:
+                n = self.nodes.get(ip)
+                if n is None:
+                    self.nodes[ip] = AIcNode(ip, self.weights.get(ip, 1.0))
+                elif not n.connected:
+                    n.connected, n.misses = True, 0
+            for ip, n in self.nodes.items():
+                if ip not in ips:
+                    n.connected = False
+
+    def report(self, ip: str, load: dict):
+        """AIc Load 응답 : {"slots_total", "slots_used", "cpu", "backlog_sec", "cameras": {cam: {"speed", "lag"}}}"""
+        with self._lock:
+            n = self.nodes.get(ip)
+            if n is None:
+                n = self.nodes[ip] = AIcNode(ip, self.weights.get(ip, 1.0))
+            n.slots_total = int(load.get("slots_total", 0) or 0)
+            n.slots_used = int(load.get("slots_used", 0) or 0)
+            n.cpu = float(load.get("cpu", 0.0) or 0.0)
+            n.backlog_sec = float(load.get("backlog_sec", 0.0) or 0.0)
+            n.cams = dict(load.get("cameras") or {})
+            n.t_report = time.time()
+            n.misses = 0
+            n.connected = True
+            _M_CAPACITY.labels(ip).set(n.capacity)
+
+    def miss(self, ip: str):
+        with self._lock:
+            n = self.nodes.get(ip)
+            if n is not None:
+                n.misses += 1
+
+    # ── assign ────────────────────────────────────────────────
+    def _counts(self) -> Dict[str, int]:
+        cnt = {ip: 0 for ip in self.nodes}
+        for node in self.assignment.values():
+            if node in cnt:
+                cnt[node] += 1
+        return cnt
+
+    def _pick(self, cam: dict, cnt: Dict[str, int], candidates: List[AIcNode], prefer: str = "") -> Optional[AIcNode]:
+        best, best_key = None, None
+        local = fd_presd_local_node(cam)
+        for n in candidates:
+            if local and n.ip != local:
+                continue   # PreSd local 녹화 - 다른 node 는 읽을 수 없다
+            if n.capacity <= 0:
+                continue
+            if n.slots_total and cnt.get(n.ip, 0) >= n.slots_total:
+                continue   # encoder slot 부족
+            key = ((cnt.get(n.ip, 0) + 1) / n.capacity,
+                   0 if n.ip == prefer else 1,
+                   0 if n.ip == str(cam.get("PreSd_id", "")) else 1,
+                   n.ip)
+            if best_key is None or key < best_key:
+                best, best_key = n, key
+        return best
+
+    def assign(self, cameras: List[dict]) -> Dict[str, List[str]]:
+        """
+        cameras : camera_env["cameras"] ({"ip", "id", "PreSd_id", ...})
+        전체 배정을 새로 만든다 (이전 배정은 같은 점수일 때만 우선). 반환 {AIc ip: [cam ip]}
+        """
+        now = time.time()
+        with self._lock:
+            prev = dict(self.assignment)
+            self.cameras = {str(c["ip"]): c for c in cameras}
+            self.assignment = {}
+            alive = [n for n in self.nodes.values() if n.alive(now)]
+            cnt = {n.ip: 0 for n in alive}
+            for cam_ip, cam in self.cameras.items():
+                n = self._pick(cam, cnt, alive, prev.get(cam_ip, ""))
+                if n is None:
+                    local = fd_presd_local_node(cam)
+                    self._log(f"[sched] no AIc with a free slot for camera {cam_ip}"
+                              + (f" (PreSd local - only {local})" if local else ""))
+                    continue
+                self.assignment[cam_ip] = n.ip
+                self._bump(cam_ip)
+                cnt[n.ip] += 1
+            self._update_metrics()
+            return self._by_node()
+
+    def rebalance(self) -> Dict[str, List[str]]:
+        """
+        끊긴 node → 그 camera 전부, 밀리는 node → camera 하나 (가장 밀린 것) 를 여유 있는 node 로.
+        바뀐 node 들의 새 camera 목록 {AIc ip: [cam ip]} (바뀐 게 없으면 {})
+        """
+        now = time.time()
+        changed = set()
+        with self._lock:
+            if not self.cameras:
+                return {}
+            alive = [n for n in self.nodes.values() if n.alive(now)]
+            alive_ips = {n.ip for n in alive}
+            cnt = self._counts()
+
+            # 0) 자리가 없어서 못 받은 camera
+            for cam_ip, cam in self.cameras.items():
+                if cam_ip in self.assignment:
+                    continue
+                n = self._pick(cam, cnt, alive)
+                if n is not None:
+                    self.assignment[cam_ip] = n.ip
+                    self._bump(cam_ip)
+                    cnt[n.ip] += 1
+                    changed.add(n.ip)
+                    _M_MOVES.labels("unassigned").inc()
+
+            # 1) 끊긴 node
+            for cam_ip, node_ip in sorted(self.assignment.items()):
+                if node_ip in alive_ips:
+                    continue
+                cnt[node_ip] -= 1
+                n = self._pick(self.cameras.get(cam_ip, {}), cnt, alive)
+                if n is None:
+                    continue   # 받을 node 가 없다 - 다음 rebalance 에서 다시
+                self._move(cam_ip, node_ip, n.ip, "disconnect", now)
+                cnt[n.ip] += 1
+                changed.update((node_ip, n.ip))
+
+            # 2) 뒤처진 node : camera 하나씩
+            for src in alive:
+                if not src.lagging():
+                    continue
+                lagging = sorted(((float(c.get("lag", 0)), cam) for cam, c in src.cams.items()
+                                  if self.assignment.get(cam) == src.ip
+                                  and now - self._moved_at.get(cam, 0) > CAM_COOLDOWN_SEC), reverse=True)
+                if not lagging:
+                    continue
+                cam_ip = lagging[0][1]
+                targets = [n for n in alive if n.ip != src.ip and not n.lagging() and n.cpu < CPU_LIMIT]
+                cnt[src.ip] -= 1
+                n = self._pick(self.cameras.get(cam_ip, {}), cnt, targets)
+                # 옮겨도 나아지지 않으면 그대로
+                if n is None or (cnt[n.ip] + 1) / n.capacity >= (cnt[src.ip] + 1) / max(src.capacity, 1e-6):
+                    cnt[src.ip] += 1
+                    continue
+                self._move(cam_ip, src.ip, n.ip, "lagging", now)
+                cnt[n.ip] += 1
+                changed.update((src.ip, n.ip))
+
+            if not changed:
+                return {}
+            self._update_metrics()
+            by_node = self._by_node()
+            return {ip: by_node.get(ip, []) for ip in changed if ip in alive_ips}
+
+    def _move(self, cam_ip: str, src: str, dst: str, reason: str, now: float):
+        self.assignment[cam_ip] = dst
+        self._moved_at[cam_ip] = now
+        self._bump(cam_ip)
+        _M_MOVES.labels(reason).inc()
+        self._log(f"[sched] camera {cam_ip}: {src} → {dst} ({reason})")
+
+    def _bump(self, cam_ip: str):
+        self._gen += 1
+        self.generation[cam_ip] = self._gen
+
+    def _by_node(self) -> Dict[str, List[str]]:
+        res: Dict[str, List[str]] = {}
+        for cam_ip, node_ip in self.assignment.items():
+            res.setdefault(node_ip, []).append(cam_ip)
+        return res
+
+    def _update_metrics(self):
+        cnt = self._counts()
+        for ip, n in self.nodes.items():
+            _M_ASSIGNED.labels(ip).set(cnt.get(ip, 0))
+            _M_CAPACITY.labels(ip).set(n.capacity)
+
+    # ── query ─────────────────────────────────────────────────
+    def cameras_of(self, ip: str) -> List[str]:
+        with self._lock:
+            return [c for c, n in self.assignment.items() if n == ip]
+
+    def generations(self, cam_ips) -> Dict[str, int]:
+        """{cam ip: generation} - Prepare / Assign packet 에 같이 보낸다"""
+        with self._lock:
+            return {str(c): self.generation[str(c)] for c in cam_ips if str(c) in self.generation}
+
+    def status(self) -> dict:
+        with self._lock:
+            cnt = self._counts()
+            return {
+                "nodes": {ip: n.to_dict(cnt.get(ip, 0)) for ip, n in self.nodes.items()},
+                "assignment": dict(self.assignment),
+                "unassigned": sorted(set(self.cameras) - set(self.assignment)),
+            }
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "AIcNode",
+    "AIcScheduler",
+    "fd_presd_local_node",
+]
@@ -40,6 +40,7 @@ from PyQt5.QtCore import QTimer
 # ─────────────────────────────────────────────────────────────────────────────
 from fd_utils.fd_config_manager import conf
 from fd_common.utils            import fd_format_elapsed_time
+from fd_common.metrics          import fd_metric_histogram, fd_metric_gauge
 
 from fd_utils.fd_logging        import fd_log
 from fd_utils.fd_file_edit      import fd_save_array_file
@@ -66,6 +67,7 @@ from fd_draw.fd_2d_draw         import fd_create_division
 from fd_draw.fd_2d_draw         import fd_combine_processed_files
 
 from fd_calibration.fd_file_calibration import create_video_each_camera
+from fd_calibration.fd_file_calibration import fd_calibration_unit_setup
 
 from pathlib import Path
 from datetime import datetime
@@ -731,12 +733,20 @@ def fd_multi_channel_video_stream(type_devision, folder_input, folder_output, ca
 
     return True, file_output
    
+# calibration metrics (AId/AIc 'Information/Metrics' 로 조회)
+_M_CALIB_SEC   = fd_metric_histogram("aid_calibration_seconds", "multi-channel calibration processing time",
+                                     buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600))
+_M_CALIB_SPEED = fd_metric_gauge("aid_calibration_speed_ratio", "last calibration speed (video sec / processing sec)")
+_M_CALIB_CAMS  = fd_metric_gauge("aid_calibration_cameras", "camera count of the last calibration")
+
 # ─────────────────────────────────────────────────────────────────────────────
 # def fd_multi_calibration_video(Cameras, Markers, AdjustData, prefix, output_path, logo_path, resolution, codec, fps, bitrate, gop):
 # [owner] hongsu jung
 # [date] 2025-09-12
+# runner : (Cameras, AdjustData, Markers) -> bool - 없으면 이 PC 에서 create_video_each_camera()
+#          AId 는 AIc 로 나눠서 처리하는 runner 를 넘긴다 (WorkQueue)
 # ─────────────────────────────────────────────────────────────────────────────
-def fd_multi_calibration_video(Cameras, Markers, AdjustData, prefix, output_path, logo_path, resolution, codec, fps, bitrate, gop, output_mode):
+def fd_multi_calibration_video(Cameras, Markers, AdjustData, prefix, output_path, logo_path, resolution, codec, fps, bitrate, gop, output_mode, runner = None):
     
     # 2025-09-14
     # check process time
@@ -767,7 +777,7 @@ def fd_multi_calibration_video(Cameras, Markers, AdjustData, prefix, output_path
         return False
     
     # confirm input datas
-    ret = create_video_each_camera(Cameras, AdjustData, Markers)
+    ret = (runner or create_video_each_camera)(Cameras, AdjustData, Markers)
     if ret is False:
         fd_log.error("❌ Error in create_video_each_camera")
         return False
@@ -801,6 +811,10 @@ def fd_multi_calibration_video(Cameras, Markers, AdjustData, prefix, output_path
         per_cam_time_for_1s = float("inf")
         all_cam_time_for_1s = float("inf")
 
+    _M_CALIB_SEC.observe(elapsed_sec)
+    _M_CALIB_SPEED.set(speed_ratio)
+    _M_CALIB_CAMS.set(camera_count)
+
     # --- Output ---
     fd_log.print("\033[33m────────────────────────────────────────────────────────────────────────────────────────── \033[0m")
     fd_log.print(f"\033[33m── \033[0m🏁 Total Video Time (per camera): \033[32m{formatted_play_total_time}\033[0m")
@@ -816,6 +830,24 @@ def fd_multi_calibration_video(Cameras, Markers, AdjustData, prefix, output_path
 
     return True
     
+# ─────────────────────────────────────────────────────────────────────────────
+# def fd_calibration_job_setup(job):
+# [date] 2026-10-19
+# AIc (WorkWorker) - AId 가 나눠준 calibration job 의 공통 설정 (job 당 한 번)
+# job : AId 의 'AI/Process/Multi' 요청과 같은 key (Cameras, Markers, AdjustData, prefix, ...)
+# ─────────────────────────────────────────────────────────────────────────────
+def fd_calibration_job_setup(job):
+    fd_clean_up()
+    conf._unique_process_name = uuid.uuid4()
+    ret = check_verified_calibration_input_data(
+        job.get("Cameras", []), job.get("Markers", []), job.get("AdjustData", []),
+        job.get("prefix"), job.get("output_path"), job.get("logo_path"), job.get("resolution"),
+        job.get("codec"), job.get("fps"), job.get("bitrate"), job.get("gop"), job.get("output_mode"))
+    if ret is False:
+        return False
+    fd_calibration_unit_setup(len(job.get("Markers", [])), len(job.get("Cameras", [])))
+    return True
+
 # ─────────────────────────────────────────────────────────────────────────────
 # def check_verified_calibration_input_data(Cameras, Markers, AdjustData, prefix, output_path, logo_path, resolution, codec, fps, bitrate, gop):
 # [owner] hongsu jung
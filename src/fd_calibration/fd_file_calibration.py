@@ -13,6 +13,7 @@
 
 import os
 import cv2
+import threading
 import numpy as np
 
 from fd_utils.fd_config_manager import conf
@@ -322,3 +323,118 @@ def create_audio_file(tg_index, cam, start_time, end_time, start_frame, end_fram
     return audio_file
 
 
+
+# ─────────────────────────────────────────────────────────────────────────────
+# distributed calibration (AId WorkQueue → AIc WorkWorker)
+# [date] 2026-10-19
+# - unit = camera × marker (marker 의 start/end time 구간)
+#   . 출력이 (marker, camera) 당 file 하나라서 marker 보다 잘게 나누면 이어 붙이는 단계가 더 필요
+# - audio 는 node local (R:\_aw) 에 만들어지므로 unit 으로 나누지 않고,
+#   video unit 을 처리하는 node 가 그 marker 의 audio 를 한 번 만들어서 같이 쓴다
+# ─────────────────────────────────────────────────────────────────────────────
+_UNIT_AUDIO_LOCK = threading.Lock()
+_UNIT_AUDIO_TG   = {}    # tg_index → threading.Lock (같은 marker 의 audio 는 한 번만)
+
+def build_calibration_units(Cameras, AdjustData, Markers) -> List[Dict[str, Any]]:
+    '''
+    create_video_each_camera() 와 같은 camera / marker 조합을 WorkQueue unit 으로.
+    cost = marker 길이 (초) - 긴 marker 부터 나눠준다.
+    '''
+    units: List[Dict[str, Any]] = []
+    for tg_index, tg in enumerate(build_marker_camera_sets_by_time(Cameras, AdjustData, Markers)):
+        marker = tg.get("marker", {})
+        cam_set = tg.get("camera_set", [])
+        adjust_set = tg.get("adjust_set", [])
+        audio_cam = next((c for c in cam_set if c.get("audio") is True), None)
+        try:
+            cost = max(0.1, float(marker.get("end_time")) - float(marker.get("start_time")))
+        except (TypeError, ValueError):
+            cost = 1.0
+        for cam_index, cam in enumerate(cam_set):
+            if not cam.get("video", True):
+                continue
+            units.append({
+                "id": f"tg{tg_index:02d}_cam{cam_index:02d}",
+                "kind": "calibration",
+                "cost": cost,
+                "params": {
+                    "tg_index": tg_index,
+                    "cam_index": cam_index,
+                    "marker": marker,
+                    "camera": cam,
+                    "adjust": adjust_set[cam_index] if cam_index < len(adjust_set) else {},
+                    "audio_camera": audio_cam,
+                },
+            })
+    return units
+
+def fd_calibration_unit_setup(tg_count: int, cam_count: int):
+    '''새 job - create_video_each_camera() 와 같은 thread slot / shared audio 초기화'''
+    conf._thread_file_calibration = [[None for _ in range(cam_count + 1)] for _ in range(tg_count)]
+    conf._shared_audio_filename = [None] * tg_count
+    conf._time_group_count = tg_count
+    with _UNIT_AUDIO_LOCK:
+        _UNIT_AUDIO_TG.clear()
+
+def _unit_shared_audio(tg_index, audio_cam, marker):
+    with _UNIT_AUDIO_LOCK:
+        lock = _UNIT_AUDIO_TG.setdefault(tg_index, threading.Lock())
+    with lock:
+        cand = conf._shared_audio_filename[tg_index]
+        if cand and os.path.exists(cand):
+            return cand
+        create_audio_file(tg_index, audio_cam, marker.get("start_time"), marker.get("end_time"),
+                          marker.get("start_frame"), marker.get("end_frame"))
+        th = conf._thread_file_calibration[tg_index][0]
+        if th is not None:
+            th.join()
+        return conf._shared_audio_filename[tg_index]
+
+def run_calibration_unit(params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    unit 하나 (camera × marker) 를 끝까지 처리 (fd_calibration_unit_setup() 이후).
+    실패는 예외로 - WorkWorker 가 Fail 로 보고하고 AId 가 다른 node 로 다시 나눈다.
+    '''
+    tg_index  = int(params["tg_index"])
+    cam_index = int(params["cam_index"])
+    marker    = params.get("marker", {})
+    cam       = params.get("camera", {})
+    start_time, start_frame = marker.get("start_time"), marker.get("start_frame")
+    end_time, end_frame     = marker.get("end_time"), marker.get("end_frame")
+
+    cam_audio    = cam.get("audio", False)
+    cam_ip_class = cam.get("ip_class", 0)
+    cam_ip       = cam.get("cam_ip", "")
+    channel      = cam.get("channel", -1)
+    file_path    = cam.get("input_path", None)
+    conf._folder_input = file_path
+
+    if not file_path or not os.path.exists(file_path):
+        raise FileNotFoundError(f"video folder not found: {file_path}")
+    file_base = "{0}/{1:03d}{2:03d}_{3}.mp4".format(file_path, cam_ip_class, int(cam_ip), start_time)
+    if file_exist(file_base) is False:
+        raise FileNotFoundError(f"input file not found: {file_base}")
+
+    # shared audio (이 node 에서 그 marker 처음이면 만든다)
+    audio_file = None
+    if params.get("audio_camera"):
+        audio_file = _unit_shared_audio(tg_index, params["audio_camera"], marker)
+
+    # get input file info
+    cap = cv2.VideoCapture(file_base)
+    conf._input_fps             = cap.get(cv2.CAP_PROP_FPS)
+    conf._input_frame_count     = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    conf._input_width           = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+    conf._input_height          = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    cap.release()
+
+    fd_log.info(f"🧩 [unit] TG:{tg_index} CAM:{cam_index} channel={channel}, time=[{start_time}:{start_frame}~{end_time}:{end_frame}]")
+    conf._thread_file_calibration[tg_index][cam_index + 1] = None
+    if fd_set_mem_file_calis(file_path, cam_ip_class, cam_ip, channel, tg_index, cam_index, start_time, start_frame,
+                             end_time, end_frame, params.get("adjust", {}), cam_audio) is False:
+        raise ValueError(f"invalid AdjustData for camera {cam_ip_class:03d}{int(cam_ip):03d}")
+    th = conf._thread_file_calibration[tg_index][cam_index + 1]
+    if th is None:
+        raise RuntimeError("calibration thread was not started")
+    th.join()
+    return {"tg_index": tg_index, "cam_index": cam_index, "channel": channel, "audio": audio_file}
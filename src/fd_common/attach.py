@@ -0,0 +1,341 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# attach.py
+# - session layer binary attachment (AId ↔ AIc ...)
+#   . MTd framing 그대로 : <I len><B flag> + body
+#       flag 0 : JSON text
+#       flag 1 : JSON + binary  →  body = <IIII>(jlen, blen, 0, 0) + JSON + binary
+#   . 첨부 종류 (Attachment.kind)
+#       ndarray : dtype / shape header + raw (codec "zlib" 이면 압축 - tracking array 등)
+#       jpeg    : preview / thumbnail
+#       bytes   : 그 밖의 것
+#   . 작은 첨부 (합쳐서 ATTACH_INLINE_MAX 이하) : 메시지 frame 하나
+#     큰 첨부 : 메시지 frame (AttachTx) → chunk frame (AttachChunk) 여러 개
+#       - 받는 쪽은 ATTACH_WINDOW chunk 마다 AttachAck → 보내는 쪽은 window 만큼만 앞서간다
+#       - chunk 사이사이에 다른 메시지가 끼어들 수 있다 (socket lock 은 frame 단위)
+# - numpy / cv2 는 쓸 때만 import (OMS 등 numpy 없는 곳에서도 framing 은 동작)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import itertools
+import json
+import struct
+import threading
+import time
+import zlib
+
+from typing import Callable, Dict, List, Optional
+
+from fd_common.metrics import fd_metric_counter, fd_metric_histogram
+
+FRAME_HEADER = struct.Struct("<IB")
+FRAME_JSON = 0
+FRAME_BINARY = 1
+BINARY_HEADER = struct.Struct("<IIII")   # jlen, blen, reserved, reserved
+FRAME_MAX = 64 * 1024 * 1024             # tcp_server 와 같은 상한
+
+ATTACH_CHUNK = 1024 * 1024               # chunk frame 하나의 binary 크기
+ATTACH_INLINE_MAX = ATTACH_CHUNK         # 이하이면 chunk 없이 한 frame
+ATTACH_WINDOW = 8                        # ack 없이 보낼 수 있는 chunk 수
+ATTACH_ACK_TIMEOUT = 10.0                # window 가 찬 채로 이만큼 ack 가 없으면 전송 포기
+ATTACH_RECV_TTL = 60.0                   # 끝나지 않은 수신은 이만큼 지나면 버린다
+ATTACH_RX_MAX = 1024 * 1024 * 1024       # AttachTx 가 선언할 수 있는 최대 크기 (이 크기만큼 미리 할당한다)
+
+_M_BYTES    = fd_metric_counter("attach_bytes", "attachment payload bytes", ("dir",))
+_M_ACK_WAIT = fd_metric_histogram("attach_ack_wait_seconds", "sender blocked on a full chunk window")
+_M_DROPPED  = fd_metric_counter("attach_dropped", "incomplete incoming transfers dropped")
+
+# ─────────────────────────────────────────────────────────────
+# attachment
+# ─────────────────────────────────────────────────────────────
+class Attachment:
+    __slots__ = ("name", "kind", "data", "meta")
+
+    def __init__(self, name: str, kind: str, data, meta: Optional[dict] = None):
+        self.name = name
+        self.kind = kind
+        self.data = bytes(data) if not isinstance(data, bytes) else data
+        self.meta = dict(meta or {})
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def desc(self, offset: int) -> dict:
+        d = {"name": self.name, "kind": self.kind, "offset": offset, "size": self.size}
+        d.update(self.meta)
+        return d
+
+    @classmethod
+    def from_desc(cls, desc: dict, blob) -> "Attachment":
+        off, size = int(desc.get("offset", 0)), int(desc.get("size", 0))
+        meta = {k: v for k, v in desc.items() if k not in ("name", "kind", "offset", "size")}
+        return cls(desc.get("name", ""), desc.get("kind", "bytes"), blob[off:off + size], meta)
+
+    def array(self):
+        """ndarray 첨부 → numpy array (복사본)"""
+        import numpy as np
+        if self.kind != "ndarray":
+            raise TypeError(f"attachment '{self.name}' is {self.kind}, not ndarray")
+        raw = zlib.decompress(self.data) if self.meta.get("codec") == "zlib" else self.data
+        return np.frombuffer(raw, dtype=np.dtype(self.meta["dtype"])).reshape(self.meta["shape"]).copy()
+
+    def image(self):
+        """jpeg 첨부 → BGR image (cv2)"""
+        import cv2
+        import numpy as np
+        return cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def __repr__(self):
+        return f"Attachment({self.name!r}, {self.kind}, {self.size}B)"
+
+def fd_attach_bytes(data, name: str = "", **meta) -> Attachment:
+    return Attachment(name, "bytes", data, meta)
+
+def fd_attach_array(arr, name: str = "", compress: bool = False, **meta) -> Attachment:
+    """numpy array (dtype / shape 는 header 로). compress=True → zlib (tracking array 등)"""
+    import numpy as np
+    arr = np.ascontiguousarray(arr)
+    raw = arr.tobytes()
+    meta.update(dtype=arr.dtype.str, shape=list(arr.shape))
+    if compress:
+        raw = zlib.compress(raw, 1)
+        meta["codec"] = "zlib"
+    return Attachment(name, "ndarray", raw, meta)
+
+def fd_attach_jpeg(image, name: str = "", quality: int = 85, **meta) -> Attachment:
+    """image : 이미 인코딩된 JPEG bytes 또는 BGR ndarray"""
+    if not isinstance(image, (bytes, bytearray, memoryview)):
+        import cv2
+        ok, buf = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        if not ok:
+            raise ValueError(f"jpeg encode failed ({name})")
+        meta.setdefault("width", int(image.shape[1]))
+        meta.setdefault("height", int(image.shape[0]))
+        image = buf.tobytes()
+    return Attachment(name, "jpeg", image, meta)
+
+# ─────────────────────────────────────────────────────────────
+# frame
+# ─────────────────────────────────────────────────────────────
+def fd_frame_pack(flag: int, body: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(body), flag) + body
+
+def fd_frame_binary(header: dict, blob=b"") -> bytes:
+    """flag 1 body (legacy MTd 규격과 같다 - server_mtd_connect 가 그대로 읽는다)"""
+    j = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return BINARY_HEADER.pack(len(j), len(blob), 0, 0) + j + bytes(blob)
+
+def fd_frame_parse_binary(body):
+    """flag 1 body → (header dict, blob memoryview)"""
+    if len(body) < BINARY_HEADER.size:
+        raise ValueError("invalid type-1 body")
+    jlen, blen, _, _ = BINARY_HEADER.unpack_from(body)
+    start = BINARY_HEADER.size
+    if start + jlen + blen > len(body):
+        raise ValueError(f"type-1 body truncated ({len(body)} < {start + jlen + blen})")
+    header = json.loads(bytes(body[start:start + jlen]).decode("utf-8"))
+    return header, memoryview(body)[start + jlen:start + jlen + blen]
+
+def fd_attach_pack(msg: dict, attachments: List[Attachment]) -> bytes:
+    """메시지 + 첨부 → flag 1 frame 하나 (chunk 없이 - MTd 응답 등)"""
+    descs, off = [], 0
+    for a in attachments:
+        descs.append(a.desc(off))
+        off += a.size
+    return fd_frame_pack(FRAME_BINARY, fd_frame_binary(dict(msg, Attachments=descs),
+                                                       b"".join(a.data for a in attachments)))
+
+# ─────────────────────────────────────────────────────────────
+# per-connection link (chunk / ack / reassembly)
+# ─────────────────────────────────────────────────────────────
+class _Rx:
+    __slots__ = ("msg", "buf", "got", "chunks", "t_last")
+
+    def __init__(self, msg: dict, size: int):
+        self.msg = msg
+        self.buf = bytearray(size)
+        self.got = 0
+        self.chunks = 0
+        self.t_last = time.monotonic()
+
+class _Tx:
+    __slots__ = ("acked", "cond")
+
+    def __init__(self, lock):
+        self.acked = 0
+        self.cond = threading.Condition(lock)
+
+class AttachLink:
+    _ids = itertools.count(1)
+
+    def __init__(self, send_raw: Callable[[bytes], None], name: str = "link", max_rx: int = ATTACH_RX_MAX):
+        """
+        send_raw : (frame bytes) -> None   - 호출마다 frame 하나가 온전히 나가야 한다 (호출자 lock)
+        max_rx   : 받을 수 있는 chunk 전송 하나의 최대 크기 (넘으면 할당 전에 거절)
+        """
+        self._send_raw = send_raw
+        self.name = name
+        self.max_rx = int(max_rx)
+        self._lock = threading.Lock()
+        self._tx: Dict[str, _Tx] = {}
+        self._rx: Dict[str, _Rx] = {}
+        self._closed = False
+        self._reader = None      # 이 link 의 frame 을 읽는 thread
+
+    def bind_reader(self):
+        """recv thread 에서 호출 - 그 thread 가 보내는 큰 첨부는 ack 를 기다리지 않는다
+        (ack 를 읽을 thread 가 바로 자기 자신이라 기다리면 멈춘다 → TCP backpressure 만)"""
+        self._reader = threading.get_ident()
+
+    # ── send ──────────────────────────────────────────────────
+    def send_text(self, text) -> None:
+        body = text.encode("utf-8") if isinstance(text, str) else bytes(text)
+        self._send_raw(fd_frame_pack(FRAME_JSON, body))
+
+    def send(self, msg: dict, attachments: List[Attachment] = (), chunked: bool = True) -> None:
+        """chunked=False → 크기와 상관없이 frame 하나 (ack 를 모르는 legacy peer - MTd 등)"""
+        attachments = list(attachments or ())
+        total = sum(a.size for a in attachments)
+        if total <= ATTACH_INLINE_MAX or not chunked:
+            self._send_raw(fd_attach_pack(msg, attachments))
+            _M_BYTES.labels("tx").inc(total)
+            return
+
+        tx_id = f"{self.name}-{next(self._ids)}"
+        descs, off = [], 0
+        for a in attachments:
+            descs.append(a.desc(off))
+            off += a.size
+        tx = _Tx(self._lock)
+        with self._lock:
+            self._tx[tx_id] = tx
+        try:
+            self._send_raw(fd_frame_pack(FRAME_BINARY, fd_frame_binary(
+                dict(msg, Attachments=descs, AttachTx={"id": tx_id, "size": total}))))
+            off = 0
+            for a in attachments:
+                view = memoryview(a.data)
+                for i in range(0, a.size, ATTACH_CHUNK):
+                    self._wait_window(tx, tx_id, off)
+                    part = view[i:i + ATTACH_CHUNK]
+                    self._send_raw(fd_frame_pack(FRAME_BINARY, fd_frame_binary(
+                        {"AttachChunk": {"id": tx_id, "off": off}}, part)))
+                    off += len(part)
+            _M_BYTES.labels("tx").inc(total)
+        finally:
+            with self._lock:
+                self._tx.pop(tx_id, None)
+
+    def _wait_window(self, tx: _Tx, tx_id: str, off: int):
+        limit = ATTACH_WINDOW * ATTACH_CHUNK
+        if threading.get_ident() == self._reader:
+            return
+        with tx.cond:
+            if off - tx.acked < limit:
+                return
+            t0 = time.perf_counter()
+            if not tx.cond.wait_for(lambda: self._closed or off - tx.acked < limit, timeout=ATTACH_ACK_TIMEOUT):
+                raise TimeoutError(f"[{self.name}] no ack for {tx_id} ({tx.acked}/{off} bytes acked)")
+            if self._closed:
+                raise ConnectionError(f"[{self.name}] closed while sending {tx_id}")
+            _M_ACK_WAIT.observe(time.perf_counter() - t0)
+
+    # ── receive ───────────────────────────────────────────────
+    def on_frame(self, body):
+        """
+        flag 1 body 하나 처리.
+        완성된 메시지면 (msg, [Attachment]) - ack / chunk / 진행 중이면 None
+        """
+        header, blob = fd_frame_parse_binary(body)
+
+        ack = header.get("AttachAck")
+        if ack is not None:
+            with self._lock:
+                tx = self._tx.get(ack.get("id"))
+                if tx is not None:
+                    tx.acked = max(tx.acked, int(ack.get("off", 0)))
+                    tx.cond.notify_all()
+            return None
+
+        chunk = header.get("AttachChunk")
+        if chunk is not None:
+            return self._on_chunk(chunk, blob)
+
+        txinfo = header.pop("AttachTx", None)
+        if txinfo is not None:
+            size = int(txinfo.get("size", -1))
+            if size < 0 or size > self.max_rx:
+                _M_DROPPED.inc()
+                raise ValueError(f"[{self.name}] AttachTx {txinfo.get('id')} size {size} out of range (max {self.max_rx})")
+            self._gc()
+            with self._lock:
+                self._rx[txinfo["id"]] = _Rx(header, size)
+            return None
+
+        _M_BYTES.labels("rx").inc(len(blob))
+        return header, [Attachment.from_desc(d, blob) for d in header.get("Attachments") or ()]
+
+    def _on_chunk(self, chunk: dict, blob):
+        tx_id, off = chunk.get("id"), int(chunk.get("off", 0))
+        with self._lock:
+            rx = self._rx.get(tx_id)
+        if rx is None:
+            return None   # 이미 버린 전송
+        if off < 0 or off + len(blob) > len(rx.buf):
+            # bytearray slice 대입은 범위를 넘으면 buffer 를 늘려 버린다 → 전송째 버린다
+            with self._lock:
+                self._rx.pop(tx_id, None)
+            _M_DROPPED.inc()
+            raise ValueError(f"[{self.name}] AttachChunk {tx_id} off={off} len={len(blob)} exceeds size {len(rx.buf)}")
+        rx.buf[off:off + len(blob)] = blob
+        rx.got += len(blob)
+        rx.chunks += 1
+        rx.t_last = time.monotonic()
+        done = rx.got >= len(rx.buf)
+        if done or rx.chunks % ATTACH_WINDOW == 0:
+            self._send_raw(fd_frame_pack(FRAME_BINARY, fd_frame_binary(
+                {"AttachAck": {"id": tx_id, "off": rx.got}})))
+        if not done:
+            return None
+        with self._lock:
+            self._rx.pop(tx_id, None)
+        _M_BYTES.labels("rx").inc(len(rx.buf))
+        return rx.msg, [Attachment.from_desc(d, rx.buf) for d in rx.msg.get("Attachments") or ()]
+
+    def _gc(self):
+        now = time.monotonic()
+        with self._lock:
+            stale = [k for k, rx in self._rx.items() if now - rx.t_last > ATTACH_RECV_TTL]
+            for k in stale:
+                del self._rx[k]
+        if stale:
+            _M_DROPPED.inc(len(stale))
+
+    def close(self):
+        """보내는 중인 전송은 ack timeout 을 기다리지 않고 바로 끝난다"""
+        with self._lock:
+            self._closed = True
+            for tx in self._tx.values():
+                tx.cond.notify_all()
+            self._rx.clear()
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "FRAME_JSON",
+    "FRAME_BINARY",
+    "FRAME_MAX",
+    "ATTACH_CHUNK",
+    "ATTACH_INLINE_MAX",
+    "ATTACH_WINDOW",
+    "ATTACH_RX_MAX",
+    "Attachment",
+    "AttachLink",
+    "fd_attach_bytes",
+    "fd_attach_array",
+    "fd_attach_jpeg",
+    "fd_attach_pack",
+    "fd_frame_pack",
+    "fd_frame_binary",
+    "fd_frame_parse_binary",
+]
@@ -0,0 +1,300 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# config_store.py
+# - 설정 파일 (user-config.json, dms_config.json ...) 공용 cache
+#   . file 당 한 번만 parse → 불변 snapshot (FrozenDict / tuple) + version
+#   . get() 마다 os.stat 한 번 (mtime_ns, size) 으로 변경 확인 → 바뀌었을 때만 다시 parse
+#   . watcher thread (poll) 가 subscriber 에게 변경 통지
+#   . 쓰는 도중의 file 은 보이지 않는다
+#       - 읽기 전후 stat 이 다르면 다시 읽고, parse 실패면 이전 snapshot 유지
+#       - write() 는 temp file + os.replace (atomic)
+# - OMS / DMS 공용
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+import threading
+import time
+
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+CONFIG_POLL_SEC = 1.0
+
+# ─────────────────────────────────────────────────────────────
+# immutable view
+# ─────────────────────────────────────────────────────────────
+class FrozenDict(dict):
+    """읽기 전용 dict - json.dumps / isinstance(dict) 는 그대로, 수정하면 TypeError"""
+    __slots__ = ()
+
+    def _ro(self, *a, **kw):
+        raise TypeError("config snapshot is read-only (use snapshot.mutable())")
+
+    __setitem__ = __delitem__ = _ro
+    clear = pop = popitem = setdefault = update = _ro
+
+    def __ior__(self, other):
+        self._ro()
+
+    def copy(self):
+        return fd_config_thaw(self)
+
+    def __deepcopy__(self, memo):
+        return fd_config_thaw(self)
+
+    def __reduce__(self):
+        return (dict, (fd_config_thaw(self),))
+
+    def __hash__(self):
+        return id(self)
+
+def fd_config_freeze(obj):
+    if isinstance(obj, dict):
+        return FrozenDict((k, fd_config_freeze(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(fd_config_freeze(v) for v in obj)
+    return obj
+
+def fd_config_thaw(obj):
+    if isinstance(obj, dict):
+        return {k: fd_config_thaw(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [fd_config_thaw(v) for v in obj]
+    return obj
+
+class ConfigSnapshot:
+    __slots__ = ("path", "version", "data", "exists", "mtime", "size", "loaded_at")
+
+    def __init__(self, path: Path, version: int, data, exists: bool, mtime: float, size: int):
+        self.path = path
+        self.version = version
+        self.data = data
+        self.exists = exists
+        self.mtime = mtime
+        self.size = size
+        self.loaded_at = time.time()
+
+    def get(self, key, default=None):
+        return self.data.get(key, default) if isinstance(self.data, dict) else default
+
+    def mutable(self):
+        """수정해서 저장할 때 - 깊은 복사 (plain dict / list)"""
+        return fd_config_thaw(self.data)
+
+# ─────────────────────────────────────────────────────────────
+# store
+# ─────────────────────────────────────────────────────────────
+class _Entry:
+    __slots__ = ("path", "loader", "sig", "snap", "subs", "error")
+
+    def __init__(self, path: Path, loader):
+        self.path = path
+        self.loader = loader
+        self.sig = None          # (mtime_ns, size) | None (없는 file)
+        self.snap: Optional[ConfigSnapshot] = None
+        self.subs = []
+        self.error = ""
+
+def _sig(path: Path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class ConfigStore:
+    def __init__(self, poll_sec: float = CONFIG_POLL_SEC, log: Callable[[str], None] = None):
+        self.poll_sec = max(0.1, float(poll_sec))
+        self._log = log or (lambda m: None)
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def set_log(self, log: Callable[[str], None]):
+        self._log = log or (lambda m: None)
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.normcase(os.path.abspath(str(path)))
+
+    def _entry(self, path, loader) -> _Entry:
+        key = self._key(path)
+        e = self._entries.get(key)
+        if e is None:
+            e = self._entries[key] = _Entry(Path(key), loader or json.loads)
+        elif loader is not None:
+            e.loader = loader
+        return e
+
+    def _read_stable(self, e: _Entry):
+        """(sig, text) - 읽는 사이에 바뀌면 다시 (최대 5회)"""
+        for _ in range(5):
+            before = _sig(e.path)
+            if before is None:
+                return None, None
+            try:
+                text = e.path.read_text(encoding="utf-8-sig")
+            except FileNotFoundError:
+                return None, None
+            if _sig(e.path) == before:
+                return before, text
+            time.sleep(0.02)
+        raise OSError(f"{e.path} keeps changing while reading")
+
+    def _refresh(self, e: _Entry) -> bool:
+        """변경됐으면 새 snapshot (True). 호출자는 self._lock 을 잡고 있다"""
+        sig = _sig(e.path)
+        if e.snap is not None and sig == e.sig:
+            return False
+        try:
+            sig, text = self._read_stable(e)
+            data = fd_config_freeze(e.loader(text)) if text is not None else FrozenDict()
+        except Exception as ex:
+            # 쓰는 중 / 깨진 file → 이전 snapshot 유지, 다음 변경 때 다시
+            err = f"{type(ex).__name__}: {ex}"
+            if err != e.error:
+                self._log(f"[config] {e.path.name} parse failed, keeping v{e.snap.version if e.snap else 0}: {err}")
+            e.error = err
+            e.sig = sig
+            if e.snap is None:
+                e.snap = ConfigSnapshot(e.path, 0, FrozenDict(), False, 0.0, 0)
+            return False
+        e.error = ""
+        if e.snap is not None and e.snap.exists == (sig is not None) and data == e.snap.data:
+            e.sig = sig   # touch / 같은 내용 재저장 → version 유지
+            return False
+        e.sig = sig
+        version = (e.snap.version if e.snap else 0) + 1
+        e.snap = ConfigSnapshot(e.path, version, data, sig is not None,
+                                sig[0] / 1e9 if sig else 0.0, sig[1] if sig else 0)
+        return True
+
+    def _notify(self, e: _Entry):
+        snap = e.snap
+        for fn in list(e.subs):
+            try:
+                fn(snap)
+            except Exception as ex:
+                self._log(f"[config] subscriber for {e.path.name} failed: {ex!r}")
+
+    def get(self, path, loader: Callable[[str], object] = None) -> ConfigSnapshot:
+        """현재 snapshot (바뀌었으면 다시 parse). loader: text -> obj (기본 json.loads)"""
+        with self._lock:
+            e = self._entry(path, loader)
+            changed = self._refresh(e)
+            snap = e.snap
+        if changed and snap.version > 1:
+            self._notify(e)
+        return snap
+
+    def subscribe(self, path, fn: Callable[[ConfigSnapshot], None], loader=None) -> Callable[[], None]:
+        """변경될 때마다 fn(snapshot). 반환값을 부르면 해지"""
+        with self._lock:
+            e = self._entry(path, loader)
+            self._refresh(e)
+            e.subs.append(fn)
+        self.start()
+
+        def _unsubscribe():
+            with self._lock:
+                if fn in e.subs:
+                    e.subs.remove(fn)
+        return _unsubscribe
+
+    def invalidate(self, path=None):
+        """다음 get() 에서 무조건 다시 읽는다 (path=None → 전부)"""
+        with self._lock:
+            for key, e in self._entries.items():
+                if path is None or key == self._key(path):
+                    e.sig = ("invalid",)
+
+    def write(self, path, data, loader=None) -> ConfigSnapshot:
+        """
+        data: dict/list → JSON, str → 그대로
+        temp file 에 쓰고 os.replace → reader 는 이전 아니면 새 file 만 본다
+        """
+        p = Path(self._key(path))
+        text = data if isinstance(data, str) else json.dumps(fd_config_thaw(data), indent=2, ensure_ascii=False)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            for i in range(10):
+                try:
+                    os.replace(tmp, p)
+                    break
+                except PermissionError:
+                    # Windows: 다른 process 가 열고 있으면 잠깐 기다렸다가
+                    if i == 9:
+                        raise
+                    time.sleep(0.05)
+        finally:
+            if tmp.exists():
+                try: tmp.unlink()
+                except OSError: pass
+        return self.get(p, loader)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                str(e.path): {
+                    "version": e.snap.version if e.snap else 0,
+                    "exists": bool(e.snap and e.snap.exists),
+                    "mtime": e.snap.mtime if e.snap else 0.0,
+                    "subscribers": len(e.subs),
+                    "error": e.error,
+                }
+                for e in self._entries.values()
+            }
+
+    # ── watcher ───────────────────────────────────────────────
+    def _loop(self):
+        while not self._stop.wait(self.poll_sec):
+            with self._lock:
+                watched = [e for e in self._entries.values() if e.subs]
+            for e in watched:
+                try:
+                    with self._lock:
+                        changed = self._refresh(e)
+                    if changed:
+                        self._notify(e)
+                except Exception as ex:
+                    self._log(f"[config] watch {e.path.name} failed: {ex!r}")
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="config-watch")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+CONFIG_STORE = ConfigStore()
+
+def fd_config_get(path, loader=None) -> ConfigSnapshot:
+    return CONFIG_STORE.get(path, loader)
+
+def fd_config_write(path, data, loader=None) -> ConfigSnapshot:
+    return CONFIG_STORE.write(path, data, loader)
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "CONFIG_POLL_SEC",
+    "FrozenDict",
+    "ConfigSnapshot",
+    "ConfigStore",
+    "CONFIG_STORE",
+    "fd_config_freeze",
+    "fd_config_thaw",
+    "fd_config_get",
+    "fd_config_write",
+]
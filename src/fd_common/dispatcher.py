@@ -0,0 +1,217 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# dispatcher.py
+# - daemon message dispatcher (MTd → AId ...)
+#   . lane 별 bounded queue + worker pool (blocking get → idle 때 CPU 0)
+#   . classify(msg) 로 lane 선택 (control / production / job ...)
+#   . lane 이 가득 차면 submit() 이 False → 호출자가 busy 응답
+#   . type(Section1/2/3) 별 wait / handle 시간 집계 + metrics
+#   . Token 이 있는 메시지는 handler 전체가 trace span 하나 (fd_common.tracing)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import queue
+import threading
+import time
+
+from typing import Callable, Dict
+
+from fd_common.metrics import fd_metric_histogram, fd_metric_gauge, fd_metric_counter
+from fd_common.tracing import fd_trace_span
+
+_STOP = object()
+
+def fd_msg_type(msg) -> str:
+    """'Section1/Section2/Section3' (dict 가 아니면 '?')"""
+    if not isinstance(msg, dict):
+        return "?"
+    return f"{msg.get('Section1', '')}/{msg.get('Section2', '')}/{msg.get('Section3', '')}"
+
+class _TypeStat:
+    __slots__ = ("count", "errors", "wait_sum", "run_sum", "run_max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.wait_sum = 0.0
+        self.run_sum = 0.0
+        self.run_max = 0.0
+        self.last = 0.0
+
+    def to_dict(self) -> dict:
+        n = max(1, self.count)
+        return {
+            "count": self.count, "errors": self.errors,
+            "wait_avg_ms": round(self.wait_sum / n * 1000, 3),
+            "run_avg_ms": round(self.run_sum / n * 1000, 3),
+            "run_max_ms": round(self.run_max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+        }
+
+class _Lane:
+    def __init__(self, name: str, workers: int, maxsize: int):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.q: queue.Queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.threads = []
+        self.busy = 0
+        self.rejected = 0
+
+class MsgDispatcher:
+    def __init__(self, name: str, handler: Callable[[object], None], classify: Callable[[object], str],
+                 lanes: Dict[str, tuple], default_lane: str = "", log=None):
+        """
+        handler  : (msg) -> None   - worker thread 에서 호출
+        classify : (msg) -> lane   - submit() 호출 thread 에서 (가볍게)
+        lanes    : {lane: (workers, maxsize)}
+        """
+        self.name = name
+        self._handler = handler
+        self._classify = classify
+        self._log = log
+        self._lanes: Dict[str, _Lane] = {nm: _Lane(nm, *cfg) for nm, cfg in lanes.items()}
+        self._default = default_lane or next(iter(self._lanes))
+        self._stats: Dict[tuple, _TypeStat] = {}
+        self._stats_lock = threading.Lock()
+        self._started = False
+
+        prefix = name.lower()
+        self._m_run = fd_metric_histogram(f"{prefix}_msg_seconds", f"{name} message handling time", ("lane", "type"))
+        self._m_wait = fd_metric_histogram(f"{prefix}_msg_wait_seconds", f"{name} message queue wait", ("lane",))
+        self._m_reject = fd_metric_counter(f"{prefix}_msg_rejected", f"{name} messages rejected (lane full)", ("lane",))
+        m_depth = fd_metric_gauge(f"{prefix}_msg_queue_depth", f"{name} messages waiting per lane", ("lane",))
+        m_busy = fd_metric_gauge(f"{prefix}_msg_busy_workers", f"{name} workers handling a message", ("lane",))
+        for ln in self._lanes.values():
+            m_depth.labels(ln.name).set_function(ln.q.qsize)
+            m_busy.labels(ln.name).set_function(lambda ln=ln: ln.busy)
+
+    # ── submit ────────────────────────────────────────────────
+    def submit(self, msg) -> bool:
+        if isinstance(msg, (str, bytes)):
+            try:
+                msg = json.loads(msg)
+            except ValueError:
+                pass  # 그대로 handler 로 (handler 가 error 응답)
+        try:
+            lane = self._lanes.get(self._classify(msg)) or self._lanes[self._default]
+        except Exception:
+            lane = self._lanes[self._default]
+        try:
+            lane.q.put_nowait((time.perf_counter(), msg))
+            return True
+        except queue.Full:
+            lane.rejected += 1
+            self._m_reject.labels(lane.name).inc()
+            if self._log:
+                self._log(f"[{self.name}] lane '{lane.name}' full ({lane.q.maxsize}) - drop {fd_msg_type(msg)}")
+            return False
+
+    # ── workers ───────────────────────────────────────────────
+    def _worker(self, lane: _Lane):
+        while True:
+            item = lane.q.get()
+            if item is _STOP:
+                break
+            t_in, msg = item
+            t0 = time.perf_counter()
+            typ = fd_msg_type(msg)
+            with self._stats_lock:
+                lane.busy += 1
+            ok = True
+            # Token 이 있는 메시지는 span 하나 (queue 대기 시간은 attrs 로)
+            span = fd_trace_span(typ, pkt=msg if isinstance(msg, dict) else {}, lane=lane.name,
+                                 wait_ms=round((t0 - t_in) * 1000, 3))
+            with span:
+                try:
+                    self._handler(msg)
+                except Exception as e:
+                    ok = False
+                    span.fail(repr(e))
+                    if self._log:
+                        self._log(f"[{self.name}] {lane.name} handler error ({typ}): {e!r}")
+            t1 = time.perf_counter()
+            self._m_wait.labels(lane.name).observe(t0 - t_in)
+            self._m_run.labels(lane.name, typ).observe(t1 - t0)
+            with self._stats_lock:
+                lane.busy -= 1
+                st = self._stats.get((lane.name, typ))
+                if st is None:
+                    st = self._stats[(lane.name, typ)] = _TypeStat()
+                st.count += 1
+                st.errors += 0 if ok else 1
+                st.wait_sum += t0 - t_in
+                st.run_sum += t1 - t0
+                st.run_max = max(st.run_max, t1 - t0)
+                st.last = t1 - t0
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        for ln in self._lanes.values():
+            for i in range(ln.workers):
+                th = threading.Thread(target=self._worker, args=(ln,), daemon=True,
+                                      name=f"{self.name}-{ln.name}-{i}")
+                th.start()
+                ln.threads.append(th)
+
+    def stop(self, timeout: float = 3.0):
+        """queue 에 남은 것은 처리하고 끝낸다 (timeout 까지 - 그 안에 stop 을 못 넣으면 남은 것은 버린다)"""
+        if not self._started:
+            return
+        self._started = False
+        deadline = time.time() + timeout
+        for ln in self._lanes.values():
+            left = len(ln.threads)
+            while left:
+                try:
+                    ln.q.put(_STOP, timeout=max(0.0, deadline - time.time()))
+                    left -= 1
+                except queue.Full:
+                    # lane 이 가득 찬 채 막혀 있다 - 남은 메시지는 버리고 stop 을 넣는다
+                    dropped, stops = self._drain(ln)
+                    if self._log:
+                        self._log(f"[{self.name}] lane '{ln.name}' full on stop - dropped {dropped}")
+                    for _ in range(left + stops):
+                        try:
+                            ln.q.put_nowait(_STOP)
+                        except queue.Full:
+                            break
+                    left = 0
+        for ln in self._lanes.values():
+            for th in ln.threads:
+                th.join(max(0.0, deadline - time.time()))
+            ln.threads = [th for th in ln.threads if th.is_alive()]
+
+    @staticmethod
+    def _drain(ln: _Lane) -> tuple:
+        """queue 를 비운다 → (버린 메시지 수, 꺼낸 _STOP 수)"""
+        dropped = stops = 0
+        while True:
+            try:
+                item = ln.q.get_nowait()
+            except queue.Empty:
+                return dropped, stops
+            if item is _STOP:
+                stops += 1
+            else:
+                dropped += 1
+
+    def status(self) -> dict:
+        with self._stats_lock:
+            types = {f"{lane}:{typ}": st.to_dict() for (lane, typ), st in self._stats.items()}
+        return {
+            "lanes": {
+                ln.name: {"workers": ln.workers, "depth": ln.q.qsize(), "max": ln.q.maxsize,
+                          "busy": ln.busy, "rejected": ln.rejected}
+                for ln in self._lanes.values()
+            },
+            "types": types,
+        }
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "fd_msg_type",
+    "MsgDispatcher",
+]
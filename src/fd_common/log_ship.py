@@ -0,0 +1,124 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# log_ship.py
+# - DMS → OMS log shipping (batch + 압축)
+#   . cursor : {"<PROC>/<YYYY-MM-DD>": {"fid": ..., "offset": ...}} - OMS collector 가 보관, 매 요청에 넘긴다
+#   . batch  : cursor 이후의 완성된 line 들 (fd_log_stream 재사용 → rotation/truncate 는 reset)
+#   . body   : JSON → zstd (zstandard 설치시) / gzip
+# - OMS / DMS 공용
+# ─────────────────────────────────────────────────────────────────────────────
+
+import gzip
+import json
+import time
+
+from pathlib import Path
+
+from src.fd_common.log_stream import fd_log_stream
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOGSHIP_MAX_BYTES      = 4_000_000    # batch 하나의 최대 (압축 전) text byte
+LOGSHIP_BACKFILL_BYTES = 2_000_000    # 처음 보는 file 은 끝에서 이만큼만
+
+# ─────────────────────────────────────────────────────────────
+# encoding
+# ─────────────────────────────────────────────────────────────
+def fd_logship_accept() -> str:
+    """collector 가 보낼 Accept-Encoding"""
+    return "zstd, gzip" if zstandard else "gzip"
+
+def fd_logship_encode(payload: dict, accept: str = "") -> tuple:
+    """payload → (body, content-encoding)"""
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    accept = (accept or "").lower()
+    if zstandard and "zstd" in accept:
+        return zstandard.ZstdCompressor(level=3).compress(raw), "zstd"
+    if "gzip" in accept:
+        return gzip.compress(raw, compresslevel=5), "gzip"
+    return raw, "identity"
+
+def fd_logship_decode(body: bytes, encoding: str = "") -> dict:
+    enc = (encoding or "identity").lower()
+    if enc == "zstd":
+        if not zstandard:
+            raise RuntimeError("zstd body but zstandard is not installed")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif enc == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body.decode("utf-8", "ignore"))
+
+# ─────────────────────────────────────────────────────────────
+# batch (DMS)
+# ─────────────────────────────────────────────────────────────
+def _find_log(dirs, date_str: str):
+    for d in dirs:
+        p = Path(d) / f"{date_str}.log"
+        if p.is_file():
+            return p
+    return None
+
+def fd_logship_batch(sources: dict, cursors: dict, max_bytes: int = LOGSHIP_MAX_BYTES,
+                     backfill: int = LOGSHIP_BACKFILL_BYTES) -> dict:
+    """
+    sources : {proc: [log dir, ...]}  (daily file <YYYY-MM-DD>.log)
+    cursors : collector 가 마지막으로 받은 위치
+    - 오늘 file + cursor 가 있는 어제 file (자정 rotation 직전 라인 마저 보내기)
+    - 같은 file 이 여러 proc 후보에 걸리면 처음 것만
+    """
+    cursors = cursors if isinstance(cursors, dict) else {}
+    budget = full = max(1, int(max_bytes))
+    today = time.strftime("%Y-%m-%d")
+    yday = time.strftime("%Y-%m-%d", time.localtime(time.time() - 86400))
+    seen, files, more = set(), [], False
+
+    for proc, dirs in sources.items():
+        for date_str in (yday, today):
+            key = f"{proc}/{date_str}"
+            cur = cursors.get(key)
+            if date_str != today and not cur:
+                continue
+            p = _find_log(dirs, date_str)
+            if p is None:
+                continue
+            rp = str(p.resolve()).lower()
+            if rp in seen:
+                continue
+            seen.add(rp)
+            if budget <= 0:
+                more = True
+                continue
+            if cur:
+                r = fd_log_stream(p, cur.get("offset"), cur.get("fid", ""), tail=0, max_bytes=budget)
+            else:
+                r = fd_log_stream(p, None, "", tail=backfill, max_bytes=budget)
+            if not r.get("ok"):
+                continue
+            if r.get("partial") and budget < full:
+                # 남은 budget 이 작아서 line 이 잘린 것 - 다음 batch 에 온전히
+                more = True
+                continue
+            n = len(r["text"].encode("utf-8"))
+            budget -= n
+            more = more or r["more"]
+            if not n and cur and not r["reset"] and r["offset"] == cur.get("offset"):
+                continue  # 변화 없음
+            files.append({
+                "key": key, "proc": proc, "date": date_str,
+                "fid": r["fid"], "start": r["start"], "offset": r["offset"],
+                "size": r["size"], "reset": r["reset"], "text": r["text"],
+            })
+    return {"ok": True, "ts": time.time(), "files": files, "more": more}
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "LOGSHIP_MAX_BYTES",
+    "fd_logship_accept",
+    "fd_logship_encode",
+    "fd_logship_decode",
+    "fd_logship_batch",
+]
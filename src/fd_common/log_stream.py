@@ -0,0 +1,321 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# log_stream.py
+# - daily log file (daemon/<PROC>/log/YYYY-MM-DD.log) incremental read / search
+#   . stream : client 가 마지막 offset 을 넘기면 그 이후 byte 만 돌려준다
+#              file id (dev + inode + 생성시각) 가 바뀌거나 size 가 줄면 reset (rotation / truncate)
+#   . search : level / regex / time range 를 server 에서 거른다
+#              per-file line-offset index (sparse) 로 time range 시작점까지 seek
+# - stdlib only (OMS / DMS 공용)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import re
+import time
+import threading
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+
+STREAM_MAX_BYTES = 1_000_000    # 한 번에 돌려줄 최대 byte
+INDEX_STRIDE     = 256          # index checkpoint 간격 (line 수)
+INDEX_CACHE_MAX  = 32           # index 를 유지할 file 수
+SEARCH_MAX_LINES = 2000
+SEARCH_SKEW_SEC  = 2.0          # multi-thread 로그의 순서 뒤섞임 허용폭
+
+_TS_RE    = re.compile(rb"^(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2}):(\d{2})(?:[,.](\d{1,6}))?")
+_LEVEL_RE = re.compile(r"\[(DEBUG|INFO|WARN|WARNING|ERR|ERROR|CRITICAL|FATAL)\]", re.I)
+_LEVELS = {
+    "DEBUG": 10, "INFO": 20,
+    "WARN": 30, "WARNING": 30,
+    "ERR": 40, "ERROR": 40,
+    "CRITICAL": 50, "FATAL": 50,
+}
+
+# ─────────────────────────────────────────────────────────────
+# helpers
+# ─────────────────────────────────────────────────────────────
+def fd_log_file_id(st) -> str:
+    """
+    rotation 판정용 file id
+    - NTFS 도 st_ino 에 file index 가 들어온다
+    - Windows 의 ctime 은 생성 시각 (POSIX 의 ctime 은 write 마다 바뀌므로 제외)
+    """
+    born = getattr(st, "st_birthtime_ns", None)
+    if born is None and os.name == "nt":
+        born = st.st_ctime_ns
+    return f"{st.st_dev:x}-{st.st_ino:x}-{(born or 0):x}"
+
+def fd_log_level_no(name) -> int:
+    if name is None or name == "":
+        return 0
+    if isinstance(name, int) or str(name).isdigit():
+        return int(name)
+    return _LEVELS.get(str(name).strip().upper(), 0)
+
+def fd_log_line_level(line: str) -> int:
+    """[LEVEL] 태그가 없는 라인은 INFO 로 본다"""
+    m = _LEVEL_RE.search(line, 0, 64)
+    return _LEVELS[m.group(1).upper()] if m else _LEVELS["INFO"]
+
+def fd_log_parse_time(value, date: str = ""):
+    """epoch 숫자 / 'YYYY-mm-dd HH:MM:SS' / 'HH:MM[:SS]'(date 기준) → epoch, 실패시 None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value).strip()
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    if date and re.fullmatch(r"\d{1,2}:\d{2}(:\d{2})?", s):
+        s = f"{date} {s}"
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(s[:19], fmt))
+        except ValueError:
+            continue
+    return None
+
+class _TsParser:
+    """라인 timestamp → epoch (같은 초는 mktime 재사용)"""
+    __slots__ = ("_key", "_val")
+    def __init__(self):
+        self._key = None
+        self._val = None
+    def __call__(self, line: bytes):
+        m = _TS_RE.match(line)
+        if not m:
+            return None
+        key = line[:19]
+        if key != self._key:
+            y, mo, d, h, mi, s = (int(g) for g in m.groups()[:6])
+            self._key = key
+            self._val = time.mktime((y, mo, d, h, mi, s, 0, 0, -1))
+        frac = m.group(7)
+        return self._val + (int(frac) / (10 ** len(frac)) if frac else 0.0)
+
+LogTimeParser = _TsParser   # log collector 등 외부에서 대량 parse 용
+
+def _read_tail(f, size: int, tail_bytes: int) -> int:
+    """tail 시작 offset (line 경계로 맞춤)"""
+    if tail_bytes <= 0 or size <= tail_bytes:
+        return 0
+    f.seek(size - tail_bytes)
+    f.readline()
+    return f.tell()
+
+# ─────────────────────────────────────────────────────────────
+# stream
+# ─────────────────────────────────────────────────────────────
+def fd_log_stream(path, offset=None, fid: str = "", tail: int = 50000, max_bytes: int = STREAM_MAX_BYTES) -> dict:
+    """
+    offset 이후 완성된 line 만 반환한다 (마지막 '\\n' 까지).
+    - offset 없음 / fid 불일치 / offset > size  → reset=True, tail 부터 다시 보냄
+    - 응답의 offset/fid 를 그대로 다음 요청에 넘기면 된다
+    - line 하나가 max_bytes 보다 길면 그 조각만 보내고 partial=True (나머지는 다음 요청)
+    """
+    path = Path(path)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return {"ok": False, "error": "log file not found", "path": str(path)}
+    cur_fid = fd_log_file_id(st)
+    size = st.st_size
+    try:
+        off = int(offset) if offset not in (None, "") else -1
+    except (TypeError, ValueError):
+        off = -1
+    reset = off < 0 or (fid and fid != cur_fid) or off > size
+
+    with open(path, "rb") as f:
+        start = _read_tail(f, size, int(tail)) if reset else off
+        f.seek(start)
+        blob = f.read(max(0, min(size - start, int(max_bytes))))
+    cut = blob.rfind(b"\n")
+    # max_bytes 보다 긴 line 하나 → 잘린 그대로 보내고 offset 을 넘긴다 (같은 offset 을 계속 polling 하지 않게)
+    partial = cut < 0 and len(blob) >= int(max_bytes) > 0
+    if not partial:
+        blob = blob[:cut + 1] if cut >= 0 else b""
+    nxt = start + len(blob)
+    return {
+        "ok": True,
+        "path": str(path),
+        "fid": cur_fid,
+        "size": size,
+        "offset": nxt,
+        "start": start,
+        "reset": bool(reset),
+        "partial": partial,
+        "more": nxt < size and len(blob) > 0,
+        "text": blob.decode("utf-8", "ignore"),
+    }
+
+# ─────────────────────────────────────────────────────────────
+# index
+# ─────────────────────────────────────────────────────────────
+class LogLineIndex:
+    """
+    file 하나의 sparse line-offset index.
+    INDEX_STRIDE 라인마다 (byte offset, 그 지점 이전 라인들의 최대 timestamp) 를 기록.
+    - 최대값은 단조 증가 → bisect 로 "t0 이전 라인만 있는 마지막 checkpoint" 를 찾는다
+    - append 만 되는 로그라 이어서 index 하고, fid 가 바뀌면 처음부터 다시 만든다
+    """
+    def __init__(self, path, stride: int = INDEX_STRIDE):
+        self.path = Path(path)
+        self.stride = max(1, int(stride))
+        self.fid = ""
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offsets = array("q")    # checkpoint byte offset
+        self.maxts   = array("d")    # checkpoint 이전 라인들의 max timestamp
+        self.lines = 0
+        self.indexed_to = 0
+        self._ts_max = 0.0
+
+    def refresh(self) -> int:
+        """새로 append 된 부분만 index, 현재 size 반환"""
+        st = self.path.stat()
+        fid = fd_log_file_id(st)
+        with self._lock:
+            if fid != self.fid or st.st_size < self.indexed_to:
+                self.fid = fid
+                self._reset()
+            if st.st_size == self.indexed_to:
+                return st.st_size
+            parse = _TsParser()
+            with open(self.path, "rb") as f:
+                f.seek(self.indexed_to)
+                pos = self.indexed_to
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # 쓰는 중인 마지막 라인은 다음 refresh 때
+                    if self.lines % self.stride == 0:
+                        self.offsets.append(pos)
+                        self.maxts.append(self._ts_max)
+                    ts = parse(line)
+                    if ts is not None and ts > self._ts_max:
+                        self._ts_max = ts
+                    self.lines += 1
+                    pos += len(line)
+                self.indexed_to = pos
+            return st.st_size
+
+    def seek_offset(self, t0) -> int:
+        """t0 이상인 라인이 처음 나올 수 있는 byte offset"""
+        with self._lock:
+            if t0 is None or not self.offsets:
+                return 0
+            i = bisect_left(self.maxts, t0)
+            return self.offsets[max(0, i - 1)]
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "fid": self.fid, "lines": self.lines, "indexed_to": self.indexed_to,
+                "checkpoints": len(self.offsets), "stride": self.stride,
+            }
+
+_INDEX = {}
+_INDEX_LOCK = threading.Lock()
+
+def fd_log_index(path) -> LogLineIndex:
+    key = str(Path(path).resolve())
+    with _INDEX_LOCK:
+        idx = _INDEX.pop(key, None) or LogLineIndex(key)
+        _INDEX[key] = idx  # 최근 사용을 뒤로 (LRU)
+        while len(_INDEX) > INDEX_CACHE_MAX:
+            _INDEX.pop(next(iter(_INDEX)))
+    return idx
+
+# ─────────────────────────────────────────────────────────────
+# search
+# ─────────────────────────────────────────────────────────────
+def fd_log_search(path, level=None, pattern: str = "", t_from=None, t_to=None,
+                  limit: int = SEARCH_MAX_LINES, ignore_case: bool = True, date: str = "") -> dict:
+    """
+    level   : 최소 level (DEBUG/INFO/WARNING/ERROR/CRITICAL)
+    pattern : 정규식 (라인 단위)
+    t_from/t_to : epoch 또는 'YYYY-mm-dd HH:MM:SS' ('HH:MM:SS' 는 date 기준)
+    - timestamp 없는 라인(traceback 등)은 바로 앞 라인의 timestamp / level 을 따른다
+    - limit 을 넘으면 마지막 limit 개만 (truncated=True)
+    """
+    path = Path(path)
+    if not path.exists():
+        return {"ok": False, "error": "log file not found", "path": str(path)}
+    try:
+        rx = re.compile(pattern, re.I if ignore_case else 0) if pattern else None
+    except re.error as e:
+        return {"ok": False, "error": f"bad regex: {e}"}
+    min_lv = fd_log_level_no(level)
+    t0 = fd_log_parse_time(t_from, date)
+    t1 = fd_log_parse_time(t_to, date)
+    limit = max(1, min(int(limit), 20000))
+
+    idx = fd_log_index(path)
+    size = idx.refresh()
+    start = idx.seek_offset(t0)
+    parse = _TsParser()
+
+    hits = deque(maxlen=limit)
+    scanned = 0
+    truncated = False
+    cur_ts, cur_lv = None, _LEVELS["INFO"]
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        for raw in f:
+            if pos >= size or not raw.endswith(b"\n"):
+                break
+            pos += len(raw)
+            scanned += 1
+            ts = parse(raw)
+            line = raw.decode("utf-8", "ignore").rstrip("\r\n")
+            if ts is not None:
+                cur_ts = ts
+                cur_lv = fd_log_line_level(line)
+            if t1 is not None and cur_ts is not None and cur_ts > t1 + SEARCH_SKEW_SEC:
+                break
+            if t0 is not None and (cur_ts is None or cur_ts < t0):
+                continue
+            if t1 is not None and cur_ts is not None and cur_ts > t1:
+                continue
+            if min_lv and cur_lv < min_lv:
+                continue
+            if rx and not rx.search(line):
+                continue
+            if len(hits) == limit:
+                truncated = True
+            hits.append(line)
+
+    return {
+        "ok": True,
+        "path": str(path),
+        "fid": idx.fid,
+        "size": size,
+        "start": start,
+        "scanned": scanned,
+        "count": len(hits),
+        "truncated": truncated,
+        "lines": list(hits),
+    }
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "STREAM_MAX_BYTES",
+    "fd_log_file_id",
+    "fd_log_level_no",
+    "fd_log_parse_time",
+    "fd_log_line_level",
+    "LogTimeParser",
+    "fd_log_stream",
+    "LogLineIndex",
+    "fd_log_index",
+    "fd_log_search",
+]
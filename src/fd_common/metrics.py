@@ -0,0 +1,295 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# metrics.py
+# - 공용 metrics registry (counter / gauge / fixed-bucket histogram)
+#   . render()   : Prometheus text format 0.0.4 (OMS / DMS HTTP /metrics)
+#   . snapshot() : JSON dict (AId / AIc 는 MTd 메시지로 조회)
+#   . label 조합별 child 는 처음 쓸 때 만든다 (cardinality 는 호출하는 쪽 책임)
+# - stdlib only, 'src.fd_common.metrics' / 'fd_common.metrics' 어느 쪽으로 import 해도 된다
+# ─────────────────────────────────────────────────────────────────────────────
+
+import math
+import threading
+import time
+
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _fmt(v) -> str:
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return "NaN"
+    if v == math.inf:
+        return "+Inf"
+    if v == -math.inf:
+        return "-Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v) if isinstance(v, float) else str(v)
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labelstr(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)] + [f'{n}="{_esc(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+# ─────────────────────────────────────────────────────────────
+# metric types
+# ─────────────────────────────────────────────────────────────
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = "", labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values, **kv):
+        if kv:
+            values = tuple(str(kv.get(n, "")) for n in self.label_names)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name}: expected labels {self.label_names}, got {values}")
+        c = self._children.get(values)
+        if c is None:
+            with self._lock:
+                c = self._children.setdefault(values, self._new_child())
+        return c
+
+    def _default(self):
+        if self.label_names:
+            raise ValueError(f"{self.name}: labels required {self.label_names}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+class _CounterChild:
+    __slots__ = ("_v", "_lock")
+    def __init__(self):
+        self._v = 0.0
+        self._lock = threading.Lock()
+    def inc(self, v: float = 1.0):
+        if v < 0:
+            raise ValueError("counter can only increase")
+        with self._lock:
+            self._v += v
+    def get(self) -> float:
+        return self._v
+
+class Counter(_Metric):
+    kind = "counter"
+    def _new_child(self):
+        return _CounterChild()
+    def inc(self, v: float = 1.0):
+        self._default().inc(v)
+    def render(self, out: list):
+        for values, c in self._items():
+            out.append(f"{self.name}_total{_labelstr(self.label_names, values)} {_fmt(c.get())}")
+    def snapshot(self):
+        return [{"labels": dict(zip(self.label_names, v)), "value": c.get()} for v, c in self._items()]
+
+class _GaugeChild:
+    __slots__ = ("_v", "_fn", "_lock")
+    def __init__(self):
+        self._v = 0.0
+        self._fn = None
+        self._lock = threading.Lock()
+    def set(self, v: float):
+        self._v = float(v)
+    def inc(self, v: float = 1.0):
+        with self._lock:
+            self._v += v
+    def dec(self, v: float = 1.0):
+        self.inc(-v)
+    def set_function(self, fn):
+        """render 시점에 fn() 값을 쓴다 (queue 길이 등)"""
+        self._fn = fn
+    def get(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return math.nan
+        return self._v
+
+class Gauge(_Metric):
+    kind = "gauge"
+    def _new_child(self):
+        return _GaugeChild()
+    def set(self, v: float):
+        self._default().set(v)
+    def inc(self, v: float = 1.0):
+        self._default().inc(v)
+    def dec(self, v: float = 1.0):
+        self._default().dec(v)
+    def set_function(self, fn):
+        self._default().set_function(fn)
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+    def render(self, out: list):
+        for values, c in self._items():
+            out.append(f"{self.name}{_labelstr(self.label_names, values)} {_fmt(c.get())}")
+    def snapshot(self):
+        return [{"labels": dict(zip(self.label_names, v)), "value": c.get()} for v, c in self._items()]
+
+class _Timer:
+    __slots__ = ("_child", "_t0")
+    def __init__(self, child):
+        self._child = child
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._t0)
+        return False
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_count", "_lock")
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)   # 마지막은 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+    def observe(self, v: float):
+        i = bisect_left(self._bounds, v)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += v
+            self._count += 1
+    def time(self):
+        return _Timer(self)
+    def get(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+class Histogram(_Metric):
+    kind = "histogram"
+    def __init__(self, name: str, help: str = "", labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    def observe(self, v: float):
+        self._default().observe(v)
+    def time(self):
+        return self._default().time()
+    def render(self, out: list):
+        for values, c in self._items():
+            counts, s, n = c.get()
+            acc = 0
+            for b, k in zip(self.buckets + (math.inf,), counts):
+                acc += k
+                out.append(f"{self.name}_bucket{_labelstr(self.label_names, values, (('le', _fmt(b)),))} {acc}")
+            out.append(f"{self.name}_sum{_labelstr(self.label_names, values)} {_fmt(s)}")
+            out.append(f"{self.name}_count{_labelstr(self.label_names, values)} {n}")
+    def snapshot(self):
+        res = []
+        for values, c in self._items():
+            counts, s, n = c.get()
+            res.append({
+                "labels": dict(zip(self.label_names, values)),
+                "count": n, "sum": round(s, 6),
+                "buckets": {_fmt(b): k for b, k in zip(self.buckets + (math.inf,), counts)},
+            })
+        return res
+
+# ─────────────────────────────────────────────────────────────
+# registry
+# ─────────────────────────────────────────────────────────────
+class MetricsRegistry:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.start_time = time.time()
+
+    def _get(self, cls, name, help, labels, **kw):
+        full = f"{self.prefix}{name}"
+        with self._lock:
+            m = self._metrics.get(full)
+            if m is None:
+                m = self._metrics[full] = cls(full, help, labels, **kw)
+            elif not isinstance(m, cls) or m.label_names != tuple(labels):
+                raise ValueError(f"metric {full} already registered as {m.kind}{m.label_names}")
+            return m
+
+    def counter(self, name: str, help: str = "", labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", labels=()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        out = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for m in metrics:
+            if m.help:
+                out.append(f"# HELP {m.name}{'_total' if m.kind == 'counter' else ''} {m.help}")
+            out.append(f"# TYPE {m.name}{'_total' if m.kind == 'counter' else ''} {m.kind}")
+            m.render(out)
+        out.append(f"# TYPE process_start_time_seconds gauge")
+        out.append(f"process_start_time_seconds {_fmt(round(self.start_time, 3))}")
+        return "\n".join(out) + "\n"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "ts": time.time(),
+            "start_time": self.start_time,
+            "metrics": {m.name: {"type": m.kind, "values": m.snapshot()} for m in metrics},
+        }
+
+REGISTRY = MetricsRegistry()
+
+# ─────────────────────────────────────────────────────────────
+# module helpers (default registry)
+# ─────────────────────────────────────────────────────────────
+def fd_metric_counter(name: str, help: str = "", labels=()) -> Counter:
+    return REGISTRY.counter(name, help, labels)
+
+def fd_metric_gauge(name: str, help: str = "", labels=()) -> Gauge:
+    return REGISTRY.gauge(name, help, labels)
+
+def fd_metric_histogram(name: str, help: str = "", labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, help, labels, buckets)
+
+def fd_metrics_text() -> str:
+    return REGISTRY.render()
+
+def fd_metrics_snapshot() -> dict:
+    return REGISTRY.snapshot()
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "LATENCY_BUCKETS",
+    "METRICS_CONTENT_TYPE",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "REGISTRY",
+    "fd_metric_counter",
+    "fd_metric_gauge",
+    "fd_metric_histogram",
+    "fd_metrics_text",
+    "fd_metrics_snapshot",
+]
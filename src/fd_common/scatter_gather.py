@@ -0,0 +1,232 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# scatter_gather.py
+# - session fan-out (AId → AIc ...) 공용
+#   . scatter : 여러 node 에 동시에 전송 (node 하나가 느려도 나머지는 바로)
+#   . gather  : (node, Token, Section3) 별 Future 를 등록 → 응답 callback 에서 resolve()
+#               전부 (또는 quorum) 도착하면 바로 반환, node 별 timeout
+#   . timeout 뒤에 온 응답은 late 로 집계 (버리지만 숫자는 남긴다)
+#   . trace span 안에서 부르면 gather 도 하위 span + packet 에 TraceParent
+# ─────────────────────────────────────────────────────────────────────────────
+
+import itertools
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, wait as futures_wait, FIRST_COMPLETED
+from typing import Callable, Dict, Optional
+
+from fd_common.metrics import fd_metric_histogram, fd_metric_counter
+from fd_common.tracing import fd_trace_current, fd_trace_inject, fd_trace_span
+
+_M_GATHER_SEC = fd_metric_histogram("fanout_gather_seconds", "scatter/gather until all/quorum replied or timeout", ("kind",))
+_M_REPLY_SEC  = fd_metric_histogram("fanout_reply_seconds", "per-node reply time", ("kind",))
+_M_TIMEOUTS   = fd_metric_counter("fanout_timeouts", "nodes that did not reply in time", ("kind",))
+_M_LATE       = fd_metric_counter("fanout_late_replies", "replies that arrived after the gather finished", ("kind",))
+
+LATE_KEEP = 512   # late 판정용으로 기억하는 끝난 key 수
+
+class GatherResult:
+    __slots__ = ("kind", "token", "replies", "rtt_ms", "missing", "errors", "elapsed")
+
+    def __init__(self, kind: str, token: str):
+        self.kind = kind
+        self.token = token
+        self.replies: Dict[str, dict] = {}     # node → 응답
+        self.rtt_ms: Dict[str, float] = {}
+        self.missing: list = []                # timeout
+        self.errors: Dict[str, str] = {}       # 전송 실패 / session 없음
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.errors
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "token": self.token, "ok": self.ok,
+                "replied": sorted(self.replies), "rtt_ms": self.rtt_ms,
+                "missing": self.missing, "errors": self.errors,
+                "elapsed_ms": round(self.elapsed * 1000, 1)}
+
+class ScatterGather:
+    def __init__(self, send: Callable[[str, dict], bool], name: str = "fanout",
+                 max_workers: int = 8, log: Callable[[str], None] = None):
+        """
+        send : (node, packet) -> bool   - 실제 전송 (session.send_msg 등)
+        """
+        self._send = send
+        self.name = name
+        self._log = log or (lambda m: None)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix=f"{name}-send")
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, tuple] = {}               # key → (future, t_sent, kind)
+        self._done: "OrderedDict[tuple, str]" = OrderedDict()  # 끝난 key → kind (late 집계)
+        self._seq = itertools.count(1)
+        self.late = 0
+
+    @staticmethod
+    def _key(node: str, token: str, section3: str) -> tuple:
+        return (str(node), str(token), str(section3))
+
+    def make_token(self) -> str:
+        ms = int(time.time() * 1000)
+        return f"{self.name}_{ms}_{next(self._seq)}"
+
+    # ── scatter ───────────────────────────────────────────────
+    def scatter(self, nodes, build) -> Dict[str, bool]:
+        """응답을 기다리지 않는 동시 전송. build: dict 또는 (node) -> dict"""
+        nodes = [str(n) for n in nodes]
+        packets = {n: dict(build(n) if callable(build) else build) for n in nodes}
+        for p in packets.values():
+            fd_trace_inject(p)
+        futs = {n: self._pool.submit(self._send, n, packets[n]) for n in nodes}
+        res = {}
+        for n, f in futs.items():
+            try:
+                res[n] = bool(f.result())
+            except Exception as e:
+                self._log(f"[{self.name}] send to {n} failed: {e!r}")
+                res[n] = False
+        return res
+
+    # ── gather ────────────────────────────────────────────────
+    def gather(self, nodes, build, timeout: float = 5.0, quorum: Optional[int] = None,
+               node_timeout: Optional[Dict[str, float]] = None) -> GatherResult:
+        """
+        build        : packet dict 또는 (node) -> dict  (Token 이 비어 있으면 새로 만든다)
+        quorum       : 이만큼 응답이 모이면 바로 반환 (None → 전부)
+        node_timeout : {node: sec} - node 별 timeout (없으면 timeout)
+        """
+        if fd_trace_current() is None:
+            return self._gather(nodes, build, timeout, quorum, node_timeout)
+        with fd_trace_span(f"{self.name}:gather") as span:
+            res = self._gather(nodes, build, timeout, quorum, node_timeout)
+            span.set(kind=res.kind, replied=len(res.replies), missing=res.missing, errors=len(res.errors))
+            if not res.ok:
+                span.status = "partial"
+            return res
+
+    def _gather(self, nodes, build, timeout, quorum, node_timeout) -> GatherResult:
+        t0 = time.perf_counter()
+        packets, build_errors = {}, {}
+        for n in dict.fromkeys(str(n) for n in nodes):
+            try:
+                packets[n] = dict(build(n) if callable(build) else build)
+            except Exception as e:
+                build_errors[n] = f"build: {type(e).__name__}: {e}"
+        nodes = list(packets)
+        token = next((p.get("Token") for p in packets.values() if p.get("Token")), "") or self.make_token()
+        kind = ""
+        futs: Dict[str, Future] = {}
+        deadlines: Dict[str, float] = {}
+        with self._lock:
+            for n, p in packets.items():
+                p["Token"] = p.get("Token") or token
+                fd_trace_inject(p)
+                kind = kind or f"{p.get('Section2', '')}/{p.get('Section3', '')}"
+                f = Future()
+                self._pending[self._key(n, p["Token"], p.get("Section3", ""))] = (f, t0, kind)
+                futs[n] = f
+                deadlines[n] = t0 + float((node_timeout or {}).get(n, timeout))
+        res = GatherResult(kind, token)
+        res.errors.update(build_errors)
+
+        # 동시 전송 - 실패한 node 는 바로 error
+        def _send_one(n):
+            try:
+                err = None if self._send(n, packets[n]) else ConnectionError("send failed (no session?)")
+            except Exception as e:
+                err = e
+            if err is not None:
+                try:
+                    futs[n].set_exception(err)
+                except InvalidStateError:
+                    pass
+        for n in nodes:
+            self._pool.submit(_send_one, n)
+
+        need = len(nodes) if quorum is None else max(0, min(int(quorum), len(nodes)))
+        waiting = set(nodes)
+        while waiting and len(res.replies) < need:
+            now = time.perf_counter()
+            for n in [n for n in waiting if deadlines[n] <= now]:
+                waiting.discard(n)
+                res.missing.append(n)
+            if not waiting:
+                break
+            done, _ = futures_wait([futs[n] for n in waiting], timeout=min(deadlines[n] for n in waiting) - now,
+                                   return_when=FIRST_COMPLETED)
+            for n in [n for n in waiting if futs[n].done()]:
+                waiting.discard(n)
+                try:
+                    res.replies[n], t_reply = futs[n].result()
+                    res.rtt_ms[n] = round((t_reply - t0) * 1000, 2)
+                    _M_REPLY_SEC.labels(kind).observe(t_reply - t0)
+                except Exception as e:
+                    res.errors[n] = f"{type(e).__name__}: {e}"
+        timed_out = len(res.missing)
+        # quorum 으로 먼저 끝났으면 남은 것도 missing (나중에 오면 late 로 집계)
+        res.missing.extend(sorted(waiting))
+        res.elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            for n, p in packets.items():
+                key = self._key(n, p["Token"], p.get("Section3", ""))
+                self._pending.pop(key, None)
+                if n in res.missing:
+                    self._done[key] = kind
+            while len(self._done) > LATE_KEEP:
+                self._done.popitem(last=False)
+        if timed_out:
+            _M_TIMEOUTS.labels(kind).inc(timed_out)
+        _M_GATHER_SEC.labels(kind).observe(res.elapsed)
+        return res
+
+    def gather_async(self, nodes, build, timeout: float = 5.0, quorum: Optional[int] = None,
+                     node_timeout: Optional[Dict[str, float]] = None) -> Future:
+        """gather() 를 background 로 - 호출한 thread 는 바로 다음 일로 (add_done_callback 으로 결과)"""
+        fut = Future()
+
+        def _run():
+            try:
+                fut.set_result(self.gather(nodes, build, timeout, quorum, node_timeout))
+            except Exception as e:
+                fut.set_exception(e)
+        threading.Thread(target=_run, daemon=True, name=f"{self.name}-gather").start()
+        return fut
+
+    # ── 응답 (session recv callback) ──────────────────────────
+    def resolve(self, node: str, msg: dict) -> bool:
+        """기다리던 응답 (또는 늦은 응답) 이면 True - 호출자는 더 처리하지 않아도 된다"""
+        key = self._key(node, msg.get("Token", ""), msg.get("Section3", ""))
+        with self._lock:
+            ent = self._pending.get(key)
+            if ent is None:
+                kind = self._done.pop(key, None)
+                if kind is None:
+                    return False
+                self.late += 1
+        if ent is None:
+            _M_LATE.labels(kind).inc()
+            self._log(f"[{self.name}] late reply from {node}: {kind} token={key[1]}")
+            return True
+        try:
+            ent[0].set_result((msg, time.perf_counter()))
+        except InvalidStateError:
+            pass  # 같은 응답이 두 번
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "GatherResult",
+    "ScatterGather",
+]
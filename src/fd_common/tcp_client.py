@@ -2,8 +2,10 @@ import socket
 import errno
 import struct
 import threading
+import json
 
 from fd_utils.fd_logging        import fd_log
+from fd_common.attach           import AttachLink, FRAME_BINARY, FRAME_JSON, fd_frame_pack
 
 
 class TCPClient:
@@ -12,11 +14,12 @@ class TCPClient:
         self.serv_addr = ()
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setblocking(0)
-        self.buf = bytearray()
         self.lock = threading.Lock()
         self.stop_evt = threading.Event()
         self.recv_th = None
         self.cb = None
+        self.attach_cb = None     # (msg dict, [Attachment]) - 없으면 cb(JSON text)
+        self.link = AttachLink(self._send_frame, name=name or "tcp")
 
     def connect(self, ip: str, port: int, callback=None, timeout: int=3) -> bool:
         try:
@@ -32,13 +35,26 @@ class TCPClient:
                 fd_log.error(f'Failed to create socket [{self.name}] : {e.strerror}')
                 return False
 
-        self.cb = callback
-        self.recv_th = threading.Thread(target=self.recv_thread_func)
-        self.recv_th.start()
+        self.cb = callback or self.cb
+        self.start_recv()
         fd_log.debug(f'Connection successful [{self.name}]')
         return True
 
+    def set_callback(self, callback):
+        self.cb = callback
+
+    def set_attach_callback(self, callback):
+        """flag 1 (JSON + 첨부) 메시지를 (msg, attachments) 로 받는다"""
+        self.attach_cb = callback
+
+    def start_recv(self):
+        if self.recv_th and self.recv_th.is_alive():
+            return
+        self.recv_th = threading.Thread(target=self.recv_thread_func, daemon=True)
+        self.recv_th.start()
+
     def close(self):
+        self.link.close()
         self.sock.close()
         self.serv_addr = ()
         self.stop_evt.set()
@@ -59,17 +75,19 @@ class TCPClient:
         return self.serv_addr[0] if len(self.serv_addr) > 0 else None
         
     def recv_all(self, size: int) -> bytes:
-        data = b''
-        while size > 0:
-            packet = self.sock.recv(min(size, 1024))
-            if not packet:
+        data = bytearray(size)
+        view = memoryview(data)
+        got = 0
+        while got < size:
+            n = self.sock.recv_into(view[got:], min(size - got, 1024 * 1024))
+            if not n:
                 return b''
-            data += packet
-            size -= len(packet)
+            got += n
         return data
 
     def recv_thread_func(self):
         header_len = struct.calcsize('<IB')
+        self.link.bind_reader()
         while not self.stop_evt.is_set():
             try:
                 header = self.recv_all(header_len)
@@ -83,57 +101,69 @@ class TCPClient:
                         fd_log.error(f"recv data error")
                         break
                     
-                    if self.cb:
+                    if data_type == FRAME_BINARY:
+                        self._on_binary(data)
+                    elif self.cb:
                         self.cb(data.decode())
-                        
+
             except socket.error as e:
                 ip, port = '', ''
                 if len(self.serv_addr) > 1:
                     ip, port = self.serv_addr[0], self.serv_addr[1]
                 fd_log.error(f'Recv error [{self.name}] : {e.strerror}')
                 break
+        self.link.close()
         self.sock.close()
         fd_log.debug(f'Finish recv thread')
 
+    def _on_binary(self, body):
+        try:
+            res = self.link.on_frame(body)
+        except Exception as e:
+            fd_log.error(f'Binary frame error [{self.name}] : {e}')
+            return
+        if res is None:
+            return
+        msg, attachments = res
+        if self.attach_cb:
+            self.attach_cb(msg, attachments)
+        elif self.cb:
+            self.cb(json.dumps(msg, ensure_ascii=False))
+
     def send_flush(self, data) -> int:
         # 버퍼링 없이 데이터 전송
         sent_bytes = 0
+        view = memoryview(data)
         while sent_bytes < len(data):
-            remaining_bytes = len(data) - sent_bytes
-            sent = self.sock.send(data[sent_bytes:sent_bytes + remaining_bytes])
+            sent = self.sock.send(view[sent_bytes:])
             if sent == 0:
                 raise ConnectionError("[app] socket connection broken")
             sent_bytes += sent
         return sent_bytes
 
-    def send_msg(self, msg) -> bool:
+    def _send_frame(self, frame: bytes):
+        with self.lock:
+            self.send_flush(frame)
+
+    def send_msg(self, msg, attachments=None) -> bool:
+        """
+        msg         : JSON text (또는 dict)
+        attachments : [Attachment] - 있으면 flag 1 (큰 것은 chunk + ack)
+        """
         if not self.is_connected():
             fd_log.error(f'Fail to send message: Disconnected:\n{msg}')
             return False
 
-        msg_len = len(msg)
-        # !: big-endian byte order, <: little-endian byte order
-        # B: unsigned byte, 1btye, I: unsigned integer, 4bytes
-        header_data = struct.pack('<IB', msg_len, 0x00)
-        header_len = len(header_data)
-        msg_bytes = msg.encode('utf-8')
-        pkt_size = len(header_data) + msg_len
+        try:
+            if attachments:
+                self.link.send(json.loads(msg) if isinstance(msg, str) else msg, attachments)
+            else:
+                # !: big-endian byte order, <: little-endian byte order
+                # B: unsigned byte, 1btye, I: unsigned integer, 4bytes
+                msg_bytes = (json.dumps(msg) if isinstance(msg, dict) else msg).encode('utf-8')
+                self._send_frame(fd_frame_pack(FRAME_JSON, msg_bytes))
+        except Exception as e:
+            fd_log.error(f'Send error: {e}')
+            return False
 
-        with self.lock:
-            # resize buffer
-            if len(self.buf) < pkt_size:
-                self.buf = bytearray(pkt_size)
-                
-            self.buf[:header_len] = header_data
-            self.buf[header_len:] = msg_bytes
-            
-            try:
-                send_size = self.send_flush(self.buf)
-                if send_size != pkt_size:
-                    fd_log.error(f'Send error.. size: {send_size} / {pkt_size}')
-                    return False
-            except Exception as e:
-                fd_log.error(f'Send error: {e}')
-                return False
-        
-        return True
\ No newline at end of file
+        return True
@@ -5,8 +5,10 @@ import struct
 import threading
 import time
 import traceback
+import json
 
 from fd_utils.fd_logging import fd_log
+from fd_common.attach import AttachLink, FRAME_BINARY, FRAME_MAX
 
 cur_path = os.path.abspath(os.path.dirname(__file__))
 common_path = os.path.abspath(os.path.join(cur_path, '..'))
@@ -19,15 +21,26 @@ _SERVER_REG = {}
 _SERVER_LOCK = threading.Lock()
 
 
-def _recv_exact(sock, n: int) -> bytes:
+def _recv_exact(sock, n: int) -> bytearray:
     """TCP에서 n바이트 정확히 수신. 부족하면 계속 recv."""
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = sock.recv(n - len(buf))
-        if not chunk:
-            raise ConnectionError(f"peer closed while expecting {n} bytes (got {len(buf)}/{n})")
-        buf.extend(chunk)
-    return bytes(buf)
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:], n - got)
+        if not k:
+            raise ConnectionError(f"peer closed while expecting {n} bytes (got {got}/{n})")
+        got += k
+    return buf
+
+def _send_flush(sock, data):
+    view = memoryview(data)
+    sent = 0
+    while sent < len(view):
+        n = sock.send(view[sent:])
+        if n == 0:
+            raise RuntimeError("[app] socket connection broken")
+        sent += n
 
 
 class TCPServer:
@@ -41,6 +54,8 @@ class TCPServer:
         self.listen_thread = None
         self.end = False
         self.cb = handle
+        self.attach_cb = None     # (msg dict, [Attachment]) - 없으면 cb(JSON text)
+        self.links = {}           # sock → AttachLink (session 별 send lock + chunk 조립)
         self._is_alias = False
 
         fd_log.info(f"[{self.name}] TCPServer.__init__ host={host} port={port}")
@@ -108,6 +123,7 @@ class TCPServer:
                 session_thread = threading.Thread(target=self._session_loop, args=(conn, addr), daemon=True)
                 with self.lock:
                     self.session_list.append((conn, addr, session_thread))
+                    self.links[conn] = self._make_link(conn, addr)
                 session_thread.start()
 
             except socket.timeout:
@@ -123,6 +139,10 @@ class TCPServer:
         fd_log.info(f"[{self.name}] start() end listening.. ")
 
     def _session_loop(self, conn, addr):
+        with self.lock:
+            link = self.links.get(conn)
+        if link:
+            link.bind_reader()
         try:
             while not self.end:
                 # 1) 헤더 정확히 5바이트
@@ -130,13 +150,18 @@ class TCPServer:
                 body_len, flag = struct.unpack('<IB', header_data)
 
                 # sanity check (64MB 상한)
-                if body_len < 0 or body_len > (64 * 1024 * 1024):
+                if body_len < 0 or body_len > FRAME_MAX:
                     raise ValueError(f"invalid body length: {body_len}")
 
                 # 2) 본문 정확히 body_len바이트
                 body_data = _recv_exact(conn, body_len)
 
-                # 3) 콜백 호출 (예외는 세션 유지)
+                # 3) JSON + binary (flag 1) → 첨부 조립 / ack
+                if flag == FRAME_BINARY:
+                    self._on_binary(conn, addr, body_data)
+                    continue
+
+                # 4) 콜백 호출 (예외는 세션 유지)
                 if self.cb:
                     try:
                         self.cb(body_data.decode('utf-8', errors='strict'))
@@ -156,6 +181,9 @@ class TCPServer:
                 pass
             with self.lock:
                 self.session_list = [s for s in self.session_list if s[1] != addr]
+                link = self.links.pop(conn, None)
+            if link:
+                link.close()
             fd_log.info(f"[{self.name}] session end {addr[0]}:{addr[1]}")
 
     def close(self):
@@ -206,26 +234,61 @@ class TCPServer:
         with self.lock:
             return len(self.session_list) > 0
 
-    def send_msg(self, msg, target=None):
-        header = struct.pack('<IB', len(msg), 0)
-        payload = msg.encode('utf-8', errors='strict')
+    def set_attach_callback(self, callback):
+        """flag 1 (JSON + 첨부) 메시지를 (msg, attachments) 로 받는다"""
+        self.attach_cb = callback
+
+    def _make_link(self, conn, addr) -> AttachLink:
+        lock = threading.Lock()
+
+        def _send_raw(frame):
+            with lock:
+                _send_flush(conn, frame)
+        return AttachLink(_send_raw, name=f"{self.name}:{addr[0]}:{addr[1]}")
+
+    def _on_binary(self, conn, addr, body):
         with self.lock:
-            targets = list(self.session_list)
-        for sock, addr, _ in targets:
+            link = self.links.get(conn)
+        if link is None:
+            return
+        try:
+            res = link.on_frame(body)
+        except Exception as e:
+            fd_log.error(f"[{self.name}] binary frame error from {addr[0]}:{addr[1]} : {e}")
+            return
+        if res is None:
+            return
+        msg, attachments = res
+        try:
+            if self.attach_cb:
+                self.attach_cb(msg, attachments)
+            elif self.cb:
+                self.cb(json.dumps(msg, ensure_ascii=False))
+        except Exception as cb_e:
+            fd_log.error(f"[{self.name}] callback error from {addr[0]}:{addr[1]} : {cb_e}")
+
+    def send_msg(self, msg, target=None, attachments=None, chunked=True):
+        """
+        msg         : JSON text (또는 dict)
+        attachments : [Attachment] - 있으면 flag 1 (큰 것은 chunk + ack, 다른 메시지가 사이에 끼어들 수 있다)
+        chunked     : False → frame 하나 (ack 를 보내지 않는 peer - MTd)
+        """
+        if attachments:
+            msg = json.loads(msg) if isinstance(msg, str) else msg
+        else:
+            body = (json.dumps(msg) if isinstance(msg, dict) else msg).encode('utf-8', errors='strict')
+        with self.lock:
+            targets = [(addr, self.links.get(sock)) for sock, addr, _ in self.session_list]
+        for addr, link in targets:
+            if link is None:
+                continue
             if target is None or target == addr[0]:
-                self._send_flush(sock, header)
-                self._send_flush(sock, payload)
+                if attachments:
+                    link.send(msg, attachments, chunked)
+                else:
+                    link.send_text(body)
                 if target is not None:
                     break
 
-    def _send_flush(self, sock, data: bytes):
-        sent = 0
-        while sent < len(data):
-            n = sock.send(data[sent:])
-            if n == 0:
-                raise RuntimeError("[app] socket connection broken")
-            sent += n
-
-
 if __name__ == "__main__":
     pass
@@ -0,0 +1,299 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# tracing.py
+# - Token 기준 span tracing (OMS → MTd → AId → AIc → ffmpeg) - 외부 backend 없이 local 만
+#   . span   : {token, span, parent, svc, host, name, ts, dur_ms, status, attrs}
+#   . 끝난 span 은 process 별 ring buffer (최근 TRACE_RING 개) + JSON lines file (선택)
+#   . 현재 span 은 contextvar - 같은 thread 안의 하위 span 은 token/parent 를 물려받는다
+#   . daemon 경계 : packet 의 "Token" + "TraceParent" (fd_trace_inject / fd_trace_span(pkt=...))
+#   . OMS 는 각 daemon 의 span 을 모아서 fd_trace_timeline() 으로 hop 별 시간을 본다
+#     (node 간 시계 차이만큼 offset 은 어긋날 수 있다 - dur_ms 는 각자 perf_counter)
+# - stdlib only, 'src.fd_common.tracing' / 'fd_common.tracing' 어느 쪽으로 import 해도 된다
+# ─────────────────────────────────────────────────────────────────────────────
+
+import contextvars
+import json
+import os
+import socket
+import threading
+import time
+
+from collections import deque
+from pathlib import Path
+
+TRACE_RING = 4096
+
+_current: contextvars.ContextVar = contextvars.ContextVar("fd_trace_span", default=None)
+
+class Span:
+    __slots__ = ("tracer", "token", "span", "parent", "name", "t0", "p0", "attrs", "status", "_cv", "_done")
+
+    def __init__(self, tracer, name: str, token: str, parent: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.token = token
+        self.parent = parent or ""
+        self.span = os.urandom(6).hex()
+        self.attrs = dict(attrs or {})
+        self.status = "ok"
+        self.t0 = time.time()
+        self.p0 = time.perf_counter()
+        self._cv = None
+        self._done = False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def fail(self, error):
+        ''' 예외를 잡아서 처리하는 쪽에서 - span 은 error 로 끝난다 '''
+        self.status = "error"
+        self.attrs["error"] = str(error)[:300]
+        return self
+
+    def end(self, status: str = None, **attrs) -> dict:
+        ''' 끝 (두 번째 호출은 무시) → ring / file 에 기록 '''
+        if self._done:
+            return {}
+        self._done = True
+        if status:
+            self.status = status
+        self.attrs.update(attrs)
+        rec = {"token": self.token, "span": self.span, "parent": self.parent,
+               "svc": self.tracer.service, "host": self.tracer.host, "name": self.name,
+               "ts": round(self.t0, 6), "dur_ms": round((time.perf_counter() - self.p0) * 1000, 3),
+               "status": self.status, "attrs": self.attrs}
+        self.tracer.record(rec)
+        return rec
+
+    def __enter__(self):
+        self._cv = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._cv is not None:
+            _current.reset(self._cv)
+            self._cv = None
+        if exc_type is not None:
+            self.end("error", error=f"{exc_type.__name__}: {exc}"[:300])
+        else:
+            self.end()
+        return False
+
+class _NullSpan:
+    ''' token 이 없거나 tracing off - with 문은 그대로 쓰고 아무것도 남기지 않는다 '''
+    token = span = parent = ""
+
+    def set(self, **attrs):
+        return self
+
+    def fail(self, error):
+        return self
+
+    def end(self, status: str = None, **attrs) -> dict:
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL = _NullSpan()
+
+class Tracer:
+    def __init__(self, service: str = "", capacity: int = TRACE_RING):
+        self.service = service or f"pid{os.getpid()}"
+        self.host = socket.gethostname()
+        self.enabled = True
+        self.ring: deque = deque(maxlen=max(16, int(capacity)))
+        self.lock = threading.Lock()
+        self.sink_dir = None
+        self.recorded = 0
+
+    def setup(self, service: str = None, capacity: int = None, sink_dir=None, enabled: bool = True):
+        ''' daemon 시작할 때 한 번 - sink_dir 이 있으면 span 마다 <sink_dir>/spans-YYYY-MM-DD.jsonl 에 추가 '''
+        with self.lock:
+            if service:
+                self.service = service
+            if capacity:
+                self.ring = deque(self.ring, maxlen=max(16, int(capacity)))
+            self.sink_dir = Path(sink_dir) if sink_dir else None
+            self.enabled = bool(enabled)
+        if self.sink_dir is not None:
+            self.sink_dir.mkdir(parents=True, exist_ok=True)
+        return self
+
+    # ── span ──────────────────────────────────────────────────
+    def span(self, name: str, token: str = None, parent: str = None, pkt: dict = None, **attrs):
+        '''
+        with fd_trace_span("Operation/Production", pkt=msg): ...
+        - token / parent 가 없으면 pkt ("Token" / "TraceParent") → 현재 span 순서로
+        - 결국 token 이 없으면 아무것도 남기지 않는다 (_NullSpan)
+        '''
+        if not self.enabled:
+            return _NULL
+        cur = _current.get()
+        if pkt is not None:
+            token = token or pkt.get("Token") or ""
+            parent = parent or pkt.get("TraceParent") or ""
+        if not token and cur is not None:
+            token = cur.token
+        if not parent and cur is not None and cur.token == token:
+            parent = cur.span
+        if not token:
+            return _NULL
+        return Span(self, name, str(token), parent, attrs)
+
+    def record(self, rec: dict):
+        with self.lock:
+            self.ring.append(rec)
+            self.recorded += 1
+            sink = self.sink_dir
+        if sink is not None:
+            try:
+                line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=str)
+                with self.lock, open(sink / f"spans-{time.strftime('%Y-%m-%d', time.localtime(rec['ts']))}.jsonl",
+                                     "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except Exception:
+                pass
+
+    # ── 조회 ──────────────────────────────────────────────────
+    def spans(self, token: str = None, since: float = None, limit: int = None) -> list:
+        with self.lock:
+            out = [s for s in self.ring
+                   if (token is None or s["token"] == token) and (since is None or s["ts"] >= since)]
+        return out[-int(limit):] if limit else out
+
+    def tokens(self, limit: int = 50) -> list:
+        ''' 최근 token 요약 (마지막 span 이 끝난 순서, 최신이 앞) '''
+        with self.lock:
+            spans = list(self.ring)
+        by = {}
+        for s in spans:
+            t = by.setdefault(s["token"], {"token": s["token"], "spans": 0, "begin": s["ts"], "end": 0.0,
+                                           "names": [], "errors": 0})
+            t["spans"] += 1
+            t["begin"] = min(t["begin"], s["ts"])
+            t["end"] = max(t["end"], s["ts"] + s["dur_ms"] / 1000)
+            t["errors"] += s["status"] != "ok"
+            if not s["parent"] and s["name"] not in t["names"]:
+                t["names"].append(s["name"])
+        out = sorted(by.values(), key=lambda t: t["end"], reverse=True)[:max(1, int(limit))]
+        for t in out:
+            t["dur_ms"] = round((t["end"] - t["begin"]) * 1000, 3)
+        return out
+
+    def export_jsonl(self, path, token: str = None) -> int:
+        ''' ring 의 span 을 JSON lines 로 (token 지정시 그것만) → 기록한 줄 수 '''
+        spans = self.spans(token)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        return len(spans)
+
+    def status(self) -> dict:
+        with self.lock:
+            return {"service": self.service, "enabled": self.enabled, "spans": len(self.ring),
+                    "capacity": self.ring.maxlen, "recorded": self.recorded,
+                    "sink": str(self.sink_dir) if self.sink_dir else ""}
+
+TRACER = Tracer()
+
+# ─────────────────────────────────────────────────────────────
+# module 함수 (process 하나에 TRACER 하나)
+# ─────────────────────────────────────────────────────────────
+def fd_trace_setup(service: str, capacity: int = None, sink_dir=None, enabled: bool = True) -> Tracer:
+    return TRACER.setup(service, capacity, sink_dir, enabled)
+
+def fd_trace_span(name: str, token: str = None, parent: str = None, pkt: dict = None, **attrs):
+    return TRACER.span(name, token, parent, pkt, **attrs)
+
+def fd_trace_current():
+    return _current.get()
+
+def fd_trace_context() -> dict:
+    ''' 다른 thread / daemon 으로 넘길 {"Token", "TraceParent"} (현재 span 이 없으면 {}) '''
+    cur = _current.get()
+    return {"Token": cur.token, "TraceParent": cur.span} if cur is not None else {}
+
+def fd_trace_inject(pkt: dict) -> dict:
+    ''' 나가는 packet 에 TraceParent (현재 span 과 같은 Token 일 때만) '''
+    cur = _current.get()
+    if cur is not None and (pkt.get("Token") or cur.token) == cur.token:
+        pkt["Token"] = cur.token
+        pkt["TraceParent"] = cur.span
+    return pkt
+
+def fd_trace_spans(token: str = None, since: float = None, limit: int = None) -> list:
+    return TRACER.spans(token, since, limit)
+
+def fd_trace_tokens(limit: int = 50) -> list:
+    return TRACER.tokens(limit)
+
+def fd_trace_timeline(spans: list, token: str = "") -> dict:
+    '''
+    여러 daemon 의 span 을 한 token 의 timeline 으로
+    - spans : 시작 순서, offset_ms (가장 이른 span 기준) / depth (parent 사슬)
+    - self_ms : 자기 시간 - 자식 span 시간 (겹치는 자식은 합이 넘칠 수 있어 0 에서 자른다)
+    - hops : svc 별 span 수 / 전체 시간 / self_ms 합 (가장 큰 것이 "어느 hop 이 느린가")
+    '''
+    spans = sorted({s["span"]: s for s in spans}.values(), key=lambda s: s["ts"])
+    if not spans:
+        return {"token": token, "begin": None, "total_ms": 0.0, "spans": [], "hops": []}
+    by_id = {s["span"]: s for s in spans}
+    child_ms = {}
+    for s in spans:
+        if s["parent"] in by_id:
+            child_ms[s["parent"]] = child_ms.get(s["parent"], 0.0) + s["dur_ms"]
+
+    def depth(s):
+        d, seen = 0, set()
+        while s["parent"] in by_id and s["parent"] not in seen:
+            seen.add(s["parent"])
+            s = by_id[s["parent"]]
+            d += 1
+        return d
+
+    begin = spans[0]["ts"]
+    end = max(s["ts"] + s["dur_ms"] / 1000 for s in spans)
+    rows, hops = [], {}
+    for s in spans:
+        self_ms = max(0.0, s["dur_ms"] - child_ms.get(s["span"], 0.0))
+        rows.append({**s, "offset_ms": round((s["ts"] - begin) * 1000, 3), "depth": depth(s),
+                     "self_ms": round(self_ms, 3)})
+        h = hops.setdefault(s["svc"], {"svc": s["svc"], "hosts": [], "spans": 0, "self_ms": 0.0,
+                                       "first_ms": None, "last_ms": 0.0, "errors": 0})
+        h["spans"] += 1
+        h["self_ms"] += self_ms
+        h["errors"] += s["status"] != "ok"
+        if s["host"] not in h["hosts"]:
+            h["hosts"].append(s["host"])
+        off = (s["ts"] - begin) * 1000
+        h["first_ms"] = off if h["first_ms"] is None else min(h["first_ms"], off)
+        h["last_ms"] = max(h["last_ms"], off + s["dur_ms"])
+    for h in hops.values():
+        h["self_ms"] = round(h["self_ms"], 3)
+        h["first_ms"] = round(h["first_ms"], 3)
+        h["last_ms"] = round(h["last_ms"], 3)
+    return {"token": token or spans[0]["token"], "begin": begin, "total_ms": round((end - begin) * 1000, 3),
+            "spans": rows, "hops": sorted(hops.values(), key=lambda h: h["self_ms"], reverse=True)}
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "TRACE_RING",
+    "TRACER",
+    "Span",
+    "Tracer",
+    "fd_trace_setup",
+    "fd_trace_span",
+    "fd_trace_current",
+    "fd_trace_context",
+    "fd_trace_inject",
+    "fd_trace_spans",
+    "fd_trace_tokens",
+    "fd_trace_timeline",
+]
@@ -0,0 +1,458 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# work_queue.py
+# - 작은 작업 단위(unit) 를 중앙 queue 에 올리고 worker 가 남는 만큼 가져가는 구조
+#   (AId = WorkQueue, AIc = WorkWorker)
+#   . lease     : worker 가 capacity 만큼 요청 → 큰 unit(cost) 부터 lease 를 붙여서 준다
+#   . heartbeat : 처리 중인 unit 의 lease 연장 (응답의 Lost = 더 이상 내 것이 아닌 unit)
+#   . reaper    : lease 가 끝난 unit 은 다시 queue 로 (max_attempts 넘으면 failed)
+#   . complete  : 먼저 끝낸 결과만 받는다 (lease 가 끝난 뒤에 온 결과도 아직 안 끝났으면 받음)
+#                 단 그 unit 이 이미 다른 lease (다른 worker / 다음 attempt) 로 나갔으면 버린다
+# - protocol (AIc → AId request, AId → AIc response)
+#   Section1 "AIc", Section2 "Work", Section3 Lease / Heartbeat / Complete / Fail
+#   AId → AIc : Section3 "Notify" (새 job - idle worker 를 바로 깨운다)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+from typing import Callable, Dict, List, Optional
+
+from fd_common.metrics import fd_metric_counter, fd_metric_gauge, fd_metric_histogram
+
+_M_DEPTH    = fd_metric_gauge("work_queue_depth", "work units waiting for a worker")
+_M_LEASED   = fd_metric_gauge("work_units_leased", "work units currently leased")
+_M_LEASES   = fd_metric_counter("work_leases", "work units handed out", ("worker",))
+_M_REQUEUE  = fd_metric_counter("work_requeued", "work units put back on the queue", ("reason",))
+_M_FAILED   = fd_metric_counter("work_failed", "work units given up after max attempts")
+_M_UNIT_SEC = fd_metric_histogram("work_unit_seconds", "lease → complete time per unit", ("kind",),
+                                  buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600))
+
+PENDING, LEASED, DONE, FAILED, CANCELLED = "pending", "leased", "done", "failed", "cancelled"
+
+class _Unit:
+    __slots__ = ("key", "id", "job", "kind", "params", "cost", "state", "attempts",
+                 "worker", "deadline", "t_lease", "result", "error")
+
+    def __init__(self, job: str, spec: dict):
+        self.id = str(spec["id"])
+        self.key = f"{job}/{self.id}"
+        self.job = job
+        self.kind = str(spec.get("kind", ""))
+        self.params = spec.get("params") or {}
+        self.cost = float(spec.get("cost", 1.0) or 0.0)
+        self.state = PENDING
+        self.attempts = 0
+        self.worker = ""
+        self.deadline = 0.0
+        self.t_lease = 0.0
+        self.result = None
+        self.error = ""
+
+class _Job:
+    __slots__ = ("id", "kind", "spec", "keys", "left", "sent", "t_submit", "t_done", "event", "workers")
+
+    def __init__(self, job_id: str, kind: str, spec: dict):
+        self.id = job_id
+        self.kind = kind
+        self.spec = spec or {}
+        self.keys: List[str] = []
+        self.left = 0
+        self.sent = set()          # spec 을 이미 보낸 worker
+        self.t_submit = time.time()
+        self.t_done = 0.0
+        self.event = threading.Event()
+        self.workers: Dict[str, int] = {}   # worker → 끝낸 unit 수
+
+class WorkQueue:
+    def __init__(self, lease_sec: float = 30.0, max_attempts: int = 3, log: Callable[[str], None] = None):
+        self.lease_sec = float(lease_sec)
+        self.max_attempts = max(1, int(max_attempts))
+        self._log = log or (lambda m: None)
+        self._lock = threading.Lock()
+        self._units: Dict[str, _Unit] = {}
+        self._jobs: Dict[str, _Job] = {}
+        self._heap: list = []                 # (-cost, seq, key) - 큰 unit 먼저 (LPT)
+        self._seq = itertools.count()
+        self._end = threading.Event()
+        self._reaper = None
+        _M_DEPTH.set_function(lambda: sum(1 for u in list(self._units.values()) if u.state == PENDING))
+        _M_LEASED.set_function(lambda: sum(1 for u in list(self._units.values()) if u.state == LEASED))
+
+    # ── 내부 (self._lock 안에서) ───────────────────────────────
+    def _push(self, u: _Unit):
+        u.state, u.worker, u.deadline = PENDING, "", 0.0
+        heapq.heappush(self._heap, (-u.cost, next(self._seq), u.key))
+
+    def _finish(self, u: _Unit, state: str):
+        u.state, u.worker, u.deadline = state, "", 0.0
+        job = self._jobs.get(u.job)
+        if job is None:
+            return
+        job.left -= 1
+        if job.left <= 0 and not job.event.is_set():
+            job.t_done = time.time()
+            job.event.set()
+            self._log(f"[work] job {job.id} finished in {job.t_done - job.t_submit:.1f}s")
+
+    def _requeue(self, u: _Unit, reason: str):
+        if u.attempts >= self.max_attempts:
+            self._log(f"[work] {u.key} failed after {u.attempts} attempt(s): {u.error or reason}")
+            u.error = u.error or reason
+            _M_FAILED.inc()
+            self._finish(u, FAILED)
+            return
+        _M_REQUEUE.labels(reason).inc()
+        self._push(u)
+
+    # ── AId 쪽 ────────────────────────────────────────────────
+    def submit(self, units: List[dict], spec: dict = None, kind: str = "", job_id: str = "") -> str:
+        """
+        units : [{"id", "kind", "params", "cost"}]  (id 는 job 안에서 unique)
+        spec  : job 공통 정보 - worker 마다 처음 한 번만 보낸다
+        """
+        job_id = job_id or f"{kind or 'job'}_{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            if job_id in self._jobs:
+                raise ValueError(f"job {job_id} already submitted")
+            job = self._jobs[job_id] = _Job(job_id, kind, spec)
+            for s in units:
+                u = _Unit(job_id, s)
+                if u.key in self._units:
+                    raise ValueError(f"duplicate unit id {u.id}")
+                self._units[u.key] = u
+                job.keys.append(u.key)
+                self._push(u)
+            job.left = len(job.keys)
+            if not job.keys:
+                job.t_done = time.time()
+                job.event.set()
+        self._log(f"[work] job {job_id}: {len(units)} unit(s), cost {sum(float(s.get('cost', 1.0) or 0.0) for s in units):.1f}")
+        return job_id
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> bool:
+        job = self._jobs.get(job_id)
+        return True if job is None else job.event.wait(timeout)
+
+    def cancel(self, job_id: str) -> int:
+        """남은 unit 을 모두 cancelled 로 (처리 중인 worker 는 다음 heartbeat 에서 Lost 로 안다)"""
+        n = 0
+        with self._lock:
+            job = self._jobs.get(job_id)
+            for key in (job.keys if job else []):
+                u = self._units[key]
+                if u.state in (PENDING, LEASED):
+                    self._finish(u, CANCELLED)
+                    n += 1
+        return n
+
+    def forget(self, job_id: str):
+        """끝난 job 정리 (job_status 를 읽은 뒤)"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            for key in (job.keys if job else []):
+                self._units.pop(key, None)
+
+    def job_status(self, job_id: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {}
+            units = [self._units[k] for k in job.keys]
+            counts = {s: 0 for s in (PENDING, LEASED, DONE, FAILED, CANCELLED)}
+            for u in units:
+                counts[u.state] += 1
+            return {
+                "job": job.id, "kind": job.kind, "units": len(units), **counts,
+                "finished": job.event.is_set(),
+                "leased_ever": sum(1 for u in units if u.attempts > 0),
+                "elapsed": round((job.t_done or time.time()) - job.t_submit, 3),
+                "workers": dict(job.workers),
+                "errors": {u.id: u.error for u in units if u.state == FAILED},
+                "results": {u.id: u.result for u in units if u.state == DONE},
+            }
+
+    def status(self) -> dict:
+        with self._lock:
+            jobs = {j.id: {"units": len(j.keys), "left": j.left, "finished": j.event.is_set()}
+                    for j in self._jobs.values()}
+            leased: Dict[str, list] = {}
+            for u in self._units.values():
+                if u.state == LEASED:
+                    leased.setdefault(u.worker, []).append(u.key)
+            return {"lease_sec": self.lease_sec, "jobs": jobs, "leased": leased}
+
+    # ── worker 요청 ───────────────────────────────────────────
+    def lease(self, worker: str, capacity: int = 1) -> tuple:
+        """→ ([unit dict], {job: spec}) - spec 은 이 worker 가 처음 받는 job 것만"""
+        out, specs = [], {}
+        now = time.time()
+        with self._lock:
+            while self._heap and len(out) < max(0, int(capacity)):
+                _, _, key = heapq.heappop(self._heap)
+                u = self._units.get(key)
+                if u is None or u.state != PENDING:
+                    continue      # cancel / forget 된 것
+                u.state, u.worker = LEASED, worker
+                u.attempts += 1
+                u.t_lease, u.deadline = now, now + self.lease_sec
+                job = self._jobs[u.job]
+                if worker not in job.sent:
+                    job.sent.add(worker)
+                    specs[job.id] = job.spec
+                out.append({"Unit": u.key, "Job": u.job, "Kind": u.kind, "Params": u.params,
+                            "Attempt": u.attempts})
+        if out:
+            _M_LEASES.labels(worker).inc(len(out))
+        return out, specs
+
+    def heartbeat(self, worker: str, keys: List[str]) -> List[str]:
+        """lease 연장 → 더 이상 이 worker 것이 아닌 unit (Lost) - worker 는 그 일을 멈춘다"""
+        lost = []
+        deadline = time.time() + self.lease_sec
+        with self._lock:
+            for key in keys:
+                u = self._units.get(key)
+                if u is not None and u.state == LEASED and u.worker == worker:
+                    u.deadline = deadline
+                else:
+                    lost.append(key)
+        return lost
+
+    def complete(self, worker: str, key: str, result=None, attempt: int = 0) -> bool:
+        """attempt : 결과를 낸 lease 의 Attempt (0 = 모름 → worker 만 본다)"""
+        with self._lock:
+            u = self._units.get(key)
+            if u is None or u.state in (DONE, FAILED, CANCELLED):
+                return False
+            if u.state == LEASED and (u.worker != worker or (attempt and int(attempt) != u.attempts)):
+                # lease 가 끝난 뒤 이미 다시 나간 unit - 지금 lease 주인의 결과만 받는다
+                self._log(f"[work] stale complete for {key} from {worker} (attempt {attempt}), "
+                          f"now leased to {u.worker} (attempt {u.attempts})")
+                return False
+            if u.state == LEASED:
+                _M_UNIT_SEC.labels(u.kind).observe(time.time() - u.t_lease)
+            u.result = result
+            job = self._jobs.get(u.job)
+            if job is not None:
+                job.workers[worker] = job.workers.get(worker, 0) + 1
+            self._finish(u, DONE)
+        return True
+
+    def fail(self, worker: str, key: str, error: str = "") -> bool:
+        with self._lock:
+            u = self._units.get(key)
+            if u is None or u.state != LEASED or u.worker != worker:
+                return False
+            u.error = f"{worker}: {error}"
+            self._log(f"[work] {key} failed on {worker} (attempt {u.attempts}): {error}")
+            self._requeue(u, "fail")
+        return True
+
+    def release_worker(self, worker: str) -> int:
+        """worker 가 끊어졌을 때 - lease 를 기다리지 않고 바로 다시 queue 로"""
+        n = 0
+        with self._lock:
+            for u in self._units.values():
+                if u.state == LEASED and u.worker == worker:
+                    self._requeue(u, "release")
+                    n += 1
+        if n:
+            self._log(f"[work] worker {worker} released: {n} unit(s) re-queued")
+        return n
+
+    def reap(self) -> int:
+        """lease 가 끝난 unit 을 다시 queue 로"""
+        n = 0
+        now = time.time()
+        with self._lock:
+            for u in self._units.values():
+                if u.state == LEASED and u.deadline <= now:
+                    self._log(f"[work] lease expired: {u.key} on {u.worker}")
+                    self._requeue(u, "expired")
+                    n += 1
+        return n
+
+    def start(self):
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._end.clear()
+
+        def _loop():
+            while not self._end.wait(max(0.2, min(1.0, self.lease_sec / 4))):
+                self.reap()
+        self._reaper = threading.Thread(target=_loop, daemon=True, name="work-reaper")
+        self._reaper.start()
+
+    def stop(self):
+        self._end.set()
+
+    # ── protocol ──────────────────────────────────────────────
+    def handle(self, msg: dict) -> Optional[dict]:
+        """[AIc], [Work], [...] request → response (Work 가 아니면 None)"""
+        if msg.get("Section2") != "Work":
+            return None
+        worker = str(msg.get("Worker", ""))
+        sec3 = msg.get("Section3")
+        resp = {
+            "Section1": msg.get("Section1", "AIc"),
+            "Section2": "Work",
+            "Section3": sec3,
+            "SendState": "response",
+            "From": msg.get("To", "AId"),
+            "To": msg.get("From", "AIc"),
+            "Token": msg.get("Token", ""),
+            "Worker": worker,
+            "ResultCode": 1000,
+            "ErrorMsg": "",
+        }
+        if not worker:
+            resp.update(ResultCode=1100, ErrorMsg="Worker is empty")
+            return resp
+        match sec3:
+            case "Lease":
+                units, specs = self.lease(worker, int(msg.get("Capacity", 1) or 0))
+                resp.update(Units=units, Jobs=specs, LeaseSec=self.lease_sec)
+            case "Heartbeat":
+                resp["Lost"] = self.heartbeat(worker, list(msg.get("Units") or []))
+            case "Complete":
+                resp["Accepted"] = self.complete(worker, str(msg.get("Unit", "")), msg.get("Result"),
+                                                 int(msg.get("Attempt", 0) or 0))
+            case "Fail":
+                resp["Accepted"] = self.fail(worker, str(msg.get("Unit", "")), str(msg.get("Error", "")))
+            case _:
+                resp.update(ResultCode=1100, ErrorMsg=f"unknown Work request: {sec3}")
+        return resp
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WorkWorker
+# - slot 이 비면 Lease, 처리 중에는 Heartbeat, 끝나면 Complete / Fail
+# - rpc(section3, payload) -> response dict (timeout / 끊김 → None)
+# - handlers : {kind: (unit dict, job spec, cancel Event) -> result (JSON 가능한 값)}
+# ─────────────────────────────────────────────────────────────────────────────
+class WorkWorker:
+    def __init__(self, name: str, rpc: Callable[[str, dict], Optional[dict]], handlers: Dict[str, Callable],
+                 slots: int = 1, heartbeat_sec: float = 5.0, idle_sec: float = 10.0,
+                 log: Callable[[str], None] = None):
+        self.name = name
+        self._rpc = rpc
+        self._handlers = dict(handlers)
+        self.slots = max(1, int(slots))
+        self.heartbeat_sec = float(heartbeat_sec)
+        self.idle_sec = float(idle_sec)
+        self._log = log or (lambda m: None)
+        self._lock = threading.Lock()
+        self._running: Dict[str, threading.Event] = {}   # unit key → cancel
+        self._specs: Dict[str, dict] = {}
+        self._wake = threading.Event()
+        self._end = threading.Event()
+        self._threads = []
+        self.done = 0
+        self.failed = 0
+        self.lost = 0
+
+    def wake(self):
+        """Notify (새 job) / slot 이 비었을 때 - idle 대기를 바로 끝낸다"""
+        self._wake.set()
+
+    def _request(self, sec3: str, payload: dict) -> Optional[dict]:
+        try:
+            resp = self._rpc(sec3, dict(payload, Worker=self.name))
+        except Exception as e:
+            self._log(f"[{self.name}] work rpc {sec3} failed: {e!r}")
+            return None
+        if resp is not None and int(resp.get("ResultCode", 1000)) != 1000:
+            self._log(f"[{self.name}] work rpc {sec3} error: {resp.get('ErrorMsg')}")
+            return None
+        return resp
+
+    # ── unit 처리 thread ──────────────────────────────────────
+    def _run_unit(self, unit: dict, cancel: threading.Event):
+        key = unit["Unit"]
+        try:
+            handler = self._handlers.get(unit.get("Kind"))
+            if handler is None:
+                raise KeyError(f"no handler for kind {unit.get('Kind')!r}")
+            result = handler(unit, self._specs.get(unit.get("Job"), {}), cancel)
+            if cancel.is_set():
+                self.lost += 1
+            else:
+                self._request("Complete", {"Unit": key, "Result": result, "Attempt": unit.get("Attempt", 0)})
+                self.done += 1
+        except Exception as e:
+            if cancel.is_set():
+                self.lost += 1
+            else:
+                self.failed += 1
+                self._request("Fail", {"Unit": key, "Error": f"{type(e).__name__}: {e}"})
+        finally:
+            with self._lock:
+                self._running.pop(key, None)
+            self._wake.set()
+
+    # ── loops ─────────────────────────────────────────────────
+    def _pull_loop(self):
+        while not self._end.is_set():
+            with self._lock:
+                free = self.slots - len(self._running)
+            if free <= 0:
+                self._wake.wait(self.idle_sec)
+                self._wake.clear()
+                continue
+            resp = self._request("Lease", {"Capacity": free})
+            units = (resp or {}).get("Units") or []
+            self._specs.update((resp or {}).get("Jobs") or {})
+            for unit in units:
+                cancel = threading.Event()
+                with self._lock:
+                    self._running[unit["Unit"]] = cancel
+                threading.Thread(target=self._run_unit, args=(unit, cancel), daemon=True,
+                                 name=f"{self.name}-unit").start()
+            if not units:
+                self._wake.wait(self.idle_sec)
+                self._wake.clear()
+
+    def _heartbeat_loop(self):
+        while not self._end.wait(self.heartbeat_sec):
+            with self._lock:
+                keys = list(self._running)
+            if not keys:
+                continue
+            resp = self._request("Heartbeat", {"Units": keys})
+            for key in (resp or {}).get("Lost") or []:
+                with self._lock:
+                    cancel = self._running.get(key)
+                if cancel is not None and not cancel.is_set():
+                    self._log(f"[{self.name}] lease lost: {key}")
+                    cancel.set()
+
+    def start(self):
+        if self._threads:
+            return
+        self._end.clear()
+        for fn, nm in ((self._pull_loop, "pull"), (self._heartbeat_loop, "heartbeat")):
+            th = threading.Thread(target=fn, daemon=True, name=f"{self.name}-{nm}")
+            th.start()
+            self._threads.append(th)
+
+    def stop(self):
+        """더 가져오지 않는다 (처리 중인 unit 은 끝까지 - lease 가 끝나면 AId 가 다시 나눈다)"""
+        self._end.set()
+        self._wake.set()
+        self._threads = []
+
+    def status(self) -> dict:
+        with self._lock:
+            running = list(self._running)
+        return {"worker": self.name, "slots": self.slots, "running": running,
+                "done": self.done, "failed": self.failed, "lost": self.lost}
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "WorkQueue",
+    "WorkWorker",
+]
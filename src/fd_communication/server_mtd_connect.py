@@ -4,6 +4,11 @@ import json, struct, time, copy, socket, os
 from pathlib import Path
 from typing import Tuple
 
+from src.fd_common.metrics import fd_metric_histogram, fd_metric_counter
+
+_M_MTD_SEC = fd_metric_histogram("mtd_roundtrip_seconds", "MTd request/response round trip", ("section",))
+_M_MTD_ERR = fd_metric_counter("mtd_roundtrip_errors", "MTd round trips that raised", ("section",))
+
 
 class MtdTraceError(Exception):
     def __init__(self, msg: str, trace_tag: str):
@@ -74,6 +79,17 @@ def _send_once(host: str, port: int, js: bytes, sep_byte: bytes, timeout: float,
 # server_mtd_connect.py
 
 def tcp_json_roundtrip(host: str, port: int, message: dict, timeout: float = 10.0, trace_tag: str | None = None):
+    section = f"{message.get('Section1', '')}/{message.get('Section2', '')}/{message.get('Section3', '')}"
+    t0 = time.perf_counter()
+    try:
+        return _tcp_json_roundtrip(host, port, message, timeout, trace_tag)
+    except Exception:
+        _M_MTD_ERR.labels(section).inc()
+        raise
+    finally:
+        _M_MTD_SEC.labels(section).observe(time.perf_counter() - t0)
+
+def _tcp_json_roundtrip(host: str, port: int, message: dict, timeout: float, trace_tag: str | None):
     tag = trace_tag or _now_tag()
     outgoing = _prepare_outgoing(message)
 
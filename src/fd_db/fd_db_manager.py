@@ -4,11 +4,43 @@ import json
 from datetime                   import datetime, timedelta
 from fd_utils.fd_config_manager import conf
 from fd_utils.fd_logging        import fd_log
+from fd_db.fd_event_timeline    import EventTimeline, fd_moment_ms
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 조회 (overlay 렌더링 중 호출) 가 시즌 data 가 쌓여도 느려지지 않도록
+# - index : (name, table, columns) - 열 때마다 CREATE INDEX IF NOT EXISTS
+# - pragma: WAL (기록 중에도 읽기 가능) + synchronous NORMAL (WAL 에서는 안전) + mmap
+# ─────────────────────────────────────────────────────────────────────────────
+BASEBALL_DB_INDEXES = (
+    ("idx_pitches_event_time",       "pitches",          "event_time"),
+    ("idx_pitches_play_id",          "pitches",          "play_id"),
+    ("idx_pitches_player_type_time", "pitches",          "team_code, player_no, pitch_type, event_time"),
+    ("idx_hits_event_time",          "hits",             "event_time"),
+    ("idx_hits_play_id",             "hits",             "play_id"),
+    ("idx_pitches_raw_event_time",   "pitches_raw_data", "event_time"),
+    ("idx_pitches_raw_play_id",      "pitches_raw_data", "play_id"),
+    ("idx_hits_raw_event_time",      "hits_raw_data",    "event_time"),
+    ("idx_hits_raw_play_id",         "hits_raw_data",    "play_id"),
+)
+
+BASEBALL_DB_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous",  "NORMAL"),
+    ("mmap_size",    256 * 1024 * 1024),
+    ("cache_size",   -32000),          # KiB (음수) → 약 32MB
+    ("temp_store",   "MEMORY"),
+    ("busy_timeout", 5000),
+)
 
 class BaseballDB:
-    def __init__(self, db_file):
-        ''' SQLite database connection (creates folder if it does not exist) '''
+    def __init__(self, db_file, timeline=None):
+        '''
+        SQLite database connection (creates folder if it does not exist)
+        :param timeline: pitch/hit 시간축을 memory 에 올릴지 (None → conf._event_timeline)
+                         writer 처럼 기록만 하는 connection 은 False
+        '''
         self.db_file = os.path.abspath(db_file)
+        self.timeline = None
 
         db_dir = os.path.dirname(self.db_file)
         if not os.path.exists(db_dir):
@@ -20,17 +52,67 @@ class BaseballDB:
             self.conn.row_factory = sqlite3.Row
             self.cursor = self.conn.cursor()
             fd_log.info(f"✅ Database connection established: {self.db_file}")
+            self.apply_pragmas()
 
             if os.path.exists(self.db_file):
                 fd_log.info(f"✅ Database file exists: {self.db_file}")
                 self.update_table_schema()
             else:
                 self.create_tables()
+            self.ensure_indexes()
+            use_timeline = getattr(conf, "_event_timeline", True) if timeline is None else timeline
+            if use_timeline:
+                self.load_timeline()
 
         except sqlite3.Error as e:
             fd_log.info(f"❌ SQLite connection error: {e}")
             raise
 
+    def apply_pragmas(self):
+        ''' WAL / synchronous / mmap 등 연결 단위 설정 (journal_mode 는 file 에 남는다) '''
+        for name, value in BASEBALL_DB_PRAGMAS:
+            try:
+                self.cursor.execute(f"PRAGMA {name} = {value};")
+            except sqlite3.Error as e:
+                fd_log.info(f"⚠️ PRAGMA {name} 설정 실패: {e}")
+        mode = self.cursor.execute("PRAGMA journal_mode;").fetchone()[0]
+        fd_log.info(f"✅ SQLite journal_mode={mode}")
+
+    def ensure_indexes(self):
+        ''' BASEBALL_DB_INDEXES 중 없는 index 생성 (기존 DB 는 처음 한 번만 시간이 걸린다) '''
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='index';")
+        existing = {row[0] for row in self.cursor.fetchall()}
+        created = []
+        for name, table, columns in BASEBALL_DB_INDEXES:
+            if name in existing:
+                continue
+            try:
+                self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});")
+                created.append(name)
+            except sqlite3.Error as e:
+                fd_log.info(f"❌ Index 생성 실패: {name}, 오류: {e}")
+        if created:
+            self.cursor.execute("ANALYZE;")
+            fd_log.info(f"✅ Index 생성됨: {', '.join(created)}")
+        self.conn.commit()
+
+    def load_timeline(self):
+        ''' raw table → EventTimeline (get_next_* / get_prev_* 가 SQLite 대신 사용) '''
+        timeline = EventTimeline()
+        timeline.load(self)
+        self.timeline = timeline
+        return timeline
+
+    def feed_timeline(self, json_data):
+        ''' websocket 메시지 하나를 timeline 에 반영 (DB 기록은 BaseballDBWriter 가 따로) '''
+        if self.timeline is None:
+            return False
+        built = self._raw_row(json_data)
+        if built is None:
+            return False
+        table, columns, values = built
+        return self.timeline.add("pitch" if table == "pitches_raw_data" else "hit", dict(zip(columns, values)))
+
     def update_table_schema(self):
         ''' 기존 DB 파일이 존재할 경우, 누락된 컬럼을 자동으로 추가 (테이블 없으면 생성) '''
         expected_schema = {
@@ -284,27 +366,33 @@ class BaseballDB:
         except (KeyError, TypeError, ValueError):
             return default_value
         
-    def insert_raw_data(self, json_data):
+    # raw table 별 column (play_id 가 항상 처음 - upsert 의 key)
+    RAW_PITCH_COLUMNS = (
+        "play_id", "event_time", "pitch_type",
+        "location_height", "location_side", "location_time", "location_speed",
+        "location_middle_height", "location_middle_side",
+        "location_back_height", "location_back_side",
+        "movement_horizontal", "movement_induced_vertical", "movement_spin_axis",
+        "movement_vertical", "movement_tilt", "movement_side0", "movement_height0",
+        "release_extension", "release_height", "release_side", "release_speed",
+        "release_spin_rate", "release_horizontal_angle", "release_vertical_angle",
+        "ninep_x0_x", "ninep_x0_y", "ninep_x0_z",
+        "ninep_v0_x", "ninep_v0_y", "ninep_v0_z",
+        "ninep_a0_x", "ninep_a0_y", "ninep_a0_z",
+        "ninep_pfxx", "ninep_pfxz",
+    )
+    RAW_HIT_COLUMNS = (
+        "play_id", "event_time",
+        "landing_bearing", "landing_dist_f", "landing_distance", "landing_hang_time",
+        "landing_x", "landing_y",
+        "launch_speed", "launch_vertical_angle", "launch_horizontal_angle", "launch_spin_axis",
+    )
+
+    def _raw_row(self, json_data):
+        ''' websocket 메시지 → (table, columns, values) / 알 수 없는 Kind 면 None '''
         kind = json_data.get("Kind")
 
         if kind == "Pitch":
-            raw_query = '''
-            INSERT INTO pitches_raw_data (
-                play_id, event_time, pitch_type,
-                location_height, location_side, location_time, location_speed,
-                location_middle_height, location_middle_side,
-                location_back_height, location_back_side,
-                movement_horizontal, movement_induced_vertical, movement_spin_axis,
-                movement_vertical, movement_tilt, movement_side0, movement_height0,
-                release_extension, release_height, release_side, release_speed,
-                release_spin_rate, release_horizontal_angle, release_vertical_angle,
-                ninep_x0_x, ninep_x0_y, ninep_x0_z,
-                ninep_v0_x, ninep_v0_y, ninep_v0_z,
-                ninep_a0_x, ninep_a0_y, ninep_a0_z,
-                ninep_pfxx, ninep_pfxz
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-            '''
-
             raw_values = (
                 json_data.get("PlayId"),
                 json_data.get("Time"),
@@ -352,19 +440,12 @@ class BaseballDB:
                 self.safe_get(json_data, ["data", "NineP", "Pfxx"], 0.0, float),
                 self.safe_get(json_data, ["data", "NineP", "Pfxz"], 0.0, float)
             )
+            return "pitches_raw_data", self.RAW_PITCH_COLUMNS, raw_values
 
         elif kind == "Hit":
-            raw_query = '''
-            INSERT INTO hits_raw_data (
-                play_id, event_time,
-                landing_bearing, landing_dist_f, landing_distance, landing_hang_time,
-                landing_x, landing_y,
-                launch_speed, launch_vertical_angle, launch_horizontal_angle, launch_spin_axis
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-            '''
             raw_values = (
-                json_data["PlayId"],
-                json_data["Time"],
+                json_data.get("PlayId"),
+                json_data.get("Time"),
                 self.safe_get(json_data, ["data", "LandingFlat", "Bearing"], 0.0, float),
                 self.safe_get(json_data, ["data", "LandingFlat", "Dist_f"], 0.0, float),
                 self.safe_get(json_data, ["data", "LandingFlat", "Distance"], 0.0, float),
@@ -376,20 +457,52 @@ class BaseballDB:
                 self.safe_get(json_data, ["data", "Launch", "HorizontalAngle"], 0.0, float),
                 self.safe_get(json_data, ["data", "Launch", "SpinAxis"], 0.0, float)
             )
+            return "hits_raw_data", self.RAW_HIT_COLUMNS, raw_values
 
-        else:
-            fd_log.info(f"❌ 알 수 없는 Kind 유형: {kind}")
+        fd_log.info(f"❌ 알 수 없는 Kind 유형: {kind}")
+        return None
+
+    def insert_raw_data(self, json_data):
+        built = self._raw_row(json_data)
+        if built is None:
             return
+        table, columns, raw_values = built
+        raw_query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))});"
 
         try:
             self.cursor.execute(raw_query, raw_values)
             self.conn.commit()
-            fd_log.info(f"📥 Raw structured data inserted into {kind.lower()}_raw_data for PlayId {json_data.get('PlayId')}.")
+            fd_log.info(f"📥 Raw structured data inserted into {table} for PlayId {json_data.get('PlayId')}.")
         except Exception as e:
             fd_log.info(f"❌ Raw structured data 삽입 오류: {e}")
-            fd_log.info("📛 VALUES 개수:", len(raw_values))
-            fd_log.info("📛 SQL placeholders 개수:", raw_query.count("?"))
+            fd_log.info(f"📛 VALUES 개수: {len(raw_values)}")
+            fd_log.info(f"📛 SQL placeholders 개수: {raw_query.count('?')}")
 
+    def upsert_raw_rows(self, items):
+        '''
+        raw data 여러 개를 transaction 하나로 (commit 한 번)
+        - 같은 PlayId 가 이미 있으면 UPDATE (재전송 dedupe, play_id index 사용)
+        - 실패하면 전체 rollback 후 예외 → 호출자 (BaseballDBWriter) 가 판단
+        :return: {"insert": n, "update": n, "skip": n}
+        '''
+        counts = {"insert": 0, "update": 0, "skip": 0}
+        with self.conn:
+            cur = self.conn.cursor()
+            for json_data in items:
+                built = self._raw_row(json_data)
+                if built is None or not built[2][0]:
+                    counts["skip"] += 1
+                    continue
+                table, columns, values = built
+                sets = ", ".join(f"{col} = ?" for col in columns[1:])
+                cur.execute(f"UPDATE {table} SET {sets} WHERE play_id = ?;", (*values[1:], values[0]))
+                if cur.rowcount > 0:
+                    counts["update"] += 1
+                    continue
+                cur.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))});",
+                            values)
+                counts["insert"] += 1
+        return counts
 
     def insert_data(self, json_data, tracking_video_path , tracking_data_path):
         ''' JSON 데이터를 SQLite 데이터베이스에 삽입 (PlayId 사용) '''
@@ -528,6 +641,10 @@ class BaseballDB:
         return count
 
     def close(self):
+        try:
+            self.conn.execute("PRAGMA optimize;")
+        except sqlite3.Error:
+            pass
         self.conn.close()
         fd_log.info("🔌 데이터베이스 연결이 종료되었습니다.")
 
@@ -540,39 +657,55 @@ class BaseballDB:
         :param pitch_type_counts: dict, 예: {'Fastball': 3, 'Curveball': 2}
         :return: dict 형태의 tracking_data_path 결과 (pitch_type별 구분)
         '''
-        pkl_list = {}
-
-        for pitch_type, limit in pitch_type_counts.items():
-            query = f'''
-                SELECT tracking_data_path FROM pitches
-                WHERE team_code = ? AND player_no = ? AND pitch_type = ?
-                ORDER BY event_time DESC
-                LIMIT {int(limit)};
-            '''
-            self.cursor.execute(query, (team_code, player_no, pitch_type))
-            rows = self.cursor.fetchall()
-            paths = [row["tracking_data_path"] for row in rows if row["tracking_data_path"]]
-            pkl_list[pitch_type] = paths
+        pkl_list = {pitch_type: [] for pitch_type in pitch_type_counts}
+        wanted = [(pitch_type, int(limit)) for pitch_type, limit in pitch_type_counts.items() if int(limit) > 0]
+        if not wanted:
+            return True, pkl_list
+
+        # 한 번의 query : pitch_type 별 "ORDER BY event_time DESC LIMIT n" 을 UNION ALL
+        # - 각 branch 가 index (team_code, player_no, pitch_type, event_time) 를 끝에서부터 n 개만 읽는다
+        #   → 시즌 data 가 쌓여도 시간이 그대로 (ROW_NUMBER() window 는 선수 기록 전체를 순위 매김)
+        branch = ("SELECT * FROM (SELECT pitch_type, tracking_data_path FROM pitches "
+                  "WHERE team_code = ? AND player_no = ? AND pitch_type = ? "
+                  "ORDER BY event_time DESC LIMIT ?)")
+        query = " UNION ALL ".join([branch] * len(wanted)) + ";"
+        params = [v for pitch_type, limit in wanted for v in (team_code, player_no, pitch_type, limit)]
+        self.cursor.execute(query, params)
+        for row in self.cursor.fetchall():
+            if row["tracking_data_path"]:
+                pkl_list[row["pitch_type"]].append(row["tracking_data_path"])
 
         return True, pkl_list
     
-    def get_next_hit_after(self, folder_input: str, selected_moment_sec: int):
+    def _moment_row(self, kind: str, table: str, folder_input: str, selected_moment_sec: int, after: bool):
+        '''
+        녹화 folder + 초 → 바로 다음 (after) / 바로 이전 event row
+        - timeline 이 있으면 memory bisect, 없으면 SQLite (event_time 문자열 비교)
+        - 비교 기준은 초 단위 (기존 "%Y-%m-%dT%H:%M:%S" 문자열과 같은 결과)
+        '''
+        if self.timeline is not None:
+            moment_ms = fd_moment_ms(folder_input, selected_moment_sec) // 1000 * 1000
+            return self.timeline.next(kind, moment_ms) if after else self.timeline.prev(kind, moment_ms)
+
         base_time_str = os.path.basename(folder_input)
         base_dt = datetime.strptime(base_time_str, "%Y_%m_%d_%H_%M_%S")
         target_dt = base_dt + timedelta(seconds=selected_moment_sec)
         target_time_str = target_dt.strftime("%Y-%m-%dT%H:%M:%S")
 
-        query = '''
-        SELECT * FROM hits_raw_data
-        WHERE event_time > ?
-        ORDER BY event_time ASC
+        query = f'''
+        SELECT * FROM {table}
+        WHERE event_time {'>' if after else '<'} ?
+        ORDER BY event_time {'ASC' if after else 'DESC'}
         LIMIT 1;
         '''
         self.cursor.execute(query, (target_time_str,))
         row = self.cursor.fetchone()
+        return dict(row) if row else None
 
-        if row:
-            hit_data = dict(row)
+    def get_next_hit_after(self, folder_input: str, selected_moment_sec: int):
+        hit_data = self._moment_row("hit", "hits_raw_data", folder_input, selected_moment_sec, after=True)
+
+        if hit_data:
             #self.save_pitch_data_to_file(hit_data,"next_hit.json")
             conf._playId_hit = hit_data.get("play_id")
             conf._landingflat_distance = hit_data.get("landing_distance")
@@ -590,22 +723,9 @@ class BaseballDB:
 
     
     def get_next_pitch_after(self, folder_input: str, selected_moment_sec: int):
-        base_time_str = os.path.basename(folder_input)
-        base_dt = datetime.strptime(base_time_str, "%Y_%m_%d_%H_%M_%S")
-        target_dt = base_dt + timedelta(seconds=selected_moment_sec)
-        target_time_str = target_dt.strftime("%Y-%m-%dT%H:%M:%S")
+        pitch_data = self._moment_row("pitch", "pitches_raw_data", folder_input, selected_moment_sec, after=True)
 
-        query = '''
-        SELECT * FROM pitches_raw_data
-        WHERE event_time > ?
-        ORDER BY event_time ASC
-        LIMIT 1;
-        '''
-        self.cursor.execute(query, (target_time_str,))
-        row = self.cursor.fetchone()
-
-        if row:
-            pitch_data = dict(row)
+        if pitch_data:
             #self.save_pitch_data_to_file(pitch_data,"next_pitch.json")
             conf._playId_pitch = pitch_data.get("play_id")
             conf._release_speed = pitch_data.get("release_speed")
@@ -615,22 +735,9 @@ class BaseballDB:
         return False
     
     def get_prev_pitch_before(self, folder_input: str, selected_moment_sec: int):
-        base_time_str = os.path.basename(folder_input)
-        base_dt = datetime.strptime(base_time_str, "%Y_%m_%d_%H_%M_%S")
-        target_dt = base_dt + timedelta(seconds=selected_moment_sec)
-        target_time_str = target_dt.strftime("%Y-%m-%dT%H:%M:%S")
-
-        query = '''
-        SELECT * FROM pitches_raw_data
-        WHERE event_time < ?
-        ORDER BY event_time DESC
-        LIMIT 1;
-        '''
-        self.cursor.execute(query, (target_time_str,))
-        row = self.cursor.fetchone()
+        pitch_data = self._moment_row("pitch", "pitches_raw_data", folder_input, selected_moment_sec, after=False)
 
-        if row:
-            pitch_data = dict(row)
+        if pitch_data:
             #self.save_pitch_data_to_file(pitch_data,"pre_pitch.json")
             conf._release_speed = pitch_data.get("release_speed")
             conf._release_spinrate = int(pitch_data.get("release_spin_rate", 0))
@@ -0,0 +1,149 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# fd_db_writer.py
+# - websocket (tracking data) → BaseballDB raw table 기록 전용 thread
+#   . submit() 은 queue 에 넣기만 (asyncio loop 가 disk 를 기다리지 않는다)
+#   . batch_rows 개 또는 flush_sec 이 지나면 transaction 하나로 commit
+#   . 같은 PlayId 재전송은 UPDATE (BaseballDB.upsert_raw_rows)
+#   . 자기 connection 을 따로 연다 (WAL - 조회 connection 과 서로 막지 않는다)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import queue
+import threading
+import time
+
+from fd_utils.fd_logging        import fd_log
+from fd_common.metrics          import fd_metric_counter, fd_metric_gauge, fd_metric_histogram
+
+_M_DEPTH   = fd_metric_gauge("ws_db_queue_depth", "tracking messages waiting for the DB writer")
+_M_COMMIT  = fd_metric_histogram("ws_db_commit_seconds", "DB writer transaction (batch) time")
+_M_BATCH   = fd_metric_histogram("ws_db_batch_rows", "rows per DB writer transaction",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+_M_ROWS    = fd_metric_counter("ws_db_rows", "tracking rows written", ("op",))
+_M_DROPPED = fd_metric_counter("ws_db_dropped", "tracking messages dropped (queue full / write error)", ("reason",))
+
+_STOP = object()
+
+class BaseballDBWriter:
+    def __init__(self, db_file: str, batch_rows: int = 64, flush_sec: float = 0.25, maxsize: int = 10000,
+                 retries: int = 3):
+        self.db_file = db_file
+        self.batch_rows = max(1, int(batch_rows))
+        self.flush_sec = max(0.0, float(flush_sec))
+        self.retries = max(0, int(retries))
+        self.q: queue.Queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.db = None
+        self.th = None
+        self.written = 0
+        self.dropped = 0
+        _M_DEPTH.set_function(self.q.qsize)
+
+    # ── 호출 쪽 (websocket loop) ──────────────────────────────
+    def submit(self, json_data: dict) -> bool:
+        ''' 절대 막히지 않는다 - queue 가 가득 차면 버리고 False '''
+        try:
+            self.q.put_nowait(json_data)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            _M_DROPPED.labels("full").inc()
+            if self.dropped % 100 == 1:
+                fd_log.warning(f"⚠️ DB writer queue full ({self.q.maxsize}) - dropped {self.dropped}")
+            return False
+
+    # ── writer thread ─────────────────────────────────────────
+    def _collect(self, first):
+        ''' first 이후 batch_rows 개 또는 flush_sec 까지 모은다 → (batch, stop) '''
+        batch = [first]
+        deadline = time.monotonic() + self.flush_sec
+        while len(batch) < self.batch_rows:
+            remain = deadline - time.monotonic()
+            try:
+                item = self.q.get(timeout=remain) if remain > 0 else self.q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch):
+        for attempt in range(self.retries + 1):
+            t0 = time.perf_counter()
+            try:
+                counts = self.db.upsert_raw_rows(batch)
+            except Exception as e:
+                # database is locked 등 - 잠깐 쉬고 같은 batch 를 다시
+                fd_log.warning(f"⚠️ DB writer commit failed ({attempt + 1}/{self.retries + 1}): {e}")
+                time.sleep(0.2 * (attempt + 1))
+                continue
+            _M_COMMIT.observe(time.perf_counter() - t0)
+            _M_BATCH.observe(len(batch))
+            for op, n in counts.items():
+                if n:
+                    _M_ROWS.labels(op).inc(n)
+            self.written += counts["insert"] + counts["update"]
+            return
+        # batch 전체가 계속 실패 → 한 줄씩 (문제 있는 row 만 버린다)
+        for row in batch if len(batch) > 1 else ():
+            try:
+                counts = self.db.upsert_raw_rows([row])
+                self.written += counts["insert"] + counts["update"]
+            except Exception as e:
+                self.dropped += 1
+                _M_DROPPED.labels("error").inc()
+                fd_log.error(f"❌ DB writer dropped PlayId {row.get('PlayId')}: {e}")
+        if len(batch) == 1:
+            self.dropped += 1
+            _M_DROPPED.labels("error").inc()
+            fd_log.error(f"❌ DB writer dropped PlayId {batch[0].get('PlayId')}")
+
+    def _loop(self):
+        from fd_db.fd_db_manager import BaseballDB
+        self.db = BaseballDB(self.db_file, timeline=False)
+        stop = False
+        while not stop:
+            first = self.q.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._write(batch)
+        # stop 뒤에 남은 것까지
+        rest = []
+        while True:
+            try:
+                item = self.q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                rest.append(item)
+        for i in range(0, len(rest), self.batch_rows):
+            self._write(rest[i:i + self.batch_rows])
+        self.db.close()
+
+    def start(self):
+        if self.th and self.th.is_alive():
+            return
+        self.th = threading.Thread(target=self._loop, daemon=True, name="ws-db-writer")
+        self.th.start()
+
+    def stop(self, timeout: float = 5.0):
+        ''' 남은 것은 기록하고 끝낸다 (timeout 까지) '''
+        if not self.th:
+            return
+        try:
+            self.q.put(_STOP, timeout=timeout)
+        except queue.Full:
+            fd_log.warning("⚠️ DB writer queue full on stop")
+        self.th.join(timeout)
+        self.th = None
+
+    def status(self) -> dict:
+        return {"depth": self.q.qsize(), "written": self.written, "dropped": self.dropped,
+                "batch_rows": self.batch_rows, "flush_sec": self.flush_sec}
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "BaseballDBWriter",
+]
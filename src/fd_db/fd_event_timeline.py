@@ -0,0 +1,197 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# fd_event_timeline.py
+# - pitch / hit 이벤트 시간축 (memory) : replay 의 "녹화 folder + 초" → 가까운 play
+#   . kind 별로 epoch-ms 정렬 list + row (bisect - SQLite 를 거치지 않는다)
+#   . 시작할 때 BaseballDB raw table 에서 한 번 load, 이후 websocket feed 에서 append
+#   . 시간 key 는 event_time 의 현지 시각 (timezone 무시) - SQL 의 ISO 문자열 비교와 같은 순서
+#   . 같은 PlayId 재전송은 교체 (BaseballDB.upsert_raw_rows 와 같은 규칙)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import threading
+from bisect                     import bisect_left, bisect_right
+from datetime                   import datetime, timedelta
+
+from fd_utils.fd_logging        import fd_log
+from fd_common.metrics          import fd_metric_gauge
+
+# memory 에 두는 column (조회 결과로 conf 에 넣는 것 + overlay 에서 쓰는 것)
+TIMELINE_COLUMNS = {
+    "pitch": ("play_id", "event_time", "pitch_type", "release_speed", "release_spin_rate",
+              "location_height", "location_side", "location_speed"),
+    "hit":   ("play_id", "event_time", "landing_distance", "landing_bearing", "landing_hang_time",
+              "landing_x", "landing_y", "launch_speed", "launch_vertical_angle",
+              "launch_horizontal_angle", "launch_spin_axis"),
+}
+TIMELINE_TABLES = {"pitch": "pitches_raw_data", "hit": "hits_raw_data"}
+
+_EPOCH = datetime(1970, 1, 1)
+_MS    = timedelta(milliseconds=1)
+
+_M_EVENTS = fd_metric_gauge("event_timeline_events", "events held in the in-memory timeline", ("kind",))
+
+def fd_event_ms(event_time) -> int | None:
+    ''' "2025-05-01T19:00:00.123+09:00" → 현지 시각 epoch-ms (timezone 은 버린다) / 실패 None '''
+    if not event_time:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(event_time).strip())
+    except ValueError:
+        return None
+    return (dt.replace(tzinfo=None) - _EPOCH) // _MS
+
+def fd_moment_ms(folder_input: str, selected_moment_sec: float) -> int:
+    ''' 녹화 folder (".../2025_05_01_19_00_00") + 초 → epoch-ms '''
+    base_dt = datetime.strptime(os.path.basename(os.path.normpath(folder_input)), "%Y_%m_%d_%H_%M_%S")
+    return (base_dt - _EPOCH) // _MS + int(round(float(selected_moment_sec) * 1000))
+
+class _Track:
+    ''' kind 하나 - keys[i] 가 rows[i] 의 시간 (오름차순) '''
+    __slots__ = ("keys", "rows")
+
+    def __init__(self):
+        self.keys: list = []
+        self.rows: list = []
+
+class EventTimeline:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tracks = {kind: _Track() for kind in TIMELINE_COLUMNS}
+        self.by_play: dict = {}           # (kind, play_id) → ms
+        self.loaded = False
+        for kind, track in self.tracks.items():
+            _M_EVENTS.labels(kind).set_function(lambda t=track: len(t.keys))
+
+    # ── 적재 ──────────────────────────────────────────────────
+    def load(self, db) -> int:
+        ''' BaseballDB raw table 전체 → 정렬 (같은 play_id 는 나중 row) / :return: event 수 '''
+        tracks, by_play = {}, {}
+        for kind, columns in TIMELINE_COLUMNS.items():
+            db.cursor.execute(f"SELECT {', '.join(columns)} FROM {TIMELINE_TABLES[kind]} ORDER BY rowid;")
+            latest, loose = {}, []
+            for r in db.cursor.fetchall():
+                row = dict(r)
+                ms = fd_event_ms(row.get("event_time"))
+                if ms is None:
+                    continue
+                if row.get("play_id"):
+                    latest[row["play_id"]] = (ms, row)
+                else:
+                    loose.append((ms, row))
+            items = sorted(list(latest.values()) + loose, key=lambda x: x[0])
+            track = _Track()
+            track.keys = [ms for ms, _ in items]
+            track.rows = [row for _, row in items]
+            tracks[kind] = track
+            by_play.update({(kind, pid): ms for pid, (ms, _) in latest.items()})
+
+        with self.lock:
+            for kind, track in tracks.items():
+                self.tracks[kind].keys, self.tracks[kind].rows = track.keys, track.rows
+            self.by_play = by_play
+            self.loaded = True
+        count = sum(len(t.keys) for t in tracks.values())
+        fd_log.info(f"🕒 event timeline loaded: " +
+                    ", ".join(f"{kind} {len(t.keys)}" for kind, t in tracks.items()))
+        return count
+
+    def add(self, kind: str, row: dict) -> bool:
+        ''' live append (websocket feed) - 대부분 끝에 붙는다 / 같은 play_id 는 교체 '''
+        track = self.tracks.get(kind)
+        ms = fd_event_ms(row.get("event_time"))
+        if track is None or ms is None:
+            return False
+        row = {col: row.get(col) for col in TIMELINE_COLUMNS[kind]}
+        play_id = row.get("play_id")
+        with self.lock:
+            old = self.by_play.get((kind, play_id)) if play_id else None
+            if old is not None:
+                i = bisect_left(track.keys, old)
+                while i < len(track.keys) and track.keys[i] == old:
+                    if track.rows[i].get("play_id") == play_id:
+                        del track.keys[i], track.rows[i]
+                        break
+                    i += 1
+            if not track.keys or ms >= track.keys[-1]:
+                track.keys.append(ms)
+                track.rows.append(row)
+            else:
+                i = bisect_right(track.keys, ms)
+                track.keys.insert(i, ms)
+                track.rows.insert(i, row)
+            if play_id:
+                self.by_play[(kind, play_id)] = ms
+        return True
+
+    # ── 조회 (ms = 현지 시각 epoch-ms) ────────────────────────
+    def next(self, kind: str, ms: int) -> dict | None:
+        ''' ms 이후 (같은 초 포함) 첫 event - SQL "event_time > 'YYYY-MM-DDTHH:MM:SS'" 와 같다 '''
+        track = self.tracks[kind]
+        with self.lock:
+            i = bisect_left(track.keys, ms)
+            return track.rows[i] if i < len(track.keys) else None
+
+    def prev(self, kind: str, ms: int) -> dict | None:
+        ''' ms 이전 (ms 미포함) 마지막 event '''
+        track = self.tracks[kind]
+        with self.lock:
+            i = bisect_left(track.keys, ms)
+            return track.rows[i - 1] if i > 0 else None
+
+    def nearest(self, kind: str, ms: int, max_gap_ms: int | None = None) -> dict | None:
+        ''' 앞뒤 중 가까운 event (같으면 앞쪽) / max_gap_ms 보다 멀면 None '''
+        track = self.tracks[kind]
+        with self.lock:
+            i = bisect_left(track.keys, ms)
+            best = None
+            for j in (i - 1, i):
+                if 0 <= j < len(track.keys) and (best is None or abs(track.keys[j] - ms) < abs(track.keys[best] - ms)):
+                    best = j
+            if best is None or (max_gap_ms is not None and abs(track.keys[best] - ms) > max_gap_ms):
+                return None
+            return track.rows[best]
+
+    def range(self, kind: str, begin_ms: int, end_ms: int, limit: int | None = None) -> list:
+        ''' begin_ms <= t < end_ms 의 event (시간순) '''
+        track = self.tracks[kind]
+        with self.lock:
+            lo = bisect_left(track.keys, begin_ms)
+            hi = bisect_left(track.keys, end_ms)
+            if limit is not None:
+                hi = min(hi, lo + max(0, int(limit)))
+            return track.rows[lo:hi]
+
+    def window(self, kind: str, ms: int, before_ms: int, after_ms: int) -> list:
+        ''' ms 앞 before_ms ~ 뒤 after_ms (포함) '''
+        return self.range(kind, ms - before_ms, ms + after_ms + 1)
+
+    def get(self, kind: str, play_id: str) -> dict | None:
+        track = self.tracks[kind]
+        with self.lock:
+            ms = self.by_play.get((kind, play_id))
+            if ms is None:
+                return None
+            i = bisect_left(track.keys, ms)
+            while i < len(track.keys) and track.keys[i] == ms:
+                if track.rows[i].get("play_id") == play_id:
+                    return track.rows[i]
+                i += 1
+        return None
+
+    def status(self) -> dict:
+        with self.lock:
+            out = {"loaded": self.loaded}
+            for kind, track in self.tracks.items():
+                out[kind] = len(track.keys)
+                out[f"{kind}_last"] = track.rows[-1].get("event_time") if track.rows else None
+            return out
+
+# ────────────────────────────────────────────────────────────
+# EXPORTS
+# ────────────────────────────────────────────────────────────
+__all__ = [
+    "EventTimeline",
+    "TIMELINE_COLUMNS",
+    "fd_event_ms",
+    "fd_moment_ms",
+]
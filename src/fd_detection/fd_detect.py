@@ -2844,7 +2844,8 @@ def fd_detect_ball_pitcher():
                 mem_img = frames[idx]  # 원본 프레임
 
                 percent_progress = int(idx / frame_count * 100)
-                fd_log.info(f"🎯[PIT][{idx}] Detect Batting Position Progress: {percent_progress}% detect ball: {detect_ball_frame}/{frame_count}")
+                fd_log.every(10).info("🎯[PIT][%d] Detect Batting Position Progress: %d%% detect ball: %s/%s",
+                                      idx, percent_progress, detect_ball_frame, frame_count)
 
                 ball_detected = False
                 max_confidence = 0
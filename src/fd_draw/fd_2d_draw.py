@@ -387,9 +387,11 @@ def th_draw_tracking_singleline(file_type, ball_pos):
                 fd_log.info("FFmpeg process terminated early.")
                 break
 
+            # console 진행률은 0.2 초에 한 번 (frame 마다 stdout 에 쓰지 않는다)
             percent_progress = int((idx + 1) / tot_count * 100)
-            print("\r" + " " * 20, end="")
-            print(f"\r🎨[Draw][{'Curr' if is_curr else 'Post'}][Single] Progress: {percent_progress}%", end="")
+            if fd_log.throttle(0.2) or percent_progress >= 100:
+                print("\r" + " " * 20, end="")
+                print(f"\r🎨[Draw][{'Curr' if is_curr else 'Post'}][Single] Progress: {percent_progress}%", end="")
 
             if is_curr:
                 frame_draw = fd_draw_frame_singleline(conf._type_target, conf._file_type_curr, frame, idx, tot_count, ball_pos)
@@ -744,8 +746,9 @@ def fd_draw_analysis_overlay_multiline(file_type, arr_balls):
                 break
 
             percent_progress = int((index + 1) / tot_count * 100)
-            print("\r" + " " * 20, end="")
-            print(f"\r🎨[Draw][{'Curr' if is_curr else 'Post'}][Multi] Progress: {percent_progress}%", end="")
+            if fd_log.throttle(0.2) or percent_progress >= 100:
+                print("\r" + " " * 20, end="")
+                print(f"\r🎨[Draw][{'Curr' if is_curr else 'Post'}][Multi] Progress: {percent_progress}%", end="")
 
             if is_curr:
                 frame_draw = fd_draw_frame_multiline(conf._type_target, conf._file_type_curr, frame, idx, tot_count, arr_balls)
@@ -948,8 +951,9 @@ def th_live_player_overlay_singleline(file_type: str, ball_pos, buffer_index):
             # for waiting thread progress
             if is_curr: conf._live_player_drawing_progress = percent_progress
 
-            print("\r" + " " * 20, end="")
-            print(f"\r🎨[Live][{'Curr' if is_curr else 'Post'}] Progress: {percent_progress}%", end="")
+            if fd_log.throttle(0.2) or percent_progress >= 100:
+                print("\r" + " " * 20, end="")
+                print(f"\r🎨[Live][{'Curr' if is_curr else 'Post'}] Progress: {percent_progress}%", end="")
 
             if is_curr:
                 img = fd_draw_frame_singleline(conf._type_target, file_type, frame, idx, count_total, ball_pos)
@@ -1177,8 +1181,9 @@ def th_live_player_overlay_multiline(file_type: str, arr_balls, buffer_index):
             # for waiting thread progress
             if is_curr: conf._live_player_drawing_progress = percent_progress
 
-            print("\r" + " " * 20, end="")
-            print(f"\r🎨[DrawOnly][{'Curr' if is_curr else 'Post'}] Progress: {percent_progress}%", end="")
+            if fd_log.throttle(0.2) or percent_progress >= 100:
+                print("\r" + " " * 20, end="")
+                print(f"\r🎨[DrawOnly][{'Curr' if is_curr else 'Post'}] Progress: {percent_progress}%", end="")
             img = fd_draw_frame_multiline(conf._type_target, file_type, frame, idx, tot_count, arr_balls)
 
             if conf._trackman_mode:
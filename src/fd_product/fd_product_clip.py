@@ -5,7 +5,10 @@
 # ─────────────────────────────────────────────────────────────────────────────#
 
 import os
+import re
+import json
 import time
+import socket
 import threading
 import av  # PyAV
 from pathlib import Path
@@ -116,6 +119,38 @@ def fd_create_payload_for_preparing_to_AIc(ip, camera_info, adjust_info):
     }
 
     return payload
+def fd_create_payload_for_assigned_to_AIc(ip, camera_info, adjust_info, cam_ips):
+    """
+    scheduler 가 배정한 camera 만
+    (path 는 그대로 넘긴다 - local 녹화 camera 는 scheduler 가 PreSd node 에만 배정, 공유 경로는 어디서든)
+    cam_ips: 이 AIc 에 배정된 camera ip 목록
+    - "video-sources" : PreSd 별로 나눈 source 목록 (camera 가 여러 PreSd 에 걸칠 수 있다)
+    - "video-info"    : 첫 source (이전 AIc 호환)
+    """
+    wanted = {str(c) for c in cam_ips}
+    sources = []
+    for item in camera_info.get("PreSd", []):
+        cams = [c for c in item["cam_ips"] if str(c["ip"]) in wanted]
+        if not cams:
+            continue
+        sources.append({
+            "ip": item["ip"],
+            "cam_ips": cams,
+            "path": item["path"],
+            "camera-format": {
+                "fps": camera_info.get("camera-fps"),
+                "resolution": camera_info.get("camera-resolution"),
+            },
+            "record-folder": camera_info.get("source-folder"),
+        })
+    empty = {"ip": ip, "cam_ips": [], "path": "",
+             "camera-format": {"fps": camera_info.get("camera-fps"), "resolution": camera_info.get("camera-resolution")},
+             "record-folder": camera_info.get("source-folder")}
+    return {
+        "video-info": sources[0] if sources else empty,
+        "video-sources": sources,
+        "adjust": adjust_info,
+    }
 
 # ─────────────────────────────────────────────────────────────────────────────#
 # create paylod for send AIc about product info
@@ -222,7 +257,101 @@ def fd_create_payload_for_product_to_AIc(pkt_info: dict, cam_fps)     -> dict:
 # ─────────────────────────────────────────────────────────────────────────────#    
 #  Main Worker (Thread job on each camera)
 # ─────────────────────────────────────────────────────────────────────────────#    
-def calibrate_worker(ch_index, cam_ip, video_source, prod_info, prod_adjust_info):
+# camera 별 worker 상태 (AIc Load 보고 / 재배정 때 stop)
+#  speed : 1초 segment 를 처리하는 속도 (1.0 = 실시간, EWMA)
+#  lag   : 이미 녹화돼 있는데 아직 처리하지 못한 segment 수 (= 밀린 초)
+_WORKERS = {}
+_WORKERS_LOCK = threading.Lock()
+LAG_SCAN_MAX = 30
+
+# ch 폴더 하나를 쓰는 worker 는 하나 (AIc 재배정 handoff - 폴더는 AIc 들이 같이 본다)
+#  .lease.json          : {"gen", "node"} - generation 이 가장 큰 worker 가 주인 (AId scheduler 가 매긴다)
+#  .handoff-<gen>.json  : 그 generation 이 멈춘 자리 {"next_segment"} - 다음 주인은 여기서부터
+_SEGMENT_RE = re.compile(r"^segment_(\d+)\.m4s$")
+LEASE_FILE = ".lease.json"
+HANDOFF_WAIT_SEC = 10.0
+
+def _segment_numbers(ch_path):
+    nums = []
+    for f in os.listdir(ch_path):
+        m = _SEGMENT_RE.match(f)
+        if m:
+            nums.append(int(m.group(1)))
+    return sorted(nums)
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, obj):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _lease_gen(ch_path):
+    lease = _read_json(os.path.join(ch_path, LEASE_FILE))
+    return int(lease.get("gen", 0)) if isinstance(lease, dict) else None
+
+def _lease_check(ch_path, gen) -> bool:
+    """
+    True → 계속 써도 된다 / False → 더 큰 generation 이 가져갔다 (fenced)
+    - lease 가 없거나 작으면 다시 쓴다 (동시에 claim 해도 결국 큰 쪽이 남는다)
+    """
+    cur = _lease_gen(ch_path)
+    if cur is not None and cur > gen:
+        return False
+    if cur is None or cur < gen:
+        _write_json(os.path.join(ch_path, LEASE_FILE), {"gen": gen, "node": socket.gethostname(), "ts": time.time()})
+    return True
+
+def _handoff_mark(ch_path, gen, next_segment):
+    try:
+        _write_json(os.path.join(ch_path, f".handoff-{gen}.json"), {"next_segment": next_segment, "ts": time.time()})
+    except OSError as e:
+        fd_log.warning(f"handoff mark failed ({ch_path}, gen {gen}): {e}")
+
+def _handoff_wait(ch_path, gen, stop, timeout=HANDOFF_WAIT_SEC):
+    """이전 주인(gen)이 멈춘 자리 → next_segment / timeout (죽은 node) → None"""
+    path = os.path.join(ch_path, f".handoff-{gen}.json")
+    deadline = time.time() + timeout
+    while not stop.is_set():
+        h = _read_json(path)
+        if isinstance(h, dict) and h.get("next_segment"):
+            return int(h["next_segment"])
+        if time.time() >= deadline:
+            return None
+        stop.wait(0.2)
+    return None
+
+class _CamWorker:
+    __slots__ = ("cam_ip", "ch", "stop", "thread", "segments", "speed", "lag", "waiting", "t_start")
+
+    def __init__(self, cam_ip, ch):
+        self.cam_ip = cam_ip
+        self.ch = ch
+        self.stop = threading.Event()
+        self.thread = None
+        self.segments = 0
+        self.speed = 0.0
+        self.lag = 0
+        self.waiting = False
+        self.t_start = time.time()
+
+    def to_dict(self) -> dict:
+        return {"ch": self.ch, "segments": self.segments, "speed": round(self.speed, 3),
+                "lag": self.lag, "waiting": self.waiting}
+
+def _count_ready(input_root, cam_suffix, second):
+    n = 0
+    while n < LAG_SCAN_MAX and os.path.exists(os.path.join(input_root, f"{cam_suffix}_{second + n}.mp4")):
+        n += 1
+    return n
+
+def calibrate_worker(ch_index, cam_ip, video_source, prod_info, prod_adjust_info, state=None, resume=False, gen=0):
 
     tag, root_drive = video_source["path"].split("|")
     # C_Movie → C:\Movie
@@ -253,17 +382,44 @@ def calibrate_worker(ch_index, cam_ip, video_source, prod_info, prod_adjust_info
 
     current_second = start_time
     segment_index = 1
+    state = state or _CamWorker(cam_ip, ch_index)
+
+    # ch 폴더 주인 (이전 generation 은 다음 segment 전에 멈춘다)
+    prev_gen = _lease_gen(ch_path)
+    if not _lease_check(ch_path, gen):
+        fd_log.warning(f"[ch{ch_index}] cam {cam_ip}: newer owner (gen {prev_gen}) - not starting gen {gen}")
+        return
+
+    # 다른 AIc 에서 넘겨받은 camera : 이전 주인이 멈춘 segment 부터
+    if resume:
+        nxt = None
+        if prev_gen is not None and prev_gen < gen:
+            nxt = _handoff_wait(ch_path, prev_gen, state.stop)
+        if nxt is None:
+            # handoff 없음 (처음 / 이전 node 가 죽음) → 마지막 segment 는 반쯤 쓰였을 수 있어 다시 만든다
+            done = _segment_numbers(ch_path)
+            nxt = done[-1] if done else 1
+        segment_index = nxt
+        current_second = start_time + segment_index - 1
+        fd_log.info(f"[ch{ch_index}] resume cam {cam_ip} from segment {segment_index} (gen {gen})")
 
     print(f"[ch{ch_index}] Start processing cam {cam_ip}...")
 
-    while True:
+    while not state.stop.is_set():
+        if not _lease_check(ch_path, gen):
+            fd_log.info(f"[ch{ch_index}] cam {cam_ip} handed off at segment {segment_index} (gen {gen})")
+            break
         mp4_file = os.path.join(input_root, f"{cam_suffix}_{current_second}.mp4")
 
         # 파일 준비 대기 (녹화 중)
         if not wait_for_file_ready(mp4_file):
+            state.waiting = True
+            state.lag = 0
             fd_log.info(f"[ch{ch_index}] waiting for file: {mp4_file}")
-            time.sleep(1)
+            state.stop.wait(1)
             continue
+        state.waiting = False
+        t_seg = time.perf_counter()
 
         # 파일 오픈
         try:
@@ -312,15 +468,25 @@ def calibrate_worker(ch_index, cam_ip, video_source, prod_info, prod_adjust_info
 
         fd_log.info(f"[ch{ch_index}] saved {out_file}")
 
+        # 1초 분량을 몇 초에 처리했나 → speed, 그 사이 쌓인 file → lag
+        sp = 1.0 / max(time.perf_counter() - t_seg, 1e-3)
+        state.speed = sp if state.segments == 0 else 0.7 * state.speed + 0.3 * sp
+        state.segments += 1
+        state.lag = _count_ready(input_root, cam_suffix, current_second + 1)
+
         segment_index += 1
         current_second += 1
         time.sleep(0.05)
+    _handoff_mark(ch_path, gen, segment_index)
+    fd_log.info(f"[ch{ch_index}] stopped cam {cam_ip} at segment {segment_index}")
 
 
 # ─────────────────────────────────────────────────────────────────────────────#    
 #  Main Controller (create threads for each cam)
 # ─────────────────────────────────────────────────────────────────────────────#    
-def fd_calibrate_files(video_source: dict, prod_info: dict, prod_adjust_info: dict):
+def fd_calibrate_files(video_source: dict, prod_info: dict, prod_adjust_info: dict, resume: bool = False,
+                       generations: dict = None):
+    """generations : {cam ip: generation} (AId scheduler - ch 폴더 handoff fence)"""
 
     cam_list = video_source.get("cam_ips", [])
     threads = []
@@ -329,11 +495,18 @@ def fd_calibrate_files(video_source: dict, prod_info: dict, prod_adjust_info: di
         ch_id = cam["id"]     # ← 핵심: cam_ips의 id로 chXX 생성
         cam_ip = cam["ip"]
 
-        t = threading.Thread(
-            target=calibrate_worker,
-            args=(ch_id, cam_ip, video_source, prod_info, prod_adjust_info),
-            daemon=True
-        )
+        with _WORKERS_LOCK:
+            w = _WORKERS.get(cam_ip)
+            if w is not None and w.thread.is_alive() and not w.stop.is_set():
+                continue   # 이미 처리 중
+            w = _WORKERS[cam_ip] = _CamWorker(cam_ip, ch_id)
+            t = threading.Thread(
+                target=calibrate_worker,
+                args=(ch_id, cam_ip, video_source, prod_info, prod_adjust_info, w, resume,
+                      int((generations or {}).get(cam_ip, 0) or 0)),
+                daemon=True
+            )
+            w.thread = t
         t.start()
         threads.append(t)
 
@@ -341,4 +514,29 @@ def fd_calibrate_files(video_source: dict, prod_info: dict, prod_adjust_info: di
 
     # 필요 시, 모든 스레드 join (옵션)
     # for t in threads:
-    #     t.join()
\ No newline at end of file
+    #     t.join()
+
+# ─────────────────────────────────────────────────────────────────────────────#
+#  worker control (stop / 상태)
+# ─────────────────────────────────────────────────────────────────────────────#
+def fd_calibrate_stop(cam_ips=None, wait: float = 0.0):
+    """cam_ips=None → 전부. 지금 segment 를 끝내고 멈춘다"""
+    with _WORKERS_LOCK:
+        targets = [w for ip, w in _WORKERS.items() if cam_ips is None or ip in cam_ips]
+        for w in targets:
+            w.stop.set()
+            _WORKERS.pop(w.cam_ip, None)
+    deadline = time.time() + wait
+    for w in targets:
+        if w.thread and wait > 0:
+            w.thread.join(max(0.0, deadline - time.time()))
+    return [w.cam_ip for w in targets]
+
+def fd_calibrate_running():
+    with _WORKERS_LOCK:
+        return [ip for ip, w in _WORKERS.items() if w.thread and w.thread.is_alive() and not w.stop.is_set()]
+
+def fd_calibrate_stats():
+    """{cam ip: {"ch", "segments", "speed", "lag", "waiting"}}"""
+    with _WORKERS_LOCK:
+        return {ip: w.to_dict() for ip, w in _WORKERS.items() if w.thread and w.thread.is_alive()}
@@ -36,6 +36,7 @@ import random
 import sys, platform
 
 import threading
+import contextvars
 import numpy as np
 
 
@@ -47,6 +48,7 @@ from fd_utils.fd_config_manager import conf
 from fd_utils.fd_logging        import fd_log
 
 from fd_common.utils            import fd_format_elapsed_time
+from fd_common.tracing          import fd_trace_span
 from fd_detection.fd_detect     import fd_get_video_on_player
 from concurrent.futures         import ProcessPoolExecutor
     
@@ -3638,13 +3640,19 @@ def calibration_video(file_type, tg_index, cam_index, file_directory, file_list,
     conf._output_fps/_output_bitrate/_output_codec 적용.
     '''
     runner = CalibrationVideo()
-    return runner.run(
-        file_type=file_type, tg_index=tg_index, cam_index=cam_index,
-        file_directory=file_directory, file_list=file_list,
-        target_width=target_width, target_height=target_height,
-        time_start=time_start, channel=channel, adjust_info=adjust_info,
-        progress_cb=progress_cb
-    )
+    # decode → warp → ffmpeg pipe 구간 (AIc unit / AId job 의 trace span 아래로)
+    with fd_trace_span("ffmpeg:calibration", tg=tg_index, cam=cam_index, channel=channel,
+                       files=len(file_list or [])) as span:
+        result = runner.run(
+            file_type=file_type, tg_index=tg_index, cam_index=cam_index,
+            file_directory=file_directory, file_list=file_list,
+            target_width=target_width, target_height=target_height,
+            time_start=time_start, channel=channel, adjust_info=adjust_info,
+            progress_cb=progress_cb
+        )
+        if result is None:
+            span.fail("ffmpeg pipe failed")
+        return result
 
 
 
@@ -4051,7 +4059,8 @@ def fd_set_mem_file_calis(file_path, cam_ip_class, cam_ip, channel, tg_index, ca
     # get adjust info    
     adjust_info = adjust_set.get("Adjust","")  
 
-    conf._thread_file_calibration[tg_index][cam_index+1] = threading.Thread(target=process_video_parts_pipe, args=(file_path, tg_index, cam_index, cam_ip_class, cam_ip, conf._calibration_no_audio, start_time, start_frame, end_time, end_frame, channel, adjust_info, shared_audio))
+    # copy_context : 호출한 쪽의 trace span (calibration unit) 을 thread 안에서도 parent 로
+    conf._thread_file_calibration[tg_index][cam_index+1] = threading.Thread(target=contextvars.copy_context().run, args=(process_video_parts_pipe, file_path, tg_index, cam_index, cam_ip_class, cam_ip, conf._calibration_no_audio, start_time, start_frame, end_time, end_frame, channel, adjust_info, shared_audio))
     conf._thread_file_calibration[tg_index][cam_index+1].start()
 
     # non thread
@@ -4,9 +4,10 @@
 # owner: Hongsu Jung
 # ─────────────────────────────────────────────────────────────────────────────#
 
-import logging, os, re, sys, tempfile, glob, time
+import logging, os, re, sys, tempfile, glob, time, queue, atexit
 from datetime import datetime
 from pathlib import Path
+from logging.handlers import QueueHandler, QueueListener
 
 # =========================
 # Environment Variables
@@ -16,6 +17,10 @@ RESET_ON_START      = os.environ.get("AID_LOG_RESET", "0") == "1"
 TEE_FIXED_RAW       = os.environ.get("AID_TEE_RAW_FIXED", "0") == "1"
 RETENTION_DAYS      = int(os.environ.get("AID_LOG_RETENTION_DAYS", "60"))
 FD_DAEMON_NAME      = os.environ.get("AID_DAEMON_NAME", r"AId")
+# 호출 thread 는 queue 에 넣기만, 포맷/파일 쓰기는 listener thread (0 이면 예전처럼 직접 기록)
+#  - queue 는 atexit 에서 비운다 → os._exit() 로 끝내는 곳은 그 전에 반드시 fd_log.close()
+USE_ASYNC           = os.environ.get("AID_LOG_ASYNC", "1") != "0"
+QUEUE_MAX           = int(os.environ.get("AID_LOG_QUEUE_MAX", "10000"))
 
 # =========================
 # Utilities
@@ -37,8 +42,9 @@ _ansi_re = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')  # ANSI 이스케이프 제거
 def remove_ansi_escape_sequences(text: str) -> str:
     return _ansi_re.sub("", text)
 
-def _ts():
-    return datetime.now().strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
+def _ts(created=None):
+    dt = datetime.fromtimestamp(created) if created is not None else datetime.now()
+    return dt.strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
 
 
 # =========================
@@ -91,14 +97,110 @@ for p in glob.glob(os.path.join(PATH_LOG, "????-??-??.log")):
 # handler
 # =========================
 class CleanFileHandler(logging.FileHandler):
+    ''' 파일 sink 만 ANSI 제거 (console 은 색 그대로) - 포맷된 줄에 ESC 가 있을 때만 regex '''
+    def format(self, record):
+        text = super().format(record)
+        return remove_ansi_escape_sequences(text) if "\x1b" in text else text
+
     def emit(self, record):
-        d = record.__dict__.copy()
-        d["msg"] = remove_ansi_escape_sequences(str(d.get("msg", "")))
         try:
-            super().emit(logging.makeLogRecord(d))
+            super().emit(record)
         except Exception:
             pass
 
+class _DropQueueHandler(QueueHandler):
+    '''
+    logger 에 붙는 유일한 handler - bounded queue 에 record 를 그대로 넣는다
+    - 포맷은 listener thread 에서 (msg % args 를 호출 thread 가 하지 않는다)
+      . args 에 나중에 바뀌는 dict/list 를 넘기면 바뀐 뒤의 값이 찍힌다 → 그런 것은 f-string 으로
+    - queue 가 가득 차면 기다리지 않고 버린다 (실시간 loop 를 막지 않는다) → dropped
+    '''
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if _M_LOG_DROPPED is not None:
+                _M_LOG_DROPPED.inc()
+
+class _FDQueueListener(QueueListener):
+    ''' sink handler + fd_log.print 줄 기록 / 버린 개수는 다음 record 앞에 한 줄로 알린다 '''
+    def __init__(self, q, handlers, owner):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.owner = owner
+        self.reported = 0
+        self.reported_at = 0.0
+
+    def handle(self, record):
+        dropped = self.owner._queue_handler.dropped
+        if dropped != self.reported and time.monotonic() - self.reported_at >= 1.0:
+            self.reported_at = time.monotonic()
+            note = logging.makeLogRecord({"name": "fd_logger", "levelno": logging.WARNING, "levelname": "WARNING",
+                                          "msg": f"[fd_logging] log queue full - dropped {dropped - self.reported} "
+                                                 f"(total {dropped})"})
+            self.reported = dropped
+            super().handle(note)
+        if getattr(record, "fd_print", None) is not None:
+            self.owner._write_print(record)
+        else:
+            super().handle(record)
+
+    def enqueue_sentinel(self):
+        # 가득 찬 queue 라도 stop() 이 sentinel 을 넣을 수 있게 (기다린다)
+        try:
+            self.queue.put(self._sentinel, timeout=2.0)
+        except queue.Full:
+            pass
+
+try:
+    from fd_common.metrics import fd_metric_counter as _fd_metric_counter, fd_metric_gauge as _fd_metric_gauge
+    _M_LOG_DROPPED = _fd_metric_counter("log_dropped", "log records dropped (queue full)")
+    _M_LOG_DEPTH   = _fd_metric_gauge("log_queue_depth", "log records waiting for the writer thread")
+except ImportError:
+    _M_LOG_DROPPED = _M_LOG_DEPTH = None
+
+# =========================
+# 호출 위치별 rate limit
+# =========================
+class _LogGate:
+    '''
+    fd_log.every(n) / fd_log.throttle(sec) 의 결과
+    - 통과면 fd_log 의 debug/info/warning/error/print 를 그대로, 아니면 아무것도 안 한다
+    - bool 로도 쓴다 : if fd_log.throttle(0.5): print(..., end="")
+    '''
+    __slots__ = ("_on",)
+
+    def __init__(self, on: bool):
+        self._on = on
+
+    def __bool__(self):
+        return self._on
+
+    def debug(self, *args, **kwargs):
+        if self._on: fd_log.debug(*args, **kwargs)
+
+    def info(self, *args, **kwargs):
+        if self._on: fd_log.info(*args, **kwargs)
+
+    def warning(self, *args, **kwargs):
+        if self._on: fd_log.warning(*args, **kwargs)
+
+    def error(self, *args, **kwargs):
+        if self._on: fd_log.error(*args, **kwargs)
+
+    def print(self, *args, **kwargs):
+        if self._on: fd_log.print(*args, **kwargs)
+
+_GATE_PASS = _LogGate(True)
+_GATE_MUTE = _LogGate(False)
+
 # =========================
 # Logger Singleton
 # =========================
@@ -149,6 +251,25 @@ class FDLogger:
             rh.setFormatter(fmt)
             self.logger.addHandler(rh)
 
+        # sink 들을 listener thread 뒤로 옮긴다
+        self._queue_handler = None
+        self._listener = None
+        self._rate = {}
+        self.suppressed = 0
+        if USE_ASYNC and not any(isinstance(h, _DropQueueHandler) for h in self.logger.handlers):
+            sinks = list(self.logger.handlers)
+            q = queue.Queue(maxsize=max(1, QUEUE_MAX))
+            self._queue_handler = _DropQueueHandler(q)
+            for h in sinks:
+                self.logger.removeHandler(h)
+            self.logger.addHandler(self._queue_handler)
+            self._listener = _FDQueueListener(q, sinks, self)
+            self._listener.start()
+            self._sinks = sinks
+            if _M_LOG_DEPTH is not None:
+                _M_LOG_DEPTH.set_function(q.qsize)
+            atexit.register(self.stop)
+
         # ===== raw handles =====
         self._raw_fixed = None
         if TEE_FIXED_RAW and USE_FIXED_DIRECT:
@@ -177,28 +298,88 @@ class FDLogger:
         return self.logger
 
     def print(self, msg: str = "", end: str = "\n", flush: bool = True):
-        line = f"{_ts()} [INFO] {remove_ansi_escape_sequences(str(msg))}"
+        if self._queue_handler is None:
+            self._write_print(logging.makeLogRecord({"msg": msg, "fd_print": (end, flush)}))
+            return
+        record = logging.LogRecord("fd_logger", logging.INFO, "", 0, msg, None, None)
+        record.fd_print = (end, flush)
+        self._queue_handler.enqueue(record)
+
+    def _write_print(self, record):
+        ''' print 한 줄 → stdout + raw 파일 (async 면 listener thread 에서) '''
+        end, flush = record.fd_print
+        text = str(record.msg)
+        if "\x1b" in text:
+            text = remove_ansi_escape_sequences(text)
+        line = f"{_ts(record.created)} [INFO] {text}" + ("" if end is None else end)
         out = sys.stdout or sys.__stdout__
         if out:
             try:
-                out.write(line + ("" if end is None else end))
+                out.write(line)
                 if flush: out.flush()
             except Exception:
                 pass
         if getattr(self, "_raw_run", None):
             try:
-                self._raw_run.write(line + ("" if end is None else end))
+                self._raw_run.write(line)
                 if flush: self._raw_run.flush()
             except Exception:
                 pass
         if getattr(self, "_raw_fixed", None):
             try:
-                self._raw_fixed.write(line + ("" if end is None else end))
+                self._raw_fixed.write(line)
                 if flush: self._raw_fixed.flush()
             except Exception:
                 pass
 
+    def every(self, n: int, key=None) -> _LogGate:
+        ''' 같은 호출 위치에서 n 번에 한 번만 (첫 번째는 통과) - key 로 위치 대신 이름을 줄 수 있다 '''
+        if key is None:
+            f = sys._getframe(1)
+            key = (f.f_code.co_filename, f.f_lineno)
+        count = self._rate.get(key, 0)
+        self._rate[key] = count + 1
+        if count % max(1, int(n)) == 0:
+            return _GATE_PASS
+        self.suppressed += 1
+        return _GATE_MUTE
+
+    def throttle(self, sec: float, key=None) -> _LogGate:
+        ''' 같은 호출 위치에서 sec 초에 한 번만 '''
+        if key is None:
+            f = sys._getframe(1)
+            key = (f.f_code.co_filename, f.f_lineno)
+        now = time.monotonic()
+        last = self._rate.get(key)
+        if last is None or now - last >= sec:
+            self._rate[key] = now
+            return _GATE_PASS
+        self.suppressed += 1
+        return _GATE_MUTE
+
+    def stats(self) -> dict:
+        qh = self._queue_handler
+        return {"async": qh is not None,
+                "depth": qh.queue.qsize() if qh else 0,
+                "max": qh.queue.maxsize if qh else 0,
+                "dropped": qh.dropped if qh else 0,
+                "suppressed": self.suppressed}
+
+    def stop(self):
+        '''
+        listener 종료 - queue 에 남은 것까지 기록 (atexit)
+        - os._exit() 는 atexit 을 건너뛴다 → 그런 경로는 직접 fd_log.close() (안 하면 queue 에 남은 로그는 사라진다)
+        '''
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            try: listener.stop()
+            except Exception: pass
+
     def close(self):
+        self.stop()
+        for h in getattr(self, "_sinks", ()):
+            try: h.flush(); h.close()
+            except: pass
         for fp in (getattr(self, "_raw_fixed", None), getattr(self, "_raw_run", None)):
             try: fp and fp.close()
             except: pass
@@ -211,6 +392,9 @@ fd_logger_instance = FDLogger()
 fd_log = fd_logger_instance.get_logger()
 fd_log.print = fd_logger_instance.print
 fd_log.close = fd_logger_instance.close
+fd_log.every = fd_logger_instance.every
+fd_log.throttle = fd_logger_instance.throttle
+fd_log.stats = fd_logger_instance.stats
 
 fd_log.info(f"[fd_logging] PATH_LOG={PATH_LOG}")
 fd_log.info(f"[fd_logging] FIXED_LOG_FILE={FIXED_LOG_FILE}")
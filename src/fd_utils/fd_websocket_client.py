@@ -8,6 +8,7 @@ import websockets
 from fd_utils.fd_config_manager import conf
 from fd_utils.fd_logging        import fd_log
 from fd_utils.fd_data_manager   import DataManager
+from fd_db.fd_db_writer         import BaseballDBWriter
 
 import logging
 from datetime import datetime
@@ -21,6 +22,30 @@ import websockets
 import logging
 from datetime import datetime
 
+# raw data 기록은 writer thread 로 (recv loop 가 commit/fsync 를 기다리지 않게)
+_db_writer = None
+
+def _get_db_writer():
+    global _db_writer
+    if _db_writer is None:
+        db = getattr(conf, "_baseball_db", None)
+        if db is None:
+            return None
+        _db_writer = BaseballDBWriter(
+            db.db_file,
+            batch_rows=getattr(conf, "_db_write_batch_rows", 64),
+            flush_sec=getattr(conf, "_db_write_flush_sec", 0.25),
+            maxsize=getattr(conf, "_db_write_queue_max", 10000),
+        )
+        _db_writer.start()
+    return _db_writer
+
+def _stop_db_writer():
+    global _db_writer
+    if _db_writer is not None:
+        _db_writer.stop()
+        _db_writer = None
+
 class WebSocketHandler:
     def __init__(self):
         self.websocket = None
@@ -112,8 +137,14 @@ class WebSocketHandler:
                         if kind not in allowed_kinds:
                             continue
 
-                        # DB raw 저장
-                        conf._baseball_db.insert_raw_data(message_data)
+                        # DB raw 저장 (queue 에 넣기만 - batch / PlayId upsert 는 writer thread)
+                        writer = _get_db_writer()
+                        if writer is not None:
+                            writer.submit(message_data)
+                        # replay 조회용 시간축 (memory) 에도 바로 반영
+                        db = getattr(conf, "_baseball_db", None)
+                        if db is not None:
+                            db.feed_timeline(message_data)
 
                         # DataManager 반영
                         datamgr = DataManager()
@@ -225,6 +256,7 @@ def stop_websocket():
                 asyncio.run_coroutine_threadsafe(ws.close(), loop)
                 loop.call_soon_threadsafe(loop.stop)
         finally:
+            _stop_db_writer()
             print("🛑 WebSocket thread stop requested.")
     else:
         print("⚠️ No active WebSocket instance.")
@@ -266,6 +298,7 @@ def stop_websocket():
     ''' Stop WebSocket thread (currently needs manual termination) '''
     global _websocket_thread
     if _websocket_thread is not None:
+        _stop_db_writer()
         print("🛑 The WebSocket thread must be manually terminated.")
     else:
         print("⚠️ No active WebSocket instance.")
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+'''
+BaseballDB benchmark - 시즌 크기 DB 를 만들어서 overlay 조회 시간 비교
+- index 있음 (BaseballDB 가 만든 그대로) / index 없음 (DROP INDEX) 두 번 측정
+- get_tracking_data_paths : query 하나 (UNION ALL, 현재) vs pitch_type 별 query (이전) vs ROW_NUMBER() window
+- get_next_pitch_after / get_next_hit_after / get_prev_pitch_before : event_time 범위 + LIMIT 1
+  + EventTimeline (memory bisect) 로 같은 조회 - 결과가 SQL 과 같은지 확인 후 시간 비교
+
+  python fd_test_db_bench.py --games 162 --pitches 300 --db ./bench/season.db
+'''
+
+import os, sys, time, random, argparse, statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fd_utils.fd_config_manager import conf
+from fd_db.fd_db_manager        import BaseballDB, BASEBALL_DB_INDEXES
+
+PITCH_TYPES = ["Fastball", "Slider", "Curveball", "ChangeUp", "Sinker", "Cutter", "Splitter"]
+TEAMS = [f"T{i:02d}" for i in range(10)]
+
+def log(*a): print(*a, flush=True)
+
+def build(db, games, pitches_per_game, seed=1):
+    ''' 하루 1경기, 경기당 pitches_per_game 투구 (10% 타구) - 시간 순서대로 '''
+    rnd = random.Random(seed)
+    start = datetime(2025, 3, 22, 18, 30, 0)
+    pitch_rows, raw_rows, hit_rows, raw_hit_rows = [], [], [], []
+    for g in range(games):
+        t = start + timedelta(days=g)
+        for n in range(pitches_per_game):
+            t += timedelta(seconds=rnd.randint(15, 40))
+            iso = t.strftime("%Y-%m-%dT%H:%M:%S") + "+09:00"
+            play_id = f"{g:03d}-{n:04d}"
+            team = TEAMS[(g + n // 150) % len(TEAMS)]
+            player = str(rnd.randint(1, 13))
+            ptype = rnd.choice(PITCH_TYPES)
+            pitch_rows.append((play_id, team, player, ptype, rnd.random(), rnd.random(), 0.4, 140.0,
+                               rnd.uniform(120, 160), rnd.uniform(1800, 2600),
+                               f"v/{play_id}.mp4", f"d/{play_id}.pkl", iso.replace("T", " ").split("+")[0]))
+            raw_rows.append((play_id, iso, ptype, rnd.uniform(120, 160), rnd.uniform(1800, 2600)))
+            if rnd.random() < 0.1:
+                hit_rows.append((play_id, team, player, rnd.uniform(0, 90), rnd.uniform(10, 130),
+                                 iso.replace("T", " ").split("+")[0]))
+                raw_hit_rows.append((play_id, iso, rnd.uniform(10, 130), rnd.uniform(0, 90)))
+    cur = db.conn.cursor()
+    cur.executemany('''INSERT INTO pitches (play_id, team_code, player_no, pitch_type, location_height, location_side,
+                       location_time, location_speed, release_speed, release_spin_rate, tracking_video_path,
+                       tracking_data_path, event_time) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)''', pitch_rows)
+    cur.executemany('''INSERT INTO pitches_raw_data (play_id, event_time, pitch_type, release_speed, release_spin_rate)
+                       VALUES (?,?,?,?,?)''', raw_rows)
+    cur.executemany('''INSERT INTO hits (play_id, team_code, player_no, landing_bearing, landing_distance, event_time)
+                       VALUES (?,?,?,?,?,?)''', hit_rows)
+    cur.executemany('''INSERT INTO hits_raw_data (play_id, event_time, landing_distance, landing_bearing)
+                       VALUES (?,?,?,?)''', raw_hit_rows)
+    db.conn.commit()
+    return len(pitch_rows), len(hit_rows), start, start + timedelta(days=games)
+
+def legacy_tracking_paths(db, team_code, player_no, pitch_type_counts):
+    ''' 이전 구현 (pitch_type 마다 query) - 비교용 '''
+    out = {}
+    for pitch_type, limit in pitch_type_counts.items():
+        db.cursor.execute(f'''SELECT tracking_data_path FROM pitches
+                              WHERE team_code = ? AND player_no = ? AND pitch_type = ?
+                              ORDER BY event_time DESC LIMIT {int(limit)};''', (team_code, player_no, pitch_type))
+        out[pitch_type] = [r["tracking_data_path"] for r in db.cursor.fetchall() if r["tracking_data_path"]]
+    return True, out
+
+def window_tracking_paths(db, team_code, player_no, pitch_type_counts):
+    ''' ROW_NUMBER() window 버전 - 비교용 (선수 기록 전체를 순위 매겨서 기록이 쌓이면 느려진다) '''
+    wanted = list(pitch_type_counts.items())
+    db.cursor.execute(f'''
+        WITH want(pitch_type, lim) AS (VALUES {", ".join(["(?, ?)"] * len(wanted))}),
+        ranked AS (
+            SELECT rowid AS rid, pitch_type,
+                   ROW_NUMBER() OVER (PARTITION BY pitch_type ORDER BY event_time DESC) AS rn
+            FROM pitches
+            WHERE team_code = ? AND player_no = ? AND pitch_type IN (SELECT pitch_type FROM want))
+        SELECT r.pitch_type, p.tracking_data_path FROM ranked r
+        JOIN want w ON w.pitch_type = r.pitch_type JOIN pitches p ON p.rowid = r.rid
+        WHERE r.rn <= w.lim ORDER BY r.pitch_type, r.rn;''', [v for pair in wanted for v in pair] + [team_code, player_no])
+    out = {pitch_type: [] for pitch_type in pitch_type_counts}
+    for r in db.cursor.fetchall():
+        if r["tracking_data_path"]:
+            out[r["pitch_type"]].append(r["tracking_data_path"])
+    return True, out
+
+def timeit(fn, args_list):
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+def measure(db, t_begin, days, runs, rnd):
+    counts = {"Fastball": 5, "Slider": 3, "Curveball": 3, "ChangeUp": 2}
+    who = [(rnd.choice(TEAMS), str(rnd.randint(1, 13)), counts) for _ in range(runs)]
+    moments = []
+    for _ in range(runs):
+        base = t_begin + timedelta(days=rnd.randrange(days), hours=rnd.randint(0, 2))
+        moments.append((f"D:/record/{base.strftime('%Y_%m_%d_%H_%M_%S')}", rnd.randint(0, 600)))
+
+    # 결과가 같은지 먼저 확인
+    for args in who[:20]:
+        assert db.get_tracking_data_paths(*args) == legacy_tracking_paths(db, *args), args
+        assert db.get_tracking_data_paths(*args) == window_tracking_paths(db, *args), args
+
+    res = {}
+    res["tracking_paths"] = timeit(db.get_tracking_data_paths, who)
+    res["tracking_paths (per type)"] = timeit(lambda *a: legacy_tracking_paths(db, *a), who)
+    res["tracking_paths (window)"] = timeit(lambda *a: window_tracking_paths(db, *a), who)
+    timeline, db.timeline = db.timeline, None
+    res["next_pitch_after"] = timeit(db.get_next_pitch_after, moments)
+    res["next_hit_after"] = timeit(db.get_next_hit_after, moments)
+    res["prev_pitch_before"] = timeit(db.get_prev_pitch_before, moments)
+    if timeline is not None:
+        for fn in ("get_next_pitch_after", "get_next_hit_after", "get_prev_pitch_before"):
+            for args in moments[:50]:
+                db.timeline = None
+                sql = (getattr(db, fn)(*args), moment_conf())
+                db.timeline = timeline
+                assert (getattr(db, fn)(*args), moment_conf()) == sql, (fn, args)
+        db.timeline = timeline
+        res["next_pitch_after (timeline)"] = timeit(db.get_next_pitch_after, moments)
+        res["next_hit_after (timeline)"] = timeit(db.get_next_hit_after, moments)
+        res["prev_pitch_before (timeline)"] = timeit(db.get_prev_pitch_before, moments)
+    return res
+
+def moment_conf():
+    return (conf._playId_pitch, conf._release_speed, conf._release_spinrate, conf._pitch_type,
+            conf._playId_hit, conf._landingflat_distance, conf._landingflat_bearing)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="./bench/season.db")
+    ap.add_argument("--games", type=int, default=162)
+    ap.add_argument("--pitches", type=int, default=300)
+    ap.add_argument("--runs", type=int, default=300)
+    args = ap.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    conf._team_code, conf._player_no = "", ""
+
+    db = BaseballDB(args.db, timeline=False)
+    t0 = time.perf_counter()
+    n_pitch, n_hit, t_begin, _ = build(db, args.games, args.pitches)
+    log(f"── build: {n_pitch:,} pitches / {n_hit:,} hits in {time.perf_counter() - t0:.1f}s "
+        f"({os.path.getsize(args.db) / 1e6:.1f} MB)")
+    db.cursor.execute("ANALYZE;")
+    t0 = time.perf_counter()
+    db.load_timeline()
+    log(f"── timeline load: {time.perf_counter() - t0:.2f}s {db.timeline.status()}")
+
+    indexed = measure(db, t_begin, args.games, args.runs, random.Random(7))
+    for name, _, _ in BASEBALL_DB_INDEXES:
+        db.cursor.execute(f"DROP INDEX IF EXISTS {name};")
+    db.conn.commit()
+    plain = measure(db, t_begin, args.games, args.runs, random.Random(7))
+    db.close()
+
+    log("──────────────────────────────────────────────────────────────────────────")
+    log(f"{'query':<32}{'indexed avg/p95 ms':>22}{'no index avg/p95 ms':>24}")
+    for key in indexed:
+        (a, p), (b, q) = indexed[key], plain[key]
+        log(f"{key:<32}{a:>12.3f} /{p:>8.3f}{b:>14.3f} /{q:>8.3f}")
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+'''
+WorkQueue / WorkWorker - 한 PC 에서 AIc worker process 여러 개로 확인
+- AId 역할 (이 process) : WorkQueue + AIc 마다 TCPClient (실제와 같은 방향 : AId → AIc 접속)
+- AIc 역할 (--worker)   : TCPServer + WorkWorker, unit 은 cost 만큼 sleep
+- 중간에 worker 하나를 kill → lease 가 끝난 unit 이 다른 worker 로 가는지, 전체가 끝나는지
+
+  python fd_test_work_queue.py --workers 3 --markers 4 --cameras 6 --kill-after 2
+'''
+
+import os, sys, json, time, signal, socket, argparse, subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fd_common.tcp_server      import TCPServer
+from fd_common.tcp_client      import TCPClient
+from fd_common.scatter_gather  import ScatterGather
+from fd_common.work_queue      import WorkQueue, WorkWorker
+
+def log(*a): print(*a, flush=True)
+
+# ───────────────────────────── AIc (worker process) ─────────────────────────────
+def run_worker(port, slots, scale):
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    server = None
+
+    def send(node, pkt):
+        if not server.is_connected():
+            return False
+        server.send_msg(json.dumps(pkt))
+        return True
+    rpc_gather = ScatterGather(send, name=f"w{port}")
+
+    def on_msg(text):
+        msg = json.loads(text)
+        if msg.get("SendState") == "response":
+            rpc_gather.resolve("AId", msg)
+        elif msg.get("Section3") == "Notify":
+            worker.wake()
+
+    def rpc(sec3, payload):
+        pkt = {"Section1": "AIc", "Section2": "Work", "Section3": sec3, "SendState": "request",
+               "From": "AIc", "To": "AId", **payload}
+        return rpc_gather.gather(["AId"], pkt, timeout=5.0).replies.get("AId")
+
+    def handle(unit, job, cancel):
+        # cost 초 × scale 만큼 일하는 척 (lease 를 잃으면 바로 멈춘다)
+        cancel.wait(float(unit["Params"]["sec"]) * scale)
+        return {"worker": name, "unit": unit["Unit"], "job_spec": bool(job)}
+
+    server = TCPServer("127.0.0.1", port, on_msg, name=f"AIc{port}")
+    server.open()
+    worker = WorkWorker(name, rpc, {"calibration": handle}, slots=slots, heartbeat_sec=0.5,
+                        idle_sec=1.0, log=log)
+    worker.start()
+    while True:
+        time.sleep(1)
+
+# ───────────────────────────── AId (queue) ─────────────────────────────
+def run_queue(args):
+    base = args.port
+    procs = []
+    for i in range(args.workers):
+        procs.append(subprocess.Popen([sys.executable, __file__, "--worker", "--port", str(base + i),
+                                       "--slots", str(args.slots), "--scale", str(args.scale)]))
+    queue = WorkQueue(lease_sec=args.lease, max_attempts=3, log=log)
+    queue.start()
+
+    sessions = {}
+    for i in range(args.workers):
+        port = base + i
+        sess = TCPClient(name=f"AId→AIc:{port}")
+        for _ in range(50):
+            if sess.connect("127.0.0.1", port):
+                break
+            time.sleep(0.2)
+            sess = TCPClient(name=f"AId→AIc:{port}")
+
+        def on_msg(text, _sess=sess):
+            resp = queue.handle(json.loads(text))
+            if resp is not None:
+                _sess.send_msg(json.dumps(resp))
+        sess.set_callback(on_msg)
+        sessions[port] = sess
+
+    # camera × marker, marker 길이는 제각각 (긴 marker 가 먼저 나가야 wall time 이 최소)
+    units = []
+    for m in range(args.markers):
+        sec = 1.0 + (m % 3)
+        for c in range(args.cameras):
+            units.append({"id": f"tg{m:02d}_cam{c:02d}", "kind": "calibration", "cost": sec, "params": {"sec": sec}})
+    total = sum(u["cost"] for u in units) * args.scale
+    ideal = total / (args.workers * args.slots)
+    job = queue.submit(units, spec={"prefix": "test"}, kind="calibration")
+    for sess in sessions.values():
+        sess.send_msg(json.dumps({"Section1": "AIc", "Section2": "Work", "Section3": "Notify",
+                                  "SendState": "request", "Job": job}))
+    t0 = time.time()
+
+    if args.kill_after > 0:
+        time.sleep(args.kill_after)
+        victim = procs[0]
+        log(f"── kill worker pid={victim.pid} (port {base})")
+        victim.send_signal(signal.SIGKILL)
+
+    ok = queue.wait(job, args.timeout)
+    st = queue.job_status(job)
+    elapsed = time.time() - t0
+    log("──────────────────────────────────────────────")
+    log(f"finished={ok} done={st['done']}/{st['units']} failed={st['failed']} elapsed={elapsed:.1f}s "
+        f"(ideal {ideal:.1f}s with all workers)")
+    log(f"per worker : {st['workers']}")
+    log(f"queue      : {queue.status()}")
+    for p in procs:
+        p.kill()
+    ok = ok and st["done"] == st["units"]
+    log("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--worker", action="store_true")
+    ap.add_argument("--port", type=int, default=29738)
+    ap.add_argument("--workers", type=int, default=3)
+    ap.add_argument("--slots", type=int, default=2)
+    ap.add_argument("--markers", type=int, default=4)
+    ap.add_argument("--cameras", type=int, default=6)
+    ap.add_argument("--scale", type=float, default=0.3)      # unit 1 cost = 0.3 초
+    ap.add_argument("--lease", type=float, default=2.0)
+    ap.add_argument("--kill-after", type=float, default=1.0)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    args = ap.parse_args()
+    if args.worker:
+        run_worker(args.port, args.slots, args.scale)
+    else:
+        sys.exit(run_queue(args))